@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Замер задержки запросов к SQLite: одноразовые соединения против пула Database
+
+Запуск: python benchmark_db.py [--queries N] [--concurrency K]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from statistics import mean, quantiles
+
+import aiosqlite
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.database.database import Database  # noqa: E402
+from src.database.user_repo import UserRepository  # noqa: E402
+
+_USERS = 1000
+
+
+async def _fresh_connection_lookup(db_path: str, telegram_id: int) -> None:
+    """Как было до пула: своё соединение на каждый вызов репозитория."""
+    async with aiosqlite.connect(db_path) as conn:
+        conn.row_factory = aiosqlite.Row
+        cursor = await conn.execute(
+            "SELECT * FROM users WHERE telegram_id = ?", (telegram_id,)
+        )
+        await cursor.fetchone()
+
+
+async def _measure(lookup, queries: int, concurrency: int) -> list:
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            await lookup(i % _USERS + 1)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    await asyncio.gather(*(one(i) for i in range(queries)))
+    return latencies
+
+
+def _report(title: str, latencies: list) -> None:
+    p50, p95 = (quantiles(latencies, n=100)[i] for i in (49, 94))
+    print(f"{title:<22} avg {mean(latencies):7.3f} мс   p50 {p50:7.3f} мс   p95 {p95:7.3f} мс")
+
+
+async def main(queries: int, concurrency: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        database = Database(db_path)
+        await database.init_db()
+        async with database.connect() as conn:
+            await conn.executemany(
+                "INSERT INTO users (telegram_id) VALUES (?)",
+                [(i,) for i in range(1, _USERS + 1)],
+            )
+            await conn.commit()
+
+        repo = UserRepository(database)
+        print(f"{queries} запросов get_user, параллельно {concurrency}")
+        _report("одноразовые соединения", await _measure(
+            lambda tid: _fresh_connection_lookup(db_path, tid), queries, concurrency
+        ))
+        _report("пул Database", await _measure(repo.get_user, queries, concurrency))
+        await database.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+    asyncio.run(main(args.queries, args.concurrency))
@@ -6,13 +6,19 @@ Enhanced Telegram Bot - Точка входа в приложение
 import asyncio
 import shutil
 import ssl
+import sys
 
-from loguru import logger
+if "--profile-startup" in sys.argv:
+    # Дерево времени импорта бота (в отдельном интерпретаторе) вместо запуска
+    from src.performance.startup_profile import main as profile_startup
+    sys.exit(profile_startup(sys.argv[sys.argv.index("--profile-startup") + 1:]))
+
+from loguru import logger  # noqa: E402
 
 # Импортируем финальную оптимизированную версию бота
-from src.bot import main_enhanced as main
-from src.config import settings
-from src.utils.logging_utils import setup_logging
+from src.bot import main_enhanced as main  # noqa: E402
+from src.config import settings  # noqa: E402
+from src.utils.logging_utils import setup_logging  # noqa: E402
 
 try:
     import urllib3
@@ -2,6 +2,6 @@
 API для мониторинга и управления ботом
 """
 
-from .monitoring import MonitoringAPI
+from .monitoring import MonitoringAPI, protect_monitoring, setup_monitoring_routes
 
-__all__ = ["MonitoringAPI"]
+__all__ = ["MonitoringAPI", "protect_monitoring", "setup_monitoring_routes"]
@@ -2,9 +2,12 @@
 API endpoints для мониторинга
 """
 
+import hmac
 import json
-from typing import Any, Dict
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, Optional
 
+from aiohttp import web
 from loguru import logger
 
 from src.reliability.health_check import health_checker
@@ -160,3 +163,61 @@ class MonitoringAPI:
 
 # Глобальный экземпляр
 monitoring_api = MonitoringAPI()
+
+_json_response = partial(web.json_response, dumps=partial(json.dumps, ensure_ascii=False, default=str))
+
+
+_Handler = Callable[[web.Request], Awaitable[web.StreamResponse]]
+
+
+def protect_monitoring(handler: _Handler, token: str) -> _Handler:
+    """Закрыть обработчик мониторинга Bearer-токеном.
+
+    Доверять адресу клиента нельзя: перед сервером вебхука обычно стоит
+    TLS-прокси на localhost, и для него любой запрос приходит с 127.0.0.1.
+    """
+    if not token:
+        raise ValueError("Мониторинг без MONITORING_TOKEN не публикуется")
+
+    async def guarded(request: web.Request) -> web.StreamResponse:
+        presented = request.headers.get("Authorization", "").removeprefix("Bearer ")
+        if not hmac.compare_digest(presented.encode(), token.encode()):
+            return web.Response(body="Unauthorized", status=401)
+        return await handler(request)
+
+    return guarded
+
+
+def setup_monitoring_routes(
+    app: web.Application, api: Optional[MonitoringAPI] = None, token: Optional[str] = None
+) -> None:
+    """Отдать мониторинг по HTTP на сервере вебхука.
+
+    ``/health`` открыт и отвечает 503, если система в состоянии unhealthy (для
+    проб балансировщика). Остальные пути — статистика в JSON, закрытая
+    ``protect_monitoring``: сервер вебхука слушает публичный адрес. Без
+    ``token`` они не регистрируются вовсе.
+    """
+    api = api or monitoring_api
+
+    async def health(request: web.Request) -> web.Response:
+        status = api.get_health_status()
+        code = 503 if status.get("overall_status") == "unhealthy" else 200
+        return _json_response(status, status=code)
+
+    async def stats(request: web.Request) -> web.Response:
+        return _json_response(api.get_system_stats())
+
+    async def performance(request: web.Request) -> web.Response:
+        return _json_response(api.get_performance_metrics())
+
+    async def rate_limits(request: web.Request) -> web.Response:
+        return _json_response(api.get_rate_limit_stats())
+
+    app.router.add_get("/health", health)
+    if not token:
+        logger.warning("MONITORING_TOKEN не задан — /monitoring/* на сервере вебхука отключён")
+        return
+    app.router.add_get("/monitoring/stats", protect_monitoring(stats, token))
+    app.router.add_get("/monitoring/performance", protect_monitoring(performance, token))
+    app.router.add_get("/monitoring/rate-limits", protect_monitoring(rate_limits, token))
@@ -0,0 +1,248 @@
+"""
+Приём обновлений Telegram через вебхук
+
+Long polling держит один запрос к Telegram и не масштабируется за
+балансировщиком. В режиме вебхука Telegram сам присылает обновления POST-ом
+на ``WEBHOOK_URL``; сервер aiohttp проверяет секретный заголовок и кладёт
+обновление в ограниченную очередь, а фиксированный пул обработчиков разбирает
+её через диспетчер. Ответ Telegram уходит сразу после постановки в очередь.
+
+Если очередь заполнена дольше ``_ENQUEUE_TIMEOUT`` секунд, запрос получает
+503 с ``Retry-After`` — Telegram повторит доставку позже, а процесс не копит
+неограниченное число задач в памяти. Тот же сервер отдаёт ``/health`` и
+``/monitoring/*`` (последние — только при заданном ``MONITORING_TOKEN``).
+
+Секрет вебхука без ``WEBHOOK_SECRET`` выводится из токена бота: каждый
+процесс регистрирует вебхук заново, и случайный секрет последнего процесса
+оставил бы остальные отвечать 401.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import signal
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+from aiogram import Bot, Dispatcher
+from aiogram.methods import TelegramMethod
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+from loguru import logger
+
+from src.api.monitoring import MonitoringAPI, protect_monitoring, setup_monitoring_routes
+from src.config import settings
+
+# Сколько ждать места в очереди, прежде чем ответить Telegram 503
+_ENQUEUE_TIMEOUT = 5.0
+# Сколько ждать разбора очереди при остановке
+_DRAIN_TIMEOUT = 30.0
+
+
+class QueuedRequestHandler(SimpleRequestHandler):
+    """Обработчик вебхука с ограниченной очередью и пулом обработчиков."""
+
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        secret_token: Optional[str] = None,
+        queue_size: int = 100,
+        workers: int = 16,
+        enqueue_timeout: float = _ENQUEUE_TIMEOUT,
+        **data: Any,
+    ):
+        super().__init__(dispatcher, bot, handle_in_background=True, secret_token=secret_token, **data)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, queue_size))
+        self.workers = max(1, workers)
+        self.enqueue_timeout = enqueue_timeout
+        self._tasks: List[asyncio.Task] = []
+        self.accepted = 0
+        self.rejected = 0
+        self.unauthorized = 0
+        self.failed = 0
+
+    def register(self, app: web.Application, /, path: str, **kwargs: Any) -> None:
+        # Очередь разбирается до того, как базовый класс закроет сессию бота
+        app.on_startup.append(self._on_startup)
+        app.on_shutdown.append(self._on_shutdown)
+        super().register(app, path=path, **kwargs)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        bot = await self.resolve_bot(request)
+        if not self.verify_secret(request.headers.get("X-Telegram-Bot-Api-Secret-Token", ""), bot):
+            self.unauthorized += 1
+            logger.warning(f"Вебхук: запрос с неверным секретом от {request.remote}")
+            return web.Response(body="Unauthorized", status=401)
+
+        try:
+            update = await request.json(loads=bot.session.json_loads)
+        except ValueError:
+            update = None
+        if not isinstance(update, dict) or "update_id" not in update:
+            return web.Response(body="Bad Request", status=400)
+
+        try:
+            await asyncio.wait_for(self.queue.put((bot, update)), timeout=self.enqueue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            logger.warning(f"Вебхук: очередь переполнена, обновление {update['update_id']} отклонено")
+            return web.Response(body="Queue is full", status=503, headers={"Retry-After": "1"})
+
+        self.accepted += 1
+        return web.json_response({}, dumps=bot.session.json_dumps)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self.queue.qsize(),
+            "capacity": self.queue.maxsize,
+            "workers": self.workers,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "unauthorized": self.unauthorized,
+            "failed": self.failed,
+        }
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"webhook-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        """Дождаться разбора очереди и остановить обработчики."""
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout=_DRAIN_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(f"Вебхук: при остановке не разобрано обновлений: {self.queue.qsize()}")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _on_startup(self, app: web.Application) -> None:
+        await self.start()
+
+    async def _on_shutdown(self, app: web.Application) -> None:
+        await self.stop()
+
+    async def _worker(self) -> None:
+        while True:
+            bot, update = await self.queue.get()
+            try:
+                result = await self.dispatcher.feed_raw_update(bot=bot, update=update, **self.data)
+                if isinstance(result, TelegramMethod):
+                    await self.dispatcher.silent_call_request(bot=bot, result=result)
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Вебхук: ошибка обработки обновления {update.get('update_id')}: {e}")
+            finally:
+                self.queue.task_done()
+
+
+# Обработчик вебхука в приложении (для /monitoring/webhook и тестов)
+WEBHOOK_HANDLER = web.AppKey("webhook_handler", QueuedRequestHandler)
+
+
+def derive_webhook_secret(bot_token: str) -> str:
+    """Секрет вебхука из токена бота: одинаковый во всех процессах за этим токеном."""
+    return hmac.new(bot_token.encode("utf-8"), b"webhook-secret", hashlib.sha256).hexdigest()
+
+
+def webhook_path(url: Optional[str]) -> str:
+    """Путь маршрута вебхука из публичного URL."""
+    return urlsplit(url or "").path or "/webhook"
+
+
+def build_webhook_app(
+    dp: Dispatcher,
+    bot: Bot,
+    secret: Optional[str],
+    monitoring: Optional[MonitoringAPI] = None,
+    path: str = "/webhook",
+    queue_size: int = 100,
+    workers: int = 16,
+    enqueue_timeout: float = _ENQUEUE_TIMEOUT,
+    monitoring_token: Optional[str] = None,
+) -> web.Application:
+    """Приложение aiohttp: маршрут вебхука, /health и /monitoring/*."""
+    app = web.Application()
+    handler = QueuedRequestHandler(
+        dp, bot,
+        secret_token=secret,
+        queue_size=queue_size,
+        workers=workers,
+        enqueue_timeout=enqueue_timeout,
+    )
+    handler.register(app, path=path)
+    setup_application(app, dp, bot=bot)
+    setup_monitoring_routes(app, monitoring, token=monitoring_token)
+
+    async def webhook_stats(request: web.Request) -> web.Response:
+        return web.json_response(handler.stats())
+
+    if monitoring_token:
+        app.router.add_get("/monitoring/webhook", protect_monitoring(webhook_stats, monitoring_token))
+    app[WEBHOOK_HANDLER] = handler
+    return app
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot, monitoring: Optional[MonitoringAPI] = None) -> None:
+    """Поднять сервер вебхука, зарегистрировать URL в Telegram и работать до сигнала.
+
+    ``start_polling`` сам ловит SIGTERM/SIGINT; здесь их ловит ``run_webhook`` и
+    возвращает управление — очередь разбирается при остановке сервера, а
+    вызывающий выполняет обычный путь остановки бота.
+    """
+    secret = settings.webhook_secret or derive_webhook_secret(settings.telegram_token)
+    app = build_webhook_app(
+        dp, bot, secret,
+        monitoring=monitoring,
+        path=webhook_path(settings.webhook_url),
+        queue_size=settings.webhook_queue_size,
+        workers=settings.webhook_workers,
+        monitoring_token=settings.monitoring_token,
+    )
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    handled_signals = []
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):  # Windows / не главный поток
+            continue
+        handled_signals.append(sig)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    try:
+        site = web.TCPSite(runner, settings.webhook_host, settings.webhook_port)
+        await site.start()
+        await bot.set_webhook(
+            settings.webhook_url,
+            secret_token=secret,
+            allowed_updates=dp.resolve_used_update_types(),
+        )
+        logger.info(
+            f"Вебхук {settings.webhook_url} слушает {settings.webhook_host}:{settings.webhook_port} "
+            f"(очередь {settings.webhook_queue_size}, обработчиков {settings.webhook_workers})"
+        )
+        await stop.wait()
+        logger.info("Получен сигнал остановки — вебхук разбирает очередь и завершается")
+    finally:
+        for sig in handled_signals:
+            loop.remove_signal_handler(sig)
+        await runner.cleanup()
+
+
+__all__ = [
+    "WEBHOOK_HANDLER",
+    "QueuedRequestHandler",
+    "build_webhook_app",
+    "derive_webhook_secret",
+    "run_webhook",
+    "webhook_path",
+]
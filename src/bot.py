@@ -6,11 +6,11 @@ import asyncio
 import os
 
 from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
 from loguru import logger
 
 from src.config import settings
 from src.database import db
+from src.llm import protocol_generator
 
 # Импорты надежности
 from src.reliability import health_checker
@@ -48,6 +48,8 @@ from src.handlers import (
 from src.handlers.admin_handlers import setup_admin_handlers
 from src.handlers.participants_handlers import setup_participants_handlers
 from src.services import FileService, ProcessingService, TemplateService, UserService
+from src.services.mapping_session import mapping_sessions
+from src.services.shared_state import create_fsm_storage, state_backend
 
 
 class EnhancedTelegramBot:
@@ -55,7 +57,10 @@ class EnhancedTelegramBot:
     
     def __init__(self):
         self.bot = Bot(token=settings.telegram_token)
-        self.dp = Dispatcher(storage=MemoryStorage())
+        # FSM и карточки сопоставления — в общем бэкенде (STATE_BACKEND), если он
+        # задан: тогда несколько процессов работают за одним токеном
+        self.dp = Dispatcher(storage=create_fsm_storage(state_backend))
+        mapping_sessions.bot = self.bot
         
         # OOM защита
         if OOM_PROTECTION_AVAILABLE:
@@ -271,6 +276,13 @@ class EnhancedTelegramBot:
             # 7.5. Запускаем воркеры очереди задач
             await self.task_queue_manager.start_workers()
             logger.info("Воркеры очереди задач запущены")
+
+            # 7.6. Прогреваем локальные модели (в фоне: первая задача не ждёт загрузки)
+            try:
+                from src.services.model_workers import preload_models
+                await asyncio.to_thread(preload_models)
+            except Exception as e:
+                logger.warning(f"Не удалось запустить прогрев моделей: {e}")
             
             # 8. Проверяем доступность компонентов
             await self._perform_startup_checks()
@@ -280,9 +292,16 @@ class EnhancedTelegramBot:
             from src.ux.command_menu import publish_command_menu
             await publish_command_menu(self.bot)
 
-            # 9. Запускаем бота
+            # 9. Запускаем бота: вебхук, если задан публичный URL, иначе long polling
             logger.info("Бот с системой надежности запущен и готов к работе")
-            await self.dp.start_polling(self.bot)
+            if settings.webhook_url:
+                from src.api import MonitoringAPI
+                from src.api.webhook import run_webhook
+                await run_webhook(self.dp, self.bot, MonitoringAPI(self))
+            else:
+                # Оставшийся от режима вебхука URL блокирует getUpdates
+                await self.bot.delete_webhook(drop_pending_updates=False)
+                await self.dp.start_polling(self.bot)
             
         except Exception as e:
             logger.error(f"Критическая ошибка при запуске бота: {e}")
@@ -390,6 +409,13 @@ class EnhancedTelegramBot:
             await self.bot.session.close()
             logger.info("Соединение с ботом закрыто")
             
+            # 4.0. Закрываем пулы соединений LLM-клиентов
+            await protocol_generator.close()
+
+            # 4.0.1. Останавливаем процессы локальных моделей
+            from src.services.model_workers import shutdown_model_workers
+            await asyncio.to_thread(shutdown_model_workers)
+            
             # 4.1. Даем время на очистку всех aiohttp сессий
             await asyncio.sleep(0.5)
             
@@ -407,7 +433,10 @@ class EnhancedTelegramBot:
             
             # 5. Сохраняем статистику
             await self._save_shutdown_stats()
-            
+
+            # 6. Сбрасываем журнал отложенных записей и закрываем пул БД
+            await db.close()
+
             logger.info("Graceful shutdown завершен")
             
         except Exception as e:
@@ -24,6 +24,13 @@ class Settings(BaseSettings):
     
     # Telegram Bot
     telegram_token: str = Field(..., description="Токен Telegram бота")
+    webhook_url: Optional[str] = Field(None, description="Публичный HTTPS URL вебхука (например https://bot.example.com/telegram); если не задан — long polling")
+    webhook_host: str = Field("0.0.0.0", description="Адрес, на котором слушает сервер вебхука")
+    webhook_port: int = Field(8080, description="Порт сервера вебхука (там же /health и /monitoring/*)")
+    webhook_secret: Optional[str] = Field(None, description="Секрет заголовка X-Telegram-Bot-Api-Secret-Token; если не задан — выводится из токена бота (одинаков во всех процессах)")
+    webhook_queue_size: int = Field(100, description="Ёмкость очереди входящих обновлений вебхука; при переполнении Telegram получает 503 и повторит позже")
+    webhook_workers: int = Field(16, description="Сколько обновлений вебхука обрабатывается одновременно")
+    monitoring_token: Optional[str] = Field(None, description="Токен для /monitoring/* на сервере вебхука (Authorization: Bearer); если не задан, /monitoring/* не публикуется")
     
     # OpenAI
     openai_api_key: Optional[str] = Field(None, description="API ключ OpenAI")
@@ -45,6 +52,13 @@ class Settings(BaseSettings):
     # LLM Таймауты
     llm_timeout_seconds: float = Field(30.0, description="Общий таймаут ожидания ответа от LLM (в секундах)")
     
+    # Пул соединений к LLM (на каждый пресет свой httpx.AsyncClient)
+    llm_http2: bool = Field(True, description="HTTP/2 для соединений с LLM (нужен пакет h2; без него — HTTP/1.1)")
+    llm_pool_max_connections: int = Field(20, description="Максимум соединений в пуле одного пресета LLM")
+    llm_pool_max_keepalive: int = Field(10, description="Максимум простаивающих keep-alive соединений в пуле пресета LLM")
+    llm_keepalive_expiry_seconds: float = Field(30.0, description="Через сколько секунд простоя keep-alive соединение с LLM закрывается")
+    llm_max_concurrency_per_preset: int = Field(8, description="Максимум одновременных запросов к одному пресету LLM")
+    
     # HTTP заголовки для LLM запросов
     http_referer: Optional[str] = Field("https://github.com/gihar/Soroka", description="HTTP Referer заголовок для LLM запросов")
     x_title: Optional[str] = Field("Soroka", description="X-Title заголовок для LLM запросов")
@@ -56,6 +70,10 @@ class Settings(BaseSettings):
     max_file_size: int = Field(20 * 1024 * 1024, description="Максимальный размер файла в байтах")
     telegram_max_file_size: int = Field(20 * 1024 * 1024, description="Максимальный размер файла для Telegram Bot API в байтах")
     max_external_file_size: int = Field(2 * 1024 * 1024 * 1024, description="Максимальный размер файла из внешних источников (Google Drive, Яндекс.Диск, Synology Drive) в байтах")
+    download_parallel_parts: int = Field(4, description="Сколько диапазонов внешнего файла качать параллельно (если сервер поддерживает Range)")
+    download_min_part_mb: int = Field(8, description="Минимальный размер диапазона при параллельном скачивании (MB)")
+    download_max_retries: int = Field(5, description="Повторы докачки диапазона после обрыва соединения")
+    streaming_intake: bool = Field(True, description="Видео по ссылке сразу направлять в ffmpeg и хранить только звуковую дорожку")
     oom_max_file_size_mb: Optional[float] = Field(
         None,
         description="Максимальный размер файла для стадии транскрипции (MB). По умолчанию берётся из MAX_FILE_SIZE"
@@ -76,6 +94,10 @@ class Settings(BaseSettings):
     transcription_mode: str = Field("local", description="Режим транскрипции: local | cloud | hybrid (синоним cloud) | speechmatics | deepgram | leopard; при сбое или недоступности бэкенда — откат на локальный Whisper")
     groq_api_key: Optional[str] = Field(None, description="API ключ Groq для облачной транскрипции")
     groq_model: str = Field("whisper-large-v3-turbo", description="Модель Groq для транскрипции")
+    groq_chunked_transcription: bool = Field(True, description="Записи больше лимита Groq (25 MB после предобработки) резать по паузам на окна и транскрибировать параллельно вместо отката на локальный Whisper")
+    groq_chunk_max_seconds: int = Field(1200, description="Максимальная длина окна нарезки для Groq (секунды, вместе с перекрытием)")
+    groq_chunk_overlap_seconds: float = Field(3.0, description="Перекрытие соседних окон нарезки (секунды) — чтобы слово на стыке не потерялось")
+    groq_chunk_concurrency: int = Field(3, description="Сколько окон нарезки транскрибировать одновременно")
     
     # Speechmatics
     speechmatics_api_key: Optional[str] = Field(None, description="API ключ Speechmatics для транскрипции и диаризации")
@@ -106,17 +128,32 @@ class Settings(BaseSettings):
     compute_type: str = Field("auto", description="Тип вычислений: auto, int8, float16, float32")
     max_speakers: int = Field(10, description="Максимальное количество говорящих")
     min_speakers: int = Field(1, description="Минимальное количество говорящих")
+    model_workers: Optional[int] = Field(None, description="Процессов для локальных моделей (Whisper, WhisperX, pyannote) с тёплыми моделями; по умолчанию — по числу одновременных задач очереди, 0 — считать в потоке процесса бота")
+    preload_models: str = Field("", description="Локальные модели для прогрева при старте: whisper, whisperx, pyannote (через запятую)")
+    model_idle_ttl: int = Field(1800, description="Через сколько секунд простоя выгружать локальную модель (0 — не выгружать)")
     
     # Очистка файлов
     enable_cleanup: bool = Field(True, description="Включить автоматическую очистку временных файлов")
     cleanup_interval_minutes: int = Field(30, description="Интервал очистки файлов в минутах")
     temp_file_max_age_hours: int = Field(2, description="Максимальный возраст временных файлов в часах")
     cache_max_age_hours: int = Field(24, description="Максимальный возраст кэш файлов в часах")
+    transcription_store_enabled: bool = Field(True, description="Хранить транскрипции по хешу содержимого между рестартами (повторная запись не транскрибируется)")
+    transcription_store_dir: str = Field("cache/transcriptions", description="Директория хранилища транскрипций (индекс SQLite + сжатые блобы)")
+    transcription_store_max_mb: int = Field(2048, description="Предельный размер хранилища транскрипций (MB); сверх него вытесняются давно не использованные")
+
+    # Общее состояние процессов (FSM, сессии сопоставления)
+    state_backend: str = Field("memory", description="Где хранить FSM и сессии сопоставления: memory (в процессе), sqlite (общий файл для процессов хоста), redis (Redis-совместимый сервер)")
+    state_sqlite_path: str = Field("cache/state.sqlite", description="Файл SQLite для STATE_BACKEND=sqlite")
+    redis_url: Optional[str] = Field(None, description="URL Redis-совместимого сервера для STATE_BACKEND=redis (например redis://localhost:6379/0)")
     
     # Улучшения качества протоколов
     enable_text_preprocessing: bool = Field(True, description="Включить предобработку текста транскрипции")
     enable_protocol_validation: bool = Field(True, description="Включить валидацию и оценку качества протоколов")
     meeting_type_detection: bool = Field(True, description="Включить автоопределение типа встречи")
+    stage1_prefetch: bool = Field(True, description="Запускать анализ встречи (ЭТАП 1) сразу после транскрипции, параллельно с сопоставлением спикеров, и переиспользовать его при генерации")
+    long_transcript_mode: bool = Field(True, description="Map-reduce генерация для длинных транскрипций: фрагменты по репликам извлекаются параллельно и объединяются")
+    long_transcript_threshold_tokens: int = Field(60000, description="Оценка токенов транскрипции, начиная с которой включается map-reduce генерация")
+    long_transcript_chunk_tokens: int = Field(20000, description="Бюджет токенов одного фрагмента транскрипции в map-reduce генерации")
     
       
     # Оптимизация LLM пайплайна
@@ -151,7 +188,9 @@ class Settings(BaseSettings):
     # Настройки очереди задач
     max_concurrent_tasks: Optional[int] = Field(None, description="Максимальное количество одновременно обрабатываемых задач (по умолчанию рассчитывается по CPU/RAM)")
     max_queue_size: int = Field(100, description="Максимальный размер очереди задач")
-    queue_update_interval: float = Field(2.0, description="Интервал проверки изменений позиции в очереди (в секундах)")
+    queue_aging_seconds: float = Field(300.0, description="Через сколько секунд ожидания задача поднимается на один уровень приоритета (0 — без старения)")
+    queue_max_active_per_user: int = Field(2, description="Сколько задач одного пользователя обрабатывается одновременно (0 — без ограничения)")
+    queue_update_interval: float = Field(2.0, description="Окно группировки правок сообщения о позиции в очереди (в секундах)")
     queue_cleanup_interval_hours: int = Field(24, description="Интервал очистки завершенных задач из очереди (в часах)")
     
     # Администраторы
@@ -21,7 +21,7 @@ class AppSettingsRepository:
 
     async def get(self, key: str) -> Optional[str]:
         """Return the stored string value for `key`, or None if absent."""
-        async with self._db.connect() as db:
+        async with self._db.read() as db:
             cursor = await db.execute(
                 "SELECT value FROM app_settings WHERE key = ?",
                 (key,),
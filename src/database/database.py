@@ -1,29 +1,168 @@
 """
 Модуль для работы с базой данных
+
+Соединения долгоживущие и общие для всех репозиториев: один писатель,
+блоки которого сериализованы, и несколько читателей. Раньше каждый вызов
+репозитория открывал своё ``aiosqlite.connect`` — новый поток, новое
+соединение, холодный кэш страниц и подготовленных выражений. БД работает в
+режиме WAL: читатели не ждут писателя и не блокируют его.
 """
 
+import asyncio
+import threading
 from contextlib import asynccontextmanager
+from typing import List, Optional
 
 import aiosqlite
 from loguru import logger
 
+from .write_behind import WriteBehindJournal
+
+# Число соединений-читателей в пуле (писатель всегда один)
+_READERS = 4
+# Подготовленные выражения, которые sqlite3 держит на каждое соединение
+_STATEMENT_CACHE = 256
+# WAL — журнал, допускающий чтение во время записи; при WAL synchronous=NORMAL
+# не теряет целостность, а fsync делает только на checkpoint.
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+
+# Версионные шаги схемы: (версия, что делает, выражения). Применённая версия
+# хранится в PRAGMA user_version, каждый шаг выполняется ровно один раз.
+# Новый шаг — только в конец списка со следующим номером.
+_SCHEMA_MIGRATIONS = (
+    (1, "индексы горячих выборок", (
+        # get_pending_queue_tasks и очистка: статус + порядок выдачи без сортировки
+        "CREATE INDEX IF NOT EXISTS idx_queue_tasks_status_priority "
+        "ON queue_tasks (status, priority DESC, created_at)",
+        # get_user_stats: все четыре выборки читают только индекс
+        "CREATE INDEX IF NOT EXISTS idx_processing_history_user_created "
+        "ON processing_history (user_id, created_at, llm_provider, template_id)",
+        # get_processing_metrics(hours): окно по времени создания
+        "CREATE INDEX IF NOT EXISTS idx_processing_metrics_created "
+        "ON processing_metrics (created_at)",
+        # get_all_feedback: последние отзывы первыми
+        "CREATE INDEX IF NOT EXISTS idx_feedback_created "
+        "ON feedback (created_at)",
+    )),
+)
+
+
+def _daemonize(conn: aiosqlite.Connection) -> None:
+    """Поток долгоживущего соединения не должен держать процесс при выходе."""
+    thread = conn if isinstance(conn, threading.Thread) else getattr(conn, "_thread", None)
+    if thread is not None:
+        thread.daemon = True
+
 
 class Database:
     """Класс для работы с базой данных"""
 
-    def __init__(self, db_path: str = "bot.db"):
+    def __init__(self, db_path: str = "bot.db", readers: int = _READERS):
         self.db_path = db_path
+        # Каждое соединение с ':memory:' — отдельная БД: читаем через писателя
+        self.readers = 0 if db_path == ":memory:" else readers
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._writer: Optional[aiosqlite.Connection] = None
+        self._connections: List[aiosqlite.Connection] = []
+        self._idle_readers: Optional[asyncio.Queue] = None
+        self._write_lock: Optional[asyncio.Lock] = None
+        self._pool_lock: Optional[asyncio.Lock] = None
+        # Отложенные некритичные записи (метрики, статусы, отзывы)
+        self.journal = WriteBehindJournal(self)
+
+    async def _open(self) -> aiosqlite.Connection:
+        """Открыть соединение пула с row_factory и PRAGMA."""
+        conn = aiosqlite.connect(self.db_path, cached_statements=_STATEMENT_CACHE)
+        _daemonize(conn)
+        await conn
+        conn.row_factory = aiosqlite.Row
+        for pragma in _PRAGMAS:
+            await conn.execute(pragma)
+        self._connections.append(conn)
+        return conn
+
+    async def _ensure_pool(self) -> None:
+        """Открыть пул при первом обращении из текущего event loop."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Пул привязан к loop (блокировки, очередь читателей): новый loop
+            # (перезапуск, тесты) получает новый пул, старый закрываем.
+            await self._close_connections()
+            self._loop = loop
+            self._idle_readers = asyncio.Queue()
+            self._write_lock = asyncio.Lock()
+            self._pool_lock = asyncio.Lock()
+        if self._writer is not None:
+            return
+        async with self._pool_lock:
+            if self._writer is not None:
+                return
+            # Писатель первым: он переводит файл БД в WAL
+            writer = await self._open()
+            for _ in range(self.readers):
+                self._idle_readers.put_nowait(await self._open())
+            self._writer = writer
+
+    @staticmethod
+    async def _release(conn: aiosqlite.Connection) -> None:
+        """Вернуть соединение в пул чистым: без открытой транзакции."""
+        conn.row_factory = aiosqlite.Row
+        if conn.in_transaction:
+            # Как и при закрытии одноразового соединения: незакоммиченное
+            # отбрасывается, а не переходит в следующий блок
+            await conn.rollback()
 
     @asynccontextmanager
     async def connect(self):
-        """Единственное место политики соединения: row_factory, будущие PRAGMA."""
-        async with aiosqlite.connect(self.db_path) as conn:
-            conn.row_factory = aiosqlite.Row
+        """Соединение-писатель. Блоки сериализованы: транзакции не перемешиваются."""
+        await self._ensure_pool()
+        async with self._write_lock:
+            try:
+                yield self._writer
+            finally:
+                await self._release(self._writer)
+
+    @asynccontextmanager
+    async def read(self):
+        """Соединение-читатель из пула — для запросов без записи."""
+        await self._ensure_pool()
+        if not self.readers:
+            async with self.connect() as conn:
+                yield conn
+            return
+        conn = await self._idle_readers.get()
+        try:
             yield conn
+        finally:
+            try:
+                await self._release(conn)
+            finally:
+                self._idle_readers.put_nowait(conn)
+
+    async def close(self) -> None:
+        """Сбросить журнал отложенных записей и закрыть пул (при остановке бота)."""
+        await self.journal.close()
+        await self._close_connections()
+
+    async def _close_connections(self) -> None:
+        connections, self._connections = self._connections, []
+        self._writer = None
+        self._idle_readers = asyncio.Queue() if self._idle_readers is not None else None
+        for conn in connections:
+            try:
+                await conn.close()
+            except Exception as e:
+                logger.debug(f"Ошибка закрытия соединения с БД: {e}")
 
     async def init_db(self):
         """Инициализация базы данных"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.connect() as db:
             # Таблица пользователей
             await db.execute("""
                 CREATE TABLE IF NOT EXISTS users (
@@ -69,8 +208,6 @@ class Database:
                     file_name TEXT,
                     template_id INTEGER,
                     llm_provider TEXT,
-                    transcription_text TEXT,
-                    result_text TEXT,
                     speaker_mapping TEXT,
                     meeting_type TEXT,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -79,6 +216,18 @@ class Database:
                 )
             """)
             
+            # Тексты истории (транскрипция, протокол) — сжатые, отдельно от
+            # метаданных: сканы processing_history их не читают
+            await db.execute("""
+                CREATE TABLE IF NOT EXISTS processing_history_texts (
+                    history_id INTEGER NOT NULL,
+                    kind TEXT NOT NULL,
+                    body BLOB NOT NULL,
+                    PRIMARY KEY (history_id, kind),
+                    FOREIGN KEY (history_id) REFERENCES processing_history (id)
+                )
+            """)
+
             # Таблица обратной связи
             await db.execute("""
                 CREATE TABLE IF NOT EXISTS feedback (
@@ -222,6 +371,9 @@ class Database:
                             f"Миграция {_column} в processing_history не применилась: {exc}"
                         )
 
+            # Миграция: тексты старых записей истории — в processing_history_texts
+            await self._move_history_texts(db)
+
             # Миграция: rating в feedback становится необязательным.
             # NOT NULL снимается только перестройкой таблицы (SQLite не умеет
             # ALTER COLUMN), поэтому шаг идёт под проверкой схемы и выполняется
@@ -321,8 +473,86 @@ class Database:
             await self._consolidate_templates(db)
 
             await db.commit()
+
+            # Версионные шаги — последними, когда все таблицы уже созданы
+            await self._apply_schema_migrations(db)
             logger.info("База данных инициализирована")
     
+    async def _apply_schema_migrations(self, db) -> None:
+        """Применить шаги ``_SCHEMA_MIGRATIONS`` новее PRAGMA user_version.
+
+        Шаг и новая версия фиксируются одной транзакцией: упавший шаг не
+        поднимает версию и повторится при следующем старте.
+        """
+        cursor = await db.execute("PRAGMA user_version")
+        current = (await cursor.fetchone())[0]
+        for version, title, statements in _SCHEMA_MIGRATIONS:
+            if version <= current:
+                continue
+            try:
+                # sqlite3 сам не открывает транзакцию перед DDL — открываем явно
+                await db.execute("BEGIN")
+                for statement in statements:
+                    await db.execute(statement)
+                await db.execute(f"PRAGMA user_version = {version}")
+                await db.commit()
+                logger.info(f"Схема БД обновлена до версии {version}: {title}")
+            except Exception as exc:
+                await db.rollback()
+                logger.error(f"Шаг схемы {version} ({title}) не применился: {exc}")
+                return
+
+    async def _move_history_texts(self, db) -> None:
+        """Перенести транскрипции и протоколы из строк истории в сжатую таблицу.
+
+        Старые БД хранят тексты прямо в processing_history. Шаг переносит их
+        пачками в processing_history_texts и обнуляет колонки-источники —
+        повторный старт находит только новые строки, а на свежей схеме (без
+        колонок) шаг не выполняется. Освободившиеся страницы уходят в freelist;
+        файл сожмёт только ручной VACUUM.
+        """
+        from .history_repo import RESULT, TRANSCRIPTION, pack_text
+
+        try:
+            cursor = await db.execute("PRAGMA table_info(processing_history)")
+            columns = {c[1] for c in await cursor.fetchall()}
+            if not {"transcription_text", "result_text"} <= columns:
+                return
+
+            moved = 0
+            while True:
+                cursor = await db.execute("""
+                    SELECT id, transcription_text, result_text
+                    FROM processing_history
+                    WHERE transcription_text IS NOT NULL OR result_text IS NOT NULL
+                    LIMIT 200
+                """)
+                rows = await cursor.fetchall()
+                if not rows:
+                    break
+                texts = [
+                    (row[0], kind, pack_text(text))
+                    for row in rows
+                    for kind, text in ((TRANSCRIPTION, row[1]), (RESULT, row[2]))
+                    if text
+                ]
+                await db.executemany(
+                    "INSERT OR IGNORE INTO processing_history_texts (history_id, kind, body) "
+                    "VALUES (?, ?, ?)",
+                    texts,
+                )
+                await db.executemany(
+                    "UPDATE processing_history SET transcription_text = NULL, "
+                    "result_text = NULL WHERE id = ?",
+                    [(row[0],) for row in rows],
+                )
+                await db.commit()
+                moved += len(rows)
+            if moved:
+                logger.info(f"Тексты {moved} записей истории перенесены в processing_history_texts")
+        except Exception as exc:
+            logger.error(f"Перенос текстов истории не применился: {exc}")
+
     async def _relax_feedback_rating(self, db) -> None:
         """Снять NOT NULL с feedback.rating, сохранив данные.
 
@@ -1,6 +1,12 @@
 """Feedback data access."""
 from typing import Any, Dict, List, Optional
 
+_INSERT_FEEDBACK = """
+    INSERT INTO feedback
+    (user_id, rating, feedback_type, comment, protocol_id, processing_time, file_format, file_size)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
 
 class FeedbackRepository:
     """Repository for feedback operations."""
@@ -14,16 +20,26 @@ class FeedbackRepository:
                             file_size: Optional[int] = None) -> None:
         """Save user feedback."""
         async with self._db.connect() as db:
-            await db.execute("""
-                INSERT INTO feedback
-                (user_id, rating, feedback_type, comment, protocol_id, processing_time, file_format, file_size)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (user_id, rating, feedback_type, comment, protocol_id, processing_time, file_format, file_size))
+            await db.execute(_INSERT_FEEDBACK, (
+                user_id, rating, feedback_type, comment, protocol_id,
+                processing_time, file_format, file_size,
+            ))
             await db.commit()
 
+    async def queue_feedback(self, user_id: int, rating: Optional[int], feedback_type: str,
+                             comment: Optional[str] = None, protocol_id: Optional[str] = None,
+                             processing_time: Optional[float] = None, file_format: Optional[str] = None,
+                             file_size: Optional[int] = None) -> None:
+        """Save user feedback through the write-behind journal."""
+        await self._db.journal.write(_INSERT_FEEDBACK, (
+            user_id, rating, feedback_type, comment, protocol_id,
+            processing_time, file_format, file_size,
+        ))
+
     async def get_all_feedback(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """Get all feedback entries."""
-        async with self._db.connect() as db:
+        await self._db.journal.flush()  # include write-behind rows
+        async with self._db.read() as db:
             query = "SELECT * FROM feedback ORDER BY created_at DESC"
             if limit:
                 query += f" LIMIT {limit}"
@@ -33,7 +49,8 @@ class FeedbackRepository:
 
     async def get_feedback_stats(self) -> Dict[str, Any]:
         """Get feedback statistics."""
-        async with self._db.connect() as db:
+        await self._db.journal.flush()  # include write-behind rows
+        async with self._db.read() as db:
 
             cursor = await db.execute("""
                 SELECT
@@ -1,7 +1,30 @@
-"""История обработки: свершившиеся результаты и статистика пользователя."""
+"""История обработки: свершившиеся результаты и статистика пользователя.
+
+Строка ``processing_history`` держит только метаданные. Транскрипция и текст
+протокола (сотни килобайт на запись) лежат сжатыми в
+``processing_history_texts`` — статистика и админские выборки сканируют
+историю, не протаскивая эти тексты через кэш страниц.
+"""
 import json
+import zlib
 from typing import Any, Dict, Optional
 
+# Виды текстов записи истории в processing_history_texts
+TRANSCRIPTION = "transcription"
+RESULT = "result"
+
+
+def pack_text(text: str) -> bytes:
+    """Текст → сжатый blob для processing_history_texts."""
+    return zlib.compress(text.encode("utf-8"), 6)
+
+
+def unpack_text(blob: Optional[bytes]) -> Optional[str]:
+    """Сжатый blob → текст; отсутствующий blob → None."""
+    if blob is None:
+        return None
+    return zlib.decompress(blob).decode("utf-8")
+
 
 def _serialize_speaker_mapping(speaker_mapping: Optional[Dict[str, str]]) -> Optional[str]:
     """Сопоставление спикеров → JSON-строка; пустое/None → NULL (не «{}» и не «null»)."""
@@ -27,35 +50,74 @@ class HistoryRepository:
         чтобы перегенерация из истории пропускала анализ и держала имена участников
         консистентными с уже отправленным протоколом. Пустые значения → NULL.
         """
+        # Сжимаем до захвата писателя: он общий для всех записей в БД
+        texts = [(kind, pack_text(text)) for kind, text in
+                 ((TRANSCRIPTION, transcription_text), (RESULT, result_text)) if text]
         async with self._db.connect() as db:
             cursor = await db.execute("""
                 INSERT INTO processing_history
-                (user_id, file_name, template_id, llm_provider, transcription_text,
-                 result_text, speaker_mapping, meeting_type)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (user_id, file_name, template_id, llm_provider, transcription_text,
-                  result_text, _serialize_speaker_mapping(speaker_mapping),
-                  meeting_type or None))
+                (user_id, file_name, template_id, llm_provider, speaker_mapping, meeting_type)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (user_id, file_name, template_id, llm_provider,
+                  _serialize_speaker_mapping(speaker_mapping), meeting_type or None))
+            history_id = cursor.lastrowid
+            await db.executemany(
+                "INSERT INTO processing_history_texts (history_id, kind, body) VALUES (?, ?, ?)",
+                [(history_id, kind, body) for kind, body in texts],
+            )
             await db.commit()
-            return cursor.lastrowid
+            return history_id
 
-    async def get_result_for_user(self, history_id: int, telegram_id: int) -> Optional[Dict[str, Any]]:
+    async def get_result_for_user(self, history_id: int, telegram_id: int,
+                                  with_result: bool = True) -> Optional[Dict[str, Any]]:
         """Запись истории по id — только если принадлежит пользователю Telegram.
 
         Проверка владельца обязательна: history_id приходит из callback_data,
         которую может прислать кто угодно.
+
+        Транскрипция не загружается — только признак ``has_transcription``;
+        сам текст отдаёт ``get_transcription_text``. ``with_result=False``
+        пропускает и распаковку протокола (перегенерации он не нужен).
         """
-        async with self._db.connect() as db:
-            cursor = await db.execute("""
+        async with self._db.read() as db:
+            # Без with_result тело протокола не читается: overflow-страницы blob
+            # не трогаются вовсе
+            result_column = "t.body" if with_result else "NULL"
+            cursor = await db.execute(f"""
                 SELECT ph.id, ph.user_id, ph.file_name, ph.template_id,
-                       ph.llm_provider, ph.transcription_text, ph.result_text,
-                       ph.speaker_mapping, ph.meeting_type
+                       ph.llm_provider, ph.speaker_mapping, ph.meeting_type,
+                       EXISTS(SELECT 1 FROM processing_history_texts
+                              WHERE history_id = ph.id AND kind = ?) AS has_transcription,
+                       {result_column} AS result_blob
                 FROM processing_history ph
                 JOIN users u ON ph.user_id = u.id
+                LEFT JOIN processing_history_texts t
+                       ON t.history_id = ph.id AND t.kind = ?
                 WHERE ph.id = ? AND u.telegram_id = ?
-            """, (history_id, telegram_id))
+            """, (TRANSCRIPTION, RESULT, history_id, telegram_id))
+            row = await cursor.fetchone()
+        if not row:
+            return None
+        result = dict(row)
+        result["has_transcription"] = bool(result["has_transcription"])
+        result_blob = result.pop("result_blob")
+        if with_result:
+            result["result_text"] = unpack_text(result_blob)
+        return result
+
+    async def get_transcription_text(self, history_id: int) -> Optional[str]:
+        """Транскрипция записи истории или None, если она не сохранена.
+
+        Владелец не проверяется: вызывающий уже получил запись через
+        ``get_result_for_user``.
+        """
+        async with self._db.read() as db:
+            cursor = await db.execute(
+                "SELECT body FROM processing_history_texts WHERE history_id = ? AND kind = ?",
+                (history_id, TRANSCRIPTION),
+            )
             row = await cursor.fetchone()
-            return dict(row) if row else None
+        return unpack_text(row["body"]) if row else None
 
     async def update_result_text(self, history_id: int, telegram_id: int,
                                  result_text: str) -> bool:
@@ -63,23 +125,25 @@ class HistoryRepository:
 
         Нужна правке шапки («Дата и название»): исправленный документ должен
         стать каноном, иначе следующий «PDF» отдаст прежнюю неверную дату.
-        Владение проверяется в самом UPDATE — ``history_id`` приходит из
+        Владение проверяется в самом запросе — ``history_id`` приходит из
         callback_data, как и в ``get_result_for_user``.
         """
+        body = pack_text(result_text)
         async with self._db.connect() as db:
             cursor = await db.execute("""
-                UPDATE processing_history
-                SET result_text = ?
-                WHERE id = ? AND user_id = (
-                    SELECT id FROM users WHERE telegram_id = ?
-                )
-            """, (result_text, history_id, telegram_id))
+                INSERT INTO processing_history_texts (history_id, kind, body)
+                SELECT ph.id, ?, ?
+                FROM processing_history ph
+                JOIN users u ON ph.user_id = u.id
+                WHERE ph.id = ? AND u.telegram_id = ?
+                ON CONFLICT (history_id, kind) DO UPDATE SET body = excluded.body
+            """, (RESULT, body, history_id, telegram_id))
             await db.commit()
             return cursor.rowcount > 0
 
     async def get_user_stats(self, telegram_id: int) -> Optional[Dict[str, Any]]:
         """Get user statistics computed from processing history."""
-        async with self._db.connect() as db:
+        async with self._db.read() as db:
             cursor = await db.execute("SELECT id FROM users WHERE telegram_id = ?", (telegram_id,))
             user_row = await cursor.fetchone()
             if not user_row:
@@ -1,5 +1,40 @@
 """Processing metrics data access."""
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Tuple
+
+_INSERT_METRIC = """
+    INSERT INTO processing_metrics (
+        file_name, user_id, start_time, end_time,
+        download_duration, validation_duration, conversion_duration,
+        transcription_duration, diarization_duration, llm_duration, formatting_duration,
+        file_size_bytes, file_format, audio_duration_seconds,
+        transcription_length, speakers_count,
+        error_occurred, error_stage, error_message
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def _metric_params(metric_data: Dict[str, Any]) -> Tuple[Any, ...]:
+    return (
+        metric_data.get('file_name'),
+        metric_data.get('user_id'),
+        metric_data.get('start_time'),
+        metric_data.get('end_time'),
+        metric_data.get('download_duration', 0.0),
+        metric_data.get('validation_duration', 0.0),
+        metric_data.get('conversion_duration', 0.0),
+        metric_data.get('transcription_duration', 0.0),
+        metric_data.get('diarization_duration', 0.0),
+        metric_data.get('llm_duration', 0.0),
+        metric_data.get('formatting_duration', 0.0),
+        metric_data.get('file_size_bytes', 0),
+        metric_data.get('file_format'),
+        metric_data.get('audio_duration_seconds', 0.0),
+        metric_data.get('transcription_length', 0),
+        metric_data.get('speakers_count', 0),
+        metric_data.get('error_occurred', False),
+        metric_data.get('error_stage'),
+        metric_data.get('error_message'),
+    )
 
 
 class MetricsRepository:
@@ -11,42 +46,18 @@ class MetricsRepository:
     async def save_processing_metric(self, metric_data: Dict[str, Any]) -> int:
         """Save a processing metric."""
         async with self._db.connect() as db:
-            cursor = await db.execute("""
-                INSERT INTO processing_metrics (
-                    file_name, user_id, start_time, end_time,
-                    download_duration, validation_duration, conversion_duration,
-                    transcription_duration, diarization_duration, llm_duration, formatting_duration,
-                    file_size_bytes, file_format, audio_duration_seconds,
-                    transcription_length, speakers_count,
-                    error_occurred, error_stage, error_message
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                metric_data.get('file_name'),
-                metric_data.get('user_id'),
-                metric_data.get('start_time'),
-                metric_data.get('end_time'),
-                metric_data.get('download_duration', 0.0),
-                metric_data.get('validation_duration', 0.0),
-                metric_data.get('conversion_duration', 0.0),
-                metric_data.get('transcription_duration', 0.0),
-                metric_data.get('diarization_duration', 0.0),
-                metric_data.get('llm_duration', 0.0),
-                metric_data.get('formatting_duration', 0.0),
-                metric_data.get('file_size_bytes', 0),
-                metric_data.get('file_format'),
-                metric_data.get('audio_duration_seconds', 0.0),
-                metric_data.get('transcription_length', 0),
-                metric_data.get('speakers_count', 0),
-                metric_data.get('error_occurred', False),
-                metric_data.get('error_stage'),
-                metric_data.get('error_message')
-            ))
+            cursor = await db.execute(_INSERT_METRIC, _metric_params(metric_data))
             await db.commit()
             return cursor.lastrowid
 
+    async def queue_processing_metric(self, metric_data: Dict[str, Any]) -> None:
+        """Save a processing metric through the write-behind journal."""
+        await self._db.journal.write(_INSERT_METRIC, _metric_params(metric_data))
+
     async def get_processing_metrics(self, hours: int = 24) -> List[Dict[str, Any]]:
         """Get processing metrics for the last N hours."""
-        async with self._db.connect() as db:
+        await self._db.journal.flush()  # include write-behind rows
+        async with self._db.read() as db:
             cursor = await db.execute("""
                 SELECT * FROM processing_metrics
                 WHERE created_at >= DATETIME('now', ?)
@@ -21,7 +21,7 @@ class ModelPresetRepository:
 
     async def get_all(self) -> List[Dict[str, Any]]:
         """Get all presets ordered by created_at."""
-        async with self._db.connect() as db:
+        async with self._db.read() as db:
             cursor = await db.execute(
                 "SELECT * FROM model_presets ORDER BY created_at"
             )
@@ -30,7 +30,7 @@ class ModelPresetRepository:
 
     async def get_enabled(self) -> List[Dict[str, Any]]:
         """Get enabled presets ordered by created_at."""
-        async with self._db.connect() as db:
+        async with self._db.read() as db:
             cursor = await db.execute(
                 "SELECT * FROM model_presets WHERE is_enabled = 1 ORDER BY created_at"
             )
@@ -51,7 +51,7 @@ class ModelPresetRepository:
 
     async def get_by_key(self, key: str) -> Optional[Dict[str, Any]]:
         """Get a single preset by its unique key."""
-        async with self._db.connect() as db:
+        async with self._db.read() as db:
             cursor = await db.execute(
                 "SELECT * FROM model_presets WHERE key = ?",
                 (key,),
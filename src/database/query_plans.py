@@ -0,0 +1,198 @@
+"""
+Планы запросов репозиториев: горячие выборки не должны читать таблицу целиком
+
+SQL собирается прямо из исходников ``*_repo.py`` — строки, переданные в
+``execute``/``executemany``/``journal.write``, и модульные константы, на которые
+они ссылаются. Каждый запрос прогоняется через ``EXPLAIN QUERY PLAN`` на схеме
+свежей БД (``init_db`` со всеми шагами ``_SCHEMA_MIGRATIONS``). Полный проход
+по горячей таблице — ошибка, если запрос не внесён в ``ALLOWED_SCANS``.
+
+Запуск: python -m src.database.query_plans   (или make explain-db)
+"""
+
+import ast
+import asyncio
+import os
+import re
+import sys
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from .database import Database
+
+# Таблицы, которые читаются на каждом сообщении и каждой задаче очереди
+HOT_TABLES = frozenset({
+    "users",
+    "queue_tasks",
+    "processing_history",
+    "processing_history_texts",
+    "processing_metrics",
+})
+
+# Запросы, которым полный проход по горячей таблице допустим, и почему
+ALLOWED_SCANS = {
+    "TemplateRepository.delete_template":
+        "сброс default_template_id у пользователей — редкое удаление шаблона",
+}
+
+_SQL_CALLS = frozenset({"execute", "executemany", "write"})
+_SQL_START = re.compile(r"^\s*(SELECT|INSERT|UPDATE|DELETE|REPLACE|WITH)\b", re.IGNORECASE)
+_TABLE_REF = re.compile(r"\b(?:FROM|JOIN|UPDATE|INTO)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?",
+                        re.IGNORECASE)
+_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)")
+_NOT_ALIAS = frozenset({
+    "ON", "WHERE", "SET", "JOIN", "LEFT", "INNER", "CROSS", "GROUP", "ORDER",
+    "LIMIT", "VALUES", "SELECT", "USING", "DEFAULT",
+})
+_REPO_DIR = Path(__file__).parent
+
+
+@dataclass
+class RepositoryQuery:
+    """Запрос репозитория и его план."""
+
+    location: str
+    sql: str
+    plan: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+    @property
+    def tables(self) -> Dict[str, str]:
+        """Имя или псевдоним из плана → таблица."""
+        names = {}
+        for table, alias in _TABLE_REF.findall(self.sql):
+            names[table] = table
+            if alias and alias.upper() not in _NOT_ALIAS:
+                names[alias] = table
+        return names
+
+    @property
+    def hot_scans(self) -> List[str]:
+        """Горячие таблицы, которые план читает целиком."""
+        tables = self.tables
+        scanned = (tables.get(m.group(1)) for m in map(_SCAN.match, self.plan) if m)
+        return sorted({table for table in scanned if table in HOT_TABLES})
+
+    @property
+    def is_hot(self) -> bool:
+        return any(table in HOT_TABLES for table in self.tables.values())
+
+    @property
+    def failed(self) -> bool:
+        if self.location in ALLOWED_SCANS:
+            return False
+        return bool(self.hot_scans) or (self.error is not None and self.is_hot)
+
+
+def _sql_text(node: ast.expr, names: Dict[str, str]) -> Optional[str]:
+    """Текст SQL из аргумента вызова; подстановки f-строки → NULL."""
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        text = node.value
+    elif isinstance(node, ast.Name) and node.id in names:
+        text = names[node.id]
+    elif isinstance(node, ast.JoinedStr):
+        text = "".join(
+            part.value if isinstance(part, ast.Constant) else "NULL"
+            for part in node.values
+        )
+    else:
+        return None
+    return text if _SQL_START.match(text) else None
+
+
+def _string_assignments(nodes, known: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Имена, которым присвоена строка или уже известная константа (``sql = _UPDATE``)."""
+    known = known or {}
+    names = {}
+    for node in nodes:
+        if not isinstance(node, ast.Assign):
+            continue
+        if isinstance(node.value, ast.Constant) and isinstance(node.value.value, str):
+            value = node.value.value
+        elif isinstance(node.value, ast.Name) and node.value.id in known:
+            value = known[node.value.id]
+        else:
+            continue
+        for target in node.targets:
+            if isinstance(target, ast.Name):
+                names.setdefault(target.id, value)
+    return names
+
+
+def collect_queries(repo_dir: Path = _REPO_DIR) -> List[RepositoryQuery]:
+    """Все SQL-запросы репозиториев с указанием метода."""
+    return list(_iter_queries(repo_dir))
+
+
+def _iter_queries(repo_dir: Path) -> Iterator[RepositoryQuery]:
+    seen = set()
+    for path in sorted(repo_dir.glob("*_repo.py")):
+        tree = ast.parse(path.read_text(encoding="utf-8"))
+        constants = _string_assignments(tree.body)
+        for cls in (node for node in tree.body if isinstance(node, ast.ClassDef)):
+            for func in cls.body:
+                if not isinstance(func, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    continue
+                names = {**constants, **_string_assignments(ast.walk(func), constants)}
+                for node in ast.walk(func):
+                    if not (isinstance(node, ast.Call) and node.args
+                            and isinstance(node.func, ast.Attribute)
+                            and node.func.attr in _SQL_CALLS):
+                        continue
+                    sql = _sql_text(node.args[0], names)
+                    location = f"{cls.name}.{func.name}"
+                    if sql is None or (location, sql) in seen:
+                        continue
+                    seen.add((location, sql))
+                    yield RepositoryQuery(location=location, sql=sql)
+
+
+async def explain_queries(database: Database, queries: List[RepositoryQuery]) -> None:
+    """Заполнить ``plan`` (или ``error``) каждого запроса."""
+    async with database.read() as db:
+        for query in queries:
+            params = (None,) * query.sql.count("?")
+            try:
+                cursor = await db.execute(f"EXPLAIN QUERY PLAN {query.sql}", params)
+                query.plan = [row[3] for row in await cursor.fetchall()]
+            except Exception as e:
+                query.error = str(e)
+
+
+def _report(queries: List[RepositoryQuery]) -> None:
+    for query in queries:
+        if query.failed:
+            status = "FAIL"
+        elif query.error:
+            status = "SKIP"
+        elif query.hot_scans:
+            status = "ALLOW"
+        else:
+            status = "ok"
+        print(f"[{status:>5}] {query.location}")
+        for line in query.plan:
+            print(f"          {line}")
+        if query.error:
+            print(f"          не разобран: {query.error}")
+        if status == "ALLOW":
+            print(f"          допущено: {ALLOWED_SCANS[query.location]}")
+
+
+async def main() -> int:
+    queries = collect_queries()
+    with tempfile.TemporaryDirectory() as tmp:
+        database = Database(os.path.join(tmp, "plans.db"))
+        await database.init_db()
+        await explain_queries(database, queries)
+        await database.close()
+
+    _report(queries)
+    failed = [query for query in queries if query.failed]
+    print(f"\nЗапросов: {len(queries)}, полных проходов по горячим таблицам: {len(failed)}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
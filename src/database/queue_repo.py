@@ -3,6 +3,20 @@ from typing import Any, Dict, List, Optional
 
 from loguru import logger
 
+# Statuses that move a task in or out of the restore set must survive a crash
+_DURABLE_STATUSES = frozenset({"queued", "cancelled"})
+
+_UPDATE_STATUS_STARTED = """
+    UPDATE queue_tasks
+    SET status = ?, started_at = ?, error_message = ?
+    WHERE task_id = ?
+"""
+_UPDATE_STATUS = """
+    UPDATE queue_tasks
+    SET status = ?, error_message = ?
+    WHERE task_id = ?
+"""
+
 
 class QueueRepository:
     """Repository for task queue operations."""
@@ -48,45 +62,70 @@ class QueueRepository:
     async def update_queue_task_status(self, task_id: str, status: str,
                                        started_at: Optional[str] = None,
                                        error_message: Optional[str] = None) -> bool:
-        """Update task status in queue."""
+        """Update task status in queue.
+
+        Statuses that decide whether ``get_pending_queue_tasks`` restores the
+        task are written at once; the rest go through the write-behind journal.
+        """
+        if started_at:
+            sql = _UPDATE_STATUS_STARTED
+            params = (status, started_at, error_message, task_id)
+        else:
+            sql = _UPDATE_STATUS
+            params = (status, error_message, task_id)
         try:
+            if status not in _DURABLE_STATUSES:
+                await self._db.journal.write(sql, params, key=task_id)
+                return True
+            # Earlier journaled updates of this task must not land after this one
+            await self._db.journal.flush()
             async with self._db.connect() as db:
-                if started_at:
-                    await db.execute("""
-                        UPDATE queue_tasks
-                        SET status = ?, started_at = ?, error_message = ?
-                        WHERE task_id = ?
-                    """, (status, started_at, error_message, task_id))
-                else:
-                    await db.execute("""
-                        UPDATE queue_tasks
-                        SET status = ?, error_message = ?
-                        WHERE task_id = ?
-                    """, (status, error_message, task_id))
+                await db.execute(sql, params)
                 await db.commit()
                 return True
         except Exception as e:
             logger.error(f"Error updating task status: {e}")
             return False
 
+    async def claim_queue_task(self, task_id: str, status: str,
+                               started_at: Optional[str] = None) -> Optional[bool]:
+        """Move a still-queued task to ``status``.
+
+        Processes sharing the database race for restored tasks and for cancels
+        of tasks queued by another process; the conditional UPDATE lets
+        exactly one of them win. Returns True if claimed, False if the task
+        already left the queue, None if there is no such task. Database
+        errors propagate: the caller decides what an unknown outcome means.
+        """
+        await self._db.journal.flush()
+        async with self._db.connect() as db:
+            cursor = await db.execute(
+                "UPDATE queue_tasks SET status = ?, started_at = COALESCE(?, started_at) "
+                "WHERE task_id = ? AND status = 'queued'",
+                (status, started_at, task_id),
+            )
+            await db.commit()
+            if cursor.rowcount == 1:
+                return True
+            cursor = await db.execute("SELECT 1 FROM queue_tasks WHERE task_id = ?", (task_id,))
+            return False if await cursor.fetchone() else None
+
     async def update_queue_task_message_id(self, task_id: str, message_id: int) -> bool:
-        """Update message_id for a task."""
+        """Update message_id for a task (write-behind)."""
         try:
-            async with self._db.connect() as db:
-                await db.execute("""
-                    UPDATE queue_tasks
-                    SET message_id = ?
-                    WHERE task_id = ?
-                """, (message_id, task_id))
-                await db.commit()
-                return True
+            await self._db.journal.write(
+                "UPDATE queue_tasks SET message_id = ? WHERE task_id = ?",
+                (message_id, task_id),
+                key=task_id,
+            )
+            return True
         except Exception as e:
             logger.error(f"Error updating task message_id: {e}")
             return False
 
     async def get_pending_queue_tasks(self) -> List[Dict[str, Any]]:
         """Get all queued tasks sorted by priority and creation time."""
-        async with self._db.connect() as db:
+        async with self._db.read() as db:
             cursor = await db.execute("""
                 SELECT * FROM queue_tasks
                 WHERE status = 'queued'
@@ -11,14 +11,14 @@ class TemplateRepository:
 
     async def get_templates(self) -> List[Dict[str, Any]]:
         """Get all templates."""
-        async with self._db.connect() as db:
+        async with self._db.read() as db:
             cursor = await db.execute("SELECT * FROM templates ORDER BY is_default DESC, name")
             rows = await cursor.fetchall()
             return [self._deserialize_template(dict(row)) for row in rows]
 
     async def get_user_templates(self, telegram_id: int) -> List[Dict[str, Any]]:
         """Get templates available to user (own + system defaults)."""
-        async with self._db.connect() as db:
+        async with self._db.read() as db:
             cursor = await db.execute("SELECT id FROM users WHERE telegram_id = ?", (telegram_id,))
             user_row = await cursor.fetchone()
             if not user_row:
@@ -37,7 +37,7 @@ class TemplateRepository:
 
     async def get_template(self, template_id: int) -> Optional[Dict[str, Any]]:
         """Get template by ID."""
-        async with self._db.connect() as db:
+        async with self._db.read() as db:
             cursor = await db.execute("SELECT * FROM templates WHERE id = ?", (template_id,))
             row = await cursor.fetchone()
             if not row:
@@ -110,7 +110,7 @@ class TemplateRepository:
 
     async def system_template_exists(self, name: str) -> bool:
         """Есть ли системный шаблон (created_by IS NULL) с таким именем."""
-        async with self._db.connect() as db:
+        async with self._db.read() as db:
             cursor = await db.execute(
                 "SELECT 1 FROM templates WHERE name = ? AND created_by IS NULL LIMIT 1",
                 (name,),
@@ -12,7 +12,7 @@ class UserRepository:
 
     async def get_user(self, telegram_id: int) -> Optional[Dict[str, Any]]:
         """Get user by Telegram ID."""
-        async with self._db.connect() as db:
+        async with self._db.read() as db:
             cursor = await db.execute(
                 "SELECT * FROM users WHERE telegram_id = ?",
                 (telegram_id,)
@@ -0,0 +1,119 @@
+"""
+Журнал отложенной записи (write-behind) для некритичных строк
+
+Метрики обработки, отзывы, статусы задач очереди и message_id сообщения об
+очереди пишутся на горячем пути каждой задачи — по одной строке и по одному
+commit. Журнал копит такие записи и раз в ``_FLUSH_INTERVAL`` секунд
+проводит их одной транзакцией писателя. Повторная запись той же строки
+(тот же ``key``) заменяет предыдущую: из трёх статусов задачи до БД дойдёт
+последний.
+
+Буфер ограничен: при ``_MAX_PENDING`` записях пишущий сам дожидается сброса.
+Записи, которые нельзя потерять при падении процесса, идут мимо журнала через
+``Database.connect()`` — после ``flush()``, чтобы не обогнать более ранние.
+"""
+
+import asyncio
+import itertools
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Sequence, Tuple
+
+from loguru import logger
+
+# Как часто сбрасывать накопленные записи (секунды)
+_FLUSH_INTERVAL = 0.5
+# Сколько записей ждёт сброса, прежде чем пишущий начнёт ждать сам
+_MAX_PENDING = 1000
+
+
+class WriteBehindJournal:
+    """Буфер записей, сбрасываемый пачкой в одной транзакции."""
+
+    def __init__(self, database, interval: float = _FLUSH_INTERVAL,
+                 max_pending: int = _MAX_PENDING):
+        self._db = database
+        self.interval = interval
+        self.max_pending = max_pending
+        self._pending: "OrderedDict[Hashable, Tuple[str, Sequence[Any]]]" = OrderedDict()
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._lock_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    async def write(self, sql: str, params: Sequence[Any],
+                    key: Optional[Hashable] = None) -> None:
+        """Поставить запись в журнал.
+
+        ``key`` — идентичность строки: запись с тем же ключом заменяет
+        ожидающую и встаёт в конец (порядок «последняя побеждает»). Без ключа
+        каждая запись уникальна (INSERT).
+        """
+        if len(self._pending) >= self.max_pending:
+            await self.flush()
+        entry_key = (sql, key) if key is not None else next(self._seq)
+        self._pending.pop(entry_key, None)
+        self._pending[entry_key] = (sql, params)
+        self._schedule()
+
+    def _schedule(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._timer is None or self._timer.done() or self._timer.get_loop() is not loop:
+            self._timer = loop.create_task(self._flush_later())
+
+    async def _flush_later(self) -> None:
+        try:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"Ошибка отложенной записи в БД: {e}")
+
+    def _lock(self) -> asyncio.Lock:
+        """Блокировка сброса, своя на каждый event loop (как и пул соединений)."""
+        loop = asyncio.get_running_loop()
+        if self._flush_lock is None or self._lock_loop is not loop:
+            self._flush_lock = asyncio.Lock()
+            self._lock_loop = loop
+        return self._flush_lock
+
+    async def flush(self) -> int:
+        """Записать всё накопленное одной транзакцией. Возвращает число записей."""
+        async with self._lock():
+            if not self._pending:
+                return 0
+            batch, self._pending = list(self._pending.values()), OrderedDict()
+            try:
+                async with self._db.connect() as conn:
+                    # Подряд идущие одинаковые выражения — одним executemany
+                    for sql, group in itertools.groupby(batch, key=lambda item: item[0]):
+                        await conn.executemany(sql, [params for _, params in group])
+                    await conn.commit()
+            except Exception as e:
+                # Одна битая строка не должна ронять всю пачку: пишем по одной,
+                # непрошедшие отбрасываем — в журнале только некритичные записи
+                logger.warning(f"Пачка отложенных записей не прошла ({e}), пишу по одной")
+                await self._write_one_by_one(batch)
+            return len(batch)
+
+    async def _write_one_by_one(self, batch) -> None:
+        for sql, params in batch:
+            try:
+                async with self._db.connect() as conn:
+                    await conn.execute(sql, params)
+                    await conn.commit()
+            except Exception as e:
+                logger.error(f"Отложенная запись в БД отброшена: {e}")
+
+    async def close(self) -> None:
+        """Сбросить журнал и остановить таймер (при остановке бота)."""
+        if self._timer is not None and not self._timer.done():
+            self._timer.cancel()
+        self._timer = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Не удалось сбросить журнал записи в БД: {e}")
@@ -241,6 +241,7 @@ def setup_admin_handlers(processing_service: ProcessingService) -> Router:
         
         try:
             from src.performance import memory_optimizer, metrics_collector, performance_cache, task_pool
+            from src.services.model_workers import model_stats
             
             # Собираем статистику
             cache_stats = performance_cache.get_stats()
@@ -249,7 +250,7 @@ def setup_admin_handlers(processing_service: ProcessingService) -> Router:
             metrics_stats = metrics_collector.get_current_stats()
 
             report = admin_views.performance_report(
-                cache_stats, memory_stats, task_stats, metrics_stats
+                cache_stats, memory_stats, task_stats, metrics_stats, model_stats()
             )
             await safe_answer(message, report, parse_mode="HTML")
 
@@ -393,6 +394,7 @@ def setup_admin_handlers(processing_service: ProcessingService) -> Router:
         
         try:
             from src.performance import memory_optimizer, metrics_collector, performance_cache, task_pool
+            from src.services.model_workers import model_stats
             
             await callback.answer()
             await safe_edit_text(callback.message, "⏳ Собираю данные о производительности")
@@ -404,7 +406,7 @@ def setup_admin_handlers(processing_service: ProcessingService) -> Router:
             metrics_stats = metrics_collector.get_current_stats()
 
             report = admin_views.performance_report(
-                cache_stats, memory_stats, task_stats, metrics_stats
+                cache_stats, memory_stats, task_stats, metrics_stats, model_stats()
             )
             await safe_edit_text(callback.message, report, parse_mode="HTML")
         except Exception as e:
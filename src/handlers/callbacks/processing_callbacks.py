@@ -2,6 +2,8 @@
 Обработчики callback запросов для обработки файлов и управления задачами.
 """
 
+import asyncio
+
 from aiogram import F, Router
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery
@@ -12,15 +14,13 @@ from src.services.participants_service import participants_service
 from src.utils.request_diagnostics import log_meeting_inputs
 from src.utils.telegram_safe import safe_edit_text
 from src.ux.html_text import esc
-from src.ux.message_builder import RECORD_LOST_FILE, RECORD_LOST_LINK
+from src.ux.message_builder import QUEUE_FULL, RECORD_LOST_FILE, RECORD_LOST_LINK
 
 from .helpers import _safe_callback_answer
 
 
 async def _process_file(callback: CallbackQuery, state: FSMContext, processing_service: ProcessingService):
     """Начать обработку файла"""
-    import asyncio
-
     from src.models.processing import ProcessingRequest
     from src.models.task_queue import TaskPriority
     from src.services.task_queue_manager import task_queue_manager
@@ -88,6 +88,7 @@ async def _process_file(callback: CallbackQuery, state: FSMContext, processing_s
             user_id=callback.from_user.id,
             language="ru",
             is_external_file=is_external_file,
+            file_hash=data.get('file_hash') if is_external_file else None,
             # ДОБАВЛЕНО: Передача участников и информации о встрече
             participants_list=data.get('participants_list'),
             meeting_topic=data.get('meeting_topic'),
@@ -98,11 +99,17 @@ async def _process_file(callback: CallbackQuery, state: FSMContext, processing_s
         )
 
         # Добавляем задачу в очередь
-        queued_task = await task_queue_manager.add_task(
-            request=request,
-            chat_id=callback.message.chat.id,
-            priority=TaskPriority.NORMAL
-        )
+        try:
+            queued_task = await task_queue_manager.add_task(
+                request=request,
+                chat_id=callback.message.chat.id,
+                priority=TaskPriority.NORMAL
+            )
+        except asyncio.QueueFull:
+            logger.warning(f"Очередь заполнена, запись пользователя {callback.from_user.id} не принята")
+            await safe_edit_text(callback.message, QUEUE_FULL)
+            await state.clear()
+            return
 
         # Удаляем старое сообщение с выбором
         try:
@@ -129,11 +136,11 @@ async def _process_file(callback: CallbackQuery, state: FSMContext, processing_s
             from src.database import queue_repo
             await queue_repo.update_queue_task_message_id(str(queued_task.task_id), queue_tracker.message_id)
 
-        # Запускаем фоновое обновление позиции в очереди
+        # Подписываем трекер на изменения позиции в очереди
         from src.handlers.message_handlers import _monitor_queue_position
-        asyncio.create_task(_monitor_queue_position(
-            queue_tracker, queued_task.task_id, task_queue_manager
-        ))
+        await _monitor_queue_position(
+            queue_tracker, str(queued_task.task_id), task_queue_manager
+        )
 
         # Очищаем состояние
         await state.clear()
@@ -159,14 +159,14 @@ def setup_protocol_actions_callbacks(user_service, template_service) -> Router:
 
             history_id = _history_id_from(callback.data)
             row = await history_repo.get_result_for_user(
-                history_id, callback.from_user.id
+                history_id, callback.from_user.id, with_result=False
             )
             if not row:
                 await _safe_callback_answer(
                     callback, PROTOCOL_GONE
                 )
                 return
-            if not (row.get("transcription_text") or "").strip():
+            if not row.get("has_transcription"):
                 await _safe_callback_answer(
                     callback, "Расшифровка не сохранена — перегенерация недоступна."
                 )
@@ -11,7 +11,7 @@
 голосовое, фото и ссылка проваливаются мимо, в обычную обработку записи.
 """
 
-from typing import Callable, Optional
+from typing import Callable, Dict, Optional, Union
 
 from aiogram import Router
 from aiogram.fsm.context import FSMContext
@@ -69,14 +69,14 @@ _SKIP_CONTINUED_TEXT = (
 )
 
 
-def _stale_card_text(user_id: int) -> str:
+async def _stale_card_text(user_id: int) -> str:
     """Что ответить на нажатие в карточке, которой уже нет.
 
     Два разных исхода — и до критики v11 оба получали один текст «начните
     обработку заново». После авто-доставки по таймауту это прямая ложь:
     протокол доставлен и лежит выше в чате.
     """
-    if mapping_sessions.was_recently_closed(user_id):
+    if await mapping_sessions.was_recently_closed(user_id):
         return _DELIVERED_TEXT
     return _SESSION_GONE_TEXT
 
@@ -142,7 +142,7 @@ async def _skip_or_confirm(
         )
         return
 
-    taken = mapping_sessions.take(user_id)
+    taken = await mapping_sessions.take(user_id)
     if taken is None:
         return
     await _finish_skip(callback, state, taken, processing_service)
@@ -180,12 +180,12 @@ def card_handler(
 
                 current_session = None
                 if session == "peek":
-                    current_session = mapping_sessions.peek(user_id)
+                    current_session = await mapping_sessions.peek(user_id)
                 elif session == "take":
-                    current_session = mapping_sessions.take(user_id)
+                    current_session = await mapping_sessions.take(user_id)
 
                 if session is not None and current_session is None:
-                    await safe_edit_text(callback.message, _stale_card_text(user_id))
+                    await safe_edit_text(callback.message, await _stale_card_text(user_id))
                     return
 
                 await core(callback, callback_data, state, user_id, current_session)
@@ -263,6 +263,7 @@ async def _redraw_main_card_after_naming(
         speakers_text=speakers_text,
         speakers_with_audio=session.speakers_with_audio,
     )
+    await mapping_sessions.persist(user_id, session)
 
 
 def _unnamed_speakers(session: MappingSession) -> list[str]:
@@ -307,8 +308,9 @@ async def _apply_subview_name(
     new_mapping = dict(session.speaker_mapping)
     if speaker_id:
         new_mapping[speaker_id] = display_name
-    mapping_sessions.update_mapping(user_id, new_mapping)
+    session.speaker_mapping = new_mapping
     session.editing_speaker = None
+    await mapping_sessions.persist(user_id, session)
     await _redraw_main_card_after_naming(session, user_id, message)
 
 
@@ -354,11 +356,14 @@ async def _apply_main_view_names(
         )
         new_mapping[speaker_id] = display_name
     session.request.participants_list = new_list
-    mapping_sessions.update_mapping(user_id, new_mapping)
+    session.speaker_mapping = new_mapping
+    await mapping_sessions.persist(user_id, session)
     await _redraw_main_card_after_naming(session, user_id, message)
 
 
-async def receive_speaker_name(message: Message) -> None:
+async def receive_speaker_name(
+    message: Message, mapping_session: Optional[MappingSession] = None
+) -> None:
     """Текст при открытой Карточке сопоставления: имя(имена) по неназванным спикерам.
 
     Фильтр гарантировал живую сессию и текст без ссылки. Ветвление по виду
@@ -366,10 +371,13 @@ async def receive_speaker_name(message: Message) -> None:
     спикеру (#99); главный вид (``editing_speaker`` пуст) — раскладка имён по
     неназванным спикерам (#100). Необратимого шага текст не запускает: карточка
     лишь перерисовывается, продолжение — только по «✅ Подтвердить и продолжить».
+
+    ``mapping_session`` — сессия, уже прочитанная фильтром: второй раз её из
+    хранилища не читаем.
     """
     try:
         user_id = message.from_user.id
-        session = mapping_sessions.peek(user_id)
+        session = mapping_session or await mapping_sessions.peek(user_id)
         if session is None:
             # Сессия истекла между проверкой фильтра и телом — ловить нечего.
             return
@@ -398,10 +406,13 @@ async def speaker_mapping_cancel_callback(
     как имя, а уходит в обычную обработку записи.
     """
     session.editing_speaker = None
+    await mapping_sessions.persist(user_id, session)
     await _show_main_view(callback, session, user_id)
 
 
-async def _capturing_speaker_name(message: Message, state: FSMContext = None) -> bool:
+async def _capturing_speaker_name(
+    message: Message, state: FSMContext = None
+) -> Union[bool, Dict[str, MappingSession]]:
     """Фильтр message-хендлера имени: ловим текст без ссылки, пока жива сессия
     сопоставления — НЕЗАВИСИМО от ``editing_speaker`` (#100).
 
@@ -415,6 +426,10 @@ async def _capturing_speaker_name(message: Message, state: FSMContext = None) ->
     Открытый FSM-диалог сильнее карточки (критика v11): роутер карточки включён
     раньше правки шапки, и без этой проверки введённая туда дата уезжала в имена
     спикеров, пока по второй записи висела живая сессия.
+
+    Фильтр видит каждое текстовое сообщение, поэтому сначала — дешёвый
+    указатель активной сессии, и только при нём — сама сессия; она уходит в
+    хендлер аргументом ``mapping_session``.
     """
     user = message.from_user
     if user is None or not message.text:
@@ -423,8 +438,12 @@ async def _capturing_speaker_name(message: Message, state: FSMContext = None) ->
         return False
     if state is not None and await state.get_state() is not None:
         return False
-    session = mapping_sessions.peek(user.id)
-    return session is not None
+    if not await mapping_sessions.has_active(user.id):
+        return False
+    session = await mapping_sessions.peek(user.id)
+    if session is None:
+        return False
+    return {"mapping_session": session}
 
 
 def setup_speaker_mapping_callbacks(user_service: UserService, template_service: TemplateService, processing_service: ProcessingService) -> Router:
@@ -445,6 +464,7 @@ def setup_speaker_mapping_callbacks(user_service: UserService, template_service:
     ):
         """sm_change: открыть под-вид спикера, готовый принять имя сообщением."""
         session.editing_speaker = callback_data.speaker_id
+        await mapping_sessions.persist(user_id, session)
         await _show_main_view(callback, session, user_id)
 
     @router.callback_query(SmSelect.filter())
@@ -487,8 +507,9 @@ def setup_speaker_mapping_callbacks(user_service: UserService, template_service:
                 await callback.answer("❌ Неверный формат индекса")
                 return
 
-        mapping_sessions.update_mapping(user_id, speaker_mapping)
+        session.speaker_mapping = speaker_mapping
         session.editing_speaker = None
+        await mapping_sessions.persist(user_id, session)
 
         # Обновляем сообщение (возвращаемся к основному виду)
         await _show_main_view(callback, session, user_id)
@@ -15,12 +15,14 @@ from loguru import logger
 from src.exceptions.file import FileError, FileSizeError, FileTypeError
 from src.exceptions.template import TemplateNotFoundError
 from src.handlers.record_state import register_new_record
+from src.performance.async_optimization import file_hash_from_sha256
 from src.services import FileService, ProcessingService, TemplateService
+from src.services.ranged_download import DownloadProgress
 from src.services.url_service import URLService
 from src.utils.request_diagnostics import log_meeting_inputs
 from src.utils.telegram_safe import safe_answer, safe_edit_text
 from src.utils.url_detection import contains_url, extract_url
-from src.ux.message_builder import RECORD_LOST_FILE, RECORD_LOST_LINK
+from src.ux.message_builder import QUEUE_FULL, RECORD_LOST_FILE, RECORD_LOST_LINK
 from src.ux.quick_actions import ADMIN_MENU_BUTTON, QuickActionsUI
 
 
@@ -232,6 +234,7 @@ async def _start_file_processing(message: Message, state: FSMContext, processing
             user_id=message.from_user.id,
             language="ru",
             is_external_file=is_external_file,
+            file_hash=data.get('file_hash') if is_external_file else None,
             participants_list=data.get('participants_list'),  # список участников
             meeting_topic=data.get('meeting_topic'),  # тема встречи
             meeting_date=data.get('meeting_date'),  # дата встречи
@@ -241,11 +244,17 @@ async def _start_file_processing(message: Message, state: FSMContext, processing
         )
         
         # Добавляем задачу в очередь
-        queued_task = await task_queue_manager.add_task(
-            request=request,
-            chat_id=message.chat.id,
-            priority=TaskPriority.NORMAL
-        )
+        try:
+            queued_task = await task_queue_manager.add_task(
+                request=request,
+                chat_id=message.chat.id,
+                priority=TaskPriority.NORMAL
+            )
+        except asyncio.QueueFull:
+            logger.warning(f"Очередь заполнена, запись пользователя {message.from_user.id} не принята")
+            await message.answer(QUEUE_FULL)
+            await state.clear()
+            return
         
         # Получаем позицию в очереди
         position = await task_queue_manager.get_queue_position(str(queued_task.task_id))
@@ -266,10 +275,10 @@ async def _start_file_processing(message: Message, state: FSMContext, processing
             from src.database import queue_repo
             await queue_repo.update_queue_task_message_id(str(queued_task.task_id), queue_tracker.message_id)
         
-        # Запускаем фоновое обновление позиции в очереди
-        asyncio.create_task(_monitor_queue_position(
-            queue_tracker, queued_task.task_id, task_queue_manager
-        ))
+        # Подписываем трекер на изменения позиции в очереди
+        await _monitor_queue_position(
+            queue_tracker, str(queued_task.task_id), task_queue_manager
+        )
         
         # Очищаем состояние
         await state.clear()
@@ -286,33 +295,15 @@ async def _start_file_processing(message: Message, state: FSMContext, processing
 
 
 async def _monitor_queue_position(queue_tracker, task_id, queue_manager):
-    """Мониторинг изменения позиции задачи в очереди"""
-    from src.config import settings
-    
+    """Подписать трекер на изменения позиции задачи в очереди.
+
+    Вместо цикла опроса на каждую задачу трекер получает события
+    ``TaskQueueManager`` и сам группирует правки сообщения.
+    """
     try:
-        while queue_tracker.is_active:
-            # Получаем текущую позицию
-            position = await queue_manager.get_queue_position(str(task_id))
-            
-            # Если задачи больше нет в очереди (началась обработка или завершена)
-            if position is None:
-                # Удаляем сообщение про очередь
-                await queue_tracker.delete_message()
-                break
-            
-            # Получаем общий размер очереди
-            total = await queue_manager.get_queue_size()
-            
-            # Обновляем отображение только если позиция изменилась
-            await queue_tracker.update_position(position, total)
-            
-            # Ждем перед следующей проверкой
-            await asyncio.sleep(settings.queue_update_interval)
-    
-    except asyncio.CancelledError:
-        logger.debug(f"Мониторинг позиции задачи {task_id} отменен")
+        queue_tracker.follow(queue_manager)
     except Exception as e:
-        logger.error(f"Ошибка в мониторинге позиции задачи {task_id}: {e}")
+        logger.error(f"Ошибка подписки на позицию задачи {task_id}: {e}")
 
 
 def _extract_file_info(message: Message) -> tuple:
@@ -485,6 +476,19 @@ def _extract_url(text: str) -> str:
     return extract_url(text)
 
 
+def _download_progress_reporter(status_message: Message, filename: str):
+    """Индикатор скачивания по ссылке: объём, процент и скорость в статусном сообщении."""
+    async def report(progress: DownloadProgress) -> None:
+        mb = 1024 * 1024
+        await safe_edit_text(
+            status_message,
+            f"⏬ Скачиваю файл: {filename}\n\n"
+            f"{progress.downloaded / mb:.1f} из {progress.total / mb:.1f} МБ "
+            f"({progress.percent:.0f}%), {progress.bytes_per_second / mb:.1f} МБ/с"
+        )
+    return report
+
+
 async def _process_url(message: Message, url: str, state: FSMContext, template_service: TemplateService):
     """Обработать URL файла"""
     status_message = None
@@ -527,17 +531,27 @@ async def _process_url(message: Message, url: str, state: FSMContext, template_s
                     f"Начинаю скачивание..."
                 )
                 
-                # Скачиваем файл (используем уже полученный direct_url, чтобы не делать повторный запрос)
-                temp_path = await url_service.download_file(direct_url, filename)
+                # Скачиваем файл (используем уже полученный direct_url, чтобы не делать повторный запрос).
+                # Ключ докачки — исходная ссылка: прямая у Synology несёт разовый токен
+                downloaded = await url_service.download_file(
+                    direct_url,
+                    filename,
+                    on_progress=_download_progress_reporter(status_message, filename),
+                    resume_key=url,
+                    # Видео можно принять потоком: на диск ляжет только звуковая дорожка
+                    extract_audio=True,
+                )
                 original_filename = filename
                 
                 # Сохраняем информацию в состоянии, вытесняя прежнюю запись
                 await register_new_record(
                     state,
-                    file_path=temp_path,
+                    file_path=downloaded.path,
                     file_name=original_filename,
                     file_url=url,  # Сохраняем оригинальный URL для кеширования
                     is_external_file=True,  # Флаг для отличия от Telegram файлов
+                    # Хеш посчитан при скачивании — ключи кеша не перечитывают файл
+                    file_hash=file_hash_from_sha256(downloaded.sha256),
                 )
                 
                 await safe_edit_text(
@@ -11,7 +11,7 @@ from aiogram.fsm.context import FSMContext
 # Ключи состояния, описывающие одну принятую запись. При приёме новой записи
 # все они сбрасываются, чтобы прежняя запись (файл или скачанная ссылка) не
 # осталась в состоянии рядом с новой.
-RECORD_KEYS = ("file_id", "file_path", "file_url", "is_external_file")
+RECORD_KEYS = ("file_id", "file_path", "file_url", "is_external_file", "file_hash")
 
 
 async def register_new_record(state: FSMContext, **values) -> None:
@@ -5,9 +5,23 @@ OpenAI-совместимых клиентов по пресетам модел
 (rate-limit → circuit-breaker → retry) — безусловно вокруг каждого вызова.
 402 (кончились кредиты) классифицируется в LLMInsufficientCreditsError,
 не ретраится и пролетает насквозь.
+
+Клиенты асинхронные (``openai.AsyncOpenAI``) поверх общего на пресет пула
+соединений ``httpx.AsyncClient``: вызовы модели не занимают потоки
+default-executor'а, а число одновременных запросов к одному пресету
+ограничено семафором.
+
+Транскрипция длиннее порога (оценка токенов) обрабатывается map-reduce:
+фрагменты по границам реплик извлекаются параллельно в частичные
+``protocol_data`` той же схемы, затем reduce-шаг сливает их в один протокол.
 """
 import asyncio
-from typing import Any, Dict, Optional
+import hashlib
+import importlib.util
+import json
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
 
 import httpx
 import openai
@@ -16,12 +30,14 @@ from loguru import logger
 from src.config import settings
 from src.exceptions.processing import LLMInsufficientCreditsError
 from src.llm.json_utils import safe_json_parse
+from src.llm.transcript_chunking import chunk_transcript, estimate_tokens
 from src.models.llm_schemas import MEETING_ANALYSIS_SCHEMA, PROTOCOL_DATA_SCHEMA
 from src.prompts.prompts import (
     build_analysis_prompt,
     build_analysis_system_prompt,
     build_generation_prompt,
     build_generation_system_prompt,
+    build_reduce_prompt,
 )
 from src.reliability import (
     DEFAULT_CIRCUIT_BREAKER_CONFIG,
@@ -67,6 +83,44 @@ def _select_generation_contract(
     )
 
 
+def _http2_enabled() -> bool:
+    """HTTP/2 включён в настройках и доступен (httpx требует пакет ``h2``)."""
+    if not settings.llm_http2:
+        return False
+    if importlib.util.find_spec("h2") is None:
+        logger.warning("LLM_HTTP2 включён, но пакет h2 не установлен — используется HTTP/1.1")
+        return False
+    return True
+
+
+def _build_http_client() -> httpx.AsyncClient:
+    """Пул соединений к одному LLM-эндпоинту (keep-alive, лимиты из настроек)."""
+    return httpx.AsyncClient(
+        verify=settings.ssl_verify,
+        timeout=settings.llm_timeout_seconds,
+        http2=_http2_enabled(),
+        limits=httpx.Limits(
+            max_connections=settings.llm_pool_max_connections,
+            max_keepalive_connections=settings.llm_pool_max_keepalive,
+            keepalive_expiry=settings.llm_keepalive_expiry_seconds,
+        ),
+    )
+
+
+# Сколько предвыборок ЭТАПА 1 держать: невостребованные (анализ не понадобился)
+# вытесняются самые старые
+_MAX_PREFETCHED_ANALYSES = 32
+
+
+def _log_prefetch_failure(task: asyncio.Task) -> None:
+    """Забрать исключение фоновой предвыборки, чтобы оно не терялось молча."""
+    if task.cancelled():
+        return
+    error = task.exception()
+    if error is not None:
+        logger.warning(f"Фоновый анализ ЭТАПА 1 завершился ошибкой: {error}")
+
+
 class ProtocolGenerator:
     """Глубокий модуль генерации протокола (интерфейс — тестовая поверхность)."""
 
@@ -76,10 +130,23 @@ class ProtocolGenerator:
         self.default_client = None
         self._client_cache = {}
         self._http_clients = []  # track for cleanup
+        # HTTP-пул клиента пресета по ключу кэша: закрывается при инвалидации
+        self._preset_http: Dict[Any, httpx.AsyncClient] = {}
+        # Держатели клиента (генерации и запросы в работе): пул вытесненного
+        # клиента закрывается, когда уходит последний
+        self._holders: Dict[Any, int] = {}
+        # Вытесненные клиенты, у которых ещё есть держатели → их HTTP-пул
+        self._retired: Dict[Any, httpx.AsyncClient] = {}
+        # Фоновые закрытия пулов вытесненных клиентов
+        self._closing: set = set()
+        # Семафор на клиента: ограничение одновременных запросов к пресету
+        self._concurrency: Dict[Any, asyncio.Semaphore] = {}
+        # Запущенные заранее анализы ЭТАПА 1 по ключу промпта (старые — в начале)
+        self._prefetched_analysis: "OrderedDict[str, asyncio.Task]" = OrderedDict()
         if settings.openai_api_key:
-            http_client = httpx.Client(verify=settings.ssl_verify, timeout=settings.llm_timeout_seconds)
+            http_client = _build_http_client()
             self._http_clients.append(http_client)
-            self.default_client = openai.OpenAI(
+            self.default_client = openai.AsyncOpenAI(
                 api_key=settings.openai_api_key,
                 base_url=settings.openai_base_url,
                 http_client=http_client,
@@ -112,9 +179,10 @@ class ProtocolGenerator:
         cache_key = (base_url, hash(api_key) if api_key else None)
 
         if cache_key not in self._client_cache:
-            http_client = httpx.Client(verify=settings.ssl_verify, timeout=settings.llm_timeout_seconds)
+            http_client = _build_http_client()
             self._http_clients.append(http_client)
-            self._client_cache[cache_key] = openai.OpenAI(
+            self._preset_http[cache_key] = http_client
+            self._client_cache[cache_key] = openai.AsyncOpenAI(
                 api_key=api_key,
                 base_url=base_url,
                 http_client=http_client,
@@ -123,30 +191,97 @@ class ProtocolGenerator:
 
         return self._client_cache[cache_key]
 
-    def close(self):
+    def _concurrency_limit(self, client) -> asyncio.Semaphore:
+        """Семафор одновременных запросов для клиента (пресета)."""
+        semaphore = self._concurrency.get(client)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(settings.llm_max_concurrency_per_preset)
+            self._concurrency[client] = semaphore
+        return semaphore
+
+    async def close(self):
         """Close all cached HTTP clients."""
+        for task in list(self._closing):
+            task.cancel()
         for client in self._http_clients:
             try:
-                client.close()
+                await client.aclose()
             except Exception:
                 pass
         self._http_clients.clear()
+        self._preset_http.clear()
         self._client_cache.clear()
+        self._concurrency.clear()
+        self._retired.clear()
+        for task in self._prefetched_analysis.values():
+            task.cancel()
+        self._prefetched_analysis.clear()
 
     def invalidate_cache_for(self, base_url: str, api_key_hash: Optional[int]) -> None:
         """Remove the cached client for the given (base_url, api_key_hash) tuple."""
         client = self._client_cache.pop((base_url, api_key_hash), None)
         if client is not None:
+            self._retire_client((base_url, api_key_hash), client)
             logger.info(f"Invalidated OpenAI client cache for {base_url}")
 
     def invalidate_cache_for_base_url(self, base_url: str) -> None:
         """Remove all cached clients for the given base_url, regardless of api_key."""
         keys_to_remove = [k for k in self._client_cache if k[0] == base_url]
         for k in keys_to_remove:
-            self._client_cache.pop(k)
+            self._retire_client(k, self._client_cache.pop(k))
         if keys_to_remove:
             logger.info(f"Invalidated {len(keys_to_remove)} OpenAI client(s) for {base_url}")
 
+    @asynccontextmanager
+    async def _lease(self, client) -> AsyncIterator[None]:
+        """Удерживать клиент, пока он нужен: вызов или вся генерация целиком.
+
+        Генерация берёт клиент один раз и делает им несколько вызовов (ретраи,
+        map-reduce); правка пресета посередине не должна закрыть пул под ней.
+        """
+        self._holders[client] = self._holders.get(client, 0) + 1
+        try:
+            yield
+        finally:
+            self._holders[client] -= 1
+            if not self._holders[client]:
+                del self._holders[client]
+                http_client = self._retired.pop(client, None)
+                if http_client is not None:
+                    self._schedule_close(client, http_client)
+
+    def _retire_client(self, cache_key, client) -> None:
+        """Закрыть HTTP-пул вытесненного клиента, когда уйдёт последний держатель.
+
+        Пул остаётся в ``_http_clients``, пока не закрыт: без цикла событий
+        или при остановке генератора его закроет ``close()``.
+        """
+        http_client = self._preset_http.pop(cache_key, None)
+        if http_client is None:
+            return
+        if self._holders.get(client):
+            self._retired[client] = http_client
+        else:
+            self._schedule_close(client, http_client)
+
+    def _schedule_close(self, client, http_client: httpx.AsyncClient) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = loop.create_task(self._close_retired(client, http_client))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def _close_retired(self, client, http_client: httpx.AsyncClient) -> None:
+        try:
+            await http_client.aclose()
+        except Exception as e:
+            logger.warning(f"Не удалось закрыть HTTP-пул вытесненного клиента: {e}")
+        if http_client in self._http_clients:
+            self._http_clients.remove(http_client)
+        self._concurrency.pop(client, None)
+
     def is_available(self) -> bool:
         """Клиент сконфигурирован и модуль готов принимать вызовы."""
         return self.default_client is not None
@@ -202,15 +337,16 @@ class ProtocolGenerator:
         if not self.is_available():
             raise ValueError("OpenAI API не настроен")
         client = self._get_client(preset)
-        return await self._protected(
-            self._call_openai,
-            system_prompt=system_prompt,
-            user_prompt=user_prompt,
-            schema=schema,
-            step_name=step_name,
-            model=model,
-            client=client,
-        )
+        async with self._lease(client):
+            return await self._protected(
+                self._call_openai,
+                system_prompt=system_prompt,
+                user_prompt=user_prompt,
+                schema=schema,
+                step_name=step_name,
+                model=model,
+                client=client,
+            )
 
     # ----------------------------------------------------------- реализация
 
@@ -218,24 +354,9 @@ class ProtocolGenerator:
                                   transcription: str, template_variables: Dict[str, str],
                                   **kwargs) -> Dict[str, Any]:
         """Two-stage generation: analysis (тип встречи + спикеры) → protocol."""
-        participants = kwargs.get('participants')
-        meeting_metadata = {
-            'meeting_topic': kwargs.get('meeting_topic', ''),
-            'meeting_date': kwargs.get('meeting_date', ''),
-            'meeting_time': kwargs.get('meeting_time', '')
-        }
-
-        # transcription — уже готовый текст (best_transcript вызывающего): анализ и
-        # генерация идут по нему, отдельного выбора «формат или сырой» здесь нет.
-        analysis_transcription = transcription
-
-        participants_list_str = "Не предоставлен"
-        if participants:
-            try:
-                from src.services.participants_service import participants_service
-                participants_list_str = participants_service.format_participants_for_llm(participants)
-            except ImportError:
-                participants_list_str = "\\n".join([f"- {p.get('name', 'Unknown')}" for p in participants])
+        # Длинная транскрипция → map-reduce по фрагментам; анализ при этом идёт
+        # по первому фрагменту (см. _analysis_prompt)
+        chunks = self._long_transcript_chunks(transcription)
 
         provided_meeting_type = kwargs.get('meeting_type')
         provided_speaker_mapping = kwargs.get('speaker_mapping')
@@ -258,21 +379,11 @@ class ProtocolGenerator:
             speaker_mapping = provided_speaker_mapping
             analysis_result = {}
         else:
-            logger.info("Запуск ЭТАПА 1: Анализ встречи и сопоставление спикеров")
-
-            analysis_result = await self._call_openai(
-                system_prompt=build_analysis_system_prompt(),
-                user_prompt=build_analysis_prompt(
-                    transcription=analysis_transcription,
-                    participants_list=participants_list_str,
-                    meeting_metadata=meeting_metadata,
-                    meeting_agenda=kwargs.get('meeting_agenda'),
-                    project_list=kwargs.get('project_list')
-                ),
-                schema=MEETING_ANALYSIS_SCHEMA,
-                step_name="Analysis",
-                model=settings.analysis_stage_model
-            )
+            analysis_prompt = self._analysis_prompt(transcription, chunks=chunks, **kwargs)
+            analysis_result = await self._take_prefetched_analysis(analysis_prompt)
+            if analysis_result is None:
+                logger.info("Запуск ЭТАПА 1: Анализ встречи и сопоставление спикеров")
+                analysis_result = await self._call_analysis(analysis_prompt)
 
             meeting_type = analysis_result.get('meeting_type', 'general')
             speaker_mapping = analysis_result.get('speaker_mappings', {})
@@ -288,21 +399,36 @@ class ProtocolGenerator:
             kwargs.get('template_name'), template_variables
         )
 
-        generation_result = await self._call_openai(
-            system_prompt=generation_system_prompt,
-            user_prompt=build_generation_prompt(
-                transcription=analysis_transcription,
-                template_variables=template_variables,
-                speaker_mapping=speaker_mapping,
-                meeting_type=meeting_type,
-                meeting_agenda=kwargs.get('meeting_agenda'),
-                project_list=kwargs.get('project_list')
-            ),
-            schema=generation_schema,
-            step_name="Generation",
-            model=selected_model,
-            client=client
-        )
+        async with self._lease(client):
+            if chunks:
+                generation_result = await self._generate_map_reduce(
+                    chunks=chunks,
+                    system_prompt=generation_system_prompt,
+                    schema=generation_schema,
+                    template_variables=template_variables,
+                    speaker_mapping=speaker_mapping,
+                    meeting_type=meeting_type,
+                    meeting_agenda=kwargs.get('meeting_agenda'),
+                    project_list=kwargs.get('project_list'),
+                    model=selected_model,
+                    client=client,
+                )
+            else:
+                generation_result = await self._call_openai(
+                    system_prompt=generation_system_prompt,
+                    user_prompt=build_generation_prompt(
+                        transcription=transcription,
+                        template_variables=template_variables,
+                        speaker_mapping=speaker_mapping,
+                        meeting_type=meeting_type,
+                        meeting_agenda=kwargs.get('meeting_agenda'),
+                        project_list=kwargs.get('project_list')
+                    ),
+                    schema=generation_schema,
+                    step_name="Generation",
+                    model=selected_model,
+                    client=client
+                )
 
         protocol_data = generation_result.get('protocol_data', {})
         logger.info(f"ЭТАП 2 завершен. Извлечено полей: {len(protocol_data)}")
@@ -317,6 +443,187 @@ class ProtocolGenerator:
 
         return final_result
 
+    def _analysis_prompt(self, transcription: str, *, chunks: Optional[List[str]] = None,
+                         **kwargs) -> str:
+        """Пользовательский промпт ЭТАПА 1 — он же ключ предвыборки анализа.
+
+        ``transcription`` — уже готовый текст (best_transcript вызывающего). Для
+        длинной транскрипции анализу (тип встречи, сопоставление спикеров)
+        хватает начала встречи: там звучат представления и повестка, поэтому он
+        идёт по первому фрагменту.
+        """
+        if chunks is None:
+            chunks = self._long_transcript_chunks(transcription)
+        analysis_transcription = chunks[0] if chunks else transcription
+
+        participants = kwargs.get('participants')
+        participants_list_str = "Не предоставлен"
+        if participants:
+            try:
+                from src.services.participants_service import participants_service
+                participants_list_str = participants_service.format_participants_for_llm(participants)
+            except ImportError:
+                participants_list_str = "\\n".join([f"- {p.get('name', 'Unknown')}" for p in participants])
+
+        return build_analysis_prompt(
+            transcription=analysis_transcription,
+            participants_list=participants_list_str,
+            meeting_metadata={
+                'meeting_topic': kwargs.get('meeting_topic', ''),
+                'meeting_date': kwargs.get('meeting_date', ''),
+                'meeting_time': kwargs.get('meeting_time', '')
+            },
+            meeting_agenda=kwargs.get('meeting_agenda'),
+            project_list=kwargs.get('project_list')
+        )
+
+    async def _call_analysis(self, analysis_prompt: str) -> Dict[str, Any]:
+        return await self._call_openai(
+            system_prompt=build_analysis_system_prompt(),
+            user_prompt=analysis_prompt,
+            schema=MEETING_ANALYSIS_SCHEMA,
+            step_name="Analysis",
+            model=settings.analysis_stage_model
+        )
+
+    @staticmethod
+    def _prefetch_key(analysis_prompt: str) -> str:
+        return hashlib.sha256(
+            f"{settings.analysis_stage_model}\n{analysis_prompt}".encode("utf-8")
+        ).hexdigest()
+
+    def prefetch_analysis(self, *, transcription: str, **context) -> bool:
+        """Запустить ЭТАП 1 заранее, в фоне, не дожидаясь генерации.
+
+        Конвейер зовёт это сразу после транскрипции — параллельно с
+        сопоставлением спикеров и выбором шаблона. ``generate`` с тем же
+        контекстом (включая возобновление после карточки сопоставления)
+        заберёт готовый результат вместо второго последовательного вызова.
+        Ключ — сам промпт анализа: изменился вход — предвыборка не подходит.
+
+        Returns:
+            True, если анализ запущен (или уже запущен с тем же входом).
+        """
+        if not self.is_available():
+            return False
+        analysis_prompt = self._analysis_prompt(transcription, **context)
+        key = self._prefetch_key(analysis_prompt)
+        if key in self._prefetched_analysis:
+            return True
+
+        task = asyncio.create_task(self._protected(self._call_analysis, analysis_prompt))
+        task.add_done_callback(_log_prefetch_failure)
+        self._prefetched_analysis[key] = task
+        while len(self._prefetched_analysis) > _MAX_PREFETCHED_ANALYSES:
+            _, stale = self._prefetched_analysis.popitem(last=False)
+            stale.cancel()
+        logger.info("ЭТАП 1 запущен заранее, параллельно с подготовкой протокола")
+        return True
+
+    async def _take_prefetched_analysis(self, analysis_prompt: str) -> Optional[Dict[str, Any]]:
+        """Результат предвыборки ЭТАПА 1 для этого промпта или None."""
+        task = self._prefetched_analysis.pop(self._prefetch_key(analysis_prompt), None)
+        if task is None:
+            return None
+        try:
+            result = await task
+        except Exception as e:
+            logger.warning(f"Предвыборка ЭТАПА 1 не удалась ({e}) — анализ выполняется заново")
+            return None
+        logger.info("ЭТАП 1 взят из предвыборки")
+        return result
+
+    @staticmethod
+    def _long_transcript_chunks(transcription: str) -> Optional[List[str]]:
+        """Фрагменты для map-reduce или None, если транскрипция укладывается в порог."""
+        if not settings.long_transcript_mode:
+            return None
+        estimated = estimate_tokens(transcription)
+        if estimated < settings.long_transcript_threshold_tokens:
+            return None
+        chunks = chunk_transcript(transcription, settings.long_transcript_chunk_tokens)
+        if len(chunks) < 2:
+            return None
+        logger.info(
+            f"Длинная транскрипция (~{estimated} токенов): map-reduce генерация "
+            f"по {len(chunks)} фрагментам"
+        )
+        return chunks
+
+    @staticmethod
+    def _group_partials(partials: List[Dict[str, Any]], max_tokens: int) -> List[List[Dict[str, Any]]]:
+        """Сгруппировать частичные протоколы под бюджет reduce-вызова.
+
+        В группе минимум два протокола (кроме последнего остатка), поэтому каждый
+        круг reduce сокращает их число и иерархическое слияние сходится.
+        """
+        groups: List[List[Dict[str, Any]]] = []
+        current: List[Dict[str, Any]] = []
+        current_tokens = 0
+        for partial in partials:
+            tokens = estimate_tokens(json.dumps(partial, ensure_ascii=False))
+            if len(current) >= 2 and current_tokens + tokens > max_tokens:
+                groups.append(current)
+                current, current_tokens = [], 0
+            current.append(partial)
+            current_tokens += tokens
+        if current:
+            groups.append(current)
+        return groups
+
+    async def _generate_map_reduce(self, *, chunks: List[str], system_prompt: str,
+                                   schema: Dict[str, Any], template_variables: Dict[str, str],
+                                   speaker_mapping: Dict[str, str], meeting_type: str,
+                                   meeting_agenda: Optional[str], project_list: Optional[str],
+                                   model: str, client) -> Dict[str, Any]:
+        """Map: частичный протокол на фрагмент (параллельно); reduce: слияние по той же схеме."""
+        total = len(chunks)
+        map_results = await asyncio.gather(*[
+            self._call_openai(
+                system_prompt=system_prompt,
+                user_prompt=build_generation_prompt(
+                    transcription=chunk,
+                    template_variables=template_variables,
+                    speaker_mapping=speaker_mapping,
+                    meeting_type=meeting_type,
+                    meeting_agenda=meeting_agenda,
+                    project_list=project_list,
+                    chunk_info=(index, total),
+                ),
+                schema=schema,
+                step_name=f"GenerationMap {index}/{total}",
+                model=model,
+                client=client,
+            )
+            for index, chunk in enumerate(chunks, start=1)
+        ])
+        partials = [result.get('protocol_data', {}) for result in map_results]
+        logger.info(f"Map-шаг завершён: {total} частичных протоколов")
+
+        reduce_round = 0
+        while True:
+            reduce_round += 1
+            groups = self._group_partials(partials, settings.long_transcript_chunk_tokens)
+            reduced = await asyncio.gather(*[
+                self._call_openai(
+                    system_prompt=system_prompt,
+                    user_prompt=build_reduce_prompt(
+                        partials=group,
+                        template_variables=template_variables,
+                        speaker_mapping=speaker_mapping,
+                        meeting_type=meeting_type,
+                    ),
+                    schema=schema,
+                    step_name=f"GenerationReduce {reduce_round}.{index}",
+                    model=model,
+                    client=client,
+                )
+                for index, group in enumerate(groups, start=1)
+            ])
+            if len(reduced) == 1:
+                return reduced[0]
+            partials = [result.get('protocol_data', {}) for result in reduced]
+
     async def _call_openai(self, system_prompt: str, user_prompt: str, schema: Dict[str, Any],
                            step_name: str, model: str = None, client=None) -> Dict[str, Any]:
         """Helper method for OpenAI API calls."""
@@ -332,17 +639,19 @@ class ProtocolGenerator:
         logger.info(f"Отправляем запрос в OpenAI [{step_name}] с моделью {selected_model}")
 
         try:
-            response = await asyncio.to_thread(
-                active_client.chat.completions.create,
-                model=selected_model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.1,
-                response_format={"type": "json_schema", "json_schema": schema},
-                extra_headers=extra_headers
-            )
+            # Слот берётся на одну попытку: ретрай в паузе между попытками
+            # не держит место других запросов к этому пресету
+            async with self._lease(active_client), self._concurrency_limit(active_client):
+                response = await active_client.chat.completions.create(
+                    model=selected_model,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    temperature=0.1,
+                    response_format={"type": "json_schema", "json_schema": schema},
+                    extra_headers=extra_headers
+                )
             content = response.choices[0].message.content
 
             if settings.log_cache_metrics:
@@ -0,0 +1,104 @@
+"""Нарезка длинной транскрипции на фрагменты под бюджет токенов.
+
+Чистая логика для map-reduce генерации: оценка токенов без токенизатора,
+разбиение форматированной транскрипции на реплики (границы — пустые строки,
+как их пишет ``format_transcript_with_speaker_sequence``) и жадная упаковка
+реплик во фрагменты. Реплика режется только если она одна не влезает в
+бюджет: тогда по предложениям, а в крайнем случае по словам, и каждый кусок
+сохраняет метку спикера.
+"""
+
+import math
+import re
+from typing import List
+
+# Консервативная оценка для смешанного русско-английского текста: кириллица
+# токенизируется плотнее латиницы, поэтому символов на токен берём мало —
+# лучше переоценить длину, чем упереться в контекст модели
+CHARS_PER_TOKEN = 3.0
+
+_TURN_SEPARATOR = "\n\n"
+_SPEAKER_PREFIX_RE = re.compile(r"^(SPEAKER_\w+|[^\n:]{1,60}):\s")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?…])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Грубая оценка числа токенов текста."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def split_into_turns(transcript: str) -> List[str]:
+    """Реплики форматированной транскрипции (пустые отброшены)."""
+    return [turn.strip() for turn in transcript.split(_TURN_SEPARATOR) if turn.strip()]
+
+
+def _split_words(text: str, max_tokens: int) -> List[str]:
+    pieces: List[str] = []
+    current: List[str] = []
+    current_len = 0
+    max_chars = int(max_tokens * CHARS_PER_TOKEN)
+    for word in text.split():
+        if current and current_len + 1 + len(word) > max_chars:
+            pieces.append(" ".join(current))
+            current, current_len = [], 0
+        current.append(word)
+        current_len += len(word) + (1 if current_len else 0)
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def _split_long_turn(turn: str, max_tokens: int) -> List[str]:
+    """Разрезать одну слишком длинную реплику, сохраняя метку спикера."""
+    match = _SPEAKER_PREFIX_RE.match(turn)
+    prefix = match.group(0) if match else ""
+    body = turn[len(prefix):]
+    body_budget = max(1, max_tokens - estimate_tokens(prefix))
+
+    pieces: List[str] = []
+    current = ""
+    for sentence in _SENTENCE_END_RE.split(body):
+        if estimate_tokens(sentence) > body_budget:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.extend(_split_words(sentence, body_budget))
+            continue
+        candidate = f"{current} {sentence}" if current else sentence
+        if estimate_tokens(candidate) > body_budget:
+            pieces.append(current)
+            current = sentence
+        else:
+            current = candidate
+    if current:
+        pieces.append(current)
+    return [prefix + piece for piece in pieces]
+
+
+def chunk_transcript(transcript: str, max_tokens: int) -> List[str]:
+    """Упаковать реплики во фрагменты не длиннее ``max_tokens`` (по оценке).
+
+    Порядок реплик сохраняется; фрагмент заканчивается на границе реплики,
+    кроме случая, когда одна реплика сама длиннее бюджета.
+    """
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    separator_tokens = estimate_tokens(_TURN_SEPARATOR)
+
+    for turn in split_into_turns(transcript):
+        turn_tokens = estimate_tokens(turn)
+        parts = [turn] if turn_tokens <= max_tokens else _split_long_turn(turn, max_tokens)
+        for part in parts:
+            part_tokens = estimate_tokens(part)
+            if current and current_tokens + separator_tokens + part_tokens > max_tokens:
+                chunks.append(_TURN_SEPARATOR.join(current))
+                current, current_tokens = [], 0
+            if current:
+                current_tokens += separator_tokens
+            current.append(part)
+            current_tokens += part_tokens
+
+    if current:
+        chunks.append(_TURN_SEPARATOR.join(current))
+    return chunks
@@ -4,14 +4,32 @@
 Хранит ТОЛЬКО последовательность сегментов; список спикеров, тексты по спикерам,
 форматированную транскрипцию и сводку модель выводит из сегментов как свойства.
 Потребители читают эти свойства напрямую — промежуточной dict-формы нет.
+
+Сегменты хранятся колонками (``SegmentColumns``): метки спикеров — один раз,
+в сегментах — их маленькие целые номера, тайминги — в массивах ``array('d')``.
+На 10k сегментов это на порядок легче списка pydantic-объектов. Снаружи
+колонки выглядят как последовательность ``Segment`` (объекты собираются при
+чтении), а сериализуются в тот же список dict'ов, что и раньше.
+
+Производные представления вычисляются один раз и запоминаются в колонках.
+Колонки неизменяемы, поэтому инвалидация сводится к замене ``segments``:
+новое значение — новые колонки с пустым кэшем.
 """
 
-from typing import Dict, List, Optional
+import math
+from array import array
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, TypeVar, Union, overload
 
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, GetCoreSchemaHandler
+from pydantic_core import core_schema
 
 from src.utils.transcript_formatter import format_transcript_with_speaker_sequence
 
+_T = TypeVar("_T")
+
+# Отсутствующий тайминг в массиве таймингов
+_NO_TIME = math.nan
+
 
 class Segment(BaseModel):
     """Сегмент диаризации: реплика одного спикера с опциональными таймингами."""
@@ -22,43 +40,205 @@ class Segment(BaseModel):
     end: Optional[float] = None
 
 
+def _pack_time(value: Optional[float]) -> float:
+    return _NO_TIME if value is None else float(value)
+
+
+def _unpack_time(value: float) -> Optional[float]:
+    return None if math.isnan(value) else value
+
+
+class SegmentColumns(Sequence[Segment]):
+    """Неизменяемые сегменты диаризации в колоночном виде.
+
+    ``speaker_labels`` — уникальные метки в порядке появления; сегмент хранит
+    номер метки. Индексация и итерация отдают новые ``Segment`` — правка такого
+    объекта хранилище не меняет.
+    """
+
+    __slots__ = ("_labels", "_speaker_ids", "_texts", "_starts", "_ends", "_views")
+
+    def __init__(self, segments: Iterable[Segment] = ()):
+        labels: List[str] = []
+        label_ids: Dict[str, int] = {}
+        speaker_ids = array("I")
+        texts: List[str] = []
+        starts = array("d")
+        ends = array("d")
+        for segment in segments:
+            speaker_id = label_ids.get(segment.speaker)
+            if speaker_id is None:
+                speaker_id = label_ids[segment.speaker] = len(labels)
+                labels.append(segment.speaker)
+            speaker_ids.append(speaker_id)
+            texts.append(segment.text)
+            starts.append(_pack_time(segment.start))
+            ends.append(_pack_time(segment.end))
+        self._labels = labels
+        self._speaker_ids = speaker_ids
+        self._texts = texts
+        self._starts = starts
+        self._ends = ends
+        self._views: Dict[str, Any] = {}
+
+    @property
+    def speaker_labels(self) -> List[str]:
+        """Уникальные метки спикеров в порядке появления (без копирования)."""
+        return self._labels
+
+    def iter_speaker_texts(self) -> Iterator[tuple]:
+        """Пары (метка спикера, текст) без сборки ``Segment``."""
+        labels = self._labels
+        for speaker_id, text in zip(self._speaker_ids, self._texts):
+            yield labels[speaker_id], text
+
+    def iter_rows(self) -> Iterator[tuple]:
+        """Кортежи (метка спикера, текст, начало, конец) без сборки ``Segment``."""
+        labels = self._labels
+        for speaker_id, text, start, end in zip(self._speaker_ids, self._texts, self._starts, self._ends):
+            yield labels[speaker_id], text, _unpack_time(start), _unpack_time(end)
+
+    def memo(self, name: str, build: Callable[["SegmentColumns"], _T]) -> _T:
+        """Производное представление: считается при первом обращении и запоминается."""
+        try:
+            return self._views[name]
+        except KeyError:
+            value = self._views[name] = build(self)
+            return value
+
+    def _segment(self, index: int) -> Segment:
+        return Segment(
+            speaker=self._labels[self._speaker_ids[index]],
+            text=self._texts[index],
+            start=_unpack_time(self._starts[index]),
+            end=_unpack_time(self._ends[index]),
+        )
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    @overload
+    def __getitem__(self, index: int) -> Segment: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[Segment]: ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Segment, List[Segment]]:
+        if isinstance(index, slice):
+            return [self._segment(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("segment index out of range")
+        return self._segment(index)
+
+    def __iter__(self) -> Iterator[Segment]:
+        return (self._segment(i) for i in range(len(self)))
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, SegmentColumns):
+            return self.to_dicts() == other.to_dicts()
+        if isinstance(other, (list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"SegmentColumns({len(self)} segments, {len(self._labels)} speakers)"
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Сегменты в dict-форме ``Segment.model_dump()`` — для сериализации."""
+        labels = self._labels
+        return [
+            {
+                "speaker": labels[speaker_id],
+                "text": text,
+                "start": _unpack_time(start),
+                "end": _unpack_time(end),
+            }
+            for speaker_id, text, start, end in zip(
+                self._speaker_ids, self._texts, self._starts, self._ends
+            )
+        ]
+
+    # Кэш представлений в pickle не попадает — он восстанавливается лениво
+    def __getstate__(self) -> tuple:
+        return self._labels, self._speaker_ids, self._texts, self._starts, self._ends
+
+    def __setstate__(self, state: tuple) -> None:
+        self._labels, self._speaker_ids, self._texts, self._starts, self._ends = state
+        self._views = {}
+
+    @classmethod
+    def __get_pydantic_core_schema__(
+        cls, source_type: Any, handler: GetCoreSchemaHandler
+    ) -> core_schema.CoreSchema:
+        from_segments = core_schema.no_info_after_validator_function(
+            cls, handler.generate_schema(List[Segment])
+        )
+        return core_schema.json_or_python_schema(
+            json_schema=from_segments,
+            python_schema=core_schema.union_schema(
+                [core_schema.is_instance_schema(cls), from_segments]
+            ),
+            serialization=core_schema.plain_serializer_function_ser_schema(
+                lambda columns: columns.to_dicts()
+            ),
+        )
+
+
+def _build_speakers_text(columns: SegmentColumns) -> Dict[str, str]:
+    pieces: Dict[str, List[str]] = {speaker: [] for speaker in columns.speaker_labels}
+    for speaker, text in columns.iter_speaker_texts():
+        text = text.strip()
+        if text:
+            pieces[speaker].append(text)
+    return {speaker: " ".join(texts) for speaker, texts in pieces.items()}
+
+
+def _build_formatted_transcript(columns: SegmentColumns) -> str:
+    return format_transcript_with_speaker_sequence(
+        [{"speaker": speaker, "text": text} for speaker, text in columns.iter_speaker_texts()]
+    )
+
+
 class Diarization(BaseModel):
     """Диаризация: последовательность сегментов и производные представления."""
 
-    segments: List[Segment]
+    model_config = ConfigDict(validate_assignment=True)
+
+    segments: SegmentColumns
+
+    def __setstate__(self, state: Dict[Any, Any]) -> None:
+        # Записи кэша, сохранённые до колоночного хранения, несут список Segment
+        fields = state.get("__dict__") or {}
+        segments = fields.get("segments")
+        if segments is not None and not isinstance(segments, SegmentColumns):
+            fields["segments"] = SegmentColumns(segments)
+        super().__setstate__(state)
 
     @property
     def speakers(self) -> List[str]:
         """Уникальные спикеры в порядке их появления в сегментах."""
-        ordered: List[str] = []
-        for segment in self.segments:
-            if segment.speaker not in ordered:
-                ordered.append(segment.speaker)
-        return ordered
+        return list(self.segments.speaker_labels)
 
     @property
     def speakers_text(self) -> Dict[str, str]:
         """Текст каждого спикера, склеенный по порядку; пустые реплики пропускаются."""
-        pieces: Dict[str, List[str]] = {}
-        for segment in self.segments:
-            pieces.setdefault(segment.speaker, [])
-            text = segment.text.strip()
-            if text:
-                pieces[segment.speaker].append(text)
-        return {speaker: " ".join(texts) for speaker, texts in pieces.items()}
+        return dict(self.segments.memo("speakers_text", _build_speakers_text))
 
     @property
     def formatted_transcript(self) -> str:
         """Форматированная транскрипция с сохранением чередования реплик."""
-        return format_transcript_with_speaker_sequence(
-            [segment.model_dump() for segment in self.segments]
-        )
+        return self.segments.memo("formatted_transcript", _build_formatted_transcript)
 
     @property
     def speakers_summary(self) -> str:
         """Сводка: общее число спикеров и количество слов у каждого построчно."""
-        speakers = self.speakers
-        speakers_text = self.speakers_text
+        return self.segments.memo("speakers_summary", self._build_speakers_summary)
+
+    def _build_speakers_summary(self, columns: SegmentColumns) -> str:
+        speakers = columns.speaker_labels
+        speakers_text = columns.memo("speakers_text", _build_speakers_text)
         summary = f"Общее количество говорящих: {len(speakers)}\n\n"
         for speaker in speakers:
             word_count = len(speakers_text.get(speaker, "").split())
@@ -21,6 +21,10 @@ class ProcessingRequest(BaseModel):
     user_id: int = Field(..., description="ID пользователя")
     language: str = Field("ru", description="Язык транскрипции")
     is_external_file: bool = Field(False, description="Флаг внешнего файла")
+    file_hash: Optional[str] = Field(
+        None,
+        description="Хеш содержимого для ключей кеша — считается один раз, по ходу скачивания",
+    )
     participants_list: Optional[List[Dict[str, str]]] = Field(None, description="Список участников")
     speaker_mapping: Optional[Dict[str, str]] = Field(None, description="Сопоставление спикеров с участниками")
     meeting_topic: Optional[str] = Field(None, description="Тема встречи")
@@ -3,18 +3,43 @@
 """
 
 import asyncio
+import hashlib
 import os
 import ssl
 import time
 from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from contextlib import asynccontextmanager
 from dataclasses import dataclass
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
 
 import aiofiles
 import aiohttp
 from loguru import logger
 
+# Длина хеша содержимого в ключах кеша: префикс hex-дайджеста SHA-256
+FILE_HASH_LENGTH = 16
+
+
+def file_hash_from_sha256(hexdigest: str) -> str:
+    """Хеш содержимого для ключей кеша из полного дайджеста SHA-256."""
+    return hexdigest[:FILE_HASH_LENGTH]
+
+
+async def write_stream_hashed(chunks: AsyncIterator[bytes], file_path: str) -> Tuple[int, str]:
+    """Записать поток чанков в файл, считая SHA-256 в том же проходе.
+
+    Возвращает (число байт, hex-дайджест SHA-256). Файл после скачивания
+    перечитывать ради хеша не нужно.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    async with aiofiles.open(file_path, 'wb') as file:
+        async for chunk in chunks:
+            digest.update(chunk)
+            await file.write(chunk)
+            size += len(chunk)
+    return size, digest.hexdigest()
+
 
 @dataclass
 class TaskResult:
@@ -162,7 +187,11 @@ class OptimizedHTTPClient:
     
     async def download_file(self, url: str, file_path: str, 
                           chunk_size: int = 8192) -> Dict[str, Any]:
-        """Оптимизированное скачивание файла"""
+        """Оптимизированное скачивание файла.
+
+        SHA-256 содержимого считается по ходу скачивания и возвращается в
+        ``sha256`` — повторно читать файл ради хеша не нужно.
+        """
         if not self.session:
             raise RuntimeError("HTTP клиент не инициализирован")
         
@@ -173,10 +202,9 @@ class OptimizedHTTPClient:
             async with self.session.get(url) as response:
                 response.raise_for_status()
                 
-                async with aiofiles.open(file_path, 'wb') as file:
-                    async for chunk in response.content.iter_chunked(chunk_size):
-                        await file.write(chunk)
-                        bytes_downloaded += len(chunk)
+                bytes_downloaded, sha256 = await write_stream_hashed(
+                    response.content.iter_chunked(chunk_size), file_path
+                )
                 
                 duration = time.time() - start_time
                 speed_mbps = (bytes_downloaded / (1024 * 1024)) / duration if duration > 0 else 0
@@ -186,7 +214,8 @@ class OptimizedHTTPClient:
                     "bytes_downloaded": bytes_downloaded,
                     "duration": duration,
                     "speed_mbps": speed_mbps,
-                    "file_path": file_path
+                    "file_path": file_path,
+                    "sha256": sha256,
                 }
                 
         except Exception as e:
@@ -2,15 +2,22 @@
 Система кэширования для оптимизации производительности
 """
 
+import asyncio
 import hashlib
 import json
+import os
 import pickle
+import sqlite3
+import sys
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 
-import aiofiles
 from loguru import logger
 
 
@@ -33,10 +40,257 @@ class CacheEntry:
             self.metadata = {}
 
 
+# Доли памяти по типам кэша. Сумма не превышает 1, поэтому тип, упёршийся
+# в свою квоту, вытесняет только свои записи и не трогает чужие: крупные
+# результаты LLM не выдавливают транскрипции, и наоборот. Типы, которых
+# нет в таблице, делят общую корзину DEFAULT_QUOTA_BUCKET.
+DEFAULT_QUOTA_BUCKET = "default"
+DEFAULT_TYPE_QUOTAS: Dict[str, float] = {
+    "transcription": 0.35,
+    "processing_result": 0.25,
+    "llm_response": 0.15,
+    "diarization": 0.10,
+    DEFAULT_QUOTA_BUCKET: 0.15,
+}
+
+# Атомарные типы: размер целиком даёт sys.getsizeof, обходить нечего
+_ATOMIC_TYPES = (str, bytes, bytearray, int, float, complex, bool, type(None))
+
+
+def estimate_size(value: Any) -> int:
+    """Оценить размер объекта в памяти без сериализации.
+
+    Итеративно обходит контейнеры, dataclass- и pydantic-модели (через
+    ``__dict__``) и суммирует ``sys.getsizeof``. Общие подобъекты считаются
+    один раз. Это оценка, а не точный учёт, но она монотонна по объёму
+    данных и не требует pickle крупных транскрипций только ради замера.
+    """
+    seen = set()
+    stack = [value]
+    total = 0
+    while stack:
+        obj = stack.pop()
+        obj_id = id(obj)
+        if obj_id in seen:
+            continue
+        seen.add(obj_id)
+        total += sys.getsizeof(obj, 64)
+
+        if isinstance(obj, _ATOMIC_TYPES) or isinstance(obj, type):
+            continue
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        else:
+            obj_dict = getattr(obj, "__dict__", None)
+            if isinstance(obj_dict, dict):
+                stack.append(obj_dict)
+            for slot in getattr(type(obj), "__slots__", ()):
+                if hasattr(obj, slot):
+                    stack.append(getattr(obj, slot))
+    return total
+
+
+_DISK_INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS disk_entries (
+    key TEXT PRIMARY KEY,
+    size_bytes INTEGER NOT NULL,
+    cache_type TEXT,
+    expires_at REAL,
+    last_accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_disk_entries_expires ON disk_entries(expires_at);
+CREATE INDEX IF NOT EXISTS idx_disk_entries_last_accessed ON disk_entries(last_accessed);
+"""
+
+
+class DiskCacheIndex:
+    """Манифест дискового уровня кэша в SQLite.
+
+    Хранит ключ, размер, тип и срок действия каждого ``*.pkl``, чтобы чистка
+    просроченного, статистика и вытеснение по размеру работали по индексу,
+    не открывая и не распаковывая сами файлы. Методы синхронные: из
+    асинхронного кода они вызываются через ``asyncio.to_thread``.
+    """
+
+    def __init__(self, index_path: Path, disk_dir: Path, orphan_ttl: timedelta):
+        self.index_path = index_path
+        self.disk_dir = disk_dir
+        self.orphan_ttl = orphan_ttl
+        self._initialized = False
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Короткое соединение на операцию: commit при успехе, всегда close."""
+        conn = sqlite3.connect(self.index_path, timeout=30)
+        try:
+            conn.execute("PRAGMA synchronous = NORMAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _ensure_initialized(self) -> None:
+        if self._initialized:
+            return
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.executescript(_DISK_INDEX_SCHEMA)
+            self._adopt_orphans(conn)
+        self._initialized = True
+
+    def _adopt_orphans(self, conn: sqlite3.Connection) -> None:
+        """Внести в индекс файлы, записанные до его появления.
+
+        Срок действия таких файлов неизвестен без распаковки, поэтому он
+        отсчитывается от mtime с максимальным TTL — дальше они живут и
+        вытесняются как обычные записи.
+        """
+        known = {row[0] for row in conn.execute("SELECT key FROM disk_entries")}
+        rows = []
+        with os.scandir(self.disk_dir) as it:
+            for item in it:
+                if not item.name.endswith(".pkl") or item.name[:-4] in known:
+                    continue
+                stat = item.stat()
+                rows.append((
+                    item.name[:-4], stat.st_size, None,
+                    stat.st_mtime + self.orphan_ttl.total_seconds(), stat.st_mtime,
+                ))
+        if rows:
+            conn.executemany(
+                "INSERT OR IGNORE INTO disk_entries "
+                "(key, size_bytes, cache_type, expires_at, last_accessed) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            logger.info(f"Индекс дискового кэша: учтено файлов без записи в индексе: {len(rows)}")
+
+    def path_for(self, key: str) -> Path:
+        return self.disk_dir / f"{key}.pkl"
+
+    def lookup(self, key: str) -> Optional[Tuple[Optional[float]]]:
+        """Срок действия записи (кортежем) или None, если её нет в индексе"""
+        self._ensure_initialized()
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT expires_at FROM disk_entries WHERE key = ?", (key,)
+            ).fetchone()
+
+    def read(self, key: str) -> bytes:
+        """Прочитать payload и отметить обращение"""
+        self._ensure_initialized()
+        content = self.path_for(key).read_bytes()
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE disk_entries SET last_accessed = ? WHERE key = ?", (time.time(), key)
+            )
+        return content
+
+    def write(self, key: str, payload: bytes, cache_type: Optional[str],
+              expires_at: Optional[datetime]) -> None:
+        """Записать payload атомарно (временный файл + rename) и внести в индекс"""
+        self._ensure_initialized()
+        path = self.path_for(key)
+        tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO disk_entries (key, size_bytes, cache_type, expires_at, last_accessed) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET size_bytes = excluded.size_bytes, "
+                "cache_type = excluded.cache_type, expires_at = excluded.expires_at, "
+                "last_accessed = excluded.last_accessed",
+                (key, len(payload), cache_type,
+                 expires_at.timestamp() if expires_at else None, time.time()),
+            )
+
+    def remove(self, key: str) -> bool:
+        """Удалить файл и запись индекса; True, если было что удалять"""
+        self._ensure_initialized()
+        with self._connect() as conn:
+            deleted = conn.execute("DELETE FROM disk_entries WHERE key = ?", (key,)).rowcount > 0
+        try:
+            self.path_for(key).unlink()
+            deleted = True
+        except FileNotFoundError:
+            pass
+        return deleted
+
+    def _remove_rows(self, conn: sqlite3.Connection, keys: List[str]) -> None:
+        conn.executemany("DELETE FROM disk_entries WHERE key = ?", [(k,) for k in keys])
+        for key in keys:
+            try:
+                self.path_for(key).unlink()
+            except FileNotFoundError:
+                pass
+
+    def remove_expired(self, now: float) -> int:
+        """Удалить просроченные записи, выбрав их по индексу"""
+        self._ensure_initialized()
+        with self._connect() as conn:
+            keys = [row[0] for row in conn.execute(
+                "SELECT key FROM disk_entries WHERE expires_at IS NOT NULL AND expires_at < ?",
+                (now,),
+            )]
+            self._remove_rows(conn, keys)
+        return len(keys)
+
+    def remove_by_type(self, cache_type: Optional[str]) -> int:
+        """Удалить все записи типа (None — все записи)"""
+        self._ensure_initialized()
+        with self._connect() as conn:
+            if cache_type is None:
+                keys = [row[0] for row in conn.execute("SELECT key FROM disk_entries")]
+            else:
+                keys = [row[0] for row in conn.execute(
+                    "SELECT key FROM disk_entries WHERE cache_type = ?", (cache_type,)
+                )]
+            self._remove_rows(conn, keys)
+        return len(keys)
+
+    def evict_to_size(self, max_bytes: int) -> int:
+        """Вытеснить давно не использованные записи сверх лимита размера"""
+        self._ensure_initialized()
+        with self._connect() as conn:
+            total = conn.execute(
+                "SELECT COALESCE(SUM(size_bytes), 0) FROM disk_entries"
+            ).fetchone()[0]
+            if total <= max_bytes:
+                return 0
+            keys = []
+            for key, size_bytes in conn.execute(
+                "SELECT key, size_bytes FROM disk_entries ORDER BY last_accessed"
+            ):
+                if total <= max_bytes:
+                    break
+                keys.append(key)
+                total -= size_bytes
+            self._remove_rows(conn, keys)
+        return len(keys)
+
+    def totals(self) -> Tuple[int, int]:
+        """Число записей и суммарный размер в байтах"""
+        self._ensure_initialized()
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM disk_entries"
+            ).fetchone()
+
+
 class PerformanceCache:
     """Высокопроизводительная система кэширования"""
     
-    def __init__(self, cache_dir: str = "cache", max_memory_mb: int = 512):
+    def __init__(self, cache_dir: str = "cache", max_memory_mb: int = 512,
+                 type_quotas: Optional[Dict[str, float]] = None,
+                 max_disk_mb: int = 4096):
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(exist_ok=True)
         
@@ -44,12 +298,23 @@ class PerformanceCache:
         self.max_memory_bytes = max_memory_mb * 1024 * 1024
         self.current_memory_usage = 0
         
-        # Кэш в памяти для быстрого доступа
-        self.memory_cache: Dict[str, CacheEntry] = {}
+        # Кэш в памяти для быстрого доступа. Порядок ключей — порядок LRU:
+        # в начале самые давно использованные, обращение переносит в конец
+        self.memory_cache: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        
+        # Квоты по типам кэша (в байтах) и LRU-порядок/занятость каждой корзины
+        quotas = type_quotas if type_quotas is not None else DEFAULT_TYPE_QUOTAS
+        self.type_quota_bytes: Dict[str, int] = {
+            bucket: int(self.max_memory_bytes * share) for bucket, share in quotas.items()
+        }
+        self.type_quota_bytes.setdefault(DEFAULT_QUOTA_BUCKET, self.max_memory_bytes)
+        self._type_lru: Dict[str, "OrderedDict[str, None]"] = {}
+        self._type_usage: Dict[str, int] = {}
         
         # Кэш на диске для больших объектов
         self.disk_cache_dir = self.cache_dir / "disk"
         self.disk_cache_dir.mkdir(exist_ok=True)
+        self.max_disk_bytes = max_disk_mb * 1024 * 1024
         
         # Статистика
         self.stats = {
@@ -57,7 +322,8 @@ class PerformanceCache:
             "misses": 0,
             "evictions": 0,
             "disk_reads": 0,
-            "disk_writes": 0
+            "disk_writes": 0,
+            "disk_evictions": 0
         }
         
         # Время жизни кэша по типам
@@ -69,6 +335,13 @@ class PerformanceCache:
             "template": timedelta(hours=12),
             "diarization": timedelta(hours=24)
         }
+        
+        # Манифест дискового уровня: ключ, размер, тип, срок действия
+        self.disk_index = DiskCacheIndex(
+            index_path=self.cache_dir / "disk_index.sqlite",
+            disk_dir=self.disk_cache_dir,
+            orphan_ttl=max(self.default_ttl.values()),
+        )
     
     def _generate_key(self, prefix: str, data: Union[str, Dict, List]) -> str:
         """Генерировать ключ кэша"""
@@ -83,11 +356,53 @@ class PerformanceCache:
     def _calculate_size(self, value: Any) -> int:
         """Подсчитать размер объекта в байтах"""
         try:
-            return len(pickle.dumps(value))
+            return estimate_size(value)
         except Exception:
-            # Fallback для объектов, которые нельзя сериализовать
+            # Fallback для объектов с экзотическим устройством
             return len(str(value).encode())
     
+    def _quota_bucket(self, cache_type: Optional[str]) -> str:
+        """Корзина квоты для типа кэша"""
+        if cache_type in self.type_quota_bytes:
+            return cache_type
+        return DEFAULT_QUOTA_BUCKET
+    
+    def _entry_bucket(self, entry: CacheEntry) -> str:
+        return self._quota_bucket(entry.metadata.get("cache_type"))
+    
+    def _fits_memory(self, size_bytes: int, cache_type: Optional[str]) -> bool:
+        """Помещается ли запись в память с учётом квоты своего типа"""
+        if self._should_cache_to_disk(size_bytes):
+            return False
+        return size_bytes <= self.type_quota_bytes[self._quota_bucket(cache_type)]
+    
+    def _memory_put(self, key: str, entry: CacheEntry):
+        """Положить запись в память (O(1)); старая запись с тем же ключом заменяется"""
+        self._memory_pop(key)
+        bucket = self._entry_bucket(entry)
+        self.memory_cache[key] = entry
+        self._type_lru.setdefault(bucket, OrderedDict())[key] = None
+        self._type_usage[bucket] = self._type_usage.get(bucket, 0) + entry.size_bytes
+        self.current_memory_usage += entry.size_bytes
+    
+    def _memory_pop(self, key: str) -> Optional[CacheEntry]:
+        """Убрать запись из памяти (O(1)) и вернуть её"""
+        entry = self.memory_cache.pop(key, None)
+        if entry is None:
+            return None
+        bucket = self._entry_bucket(entry)
+        self._type_lru.get(bucket, {}).pop(key, None)
+        self._type_usage[bucket] = self._type_usage.get(bucket, 0) - entry.size_bytes
+        self.current_memory_usage -= entry.size_bytes
+        return entry
+    
+    def _memory_touch(self, key: str, entry: CacheEntry):
+        """Отметить обращение: перенести ключ в конец обоих LRU-порядков"""
+        self.memory_cache.move_to_end(key)
+        type_lru = self._type_lru.get(self._entry_bucket(entry))
+        if type_lru is not None and key in type_lru:
+            type_lru.move_to_end(key)
+    
     def _should_cache_to_disk(self, size_bytes: int) -> bool:
         """Определить, нужно ли кэшировать на диск"""
         # Объекты больше 1MB кэшируем на диск
@@ -108,34 +423,40 @@ class PerformanceCache:
             # Обновляем статистику доступа
             entry.access_count += 1
             entry.last_accessed = datetime.now()
+            self._memory_touch(key, entry)
             
             self.stats["hits"] += 1
             logger.debug(f"Cache hit (memory): {key}")
             return entry.value
         
-        # Проверяем кэш на диске
-        disk_path = self.disk_cache_dir / f"{key}.pkl"
-        if disk_path.exists():
+        # Проверяем кэш на диске: срок действия берём из индекса, payload
+        # читаем только для живой записи
+        try:
+            row = await asyncio.to_thread(self.disk_index.lookup, key)
+        except Exception as e:
+            logger.error(f"Ошибка чтения индекса дискового кэша {key}: {e}")
+            row = None
+        
+        if row is not None:
+            expires_at = row[0]
+            if expires_at is not None and time.time() > expires_at:
+                await self._remove_from_disk(key)
+                self.stats["misses"] += 1
+                return None
+            
             try:
-                async with aiofiles.open(disk_path, 'rb') as f:
-                    content = await f.read()
-                    entry = pickle.loads(content)
-                
-                # Проверяем срок действия
-                if entry.expires_at and datetime.now() > entry.expires_at:
-                    await aiofiles.os.remove(disk_path)
-                    self.stats["misses"] += 1
-                    return None
+                content = await asyncio.to_thread(self.disk_index.read, key)
+                entry = pickle.loads(content)
                 
                 # Обновляем статистику
                 entry.access_count += 1
                 entry.last_accessed = datetime.now()
                 
                 # Загружаем в память если размер позволяет
-                if not self._should_cache_to_disk(entry.size_bytes):
-                    await self._ensure_memory_capacity(entry.size_bytes)
-                    self.memory_cache[key] = entry
-                    self.current_memory_usage += entry.size_bytes
+                cache_type = entry.metadata.get("cache_type")
+                if self._fits_memory(entry.size_bytes, cache_type):
+                    await self._ensure_memory_capacity(entry.size_bytes, cache_type)
+                    self._memory_put(key, entry)
                 
                 self.stats["hits"] += 1
                 self.stats["disk_reads"] += 1
@@ -144,11 +465,8 @@ class PerformanceCache:
                 
             except Exception as e:
                 logger.error(f"Ошибка чтения из дискового кэша {key}: {e}")
-                # Удаляем поврежденный файл
-                try:
-                    await aiofiles.os.remove(disk_path)
-                except:
-                    pass
+                # Удаляем поврежденный или пропавший файл вместе с записью индекса
+                await self._remove_from_disk(key)
         
         self.stats["misses"] += 1
         logger.debug(f"Cache miss: {key}")
@@ -177,17 +495,20 @@ class PerformanceCache:
                 metadata={"cache_type": cache_type}
             )
             
-            # Определяем, куда кэшировать
-            if self._should_cache_to_disk(size_bytes):
-                # Кэшируем на диск
+            # Определяем, куда кэшировать: крупное или не влезающее в квоту
+            # своего типа уходит на диск
+            if not self._fits_memory(size_bytes, cache_type):
+                # Кэшируем на диск; устаревшая копия в памяти не должна
+                # перекрывать новую при чтении
+                self._memory_pop(key)
                 await self._save_to_disk(key, entry)
                 self.stats["disk_writes"] += 1
                 logger.debug(f"Cached to disk: {key} ({size_bytes} bytes)")
             else:
                 # Кэшируем в память
-                await self._ensure_memory_capacity(size_bytes)
-                self.memory_cache[key] = entry
-                self.current_memory_usage += size_bytes
+                self._memory_pop(key)
+                await self._ensure_memory_capacity(size_bytes, cache_type)
+                self._memory_put(key, entry)
                 logger.debug(f"Cached to memory: {key} ({size_bytes} bytes)")
             
             return True
@@ -197,49 +518,60 @@ class PerformanceCache:
             return False
     
     async def _save_to_disk(self, key: str, entry: CacheEntry):
-        """Сохранить запись на диск"""
-        disk_path = self.disk_cache_dir / f"{key}.pkl"
-        async with aiofiles.open(disk_path, 'wb') as f:
-            content = pickle.dumps(entry)
-            await f.write(content)
+        """Сохранить запись на диск и, при переполнении, вытеснить старые"""
+        content = pickle.dumps(entry)
+        await asyncio.to_thread(
+            self.disk_index.write, key, content,
+            entry.metadata.get("cache_type"), entry.expires_at,
+        )
+        evicted = await asyncio.to_thread(self.disk_index.evict_to_size, self.max_disk_bytes)
+        if evicted:
+            self.stats["disk_evictions"] += evicted
+            logger.info(f"Дисковый кэш: вытеснено записей: {evicted}")
     
-    async def _ensure_memory_capacity(self, required_bytes: int):
-        """Обеспечить место в кэше памяти"""
-        if self.current_memory_usage + required_bytes <= self.max_memory_bytes:
-            return
+    async def _remove_from_disk(self, key: str) -> bool:
+        """Удалить запись с диска вместе с её строкой в индексе"""
+        try:
+            return await asyncio.to_thread(self.disk_index.remove, key)
+        except Exception as e:
+            logger.error(f"Ошибка удаления записи дискового кэша {key}: {e}")
+            return False
+    
+    async def _ensure_memory_capacity(self, required_bytes: int,
+                                      cache_type: Optional[str] = None):
+        """Обеспечить место в кэше памяти
         
-        # Нужно освободить место - используем LRU
-        entries_by_access = sorted(
-            self.memory_cache.items(),
-            key=lambda x: x[1].last_accessed
-        )
+        Сначала тип укладывается в свою квоту, вытесняя собственные давно
+        не использованные записи; затем, если нужно, соблюдается общий
+        лимит памяти. Каждое вытеснение — O(1) снятие с головы LRU.
+        """
+        bucket = self._quota_bucket(cache_type)
+        quota = self.type_quota_bytes[bucket]
+        type_lru = self._type_lru.get(bucket)
+        while type_lru and self._type_usage.get(bucket, 0) + required_bytes > quota:
+            oldest_key = next(iter(type_lru))
+            if self._memory_pop(oldest_key) is None:
+                # Ключ уже ушёл из памяти в обход индекса — просто забываем его
+                type_lru.pop(oldest_key, None)
+                continue
+            self.stats["evictions"] += 1
         
-        for key, entry in entries_by_access:
-            await self.delete(key)
+        while self.memory_cache and self.current_memory_usage + required_bytes > self.max_memory_bytes:
+            oldest_key = next(iter(self.memory_cache))
+            self._memory_pop(oldest_key)
             self.stats["evictions"] += 1
-            
-            if self.current_memory_usage + required_bytes <= self.max_memory_bytes:
-                break
     
     async def delete(self, key: str) -> bool:
         """Удалить запись из кэша"""
         deleted = False
         
         # Удаляем из памяти
-        if key in self.memory_cache:
-            entry = self.memory_cache[key]
-            self.current_memory_usage -= entry.size_bytes
-            del self.memory_cache[key]
+        if self._memory_pop(key) is not None:
             deleted = True
         
         # Удаляем с диска
-        disk_path = self.disk_cache_dir / f"{key}.pkl"
-        if disk_path.exists():
-            try:
-                await aiofiles.os.remove(disk_path)
-                deleted = True
-            except Exception as e:
-                logger.error(f"Ошибка удаления файла кэша {disk_path}: {e}")
+        if await self._remove_from_disk(key):
+            deleted = True
         
         return deleted
     
@@ -248,14 +580,9 @@ class PerformanceCache:
         if cache_type is None:
             # Очищаем весь кэш
             self.memory_cache.clear()
+            self._type_lru.clear()
+            self._type_usage.clear()
             self.current_memory_usage = 0
-            
-            # Очищаем диск
-            for cache_file in self.disk_cache_dir.glob("*.pkl"):
-                try:
-                    await aiofiles.os.remove(cache_file)
-                except Exception as e:
-                    logger.error(f"Ошибка удаления файла кэша {cache_file}: {e}")
         else:
             # Очищаем кэш определенного типа
             to_delete = []
@@ -264,13 +591,26 @@ class PerformanceCache:
                     to_delete.append(key)
             
             for key in to_delete:
-                await self.delete(key)
+                self._memory_pop(key)
+        
+        # Очищаем диск по индексу
+        try:
+            await asyncio.to_thread(self.disk_index.remove_by_type, cache_type)
+        except Exception as e:
+            logger.error(f"Ошибка очистки дискового кэша: {e}")
     
     def get_stats(self) -> Dict[str, Any]:
         """Получить статистику кэша"""
         total_requests = self.stats["hits"] + self.stats["misses"]
         hit_rate = (self.stats["hits"] / total_requests * 100) if total_requests > 0 else 0
         
+        # Агрегат по индексу — один запрос вместо обхода каталога
+        try:
+            disk_entries, disk_bytes = self.disk_index.totals()
+        except Exception as e:
+            logger.error(f"Ошибка чтения индекса дискового кэша: {e}")
+            disk_entries, disk_bytes = 0, 0
+        
         return {
             **self.stats,
             "hit_rate_percent": round(hit_rate, 2),
@@ -279,7 +619,16 @@ class PerformanceCache:
                 (self.current_memory_usage / self.max_memory_bytes) * 100, 2
             ),
             "memory_entries": len(self.memory_cache),
-            "disk_entries": len(list(self.disk_cache_dir.glob("*.pkl")))
+            "memory_by_type": {
+                bucket: {
+                    "entries": len(self._type_lru.get(bucket, ())),
+                    "usage_mb": round(self._type_usage.get(bucket, 0) / (1024 * 1024), 2),
+                    "quota_mb": round(quota / (1024 * 1024), 2),
+                }
+                for bucket, quota in self.type_quota_bytes.items()
+            },
+            "disk_entries": disk_entries,
+            "disk_usage_mb": round(disk_bytes / (1024 * 1024), 2),
         }
     
     async def cleanup_expired(self):
@@ -293,25 +642,15 @@ class PerformanceCache:
                 expired_keys.append(key)
         
         for key in expired_keys:
-            await self.delete(key)
+            self._memory_pop(key)
         
-        # Проверяем диск
-        for cache_file in self.disk_cache_dir.glob("*.pkl"):
-            try:
-                async with aiofiles.open(cache_file, 'rb') as f:
-                    content = await f.read()
-                    entry = pickle.loads(content)
-                
-                if entry.expires_at and now > entry.expires_at:
-                    await aiofiles.os.remove(cache_file)
-                    
-            except Exception as e:
-                logger.error(f"Ошибка при проверке срока действия {cache_file}: {e}")
-                # Удаляем поврежденный файл
-                try:
-                    await aiofiles.os.remove(cache_file)
-                except:
-                    pass
+        # Проверяем диск — по индексу, без чтения файлов
+        try:
+            removed = await asyncio.to_thread(self.disk_index.remove_expired, time.time())
+            if removed:
+                logger.debug(f"Дисковый кэш: удалено просроченных записей: {removed}")
+        except Exception as e:
+            logger.error(f"Ошибка очистки просроченных записей дискового кэша: {e}")
 
 
 # Глобальный экземпляр кэша
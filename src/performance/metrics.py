@@ -449,7 +449,7 @@ class MetricsCollector:
                 'error_stage': metrics.error_stage,
                 'error_message': metrics.error_message
             }
-            await metrics_repo.save_processing_metric(metric_data)
+            await metrics_repo.queue_processing_metric(metric_data)
         except Exception as e:
             logger.error(f"Ошибка сохранения метрик обработки: {e}")
     
@@ -0,0 +1,144 @@
+"""
+Профиль холодного старта: дерево времени импорта бота
+
+Импорт измеряется в отдельном интерпретаторе с ``-X importtime``: в текущем
+процессе часть модулей уже загружена, и цифры были бы заниженными. Дерево
+печатается по накопленному времени (``cumulative``) — сразу видно, какая
+ветка импорта тянет старт.
+
+Запуск: python main.py --profile-startup [--min-ms 5] [--module src.bot]
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional
+
+_ROOT = Path(__file__).resolve().parents[2]
+
+# Бюджет холодного импорта src.bot (мс) — проверяют ``make profile-startup`` и
+# бенчмарк STARTUP_BENCHMARK=1 в tests/test_startup_budget.py. Время зависит от
+# машины (один aiogram.types с -X importtime стоит 2.5–6.5 с на одном ядре),
+# поэтому в обычный прогон тестов бюджет не входит — там только HEAVY_MODULES
+STARTUP_BUDGET_MS = 8000
+
+# Модули, которые не должны загружаться при старте: их грузит процесс модели
+HEAVY_MODULES = frozenset({
+    "torch", "whisperx", "whisper", "pyannote", "pvfalcon", "pvleopard", "sentence_transformers",
+})
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+@dataclass
+class ImportRecord:
+    """Один модуль из вывода ``-X importtime``."""
+
+    name: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+    children: List["ImportRecord"] = field(default_factory=list)
+
+    @property
+    def cumulative_ms(self) -> float:
+        return self.cumulative_us / 1000
+
+
+def parse_importtime(output: str) -> List[ImportRecord]:
+    """Разобрать вывод ``-X importtime`` в дерево; возвращает корни.
+
+    Интерпретатор печатает модуль после всех его детей, с отступом по глубине.
+    """
+    roots: List[ImportRecord] = []
+    pending: List[ImportRecord] = []
+    for line in output.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        depth = (len(indent) - 1) // 2
+        record = ImportRecord(name, int(self_us), int(cumulative_us), depth)
+        # Все ожидающие записи глубже текущей — её дети
+        while pending and pending[-1].depth > depth:
+            record.children.insert(0, pending.pop())
+        if depth == 0:
+            roots.append(record)
+        else:
+            pending.append(record)
+    return roots
+
+
+def iter_records(roots: List[ImportRecord]):
+    for record in roots:
+        yield record
+        yield from iter_records(record.children)
+
+
+def measure_imports(module: str = "src.bot") -> List[ImportRecord]:
+    """Импортировать ``module`` в чистом интерпретаторе и вернуть дерево импорта."""
+    env = dict(os.environ)
+    env.setdefault("TELEGRAM_TOKEN", "startup-profile")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(_ROOT), env.get("PYTHONPATH")]))
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=_ROOT, env=env, capture_output=True, text=True,
+    )
+    if completed.returncode != 0:
+        tail = "\n".join(completed.stderr.strip().splitlines()[-5:])
+        raise RuntimeError(f"Импорт {module} завершился с ошибкой:\n{tail}")
+    return parse_importtime(completed.stderr)
+
+
+def total_ms(roots: List[ImportRecord]) -> float:
+    return sum(record.cumulative_ms for record in roots)
+
+
+def heavy_imports(roots: List[ImportRecord]) -> List[str]:
+    """Тяжёлые пакеты из ``HEAVY_MODULES``, попавшие в импорт старта."""
+    return sorted({record.name for record in iter_records(roots) if record.name in HEAVY_MODULES})
+
+
+def format_tree(roots: List[ImportRecord], min_ms: float = 5.0) -> List[str]:
+    """Строки дерева: ветки дешевле ``min_ms`` скрыты вместе с детьми."""
+    lines: List[str] = []
+
+    def walk(records: List[ImportRecord], level: int) -> None:
+        for record in sorted(records, key=lambda r: r.cumulative_us, reverse=True):
+            if record.cumulative_ms < min_ms:
+                continue
+            lines.append(
+                f"{record.cumulative_ms:9.1f} ms {record.self_us / 1000:8.1f} ms  "
+                f"{'  ' * level}{record.name}"
+            )
+            walk(record.children, level + 1)
+
+    walk(roots, 0)
+    return lines
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Дерево времени импорта при старте бота")
+    parser.add_argument("--module", default="src.bot", help="что импортировать (по умолчанию src.bot)")
+    parser.add_argument("--min-ms", type=float, default=5.0, help="скрыть ветки дешевле, мс")
+    args = parser.parse_args(argv)
+
+    roots = measure_imports(args.module)
+    print(f"{'cumulative':>12} {'self':>11}  модуль")
+    for line in format_tree(roots, args.min_ms):
+        print(line)
+
+    total = total_ms(roots)
+    print(f"\nИмпорт {args.module}: {total:.0f} мс (бюджет {STARTUP_BUDGET_MS} мс)")
+    heavy = heavy_imports(roots)
+    if heavy:
+        print(f"Тяжёлые пакеты при старте: {', '.join(heavy)}")
+    return 1 if heavy or total > STARTUP_BUDGET_MS else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,242 @@
+"""
+Контентно-адресуемое хранилище транскрипций.
+
+Ключ — (хеш содержимого записи, язык, бэкенд транскрипции). Индекс живёт в
+SQLite в режиме WAL: несколько процессов бота на одном хосте читают его
+одновременно, писатель не блокирует читателей. Сами транскрипции лежат рядом
+сжатыми блобами (zlib поверх JSON ``TranscriptionResult``); блоб пишется во
+временный файл и атомарно переименовывается, поэтому читатель видит либо
+старую версию, либо новую целиком.
+
+В отличие от ``performance_cache`` хранилище переживает рестарт и деплой:
+повторно присланная запись не транскрибируется заново.
+"""
+
+import asyncio
+import os
+import sqlite3
+import time
+import uuid
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+from loguru import logger
+
+from src.models.processing import TranscriptionResult
+
+# Версия формата блоба: смена формы TranscriptionResult → новая версия,
+# старые блобы просто перестают находиться и вытесняются по LRU
+_BLOB_VERSION = "v1"
+_BLOB_SUFFIX = ".zlib"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transcriptions (
+    content_hash TEXT NOT NULL,
+    language TEXT NOT NULL,
+    backend TEXT NOT NULL,
+    blob_name TEXT NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL,
+    PRIMARY KEY (content_hash, language, backend)
+);
+CREATE INDEX IF NOT EXISTS idx_transcriptions_last_used
+    ON transcriptions(last_used_at);
+"""
+
+
+class TranscriptionStore:
+    """Персистентное хранилище транскрипций, общее для процессов на хосте."""
+
+    def __init__(self, root_dir: str = "cache/transcriptions", max_size_mb: int = 2048):
+        self.root_dir = Path(root_dir)
+        self.blob_dir = self.root_dir / "blobs"
+        self.index_path = self.root_dir / "index.sqlite"
+        self.max_size_bytes = max_size_mb * 1024 * 1024
+        self._initialized = False
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+    # ------------------------------------------------------------------
+    # Синхронная часть — выполняется в потоке через asyncio.to_thread
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Короткое соединение на операцию: commit при успехе, всегда close."""
+        conn = sqlite3.connect(self.index_path, timeout=30)
+        try:
+            conn.execute("PRAGMA synchronous = NORMAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _ensure_initialized(self) -> None:
+        if self._initialized:
+            return
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            # WAL — свойство файла БД: включается один раз для всех процессов
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.executescript(_SCHEMA)
+        self._initialized = True
+
+    @staticmethod
+    def _blob_name(content_hash: str, language: str, backend: str) -> str:
+        return f"{content_hash[:2]}/{content_hash}_{language}_{backend}_{_BLOB_VERSION}{_BLOB_SUFFIX}"
+
+    def _get_sync(self, content_hash: str, language: str, backend: str) -> Optional[TranscriptionResult]:
+        self._ensure_initialized()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT blob_name FROM transcriptions "
+                "WHERE content_hash = ? AND language = ? AND backend = ?",
+                (content_hash, language, backend),
+            ).fetchone()
+            if row is None:
+                return None
+
+            blob_path = self.blob_dir / row[0]
+            try:
+                payload = zlib.decompress(blob_path.read_bytes())
+                result = TranscriptionResult.model_validate_json(payload)
+            except FileNotFoundError:
+                # Блоб удалили мимо индекса (ручная чистка) — запись мертва
+                conn.execute(
+                    "DELETE FROM transcriptions WHERE content_hash = ? AND language = ? AND backend = ?",
+                    (content_hash, language, backend),
+                )
+                return None
+
+            conn.execute(
+                "UPDATE transcriptions SET last_used_at = ? "
+                "WHERE content_hash = ? AND language = ? AND backend = ?",
+                (time.time(), content_hash, language, backend),
+            )
+            return result
+
+    def _put_sync(self, content_hash: str, language: str, backend: str, result: TranscriptionResult) -> int:
+        self._ensure_initialized()
+        blob_name = self._blob_name(content_hash, language, backend)
+        blob_path = self.blob_dir / blob_name
+        blob_path.parent.mkdir(parents=True, exist_ok=True)
+
+        payload = zlib.compress(result.model_dump_json().encode("utf-8"), 6)
+        tmp_path = blob_path.with_name(f"{blob_path.name}.{uuid.uuid4().hex}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, blob_path)
+
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO transcriptions "
+                "(content_hash, language, backend, blob_name, size_bytes, created_at, last_used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(content_hash, language, backend) DO UPDATE SET "
+                "blob_name = excluded.blob_name, size_bytes = excluded.size_bytes, "
+                "created_at = excluded.created_at, last_used_at = excluded.last_used_at",
+                (content_hash, language, backend, blob_name, len(payload), now, now),
+            )
+        return len(payload)
+
+    def _prune_sync(self) -> int:
+        """Вытеснить давно не использованные записи сверх лимита размера."""
+        self._ensure_initialized()
+        with self._connect() as conn:
+            total = conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM transcriptions").fetchone()[0]
+            if total <= self.max_size_bytes:
+                return 0
+
+            evicted = 0
+            rows = conn.execute(
+                "SELECT content_hash, language, backend, blob_name, size_bytes "
+                "FROM transcriptions ORDER BY last_used_at"
+            ).fetchall()
+            for content_hash, language, backend, blob_name, size_bytes in rows:
+                if total <= self.max_size_bytes:
+                    break
+                conn.execute(
+                    "DELETE FROM transcriptions WHERE content_hash = ? AND language = ? AND backend = ?",
+                    (content_hash, language, backend),
+                )
+                try:
+                    (self.blob_dir / blob_name).unlink()
+                except FileNotFoundError:
+                    pass
+                total -= size_bytes
+                evicted += 1
+            return evicted
+
+    def _stats_sync(self) -> Dict[str, Any]:
+        self._ensure_initialized()
+        with self._connect() as conn:
+            entries, size = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM transcriptions"
+            ).fetchone()
+        return {
+            **self.stats,
+            "entries": entries,
+            "size_mb": round(size / (1024 * 1024), 2),
+            "max_size_mb": round(self.max_size_bytes / (1024 * 1024), 2),
+        }
+
+    # ------------------------------------------------------------------
+    # Асинхронный интерфейс
+    # ------------------------------------------------------------------
+
+    async def get(self, content_hash: str, language: str, backend: str) -> Optional[TranscriptionResult]:
+        """Транскрипция записи или None. Ошибки хранилища — это промах, не сбой."""
+        try:
+            result = await asyncio.to_thread(self._get_sync, content_hash, language, backend)
+        except Exception as e:
+            logger.warning(f"Хранилище транскрипций: ошибка чтения {content_hash}/{language}/{backend}: {e}")
+            result = None
+
+        if result is None:
+            self.stats["misses"] += 1
+        else:
+            self.stats["hits"] += 1
+            logger.info(f"Транскрипция взята из хранилища: {content_hash}/{language}/{backend}")
+        return result
+
+    async def put(self, content_hash: str, language: str, backend: str, result: TranscriptionResult) -> bool:
+        """Сохранить транскрипцию; при переполнении вытеснить самые старые."""
+        try:
+            size = await asyncio.to_thread(self._put_sync, content_hash, language, backend, result)
+            self.stats["writes"] += 1
+            logger.debug(f"Транскрипция сохранена в хранилище: {content_hash}/{language}/{backend} ({size} байт)")
+
+            evicted = await asyncio.to_thread(self._prune_sync)
+            if evicted:
+                self.stats["evictions"] += evicted
+                logger.info(f"Хранилище транскрипций: вытеснено записей: {evicted}")
+            return True
+        except Exception as e:
+            logger.warning(f"Хранилище транскрипций: ошибка записи {content_hash}/{language}/{backend}: {e}")
+            return False
+
+    async def get_stats(self) -> Dict[str, Any]:
+        """Статистика хранилища (из индекса, без чтения блобов)."""
+        try:
+            return await asyncio.to_thread(self._stats_sync)
+        except Exception as e:
+            logger.warning(f"Хранилище транскрипций: ошибка статистики: {e}")
+            return dict(self.stats)
+
+
+def _create_store() -> TranscriptionStore:
+    from src.config import settings
+
+    return TranscriptionStore(
+        root_dir=settings.transcription_store_dir,
+        max_size_mb=settings.transcription_store_max_mb,
+    )
+
+
+# Глобальный экземпляр хранилища
+transcription_store = _create_store()
@@ -2,7 +2,8 @@
 Промпты для двухзапросного подхода к генерации протоколов
 """
 
-from typing import Dict, Optional
+import json
+from typing import Dict, List, Optional, Tuple
 
 # Compact field-specific rules for protocol generation.
 # Each rule contains ONLY what's unique to this field.
@@ -340,17 +341,30 @@ def build_generation_prompt(
     speaker_mapping: Optional[Dict[str, str]] = None,
     meeting_type: str = "general",
     meeting_agenda: Optional[str] = None,
-    project_list: Optional[str] = None
+    project_list: Optional[str] = None,
+    chunk_info: Optional[Tuple[int, int]] = None
 ) -> str:
     """
     Создает промпт для второго запроса (извлечение данных протокола).
     XML-tagged structure: context -> speakers -> fields -> rules -> transcription.
+
+    ``chunk_info`` — (номер, всего) для map-шага длинной транскрипции: модель
+    видит только фрагмент и заполняет поля лишь тем, что в нём есть.
     """
     variables_str = "\n".join([f"- {key}: {desc}" for key, desc in template_variables.items()])
     type_instructions = _get_type_specific_instructions(meeting_type)
 
     parts = [f"Извлеки данные из транскрипции для протокола. Тип встречи: {meeting_type}"]
 
+    if chunk_info:
+        index, total = chunk_info
+        parts.append(
+            f"Это фрагмент {index} из {total} длинной встречи. Заполняй поля ТОЛЬКО "
+            "тем, что есть в этом фрагменте; остальные фрагменты обрабатываются "
+            "отдельно и будут объединены. Если данных для поля во фрагменте нет — "
+            "верни пустую строку."
+        )
+
     # Context (before transcription)
     context_parts = []
     if meeting_agenda:
@@ -379,6 +393,47 @@ def build_generation_prompt(
     return "\n\n".join(parts)
 
 
+def build_reduce_prompt(
+    partials: List[Dict[str, str]],
+    template_variables: Dict[str, str],
+    speaker_mapping: Optional[Dict[str, str]] = None,
+    meeting_type: str = "general",
+) -> str:
+    """
+    Промпт reduce-шага: объединить частичные протоколы фрагментов в один.
+
+    Частичные ``protocol_data`` идут в хронологическом порядке фрагментов.
+    """
+    variables_str = "\n".join([f"- {key}: {desc}" for key, desc in template_variables.items()])
+    parts = [
+        "Объедини частичные протоколы фрагментов одной встречи в единый протокол. "
+        f"Тип встречи: {meeting_type}",
+        "ПРАВИЛА ОБЪЕДИНЕНИЯ:\n"
+        "- Фрагменты идут в хронологическом порядке — сохраняй его\n"
+        "- Одно и то же решение, задачу или тему, встретившиеся в разных фрагментах, "
+        "сливай в один пункт, не дублируй\n"
+        "- Нумерацию списков сквозную, заново от 1\n"
+        "- Шапочные поля (название, дата, время, участники) бери наиболее полные\n"
+        "- Ничего не добавляй сверх частичных протоколов",
+    ]
+
+    if speaker_mapping:
+        mapping_str = "\n".join([f"{k} = {v}" for k, v in speaker_mapping.items()])
+        parts.append(f"<speakers>\n{mapping_str}\n</speakers>")
+
+    parts.append(f"<fields>\n{variables_str}\n</fields>")
+
+    partials_str = "\n\n".join(
+        f'<partial index="{index}">\n{json.dumps(partial, ensure_ascii=False, indent=1)}\n</partial>'
+        for index, partial in enumerate(partials, start=1)
+    )
+    parts.append(f"<partials>\n{partials_str}\n</partials>")
+
+    parts.append("Верни только валидный JSON. Все значения — строки.")
+
+    return "\n\n".join(parts)
+
+
 def build_generation_system_prompt(
     template_variables: Optional[Dict[str, str]] = None,
     field_rules: Optional[Dict[str, str]] = None,
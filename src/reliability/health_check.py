@@ -68,7 +68,7 @@ class DatabaseHealthCheck(HealthCheck):
         try:
             # Простой запрос для проверки соединения
             from src.database import db
-            async with db.connect() as connection:
+            async with db.read() as connection:
                 async with connection.execute("SELECT 1") as cursor:
                     await cursor.fetchone()
             
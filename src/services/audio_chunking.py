@@ -0,0 +1,268 @@
+"""Нарезка длинной записи на перекрывающиеся окна и склейка их транскрипций.
+
+Groq принимает файл не больше 25 MB — двух-трёхчасовая встреча после
+предобработки в него не влезает. Запись режется по паузам на окна с
+перекрытием, окна транскрибируются параллельно, результат склеивается.
+
+Чистая логика (``plan_windows``, ``stitch_windows``) отделена от ввода-вывода
+(``probe_duration``, ``detect_silences``, ``cut_window``) — первую легко
+тестировать без ffmpeg.
+
+Каждое окно «отвечает» за свою зону ``[keep_start, keep_end)`` — отрезок между
+соседними точками разреза. Перекрытие нужно лишь затем, чтобы слово на
+границе целиком попало хотя бы в одно окно; при склейке сегменты окна
+сдвигаются на его начало, и остаются только те, чья середина лежит в зоне
+ответственности. Повтор слов на стыке, который всё же пережил отбор по
+таймстампам (или окно пришло без сегментов), снимается сравнением хвоста
+склеенного текста с началом следующего.
+"""
+
+import asyncio
+import os
+import re
+from dataclasses import dataclass
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+
+from loguru import logger
+
+# Паузы короче этого не считаются местом разреза (секунды)
+_MIN_SILENCE_SECONDS = 0.5
+# Порог тишины для ffmpeg silencedetect
+_SILENCE_NOISE = "-30dB"
+# Сколько слов на стыке максимум сравнивать при снятии повтора
+_MAX_OVERLAP_WORDS = 40
+
+_SILENCE_START_RE = re.compile(r"silence_start:\s*(-?[\d.]+)")
+_SILENCE_END_RE = re.compile(r"silence_end:\s*(-?[\d.]+)")
+_WORD_NORMALIZE_RE = re.compile(r"[^\w]+", re.UNICODE)
+
+
+@dataclass(frozen=True)
+class AudioWindow:
+    """Окно записи: что вырезать (start/end) и за что окно отвечает (keep_*)."""
+
+    index: int
+    start: float
+    end: float
+    keep_start: float
+    keep_end: float
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+@dataclass(frozen=True)
+class WindowSegment:
+    """Сегмент транскрипции окна с таймингами относительно начала окна."""
+
+    start: float
+    end: float
+    text: str
+
+
+def plan_windows(
+    duration: float,
+    silences: Sequence[Tuple[float, float]],
+    *,
+    max_seconds: float,
+    overlap_seconds: float,
+) -> List[AudioWindow]:
+    """Разбить запись длиной ``duration`` на окна не длиннее ``max_seconds``.
+
+    Точка разреза — середина паузы, ближайшая к предельной позиции и не раньше
+    половины окна; если подходящей паузы нет, режем жёстко по предельной
+    позиции. Окно = зона ответственности ± ``overlap_seconds`` (в пределах
+    записи), поэтому зона не длиннее ``max_seconds - 2 * overlap_seconds``.
+
+    Запись, целиком влезающая в одно окно, даёт одно окно без перекрытия.
+    """
+    if duration <= 0:
+        return []
+    if duration <= max_seconds:
+        return [AudioWindow(0, 0.0, duration, 0.0, duration)]
+
+    span = max_seconds - 2 * overlap_seconds
+    if span <= 0:
+        raise ValueError("Перекрытие не оставляет окну полезной длины")
+
+    midpoints = sorted((s + e) / 2 for s, e in silences if e > s)
+
+    cuts = [0.0]
+    while duration - cuts[-1] > span:
+        limit = cuts[-1] + span
+        earliest = cuts[-1] + span / 2
+        candidates = [m for m in midpoints if earliest <= m <= limit]
+        cuts.append(max(candidates) if candidates else limit)
+    cuts.append(duration)
+
+    windows = []
+    for index, (keep_start, keep_end) in enumerate(zip(cuts, cuts[1:])):
+        windows.append(AudioWindow(
+            index=index,
+            start=max(0.0, keep_start - overlap_seconds),
+            end=min(duration, keep_end + overlap_seconds),
+            keep_start=keep_start,
+            keep_end=keep_end,
+        ))
+    return windows
+
+
+def _normalize_word(word: str) -> str:
+    return _WORD_NORMALIZE_RE.sub("", word).lower()
+
+
+def _drop_repeated_prefix(tail: List[str], head: List[str]) -> List[str]:
+    """Убрать из ``head`` начало, повторяющее конец ``tail`` (самое длинное совпадение)."""
+    limit = min(len(tail), len(head), _MAX_OVERLAP_WORDS)
+    tail_norm = [_normalize_word(w) for w in tail[-limit:]] if limit else []
+    head_norm = [_normalize_word(w) for w in head[:limit]]
+    for size in range(limit, 0, -1):
+        if tail_norm[-size:] == head_norm[:size] and any(head_norm[:size]):
+            return head[size:]
+    return head
+
+
+def _kept_segments(window: AudioWindow, segments: Iterable[WindowSegment]) -> List[WindowSegment]:
+    """Сегменты окна в абсолютном времени, чья середина в зоне ответственности."""
+    kept = []
+    for segment in segments:
+        start = segment.start + window.start
+        end = segment.end + window.start
+        middle = (start + end) / 2
+        if window.keep_start <= middle < window.keep_end or (
+            middle == window.keep_end == window.end
+        ):
+            kept.append(WindowSegment(start=start, end=end, text=segment.text))
+    return kept
+
+
+def stitch_windows(
+    results: Sequence[Tuple[AudioWindow, str, Optional[Sequence[WindowSegment]]]],
+) -> Tuple[str, List[WindowSegment]]:
+    """Склеить транскрипции окон в текст и список сегментов в абсолютном времени.
+
+    ``results`` — тройки (окно, текст окна, сегменты окна или None). Окна без
+    сегментов вклеиваются целым текстом; повтор на стыке снимается в обоих
+    случаях.
+    """
+    words: List[str] = []
+    stitched: List[WindowSegment] = []
+
+    for window, text, segments in sorted(results, key=lambda item: item[0].index):
+        if segments:
+            kept = _kept_segments(window, segments)
+            stitched.extend(kept)
+            chunk_words = " ".join(s.text.strip() for s in kept).split()
+        else:
+            chunk_words = (text or "").split()
+
+        words.extend(_drop_repeated_prefix(words, chunk_words))
+
+    return " ".join(words), stitched
+
+
+def _field(item: Any, key: str) -> Any:
+    return item.get(key) if isinstance(item, dict) else getattr(item, key, None)
+
+
+def segments_from_response(response: Any) -> Optional[List[WindowSegment]]:
+    """Достать сегменты из ответа verbose_json (объект SDK или dict)."""
+    raw = getattr(response, "segments", None)
+    if raw is None and isinstance(response, dict):
+        raw = response.get("segments")
+    if not raw:
+        return None
+
+    segments = []
+    for item in raw:
+        start, end, text = (_field(item, key) for key in ("start", "end", "text"))
+        if not isinstance(start, (int, float)) or not isinstance(end, (int, float)) or text is None:
+            continue
+        segments.append(WindowSegment(start=float(start), end=float(end), text=str(text)))
+    return segments or None
+
+
+async def _run_ffmpeg_tool(cmd: List[str], timeout: float) -> Tuple[int, str, str]:
+    process = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        raise
+    return (
+        process.returncode,
+        stdout.decode("utf-8", errors="replace") if stdout else "",
+        stderr.decode("utf-8", errors="replace") if stderr else "",
+    )
+
+
+async def probe_duration(path: str) -> Optional[float]:
+    """Длительность записи в секундах через ffprobe или None."""
+    cmd = [
+        "ffprobe", "-v", "error",
+        "-show_entries", "format=duration",
+        "-of", "default=noprint_wrappers=1:nokey=1",
+        path,
+    ]
+    try:
+        code, stdout, stderr = await _run_ffmpeg_tool(cmd, timeout=60)
+        if code != 0:
+            logger.warning(f"probe_duration: ffprobe вернул {code}: {stderr[-300:]}")
+            return None
+        return float(stdout.strip())
+    except Exception as e:
+        logger.warning(f"probe_duration: не удалось определить длительность {path}: {e}")
+        return None
+
+
+async def detect_silences(path: str) -> List[Tuple[float, float]]:
+    """Паузы записи (start, end) через ffmpeg silencedetect; при ошибке — пусто."""
+    cmd = [
+        "ffmpeg", "-hide_banner", "-nostats",
+        "-i", path,
+        "-af", f"silencedetect=noise={_SILENCE_NOISE}:d={_MIN_SILENCE_SECONDS}",
+        "-f", "null", "-",
+    ]
+    try:
+        code, _, stderr = await _run_ffmpeg_tool(cmd, timeout=1800)
+    except Exception as e:
+        logger.warning(f"detect_silences: ffmpeg не отработал: {e}")
+        return []
+    if code != 0:
+        logger.warning(f"detect_silences: ffmpeg вернул {code}: {stderr[-300:]}")
+        return []
+
+    starts = [float(m) for m in _SILENCE_START_RE.findall(stderr)]
+    ends = [float(m) for m in _SILENCE_END_RE.findall(stderr)]
+    return [(max(0.0, s), e) for s, e in zip(starts, ends) if e > s]
+
+
+async def cut_window(src_path: str, window: AudioWindow, out_path: str) -> bool:
+    """Вырезать окно из предобработанной записи без перекодирования.
+
+    Возвращает True при успехе (код 0 и непустой файл). Исключения не пробрасывает.
+    """
+    cmd = [
+        "ffmpeg",
+        "-ss", f"{window.start:.3f}",
+        "-i", src_path,
+        "-t", f"{window.duration:.3f}",
+        "-c", "copy",
+        "-y",
+        out_path,
+    ]
+    try:
+        code, _, stderr = await _run_ffmpeg_tool(cmd, timeout=600)
+    except Exception as e:
+        logger.error(f"cut_window: ошибка запуска ffmpeg: {e}")
+        return False
+    if code != 0:
+        logger.error(f"cut_window: ffmpeg вернул {code}: {stderr[-500:]}")
+        return False
+    return os.path.exists(out_path) and os.path.getsize(out_path) > 0
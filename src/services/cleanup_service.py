@@ -69,7 +69,9 @@ class CleanupService:
         temp_cleaned = await self._cleanup_directory(
             self.temp_dir, 
             max_age_hours=self.file_max_age_hours,
-            file_patterns=['*.mp3', '*.wav', '*.m4a', '*.ogg', '*.mp4', '*.avi', '*.mov', '*.mkv', '*.tmp']
+            file_patterns=['*.mp3', '*.wav', '*.m4a', '*.ogg', '*.mp4', '*.avi', '*.mov', '*.mkv', '*.tmp',
+                           # Брошенные докачки внешних ссылок и их запись прогресса
+                           '*.partial', '*.partial.json']
         )
         
         # Очищаем кэш файлы
@@ -2,15 +2,24 @@
 Модуль диаризации аудио и видео файлов с защитой от OOM
 """
 
-import gc
+import asyncio
 import os
 import warnings
-from typing import Any, Dict, List, Optional
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional
 
 from loguru import logger
 
 from src.config import settings
 from src.models.diarization import Diarization, Segment
+from src.services.model_registry import model_registry
+from src.services.model_workers import run_model_job
+from src.services.speaker_assignment import assign_speakers
+from src.utils.optional_deps import module_available
+
+
+def _no_progress(stage: str) -> None:
+    pass
 
 # Импортируем OOM защиту
 try:
@@ -35,26 +44,18 @@ warnings.filterwarnings("ignore", message=".*Bad things might happen.*")
 warnings.filterwarnings("ignore", message=".*torch.*")
 warnings.filterwarnings("ignore", message=".*pyannote.audio.*")
 
-try:
-    import torch
-    import whisperx
-    WHISPERX_AVAILABLE = True
-except ImportError:
-    WHISPERX_AVAILABLE = False
+# Наличие библиотек проверяется без импорта: torch/whisperx/pyannote грузятся
+# при первой диаризации (в процессе модели), а не при старте бота
+WHISPERX_AVAILABLE = module_available("torch") and module_available("whisperx")
+if not WHISPERX_AVAILABLE:
     logger.warning("WhisperX не установлен. Диаризация будет недоступна.")
 
-try:
-    from pyannote.audio import Pipeline
-    PYANNOTE_AVAILABLE = True
-except ImportError:
-    PYANNOTE_AVAILABLE = False
+PYANNOTE_AVAILABLE = module_available("pyannote.audio")
+if not PYANNOTE_AVAILABLE:
     logger.warning("Pyannote.audio не установлен. Резервный вариант диаризации недоступен.")
 
-try:
-    import pvfalcon  # noqa: F401 — availability probe
-    FALCON_AVAILABLE = True
-except ImportError:
-    FALCON_AVAILABLE = False
+FALCON_AVAILABLE = module_available("pvfalcon")
+if not FALCON_AVAILABLE:
     logger.warning("pvfalcon библиотека не установлена.")
 
 try:
@@ -91,12 +92,12 @@ class DiarizationService:
     """Сервис для диаризации аудио и видео с защитой от OOM"""
     
     def __init__(self):
-        self.whisperx_model = None
-        self.align_model = None
-        self.align_metadata = None
-        self.diarize_model = None
-        self.pyannote_pipeline = None
-        self.device = self._get_device()
+        # Модели живут в реестре процесса: прогрев, закрепление на время задачи,
+        # выгрузка по простою и при нехватке памяти
+        model_registry.register("whisperx", self._load_whisperx_model)
+        model_registry.register("pyannote", self._load_pyannote_pipeline)
+        # Устройство определяется при первой загрузке модели: _get_device импортирует torch
+        self._device: Optional[str] = None
         
         # OOM защита
         if OOM_PROTECTION_AVAILABLE:
@@ -105,32 +106,35 @@ class DiarizationService:
         else:
             self.oom_protection = None
         
-        logger.info(f"DiarizationService инициализирован с устройством: {self.device}")
+        logger.info("DiarizationService инициализирован")
+
+    @property
+    def device(self) -> str:
+        """Устройство для вычислений (определяется при первом обращении)"""
+        if self._device is None:
+            self._device = self._get_device()
+            logger.info(f"Устройство диаризации: {self._device}")
+        return self._device
+
+    @device.setter
+    def device(self, value: str) -> None:
+        self._device = value
     
     def _cleanup_models(self, cleanup_type: str = "soft"):
-        """Очистка моделей для освобождения памяти"""
+        """Очистка моделей для освобождения памяти (закреплённые задачей не трогаются)"""
         if cleanup_type == "aggressive":
             logger.info("Принудительная очистка моделей диаризации")
-            
-            # Очищаем все модели
-            self.whisperx_model = None
-            self.align_model = None
-            self.align_metadata = None
-            self.diarize_model = None
-            self.pyannote_pipeline = None
-            
-            # Принудительная сборка мусора
-            gc.collect()
-            
-            # Очищаем кэш CUDA если доступен
-            if WHISPERX_AVAILABLE and torch.cuda.is_available():
-                torch.cuda.empty_cache()
+            model_registry.evict()
+        else:
+            model_registry.evict(idle_only=True)
         
     def _get_device(self) -> str:
         """Определить устройство для вычислений"""
         if not WHISPERX_AVAILABLE:
             return "cpu"
-            
+
+        import torch
+
         if settings.diarization_device == "cuda" and torch.cuda.is_available():
             return "cuda"
         elif settings.diarization_device == "mps" and hasattr(torch.backends, 'mps') and torch.backends.mps.is_available():
@@ -165,120 +169,137 @@ class DiarizationService:
             # Для CPU используем int8 для производительности
             return "int8"
     
-    def _load_whisperx_models(self, language: str = "ru"):
-        """Загрузить модели WhisperX"""
+    def _load_whisperx_model(self):
+        """Загрузить модель транскрипции WhisperX (загрузчик реестра моделей)"""
         if not WHISPERX_AVAILABLE:
             raise RuntimeError("WhisperX не установлен")
-        
+
+        import whisperx
+
         try:
-            # Загружаем модель транскрипции
-            if self.whisperx_model is None:
-                logger.info("Загрузка модели WhisperX для транскрипции...")
-                # Определяем подходящий compute_type для устройства
-                compute_type = self._get_compute_type()
-                logger.info(f"Используется compute_type: {compute_type} для устройства: {self.device}")
-                
-                # Список fallback стратегий для загрузки модели
-                strategies = [
-                    (self.device, compute_type),
-                    ("cpu", "int8"),  # Fallback на CPU с int8
-                    ("cpu", "float32"),  # Fallback на CPU с float32
-                ]
-                
-                model_loaded = False
-                for device, comp_type in strategies:
-                    try:
-                        logger.info(f"Попытка загрузки модели с устройством: {device}, compute_type: {comp_type}")
-                        self.whisperx_model = whisperx.load_model("large-v2", device, compute_type=comp_type)
-                        if device != self.device:
-                            logger.warning(f"Модель загружена с fallback устройством: {device}")
-                            self.device = device  # Обновляем устройство для остальных компонентов
-                        model_loaded = True
-                        break
-                    except Exception as e:
-                        logger.warning(f"Ошибка загрузки с {device}/{comp_type}: {e}")
-                        continue
-                
-                if not model_loaded:
-                    raise RuntimeError("Не удалось загрузить модель WhisperX ни с одной конфигурацией")
+            logger.info("Загрузка модели WhisperX для транскрипции...")
+            # Определяем подходящий compute_type для устройства
+            compute_type = self._get_compute_type()
+            logger.info(f"Используется compute_type: {compute_type} для устройства: {self.device}")
+            
+            # Список fallback стратегий для загрузки модели
+            strategies = [
+                (self.device, compute_type),
+                ("cpu", "int8"),  # Fallback на CPU с int8
+                ("cpu", "float32"),  # Fallback на CPU с float32
+            ]
             
-            # Загружаем модель выравнивания
-            if self.align_model is None:
-                logger.info(f"Загрузка модели выравнивания для языка: {language}")
+            for device, comp_type in strategies:
                 try:
-                    self.align_model, self.align_metadata = whisperx.load_align_model(
-                        language_code=language, device=self.device
-                    )
+                    logger.info(f"Попытка загрузки модели с устройством: {device}, compute_type: {comp_type}")
+                    model = whisperx.load_model("large-v2", device, compute_type=comp_type)
                 except Exception as e:
-                    logger.warning(f"Ошибка загрузки модели выравнивания: {e}")
-                    # Пробуем с CPU
-                    if self.device != "cpu":
-                        logger.info("Попытка загрузки модели выравнивания на CPU...")
-                        self.align_model, self.align_metadata = whisperx.load_align_model(
-                            language_code=language, device="cpu"
-                        )
-                        self.device = "cpu"
-                    else:
-                        raise
-            
-            # В WhisperX 3.4.2+ DiarizationPipeline удален, используем pyannote.audio напрямую
-            logger.info("WhisperX 3.4.2+ обнаружен. Диаризация будет выполняться через pyannote.audio")
+                    logger.warning(f"Ошибка загрузки с {device}/{comp_type}: {e}")
+                    continue
+                if device != self.device:
+                    logger.warning(f"Модель загружена с fallback устройством: {device}")
+                    self.device = device  # Обновляем устройство для остальных компонентов
+                # В WhisperX 3.4.2+ DiarizationPipeline удален, используем pyannote.audio напрямую
+                logger.info("WhisperX 3.4.2+ обнаружен. Диаризация будет выполняться через pyannote.audio")
+                return model
+            
+            raise RuntimeError("Не удалось загрузить модель WhisperX ни с одной конфигурацией")
                     
         except Exception as e:
             logger.error(f"Ошибка при загрузке моделей WhisperX: {e}")
             raise
+
+    def _load_align_model(self, language: str):
+        """Загрузить модель выравнивания WhisperX для языка: (модель, метаданные)"""
+        import whisperx
+
+        logger.info(f"Загрузка модели выравнивания для языка: {language}")
+        try:
+            return whisperx.load_align_model(language_code=language, device=self.device)
+        except Exception as e:
+            logger.warning(f"Ошибка загрузки модели выравнивания: {e}")
+            if self.device == "cpu":
+                raise
+            # Пробуем с CPU
+            logger.info("Попытка загрузки модели выравнивания на CPU...")
+            align = whisperx.load_align_model(language_code=language, device="cpu")
+            self.device = "cpu"
+            return align
+
+    def _align_model(self, language: str) -> str:
+        """Имя модели выравнивания в реестре (своя на каждый язык)"""
+        name = f"whisperx_align:{language}"
+        model_registry.register(name, partial(self._load_align_model, language))
+        return name
     
     def _load_pyannote_pipeline(self):
-        """Загрузить pipeline pyannote.audio (резервный вариант)"""
+        """Загрузить pipeline pyannote.audio (загрузчик реестра моделей)"""
         if not PYANNOTE_AVAILABLE:
             raise RuntimeError("Pyannote.audio не установлен")
-        
+
+        from pyannote.audio import Pipeline
+
         try:
-            if self.pyannote_pipeline is None:
-                logger.info("Загрузка pipeline pyannote.audio...")
-                if settings.huggingface_token:
-                    self.pyannote_pipeline = Pipeline.from_pretrained(
-                        "pyannote/speaker-diarization-3.1",
-                        use_auth_token=settings.huggingface_token
-                    )
-                    
-                    # Проверяем, что pipeline загружен правильно
-                    if self.pyannote_pipeline is None:
-                        raise RuntimeError("Pipeline не был загружен (None)")
-                        
-                    logger.info("Pipeline pyannote.audio успешно загружен")
-                else:
-                    logger.warning("Токен Hugging Face не настроен для pyannote.audio")
-                    logger.info("Для получения токена посетите: https://huggingface.co/settings/tokens")
-                    logger.info("Добавьте токен в переменную окружения HUGGINGFACE_TOKEN")
-                    raise RuntimeError("Требуется токен Hugging Face для pyannote.audio. См. инструкции выше.")
+            logger.info("Загрузка pipeline pyannote.audio...")
+            if not settings.huggingface_token:
+                logger.warning("Токен Hugging Face не настроен для pyannote.audio")
+                logger.info("Для получения токена посетите: https://huggingface.co/settings/tokens")
+                logger.info("Добавьте токен в переменную окружения HUGGINGFACE_TOKEN")
+                raise RuntimeError("Требуется токен Hugging Face для pyannote.audio. См. инструкции выше.")
+
+            pipeline = Pipeline.from_pretrained(
+                "pyannote/speaker-diarization-3.1",
+                use_auth_token=settings.huggingface_token
+            )
+            
+            # Проверяем, что pipeline загружен правильно
+            if pipeline is None:
+                raise RuntimeError("Pipeline не был загружен (None)")
+                
+            logger.info("Pipeline pyannote.audio успешно загружен")
+            return pipeline
                     
         except Exception as e:
             logger.error(f"Ошибка при загрузке pyannote.audio: {e}")
-            # Сбрасываем pipeline при ошибке
-            self.pyannote_pipeline = None
             raise
     
-    def diarize_with_whisperx(self, file_path: str, language: str = "ru") -> Diarization:
-        """Транскрипция с WhisperX + диаризация с pyannote.audio"""
+    def diarize_with_whisperx(self, file_path: str, language: str = "ru",
+                              progress: Callable[[str], None] = _no_progress) -> Diarization:
+        """Транскрипция с WhisperX + диаризация с pyannote.audio.
+
+        Синхронный и тяжёлый: из бота вызывается через пул процессов моделей
+        (``diarize_file``), ``progress`` получает названия этапов. Модели
+        закреплены в реестре до конца задачи.
+        """
+        names = ("whisperx", self._align_model(language), "pyannote")
+        if not all(model_registry.is_loaded(name) for name in names):
+            progress("loading_model")
+        with model_registry.use(names[0]) as model, model_registry.use(names[1]) as align, \
+                model_registry.use(names[2]) as pipeline:
+            return self._diarize_with_whisperx(model, align, pipeline, file_path, progress)
+
+    def _diarize_with_whisperx(self, model, align, pipeline, file_path: str,
+                               progress: Callable[[str], None]) -> Diarization:
+        import whisperx
+
+        align_model, align_metadata = align
         try:
-            # Загружаем модели WhisperX (только для транскрипции)
-            self._load_whisperx_models(language)
-            
             # Загружаем аудио
             logger.info(f"Загрузка аудио файла: {file_path}")
             audio = whisperx.load_audio(file_path)
             
             # Транскрибация
             logger.info("Выполнение транскрипции с WhisperX...")
-            result = self.whisperx_model.transcribe(audio, batch_size=16)
+            progress("transcribing")
+            result = model.transcribe(audio, batch_size=16)
             
             # Выравнивание (alignment)
             logger.info("Выполнение выравнивания...")
+            progress("aligning")
             result = whisperx.align(
                 result["segments"], 
-                self.align_model, 
-                self.align_metadata, 
+                align_model, 
+                align_metadata, 
                 audio, 
                 self.device,
                 return_char_alignments=False
@@ -286,11 +307,7 @@ class DiarizationService:
             
             # Диаризация с pyannote.audio
             logger.info("Выполнение диаризации с pyannote.audio...")
-            self._load_pyannote_pipeline()
-            
-            # Дополнительная проверка, что pipeline загружен
-            if self.pyannote_pipeline is None:
-                raise RuntimeError("Pipeline pyannote.audio не был загружен")
+            progress("diarizing")
             
             # Проверяем, нужна ли конвертация файла
             actual_file_path = file_path
@@ -299,7 +316,7 @@ class DiarizationService:
                 actual_file_path = self._convert_audio_format(file_path, "wav")
             
             # Выполняем диаризацию
-            diarization = self.pyannote_pipeline(actual_file_path)
+            diarization = pipeline(actual_file_path)
             
             # Проверяем результат диаризации
             if diarization is None:
@@ -317,34 +334,10 @@ class DiarizationService:
                     "speaker": speaker
                 })
             
-            # Применяем диаризацию к сегментам транскрипции
-            speakers = set()
-            for segment in result.get("segments", []):
-                segment_start = segment.get("start", 0)
-                segment_end = segment.get("end", segment_start)
-                
-                # Находим перекрывающиеся диаризационные сегменты
-                overlapping_speakers = []
-                for diar_seg in diarization_segments:
-                    # Проверяем пересечение временных интервалов
-                    if (segment_start < diar_seg["end"] and segment_end > diar_seg["start"]):
-                        # Вычисляем длину пересечения
-                        overlap_start = max(segment_start, diar_seg["start"])
-                        overlap_end = min(segment_end, diar_seg["end"])
-                        overlap_duration = overlap_end - overlap_start
-                        overlapping_speakers.append((diar_seg["speaker"], overlap_duration))
-                
-                # Выбираем говорящего с максимальным пересечением
-                if overlapping_speakers:
-                    # Сортируем по длине пересечения и берем первого
-                    overlapping_speakers.sort(key=lambda x: x[1], reverse=True)
-                    speaker = overlapping_speakers[0][0]
-                else:
-                    # Если нет пересечений, используем последнего известного говорящего или создаем нового
-                    speaker = f"SPEAKER_{len(speakers) + 1}"
-                
-                segment["speaker"] = speaker
-                speakers.add(speaker)
+            # Применяем диаризацию к сегментам транскрипции (заметающая прямая,
+            # сегменты со сменой спикера режутся по словам выравнивания)
+            segments = assign_speakers(result.get("segments", []), diarization_segments)
+            speakers = {segment["speaker"] for segment in segments}
             
             speakers_list = sorted(list(speakers))
             
@@ -354,7 +347,7 @@ class DiarizationService:
             if 'actual_file_path' in locals() and actual_file_path != file_path:
                 self._cleanup_converted_file(actual_file_path, file_path)
 
-            return build_diarization_from_segments(result.get("segments", []))
+            return build_diarization_from_segments(segments)
             
         except Exception as e:
             logger.error(f"Ошибка при диаризации с WhisperX + pyannote: {e}")
@@ -363,15 +356,18 @@ class DiarizationService:
                 self._cleanup_converted_file(actual_file_path, file_path)
             raise
     
-    def diarize_with_pyannote(self, file_path: str) -> Diarization:
+    def diarize_with_pyannote(self, file_path: str,
+                              progress: Callable[[str], None] = _no_progress) -> Diarization:
         """Диаризация с помощью pyannote.audio (резервный вариант)"""
+        if not model_registry.is_loaded("pyannote"):
+            progress("loading_model")
+        with model_registry.use("pyannote") as pipeline:
+            return self._diarize_with_pyannote(pipeline, file_path, progress)
+
+    def _diarize_with_pyannote(self, pipeline, file_path: str,
+                               progress: Callable[[str], None]) -> Diarization:
         try:
-            self._load_pyannote_pipeline()
-            
-            # Дополнительная проверка, что pipeline загружен
-            if self.pyannote_pipeline is None:
-                raise RuntimeError("Pipeline pyannote.audio не был загружен")
-            
+            progress("diarizing")
             logger.info(f"Выполнение диаризации с pyannote.audio: {file_path}")
             
             # Проверяем, нужна ли конвертация файла
@@ -381,7 +377,7 @@ class DiarizationService:
                 actual_file_path = self._convert_audio_format(file_path, "wav")
             
             # Выполняем диаризацию
-            diarization = self.pyannote_pipeline(actual_file_path)
+            diarization = pipeline(actual_file_path)
             
             # Проверяем результат диаризации
             if diarization is None:
@@ -498,6 +494,17 @@ class DiarizationService:
         unsupported_formats = ['.m4a', '.mp4', '.aac', '.m4p']
         return file_ext in unsupported_formats
 
+    async def _run_local(self, provider: str, file_path: str, language: str) -> Diarization:
+        """WhisperX/pyannote — в пуле процессов моделей, event loop не блокируется."""
+        if provider == "whisperx":
+            return await run_model_job(
+                "whisperx", file_path, language, in_process=self.diarize_with_whisperx
+            )
+        return await run_model_job(
+            "pyannote", file_path, language,
+            in_process=lambda path, _language: self.diarize_with_pyannote(path),
+        )
+
     async def diarize_file(self, file_path: str, language: str = "ru") -> Optional[Diarization]:
         """Основной метод диаризации файла"""
         if not settings.enable_diarization:
@@ -516,7 +523,7 @@ class DiarizationService:
         
         if self._needs_conversion(file_path):
             logger.info(f"Файл {file_path} требует конвертации")
-            converted_file = self._convert_audio_format(file_path)
+            converted_file = await asyncio.to_thread(self._convert_audio_format, file_path)
             if converted_file != file_path:
                 file_path = converted_file
                 logger.info(f"Используем конвертированный файл: {file_path}")
@@ -535,8 +542,7 @@ class DiarizationService:
             if settings.diarization_provider == "whisperx":
                 if WHISPERX_AVAILABLE:
                     logger.info("Использование WhisperX для диаризации")
-                    result = self.diarize_with_whisperx(file_path, language)
-                    return result
+                    return await self._run_local("whisperx", file_path, language)
                 else:
                     logger.warning("WhisperX недоступен, переключаемся на pyannote")
                     settings.diarization_provider = "pyannote"
@@ -544,8 +550,7 @@ class DiarizationService:
             if settings.diarization_provider == "pyannote":
                 if PYANNOTE_AVAILABLE:
                     logger.info("Использование pyannote.audio для диаризации")
-                    result = self.diarize_with_pyannote(file_path)
-                    return result
+                    return await self._run_local("pyannote", file_path, language)
                 else:
                     logger.error("pyannote.audio недоступен")
             
@@ -560,22 +565,20 @@ class DiarizationService:
             fallback_providers = []
             
             if settings.diarization_provider != "whisperx" and WHISPERX_AVAILABLE:
-                fallback_providers.append(("whisperx", self.diarize_with_whisperx))
+                fallback_providers.append("whisperx")
             
             if settings.diarization_provider != "pyannote" and PYANNOTE_AVAILABLE:
-                fallback_providers.append(("pyannote", self.diarize_with_pyannote))
+                fallback_providers.append("pyannote")
             
             if settings.diarization_provider != "picovoice" and PICOVOICE_AVAILABLE:
-                fallback_providers.append(("picovoice", self.diarize_with_picovoice))
+                fallback_providers.append("picovoice")
             
-            for provider_name, provider_func in fallback_providers:
+            for provider_name in fallback_providers:
                 try:
                     logger.info(f"Пробуем резервный вариант диаризации: {provider_name}")
                     if provider_name == "picovoice":
-                        result = await provider_func(file_path)
-                    else:
-                        result = provider_func(file_path, language)
-                    return result
+                        return await self.diarize_with_picovoice(file_path)
+                    return await self._run_local(provider_name, file_path, language)
                 except Exception as e2:
                     logger.error(f"Резервный вариант {provider_name} также не сработал: {e2}")
             
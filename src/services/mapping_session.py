@@ -1,18 +1,43 @@
 """Сессия сопоставления: приостановленная обработка в ожидании подтверждения.
 
-Типизированная замена dict-ам со строковыми ключами: хранилище in-memory,
-поэтому объекты живут как есть — без model_dump()/регидрации. Атомарный
-``take`` закрывает гонку двойного подтверждения: взял — владеешь, второй
-тап получает None.
+Типизированная замена dict-ам со строковыми ключами. ``MappingSessionStore``
+держит сессии в памяти процесса, поэтому объекты живут как есть — без
+model_dump()/регидрации. Атомарный ``take`` закрывает гонку двойного
+подтверждения: взял — владеешь, второй тап получает None.
+
+``SharedMappingSessionStore`` — то же поверх общего бэкенда (``STATE_BACKEND``
+sqlite/redis): карточку, поставленную на паузу одним процессом, подтверждает
+любой другой, и рестарт её не теряет. Расшифровка в сессию не сериализуется —
+сессия ссылается на неё по хешу содержимого.
+
+Интерфейс хранилища асинхронный: у общего хранилища каждая операция — сеть или
+файл с блокировкой другого процесса, и она уходит в поток (``asyncio.to_thread``),
+не останавливая event loop. Логика обоих хранилищ — синхронные ``_``-методы;
+хранилище в памяти вызывает их напрямую, без точек переключения, поэтому
+``take`` в нём по-прежнему атомарен.
 """
+import asyncio
+import hashlib
+import json
+import threading
+import time
+import zlib
+from collections import OrderedDict
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from typing import Any, Dict, Optional, Set, Tuple
+from typing import Any, Callable, Dict, Optional, Set, Tuple, TypeVar
+from uuid import uuid4
 
+from aiogram.types import Message
 from loguru import logger
+from pydantic import TypeAdapter
 
 from src.models.processing import ProcessingRequest, TranscriptionResult
+from src.models.template import Template
 from src.performance.metrics import ProcessingMetrics
+from src.services.shared_state import StateBackend, state_backend
+
+_T = TypeVar("_T")
 
 
 @dataclass
@@ -79,10 +104,18 @@ class MappingSessionStore:
         """
         return getattr(session, "task_id", None) or f"anon:{id(session)}"
 
+    async def _call(self, fn: Callable[..., _T], *args: Any) -> _T:
+        """Выполнить синхронную операцию хранилища (в памяти — прямо в loop)."""
+        return fn(*args)
+
+    def _active_key(self, user_id: int) -> Optional[str]:
+        """Ключ активной (последней сохранённой) записи пользователя."""
+        return self._active.get(user_id)
+
     def _forget(self, user_id: int, session_key: str) -> Optional[MappingSession]:
         """Снять запись со всех полок разом."""
         self._timestamps.pop((user_id, session_key), None)
-        if self._active.get(user_id) == session_key:
+        if self._active_key(user_id) == session_key:
             self._active.pop(user_id, None)
         return self._sessions.pop((user_id, session_key), None)
 
@@ -95,12 +128,15 @@ class MappingSessionStore:
             )
             self._forget(user_id, session_key)
 
-    def save(self, user_id: int, session: MappingSession) -> str:
+    async def save(self, user_id: int, session: MappingSession) -> str:
         """Сохранить сессию при постановке обработки на паузу.
 
         Возвращает ключ записи: его получает таймер авто-доставки, чтобы
         забрать именно свою сессию, а не ту, что окажется активной к сроку.
         """
+        return await self._call(self._save, user_id, session)
+
+    def _save(self, user_id: int, session: MappingSession) -> str:
         session_key = self._key_of(session)
         self._sessions[(user_id, session_key)] = session
         self._timestamps[(user_id, session_key)] = datetime.now()
@@ -111,36 +147,65 @@ class MappingSessionStore:
         )
         return session_key
 
-    def peek(self, user_id: int) -> Optional[MappingSession]:
+    async def has_active(self, user_id: int) -> bool:
+        """Есть ли у пользователя активная сессия — без чтения самой сессии.
+
+        Дешёвая проверка для фильтров, которые видят каждое сообщение; TTL не
+        проверяет — живость подтверждает следующий ``peek``.
+        """
+        return await self._call(self._active_key, user_id) is not None
+
+    async def peek(self, user_id: int) -> Optional[MappingSession]:
         """Прочитать активную сессию, не изымая (для UI смены/выбора/отмены)."""
-        session_key = self._active.get(user_id)
+        return await self._call(self._peek, user_id)
+
+    def _peek(self, user_id: int) -> Optional[MappingSession]:
+        session_key = self._active_key(user_id)
         if session_key is None:
             return None
         self._evict_if_expired(user_id, session_key)
         return self._sessions.get((user_id, session_key))
 
-    def update_mapping(self, user_id: int, new_mapping: Dict[str, str]) -> bool:
+    async def update_mapping(self, user_id: int, new_mapping: Dict[str, str]) -> bool:
         """Обновить сопоставление в активной сессии. False, если сессии нет."""
-        session = self.peek(user_id)
+        return await self._call(self._update_mapping, user_id, new_mapping)
+
+    def _update_mapping(self, user_id: int, new_mapping: Dict[str, str]) -> bool:
+        session = self._peek(user_id)
         if session is None:
             logger.warning(f"Обновление сопоставления без сессии: пользователь {user_id}")
             return False
         session.speaker_mapping = new_mapping
+        self._persist(user_id, session)
         return True
 
-    def take(self, user_id: int) -> Optional[MappingSession]:
+    async def persist(self, user_id: int, session: MappingSession) -> None:
+        """Сохранить правки, сделанные в объекте сессии на месте.
+
+        В памяти процесса объект и есть хранилище — делать нечего; общее
+        хранилище записывает сессию заново.
+        """
+        await self._call(self._persist, user_id, session)
+
+    def _persist(self, user_id: int, session: MappingSession) -> None:
+        pass
+
+    async def take(self, user_id: int) -> Optional[MappingSession]:
         """Атомарно изъять активную сессию (подтверждение/пропуск).
 
         Повторный take возвращает None — двойной тап по «Подтвердить»
         не запускает второе возобновление.
         """
-        session_key = self._active.get(user_id)
+        return await self._call(self._take, user_id)
+
+    def _take(self, user_id: int) -> Optional[MappingSession]:
+        session_key = self._active_key(user_id)
         if session_key is None:
             return None
         self._evict_if_expired(user_id, session_key)
         return self._closing(user_id, self._forget(user_id, session_key))
 
-    def take_regardless(
+    async def take_regardless(
         self, user_id: int, session_key: Optional[str] = None
     ) -> Optional[MappingSession]:
         """Изъять сессию, не проверяя TTL — для авто-доставки по таймауту.
@@ -155,8 +220,13 @@ class MappingSessionStore:
         Атомарность та же, что у ``take``: успел пользователь подтвердить —
         таймер получит None и второй доставки не будет.
         """
+        return await self._call(self._take_regardless, user_id, session_key)
+
+    def _take_regardless(
+        self, user_id: int, session_key: Optional[str]
+    ) -> Optional[MappingSession]:
         if session_key is None:
-            session_key = self._active.get(user_id)
+            session_key = self._active_key(user_id)
         if session_key is None:
             return None
         return self._closing(user_id, self._forget(user_id, session_key))
@@ -169,12 +239,15 @@ class MappingSessionStore:
             self._closed_at[user_id] = datetime.now()
         return session
 
-    def was_recently_closed(self, user_id: int) -> bool:
+    async def was_recently_closed(self, user_id: int) -> bool:
         """Была ли у пользователя сессия, закрытая доставкой, в пределах TTL.
 
         Устаревшая карточка спрашивает об этом, чтобы сказать правду: протокол
         доставлен и лежит выше в чате, а не «начните обработку заново».
         """
+        return await self._call(self._was_recently_closed, user_id)
+
+    def _was_recently_closed(self, user_id: int) -> bool:
         closed_at = self._closed_at.get(user_id)
         return bool(closed_at and datetime.now() - closed_at <= self._ttl)
 
@@ -183,17 +256,248 @@ class MappingSessionStore:
         """TTL хранилища в секундах — таймер авто-доставки считает срок от него."""
         return self._ttl.total_seconds()
 
-    def discard(self, user_id: int, session_key: Optional[str] = None) -> None:
+    async def discard(self, user_id: int, session_key: Optional[str] = None) -> None:
         """Выбросить сессию (UI не показался — пауза не состоялась).
 
         Доставкой не считается: соврать устаревшей карточке про доставленный
         протокол здесь было бы хуже, чем промолчать.
         """
+        await self._call(self._discard, user_id, session_key)
+
+    def _discard(self, user_id: int, session_key: Optional[str]) -> None:
         if session_key is None:
-            session_key = self._active.get(user_id)
+            session_key = self._active_key(user_id)
         if session_key is not None:
             self._forget(user_id, session_key)
 
 
+_metrics_adapter = TypeAdapter(ProcessingMetrics)
+
+# Сколько расшифровок держать разобранными: они неизменны (ключ — хеш),
+# а фильтр ловца имени читает сессию на каждое текстовое сообщение
+_PAYLOAD_CACHE_SIZE = 16
+
+
+class SharedMappingSessionStore(MappingSessionStore):
+    """Сессии сопоставления в общем бэкенде: подтвердить может любой процесс.
+
+    Семантика та же, что у хранилища в памяти, только каждое чтение — свежая
+    копия из бэкенда: правки объекта сохраняются через ``persist`` (или
+    ``update_mapping``). ``take`` атомарен между процессами — сессию изымает
+    бэкенд (``pop``), второй процесс получает None. Операции выполняются в
+    потоках (``_call``), поэтому кэш расшифровок защищён блокировкой.
+
+    Бэкенд хранит записи вдвое дольше TTL: ``take_regardless`` по таймеру
+    забирает и просроченную сессию (см. базовый класс).
+    """
+
+    def __init__(self, backend: StateBackend, ttl_seconds: int = 3600):
+        super().__init__(ttl_seconds=ttl_seconds)
+        self._backend = backend
+        self._retention = 2 * ttl_seconds
+        self._payloads: "OrderedDict[str, TranscriptionResult]" = OrderedDict()
+        self._payloads_lock = threading.Lock()
+        # Бот для регидрации карточки: Message без бота не умеет edit_text
+        self.bot = None
+
+    @staticmethod
+    def _key_of(session: MappingSession) -> str:
+        # id() объекта уникален только в своём процессе
+        return getattr(session, "task_id", None) or f"anon:{uuid4().hex}"
+
+    async def _call(self, fn: Callable[..., _T], *args: Any) -> _T:
+        # Бэкенд блокирует (сеть, файл под BEGIN IMMEDIATE другого процесса)
+        return await asyncio.to_thread(fn, *args)
+
+    @staticmethod
+    def _slot(user_id: int, session_key: str) -> str:
+        return f"{user_id}:{session_key}"
+
+    def _active_key(self, user_id: int) -> Optional[str]:
+        value = self._backend.get("mapping_active", str(user_id))
+        return value.decode("utf-8") if value is not None else None
+
+    # --- расшифровка по хешу содержимого ---
+
+    def _store_payload(self, result: TranscriptionResult) -> str:
+        raw = result.model_dump_json().encode("utf-8")
+        digest = hashlib.sha256(raw).hexdigest()
+        with self._payloads_lock:
+            known = digest in self._payloads
+        if not known:
+            self._backend.add("transcript", digest, zlib.compress(raw, 6), ttl=self._retention)
+            self._remember_payload(digest, result)
+        return digest
+
+    def _load_payload(self, digest: str) -> Optional[TranscriptionResult]:
+        with self._payloads_lock:
+            cached = self._payloads.get(digest)
+            if cached is not None:
+                self._payloads.move_to_end(digest)
+                return cached
+        blob = self._backend.get("transcript", digest)
+        if blob is None:
+            return None
+        result = TranscriptionResult.model_validate_json(zlib.decompress(blob))
+        self._remember_payload(digest, result)
+        return result
+
+    def _remember_payload(self, digest: str, result: TranscriptionResult) -> None:
+        with self._payloads_lock:
+            self._payloads[digest] = result
+            while len(self._payloads) > _PAYLOAD_CACHE_SIZE:
+                self._payloads.popitem(last=False)
+
+    # --- (де)сериализация ---
+
+    def _dump(self, session: MappingSession, saved_at: float) -> bytes:
+        template = session.template
+        message = session.confirmation_message
+        record = {
+            "saved_at": saved_at,
+            "request": session.request.model_dump(mode="json"),
+            "transcript": self._store_payload(session.transcription_result),
+            "speaker_mapping": session.speaker_mapping,
+            "meeting_type": session.meeting_type,
+            "temp_file_path": session.temp_file_path,
+            "cache_key": session.cache_key,
+            "task_id": session.task_id,
+            "metrics": _metrics_adapter.dump_python(session.metrics, mode="json"),
+            "template": template.model_dump(mode="json") if template is not None else None,
+            "speakers_with_audio": sorted(session.speakers_with_audio),
+            "confirmation_message": (
+                message.model_dump(mode="json", exclude_none=True) if message is not None else None
+            ),
+            "editing_speaker": session.editing_speaker,
+            "created_at": session.created_at.isoformat(),
+        }
+        return json.dumps(record, ensure_ascii=False).encode("utf-8")
+
+    def _load(self, raw: bytes) -> Tuple[Optional[MappingSession], float]:
+        record = json.loads(raw)
+        transcription = self._load_payload(record["transcript"])
+        if transcription is None:
+            logger.error(f"Расшифровка сессии сопоставления {record['transcript']} не найдена в хранилище")
+            return None, record["saved_at"]
+        message = record["confirmation_message"]
+        session = MappingSession(
+            request=ProcessingRequest.model_validate(record["request"]),
+            transcription_result=transcription,
+            speaker_mapping=record["speaker_mapping"],
+            meeting_type=record["meeting_type"],
+            temp_file_path=record["temp_file_path"],
+            cache_key=record["cache_key"],
+            task_id=record["task_id"],
+            metrics=_metrics_adapter.validate_python(record["metrics"]),
+            template=Template.model_validate(record["template"]) if record["template"] else None,
+            speakers_with_audio=set(record["speakers_with_audio"]),
+            confirmation_message=(
+                Message.model_validate(message, context={"bot": self.bot}) if message else None
+            ),
+            editing_speaker=record["editing_speaker"],
+            created_at=datetime.fromisoformat(record["created_at"]),
+        )
+        return session, record["saved_at"]
+
+    def _write(self, user_id: int, session_key: str, session: MappingSession, saved_at: float) -> None:
+        remaining = saved_at + self._retention - time.time()
+        self._backend.set("mapping", self._slot(user_id, session_key), self._dump(session, saved_at),
+                          ttl=max(remaining, 1))
+
+    def _expired(self, saved_at: float) -> bool:
+        return time.time() - saved_at > self._ttl.total_seconds()
+
+    # --- операции хранилища (выполняются в потоке) ---
+
+    def _save(self, user_id: int, session: MappingSession) -> str:
+        session_key = self._key_of(session)
+        self._write(user_id, session_key, session, time.time())
+        self._backend.set("mapping_active", str(user_id), session_key.encode("utf-8"),
+                          ttl=self._retention)
+        logger.debug(
+            f"Сессия сопоставления сохранена в {self._backend.name}: пользователь {user_id}, "
+            f"запись {session_key}"
+        )
+        return session_key
+
+    def _read(self, user_id: int, session_key: str) -> Tuple[Optional[MappingSession], float]:
+        raw = self._backend.get("mapping", self._slot(user_id, session_key))
+        if raw is None:
+            return None, 0.0
+        return self._load(raw)
+
+    def _peek(self, user_id: int) -> Optional[MappingSession]:
+        session_key = self._active_key(user_id)
+        if session_key is None:
+            return None
+        session, saved_at = self._read(user_id, session_key)
+        if session is not None and self._expired(saved_at):
+            logger.warning(
+                f"Сессия сопоставления пользователя {user_id} "
+                f"(запись {session_key}) истекла (старше {self._ttl})"
+            )
+            self._forget(user_id, session_key)
+            return None
+        return session
+
+    def _persist(self, user_id: int, session: MappingSession) -> None:
+        session_key = session.task_id or self._active_key(user_id)
+        if session_key is None:
+            return
+        raw = self._backend.get("mapping", self._slot(user_id, session_key))
+        if raw is None:
+            # Сессию уже изъяли (подтверждение в другом процессе) — не воскрешаем
+            return
+        self._write(user_id, session_key, session, json.loads(raw)["saved_at"])
+
+    def _pop(self, user_id: int, session_key: str) -> Tuple[Optional[MappingSession], float]:
+        """Изъять запись атомарно (``pop`` бэкенда) и снять указатель активной.
+
+        Указатель снимается сравнением с удалением одним шагом: ``save`` более
+        новой записи в другом процессе между проверкой и удалением иначе
+        остался бы без указателя.
+        """
+        self._backend.delete_if("mapping_active", str(user_id), session_key.encode("utf-8"))
+        raw = self._backend.pop("mapping", self._slot(user_id, session_key))
+        if raw is None:
+            return None, 0.0
+        return self._load(raw)
+
+    def _forget(self, user_id: int, session_key: str) -> Optional[MappingSession]:
+        return self._pop(user_id, session_key)[0]
+
+    def _take(self, user_id: int) -> Optional[MappingSession]:
+        session_key = self._active_key(user_id)
+        if session_key is None:
+            return None
+        session, saved_at = self._pop(user_id, session_key)
+        if session is not None and self._expired(saved_at):
+            logger.warning(
+                f"Сессия сопоставления пользователя {user_id} "
+                f"(запись {session_key}) истекла (старше {self._ttl})"
+            )
+            return None
+        return self._closing(user_id, session)
+
+    def _closing(
+        self, user_id: int, session: Optional[MappingSession]
+    ) -> Optional[MappingSession]:
+        if session is not None:
+            self._backend.set("mapping_closed", str(user_id), str(time.time()).encode("utf-8"),
+                              ttl=self._ttl.total_seconds())
+        return session
+
+    def _was_recently_closed(self, user_id: int) -> bool:
+        return self._backend.get("mapping_closed", str(user_id)) is not None
+
+
+def create_mapping_store(
+    backend: Optional[StateBackend], ttl_seconds: int = 3600
+) -> MappingSessionStore:
+    if backend is None:
+        return MappingSessionStore(ttl_seconds=ttl_seconds)
+    return SharedMappingSessionStore(backend, ttl_seconds=ttl_seconds)
+
+
 # Глобальный экземпляр
-mapping_sessions = MappingSessionStore(ttl_seconds=3600)
+mapping_sessions = create_mapping_store(state_backend, ttl_seconds=3600)
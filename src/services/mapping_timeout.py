@@ -91,7 +91,7 @@ async def deliver_on_timeout(
         if delay_seconds > 0:
             await asyncio.sleep(delay_seconds)
 
-        session = store.take_regardless(user_id, session_key)
+        session = await store.take_regardless(user_id, session_key)
         if session is None:
             # Штатный исход: пользователь закрыл карточку сам.
             return
@@ -125,7 +125,7 @@ async def finish_superseded_session(
     нечего или возобновление упало. В обоих случаях новая пауза продолжается:
     сбой старой записи не имеет права уронить новую.
     """
-    session = store.take_regardless(user_id)
+    session = await store.take_regardless(user_id)
     if session is None:
         return False
 
@@ -0,0 +1,185 @@
+"""
+Реестр тёплых локальных моделей процесса (Whisper, WhisperX, pyannote)
+
+Раньше модель грузилась первой задачей (она и платила всю задержку загрузки),
+а очистка по памяти выбрасывала её даже посреди работы — следующая задача
+грузила заново. Реестр держит по одному экземпляру каждой модели на процесс:
+
+- ``use(name)`` закрепляет модель на время задачи (счётчик ссылок) и грузит её,
+  если она ещё не загружена; параллельные задачи ждут одну загрузку;
+- ``preload(names)`` прогревает модели в фоне при старте процесса;
+- модель без закреплений выгружается после ``idle_ttl`` секунд простоя, а при
+  нехватке памяти — сразу (``evict``); закреплённые модели не трогаются;
+- ``stats()`` — счётчики загрузок, попаданий и выгрузок.
+
+Загрузчики регистрируют владельцы моделей: whisper — ``model_workers``,
+whisperx/pyannote — ``DiarizationService``.
+"""
+
+import gc
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from loguru import logger
+
+from src.config import settings
+
+
+@dataclass
+class _Entry:
+    loader: Callable[[], Any]
+    model: Any = None
+    loaded: bool = False
+    loading: bool = False
+    pins: int = 0
+    last_used: float = 0.0
+
+
+class ModelRegistry:
+    """Тёплые модели процесса с закреплением и выгрузкой по простою."""
+
+    def __init__(self, idle_ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.idle_ttl = idle_ttl
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._entries: Dict[str, _Entry] = {}
+        self._reaper: Optional[threading.Thread] = None
+        self.loads = 0
+        self.hits = 0
+        self.evictions = 0
+
+    def register(self, name: str, loader: Callable[[], Any]) -> None:
+        """Зарегистрировать загрузчик модели (повторная регистрация не меняет его)."""
+        with self._cond:
+            self._entries.setdefault(name, _Entry(loader=loader))
+
+    def is_loaded(self, name: str) -> bool:
+        with self._cond:
+            entry = self._entries.get(name)
+            return entry is not None and entry.loaded
+
+    @contextmanager
+    def use(self, name: str) -> Iterator[Any]:
+        """Модель, закреплённая на время блока ``with``."""
+        model = self._acquire(name, count_hit=True)
+        try:
+            yield model
+        finally:
+            self._release(name)
+
+    def preload(self, names: Iterable[str]) -> List[threading.Thread]:
+        """Прогреть модели в фоновых потоках; задачи, пришедшие раньше, дождутся загрузки."""
+        threads = []
+        for name in names:
+            with self._cond:
+                if name not in self._entries:
+                    logger.warning(f"Прогрев модели пропущен: неизвестная модель {name}")
+                    continue
+            thread = threading.Thread(target=self._warm, args=(name,),
+                                      name=f"model-preload-{name}", daemon=True)
+            thread.start()
+            threads.append(thread)
+        return threads
+
+    def evict(self, idle_only: bool = False) -> List[str]:
+        """Выгрузить незакреплённые модели (``idle_only`` — только простоявшие ``idle_ttl``)."""
+        now = self._clock()
+        evicted = []
+        with self._cond:
+            for name, entry in self._entries.items():
+                if not entry.loaded or entry.pins:
+                    continue
+                if idle_only and now - entry.last_used < self.idle_ttl:
+                    continue
+                entry.model, entry.loaded = None, False
+                evicted.append(name)
+            self.evictions += len(evicted)
+        if evicted:
+            logger.info(f"Выгружены модели: {', '.join(evicted)}")
+            _free_memory()
+        return evicted
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "loads": self.loads,
+                "hits": self.hits,
+                "evictions": self.evictions,
+                "loaded": sorted(name for name, entry in self._entries.items() if entry.loaded),
+                "pinned": sorted(name for name, entry in self._entries.items() if entry.pins),
+            }
+
+    # --- внутреннее ---
+
+    def _warm(self, name: str) -> None:
+        try:
+            self._acquire(name, count_hit=False)
+        except Exception as e:
+            logger.error(f"Не удалось прогреть модель {name}: {e}")
+            return
+        self._release(name)
+        logger.info(f"Модель {name} прогрета")
+
+    def _acquire(self, name: str, count_hit: bool) -> Any:
+        with self._cond:
+            entry = self._entries.get(name)
+            if entry is None:
+                raise ValueError(f"Неизвестная модель: {name}")
+            entry.pins += 1
+            while entry.loading:
+                self._cond.wait()
+            if entry.loaded:
+                if count_hit:
+                    self.hits += 1
+                return entry.model
+            entry.loading = True
+        try:
+            model = entry.loader()
+        except BaseException:
+            with self._cond:
+                entry.loading = False
+                entry.pins -= 1
+                self._cond.notify_all()
+            raise
+        with self._cond:
+            entry.model, entry.loaded, entry.loading = model, True, False
+            self.loads += 1
+            self._cond.notify_all()
+        return model
+
+    def _release(self, name: str) -> None:
+        with self._cond:
+            entry = self._entries[name]
+            entry.pins -= 1
+            entry.last_used = self._clock()
+            if self.idle_ttl > 0 and self._reaper is None:
+                self._reaper = threading.Thread(target=self._reap, name="model-reaper", daemon=True)
+                self._reaper.start()
+
+    def _reap(self) -> None:
+        interval = max(1.0, min(self.idle_ttl / 2, 60.0))
+        while True:
+            time.sleep(interval)
+            try:
+                self.evict(idle_only=True)
+            except Exception as e:
+                logger.error(f"Ошибка выгрузки простаивающих моделей: {e}")
+
+
+def _free_memory() -> None:
+    """Вернуть память выгруженных моделей (и кэш CUDA, если torch уже загружен)."""
+    gc.collect()
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+
+# Реестр процесса: у бота и у каждого процесса моделей свой
+model_registry = ModelRegistry(idle_ttl=settings.model_idle_ttl)
+
+
+__all__ = ["ModelRegistry", "model_registry"]
@@ -0,0 +1,553 @@
+"""
+Процессы локальных моделей: Whisper, WhisperX и pyannote вне event loop бота
+
+Раньше Whisper работал в сыром потоке с опросом ``is_alive()``, а диаризация
+WhisperX/pyannote выполнялась синхронно прямо в корутине — event loop (и с ним
+весь Telegram) стоял до конца диаризации. Теперь такие задачи уходят в пул
+отдельных процессов:
+
+- модели грузятся в процессе-воркере один раз и остаются тёплыми между задачами;
+- задачи ждут в очереди пула, свободный воркер получает следующую по своему pipe;
+- вызывающий получает awaitable и (по желанию) колбэк прогресса по этапам;
+- падение воркера (OOM killer, segfault в нативном коде) завершает ошибкой только
+  его задачу — пул поднимает замену, бот продолжает работать. Повторные падения
+  подряд (например, OOM при прогреве pyannote) разводятся растущей паузой, а
+  после ``_CRASH_BUDGET`` падений за ``_CRASH_WINDOW`` секунд пул помечается
+  деградировавшим и перестаёт перезапускать воркеры до конца окна;
+- ошибки проекта (``BotException`` и наследники) из воркера пересоздаются у
+  вызывающего тем же типом и с тем же текстом.
+
+Размер пула — ``settings.model_workers``, по умолчанию по числу одновременных
+задач очереди. ``model_workers=0`` выключает пул: задачи считаются в потоке
+процесса бота, как раньше, но без блокировки event loop.
+
+Модели процесса держит ``model_registry``: каждый воркер (и его замена после
+падения) прогревает ``settings.preload_models`` при запуске, а счётчики
+загрузок/попаданий/выгрузок присылает после каждой задачи.
+"""
+
+import asyncio
+import importlib
+import itertools
+import multiprocessing
+import signal
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence
+
+from loguru import logger
+
+from src.config import settings
+from src.exceptions.base import BotException
+from src.exceptions.processing import TranscriptionError
+from src.performance.oom_protection import get_oom_protection, oom_protected
+from src.services.model_registry import model_registry
+
+ProgressCallback = Callable[[str], None]
+
+
+class ModelWorkerError(RuntimeError):
+    """Задача упала внутри процесса модели (текст — исключение воркера).
+
+    ``remote_type`` — имя класса исходного исключения воркера, если оно было.
+    """
+
+    remote_type: Optional[str] = None
+
+
+class ModelWorkerCrashed(ModelWorkerError):
+    """Процесс модели завершился, не доведя задачу до конца."""
+
+
+_POOL_CLOSED = "Пул процессов моделей остановлен"
+_POOL_DEGRADED = "Процессы моделей падают один за другим, локальная обработка временно недоступна"
+
+# Пауза перед перезапуском: первое падение в окне — сразу, дальше удваивается
+_RESPAWN_BASE_DELAY = 1.0
+_RESPAWN_MAX_DELAY = 60.0
+# Сколько падений за окно (секунд) пул терпит, прежде чем перестать перезапускать
+_CRASH_BUDGET = 5
+_CRASH_WINDOW = 300.0
+
+
+# ---------------------------------------------------------------------------
+# Сторона воркера
+# ---------------------------------------------------------------------------
+
+# Счётчики реестра моделей, которые воркер присылает после задачи
+_MODEL_COUNTERS = ("loads", "hits", "evictions")
+
+
+@oom_protected(estimated_memory_mb=200)  # Whisper модели занимают ~200MB
+def _load_whisper(model_size: str = "base"):
+    """Загрузчик модели Whisper для реестра моделей."""
+    logger.info(f"Загрузка модели Whisper: {model_size}")
+    memory_status = get_oom_protection().get_memory_status()
+    if memory_status["system"]["percent"] > 80:
+        logger.warning(f"Высокое использование памяти при загрузке модели: {memory_status['system']['percent']:.1f}%")
+    try:
+        import whisper
+        model = whisper.load_model(model_size)
+    except Exception as e:
+        logger.error(f"Ошибка при загрузке модели Whisper: {e}")
+        raise TranscriptionError(f"Не удалось загрузить модель Whisper: {e}")
+    logger.info("Модель Whisper загружена")
+    return model
+
+
+model_registry.register("whisper", _load_whisper)
+
+
+def whisper_transcribe(file_path: str, language: str,
+                       progress: Optional[ProgressCallback] = None) -> str:
+    """Транскрипция тёплой моделью Whisper процесса (синхронно)."""
+    if progress is not None and not model_registry.is_loaded("whisper"):
+        progress("loading_model")
+    with model_registry.use("whisper") as model:
+        if progress is not None:
+            progress("transcribing")
+        result = model.transcribe(file_path, language=language, word_timestamps=False)
+    return result["text"]
+
+
+def _diarize_whisperx(file_path: str, language: str, progress: ProgressCallback):
+    from src.services.diarization_service import diarization_service
+    return diarization_service.diarize_with_whisperx(file_path, language, progress=progress)
+
+
+def _diarize_pyannote(file_path: str, language: str, progress: ProgressCallback):
+    from src.services.diarization_service import diarization_service
+    return diarization_service.diarize_with_pyannote(file_path, progress=progress)
+
+
+_JOBS: Dict[str, Callable[..., Any]] = {
+    "whisper": whisper_transcribe,
+    "whisperx": _diarize_whisperx,
+    "pyannote": _diarize_pyannote,
+}
+
+
+def preload_names() -> List[str]:
+    """Модели для прогрева из ``settings.preload_models``."""
+    return [name.strip().lower() for name in settings.preload_models.split(",") if name.strip()]
+
+
+def _preload(names: Sequence[str]) -> None:
+    if not names:
+        return
+    if any(name != "whisper" for name in names):
+        # whisperx/pyannote регистрирует DiarizationService при создании
+        import src.services.diarization_service  # noqa: F401
+    model_registry.preload(names)
+
+
+def _worker_main(conn, preload: Sequence[str] = ()) -> None:
+    """Цикл процесса-воркера: задача из pipe → прогресс и результат обратно."""
+    # Ctrl+C получает вся группа процессов; останавливает воркеры родитель
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        _preload(preload)
+    except Exception as e:
+        logger.error(f"Не удалось начать прогрев моделей: {e}")
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            return
+        if job is None:
+            return
+        job_id, kind, args = job
+
+        def progress(stage: str, _job_id: int = job_id) -> None:
+            conn.send(("progress", _job_id, stage))
+
+        try:
+            outcome = ("done", job_id, _JOBS[kind](*args, progress))
+        except Exception as e:
+            outcome = ("error", job_id, _describe_error(e))
+        conn.send(("models", job_id, model_registry.stats()))
+        try:
+            conn.send(outcome)
+        except Exception as e:  # результат не упаковался в pickle
+            conn.send(("error", job_id, _describe_error(e)))
+
+
+def _describe_error(error: Exception) -> tuple:
+    """Исключение воркера в виде, который переживёт pipe: (модуль, класс, текст, атрибуты)."""
+    cls = type(error)
+    state = dict(vars(error)) if isinstance(error, BotException) else {}
+    return cls.__module__, cls.__qualname__, str(error), state
+
+
+def _rebuild_error(payload: tuple) -> Exception:
+    """Исключение воркера на стороне бота.
+
+    ``BotException`` проекта пересоздаётся тем же классом без вызова
+    ``__init__`` (конструкторы добавляют к тексту префикс), остальное —
+    ``ModelWorkerError`` с текстом исключения.
+    """
+    module_name, qualname, message, state = payload
+    if module_name.startswith("src."):
+        try:
+            cls = getattr(importlib.import_module(module_name), qualname)
+        except (ImportError, AttributeError):
+            cls = None
+        if isinstance(cls, type) and issubclass(cls, BotException):
+            error = cls.__new__(cls)
+            Exception.__init__(error, message)
+            error.__dict__.update(state)
+            return error
+    error = ModelWorkerError(message)
+    error.remote_type = qualname
+    return error
+
+
+# ---------------------------------------------------------------------------
+# Сторона бота
+# ---------------------------------------------------------------------------
+
+@dataclass
+class _Job:
+    job_id: int
+    kind: str
+    args: tuple
+    loop: asyncio.AbstractEventLoop
+    future: asyncio.Future
+    progress: Optional[ProgressCallback] = None
+
+
+@dataclass
+class _Worker:
+    process: Any
+    conn: Any
+    job: Optional[_Job] = None
+    reader: Optional[threading.Thread] = field(default=None, repr=False)
+    models: Dict[str, Any] = field(default_factory=dict)
+
+
+class ModelWorkerPool:
+    """Пул процессов с тёплыми моделями и очередью задач."""
+
+    def __init__(self, size: int, start_method: str = "spawn", preload: Sequence[str] = ()):
+        self.size = max(1, size)
+        self.preload = tuple(preload)
+        # spawn: форк процесса с живым event loop и потоками aiosqlite небезопасен
+        self._ctx = multiprocessing.get_context(start_method)
+        self._lock = threading.Lock()
+        self._queue: Deque[_Job] = deque()
+        self._workers: list = []
+        self._ids = itertools.count(1)
+        self._closed = False
+        self.crashes = 0
+        # Время недавних падений (для паузы и бюджета) и ожидающие перезапуски
+        self._recent_crashes: Deque[float] = deque()
+        self._respawns_pending = 0
+        self.degraded = False
+        # Счётчики моделей завершившихся воркеров
+        self._retired_models = dict.fromkeys(_MODEL_COUNTERS, 0)
+
+    def start(self) -> None:
+        """Запустить все воркеры сразу (они прогревают ``preload`` в фоне)."""
+        with self._lock:
+            if self._closed:
+                raise ModelWorkerError(_POOL_CLOSED)
+            self._fill()
+
+    async def submit(self, kind: str, *args: Any,
+                     progress: Optional[ProgressCallback] = None) -> Any:
+        """Поставить задачу в очередь пула и дождаться результата.
+
+        Отмена ожидающего не прерывает задачу, уже отданную воркеру: её
+        результат просто отбрасывается.
+        """
+        if kind not in _JOBS:
+            raise ValueError(f"Неизвестная задача модели: {kind}")
+        loop = asyncio.get_running_loop()
+        job = _Job(next(self._ids), kind, args, loop, loop.create_future(), progress)
+        with self._lock:
+            if self._closed:
+                raise ModelWorkerError(_POOL_CLOSED)
+            self._fill()
+            if self.degraded and not self._workers:
+                raise ModelWorkerError(_POOL_DEGRADED)
+            self._queue.append(job)
+            self._dispatch()
+        return await job.future
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = {
+                "workers": len(self._workers),
+                "busy": sum(1 for w in self._workers if w.job is not None),
+                "queued": len(self._queue),
+                "crashes": self.crashes,
+                "degraded": int(self.degraded),
+            }
+            for counter in _MODEL_COUNTERS:
+                stats[f"model_{counter}"] = self._retired_models[counter] + sum(
+                    w.models.get(counter, 0) for w in self._workers
+                )
+            return stats
+
+    def close(self) -> None:
+        """Остановить воркеры; задачи в очереди и в работе завершаются ошибкой."""
+        with self._lock:
+            self._closed = True
+            workers, self._workers = self._workers, []
+            pending = list(self._queue) + [w.job for w in workers if w.job is not None]
+            self._queue.clear()
+        for job in pending:
+            self._resolve(job, error=ModelWorkerError(_POOL_CLOSED))
+        for worker in workers:
+            try:
+                worker.conn.send(None)
+            except (OSError, ValueError):
+                pass
+        for worker in workers:
+            worker.process.join(timeout=5)
+            if worker.process.is_alive():
+                worker.process.kill()
+                worker.process.join(timeout=1)
+            worker.conn.close()
+        if workers:
+            logger.info(f"Процессы моделей остановлены: {len(workers)}")
+
+    # --- внутреннее (вызывается под self._lock) ---
+
+    def _fill(self) -> None:
+        """Дополнить пул до ``size`` с учётом ожидающих перезапусков и деградации."""
+        if self.degraded:
+            if self._recent_crashes and time.monotonic() - self._recent_crashes[-1] < _CRASH_WINDOW:
+                return
+            # Окно прошло без падений — пробуем снова
+            self.degraded = False
+            self._recent_crashes.clear()
+            logger.info("Пул процессов моделей снова перезапускает воркеры")
+        while len(self._workers) + self._respawns_pending < self.size:
+            self._spawn()
+
+    def _spawn(self) -> None:
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(
+            target=_worker_main, args=(child_conn, self.preload), name="model-worker", daemon=True
+        )
+        process.start()
+        child_conn.close()
+        worker = _Worker(process=process, conn=parent_conn)
+        worker.reader = threading.Thread(
+            target=self._read, args=(worker,), name=f"model-worker-{process.pid}", daemon=True
+        )
+        worker.reader.start()
+        self._workers.append(worker)
+        logger.info(f"Запущен процесс моделей pid={process.pid}")
+
+    def _dispatch(self) -> None:
+        for worker in self._workers:
+            if not self._queue:
+                return
+            if worker.job is not None:
+                continue
+            job = self._queue.popleft()
+            if job.future.cancelled():
+                continue
+            worker.job = job
+            try:
+                worker.conn.send((job.job_id, job.kind, job.args))
+            except (OSError, ValueError) as e:
+                # Воркер умирает: читатель увидит выход процесса и завершит задачу ошибкой
+                logger.warning(f"Не удалось отдать задачу процессу моделей: {e}")
+
+    # --- поток-читатель воркера ---
+
+    def _read(self, worker: _Worker) -> None:
+        while True:
+            try:
+                event, job_id, payload = worker.conn.recv()
+            except (EOFError, OSError):
+                self._on_worker_exit(worker)
+                return
+            if event == "models":
+                worker.models = payload
+                continue
+            job = worker.job
+            if job is None or job.job_id != job_id:
+                continue
+            if event == "progress":
+                if job.progress is not None:
+                    job.loop.call_soon_threadsafe(self._report_progress, job, payload)
+                continue
+            with self._lock:
+                worker.job = None
+                self._dispatch()
+            if event == "done":
+                self._resolve(job, result=payload)
+            else:
+                self._resolve(job, error=_rebuild_error(payload))
+
+    def _on_worker_exit(self, worker: _Worker) -> None:
+        stranded: List[_Job] = []
+        delay: Optional[float] = None
+        with self._lock:
+            if worker not in self._workers:
+                return  # штатная остановка пула
+            self._workers.remove(worker)
+            job, worker.job = worker.job, None
+            self.crashes += 1
+            for counter in _MODEL_COUNTERS:
+                self._retired_models[counter] += worker.models.get(counter, 0)
+            now = time.monotonic()
+            self._recent_crashes.append(now)
+            while now - self._recent_crashes[0] > _CRASH_WINDOW:
+                self._recent_crashes.popleft()
+            if len(self._recent_crashes) >= _CRASH_BUDGET:
+                self.degraded = True
+                if not self._workers:
+                    stranded, self._queue = list(self._queue), deque()
+            elif not self._closed:
+                delay = _respawn_delay(len(self._recent_crashes))
+                self._respawns_pending += 1
+        worker.process.join(timeout=1)
+        if delay is None:
+            logger.error(
+                f"Процесс моделей pid={worker.process.pid} завершился (код {worker.process.exitcode}); "
+                f"падений за {_CRASH_WINDOW:.0f} с: {len(self._recent_crashes)} — пул деградировал, "
+                f"воркеры не перезапускаются"
+            )
+        else:
+            logger.error(
+                f"Процесс моделей pid={worker.process.pid} завершился "
+                f"(код {worker.process.exitcode}), замена через {delay:.0f} с"
+            )
+            timer = threading.Timer(delay, self._respawn)
+            timer.daemon = True
+            timer.start()
+        if job is not None:
+            self._resolve(job, error=ModelWorkerCrashed(
+                f"Процесс модели завершился во время задачи {job.kind} "
+                f"(код {worker.process.exitcode})"
+            ))
+        for pending in stranded:
+            self._resolve(pending, error=ModelWorkerError(_POOL_DEGRADED))
+
+    def _respawn(self) -> None:
+        with self._lock:
+            self._respawns_pending -= 1
+            if self._closed or self.degraded:
+                return
+            self._spawn()
+            self._dispatch()
+
+    @staticmethod
+    def _report_progress(job: _Job, stage: str) -> None:
+        try:
+            job.progress(stage)
+        except Exception as e:
+            logger.debug(f"Ошибка колбэка прогресса задачи модели: {e}")
+
+    @staticmethod
+    def _resolve(job: _Job, result: Any = None, error: Optional[Exception] = None) -> None:
+        def settle() -> None:
+            if job.future.done():
+                return
+            if error is not None:
+                job.future.set_exception(error)
+            else:
+                job.future.set_result(result)
+
+        try:
+            job.loop.call_soon_threadsafe(settle)
+        except RuntimeError:
+            pass  # event loop ожидающего уже закрыт
+
+
+def _respawn_delay(recent_crashes: int) -> float:
+    """Пауза перед перезапуском после ``recent_crashes``-го падения в окне."""
+    if recent_crashes <= 1:
+        return 0.0
+    return min(_RESPAWN_BASE_DELAY * 2 ** (recent_crashes - 2), _RESPAWN_MAX_DELAY)
+
+
+_pool: Optional[ModelWorkerPool] = None
+_pool_lock = threading.Lock()
+
+
+def _pool_size() -> int:
+    if settings.model_workers is not None:
+        return settings.model_workers
+    if settings.max_concurrent_tasks:
+        return settings.max_concurrent_tasks
+    from src.services.task_queue_manager import task_queue_manager
+    return task_queue_manager.max_concurrent
+
+
+def get_model_worker_pool() -> Optional[ModelWorkerPool]:
+    """Общий пул процессов моделей или ``None``, если пул выключен."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            size = _pool_size()
+            if size <= 0:
+                return None
+            _pool = ModelWorkerPool(size, preload=preload_names())
+        return _pool
+
+
+async def run_model_job(kind: str, *args: Any,
+                        progress: Optional[ProgressCallback] = None,
+                        in_process: Optional[Callable[..., Any]] = None) -> Any:
+    """Выполнить задачу модели в пуле, а при выключенном пуле — в потоке.
+
+    ``in_process`` — синхронная функция той же задачи для режима без пула.
+    """
+    pool = get_model_worker_pool()
+    if pool is not None:
+        return await pool.submit(kind, *args, progress=progress)
+    if in_process is None:
+        raise ModelWorkerError(f"Пул процессов выключен, а задаче {kind} нечем считаться")
+    return await asyncio.to_thread(in_process, *args)
+
+
+def preload_models() -> None:
+    """Прогреть модели из ``settings.preload_models`` (при старте бота, в фоне)."""
+    names = preload_names()
+    if not names:
+        return
+    pool = get_model_worker_pool()
+    if pool is not None:
+        pool.start()
+    else:
+        _preload(names)
+    logger.info(f"Прогрев моделей запущен: {', '.join(names)}")
+
+
+def model_stats() -> Dict[str, Any]:
+    """Счётчики тёплых моделей: по пулу процессов или по реестру процесса бота."""
+    pool = get_model_worker_pool()
+    if pool is not None:
+        return pool.stats()
+    registry = model_registry.stats()
+    return {f"model_{counter}": registry[counter] for counter in _MODEL_COUNTERS}
+
+
+def shutdown_model_workers() -> None:
+    """Остановить пул процессов моделей (при остановке бота)."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
+
+
+__all__ = [
+    "ModelWorkerCrashed",
+    "ModelWorkerError",
+    "ModelWorkerPool",
+    "get_model_worker_pool",
+    "model_stats",
+    "preload_models",
+    "run_model_job",
+    "shutdown_model_workers",
+    "whisper_transcribe",
+]
@@ -10,12 +10,11 @@ from loguru import logger
 
 from src.config import settings
 from src.models.diarization import Diarization, Segment
+from src.utils.optional_deps import module_available
 
-try:
-    import pvfalcon
-    FALCON_AVAILABLE = True
-except ImportError:
-    FALCON_AVAILABLE = False
+# Нативная библиотека импортируется при создании экземпляра Falcon
+FALCON_AVAILABLE = module_available("pvfalcon")
+if not FALCON_AVAILABLE:
     logger.warning("pvfalcon не установлен. Picovoice диаризация недоступна.")
 
 
@@ -42,6 +41,7 @@ class PicovoiceService:
                     logger.error("Picovoice Access Key не настроен")
                     return None
                 
+                import pvfalcon
                 self.falcon = pvfalcon.create(access_key=self.access_key)
                 logger.info("Picovoice Falcon успешно инициализирован")
                 return self.falcon
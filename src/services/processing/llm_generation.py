@@ -104,6 +104,23 @@ def effective_stage1_outcome(
     return speaker_mapping, meeting_type
 
 
+def stage1_context(request: Any) -> Dict[str, Any]:
+    """Контекст запроса, от которого зависит ЭТАП 1 (анализ встречи).
+
+    Единый источник для генерации и для предвыборки анализа в конвейере:
+    предвыборка находится по промпту анализа, поэтому обе стороны обязаны
+    собирать его из одних и тех же полей.
+    """
+    return {
+        "meeting_topic": request.meeting_topic,
+        "meeting_date": request.meeting_date,
+        "meeting_time": request.meeting_time,
+        "participants": request.participants_list,
+        "meeting_agenda": request.meeting_agenda,
+        "project_list": request.project_list,
+    }
+
+
 def record_metric(processing_metrics: Any, field: str, value: Any) -> None:
     """Записать замер, если метрики вообще ведутся.
 
@@ -204,12 +221,7 @@ class LLMGenerationService:
                 meeting_metadata=meeting_metadata,
                 speaker_mapping=request.speaker_mapping,
                 meeting_type=meeting_type,
-                meeting_topic=request.meeting_topic,
-                meeting_date=request.meeting_date,
-                meeting_time=request.meeting_time,
-                participants=request.participants_list,
-                meeting_agenda=request.meeting_agenda,
-                project_list=request.project_list,
+                **stage1_context(request),
             )
 
             record_metric(processing_metrics, 'llm_duration', time.time() - start_time)
@@ -11,6 +11,7 @@ import aiofiles
 from loguru import logger
 
 from src.database import history_repo
+from src.performance.async_optimization import file_hash_from_sha256
 from src.performance.cache_system import performance_cache
 
 
@@ -60,16 +61,20 @@ class ProcessingHistoryService:
 
     @staticmethod
     async def calculate_file_hash(file_path: str) -> str:
-        """Вычислить хэш файла для кэширования"""
+        """Вычислить хэш файла для кэширования.
+
+        Запасной путь: обычно хеш уже посчитан при скачивании и лежит в
+        ``request.file_hash``; здесь файл читается с диска целиком.
+        """
         import hashlib
 
         hash_obj = hashlib.sha256()
 
         async with aiofiles.open(file_path, 'rb') as f:
-            while chunk := await f.read(8192):
+            while chunk := await f.read(1024 * 1024):
                 hash_obj.update(chunk)
 
-        return hash_obj.hexdigest()[:16]
+        return file_hash_from_sha256(hash_obj.hexdigest())
 
     @staticmethod
     async def cleanup_temp_file(file_path: str):
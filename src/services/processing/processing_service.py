@@ -18,14 +18,22 @@ from src.config import settings
 from src.database import history_repo, queue_repo
 from src.exceptions.processing import ProcessingError
 from src.models.processing import ProcessingRequest, ProcessingResult
-from src.performance.async_optimization import OptimizedHTTPClient, optimized_file_processing, task_pool, thread_manager
+from src.performance.async_optimization import (
+    OptimizedHTTPClient,
+    file_hash_from_sha256,
+    optimized_file_processing,
+    task_pool,
+    thread_manager,
+)
 from src.performance.cache_system import performance_cache
 from src.performance.memory_management import memory_optimizer
 from src.performance.metrics import PerformanceTimer, metrics_collector, performance_timer
+from src.performance.transcription_store import transcription_store
 from src.reliability.middleware import monitoring_middleware
 from src.services.base_processing_service import BaseProcessingService
 from src.services.error_presentation import resume_failure_message
 from src.services.mapping_session import MappingSession
+from src.services.request_scope import scoped
 from src.services.smart_template_selector import smart_selector
 
 # Новые сервисы для улучшения качества
@@ -34,7 +42,7 @@ from src.utils.request_diagnostics import log_meeting_inputs
 from src.utils.telegram_safe import safe_send_message
 
 from .completion import CompletionDeps, complete_processing, deliver_cached
-from .llm_generation import LLMGenerationService
+from .llm_generation import LLMGenerationService, stage1_context
 from .processing_history import ProcessingHistoryService
 
 # Extracted modules
@@ -109,6 +117,7 @@ class ProcessingService(BaseProcessingService):
     # ------------------------------------------------------------------
 
     @performance_timer("file_processing")
+    @scoped
     async def process_file(
         self, request: ProcessingRequest, progress_tracker=None, task_id=None
     ) -> ProcessingResult:
@@ -156,9 +165,9 @@ class ProcessingService(BaseProcessingService):
                 temp_file_path = await self._download_telegram_file(request)
                 cache_check_only = True
 
-            # Шаг 2: Вычисляем хеш файла
-            file_hash = await self.history.calculate_file_hash(temp_file_path)
-            logger.debug(f"Вычислен хеш файла: {file_hash}")
+            # Шаг 2: Хеш файла (обычно уже посчитан при скачивании)
+            file_hash = await self._file_hash(request, temp_file_path)
+            logger.debug(f"Хеш файла: {file_hash}")
 
             # Шаг 3: Генерируем ключ кеша с хешем
             cache_key = self.history.generate_result_cache_key(request, file_hash)
@@ -305,6 +314,7 @@ class ProcessingService(BaseProcessingService):
 
                         processing_metrics.download_duration = download_result["duration"]
                         processing_metrics.file_size_bytes = download_result["bytes_downloaded"]
+                        request.file_hash = file_hash_from_sha256(download_result["sha256"])
                 else:
                     if os.path.exists(temp_file_path):
                         file_size = os.path.getsize(temp_file_path)
@@ -337,6 +347,12 @@ class ProcessingService(BaseProcessingService):
                 f"diarization={transcription_result.diarization is not None}"
             )
 
+            # ЭТАП 1 (анализ встречи) не зависит ни от сопоставления, ни от
+            # шаблона: если сопоставление не даст тип встречи (нет участников
+            # или диаризации), анализ понадобится наверняка — стартуем его сразу.
+            if not (request.participants_list and transcription_result.diarization):
+                self._prefetch_stage1(request, transcription_result)
+
             mapping_result, template = await asyncio.gather(
                 self._run_speaker_mapping(request, transcription_result),
                 self._suggest_template_if_needed(request, transcription_result, progress_tracker),
@@ -356,6 +372,12 @@ class ProcessingService(BaseProcessingService):
             # диаризации с ≥ 1 спикером (ADR-0002) — даже с пустым авто-маппингом
             # и без списка участников (там имена вводятся вручную).
             speaker_mapping, request_meeting_type = mapping_result
+
+            # Сопоставление не дало и тип, и маппинг — генерация запустит
+            # ЭТАП 1; пусть он идёт, пока пользователь смотрит карточку
+            if not (speaker_mapping and request_meeting_type):
+                self._prefetch_stage1(request, transcription_result)
+
             if _should_show_mapping_card(transcription_result.diarization):
                 if await self._mapping_confirmation_enabled(request.user_id):
                     # task_id передаём ДО показа кнопок подтверждения, чтобы он
@@ -393,6 +415,24 @@ class ProcessingService(BaseProcessingService):
             )
             return outcome.result
 
+    def _prefetch_stage1(self, request: ProcessingRequest, transcription_result: Any) -> None:
+        """Запустить ЭТАП 1 в фоне; генерация заберёт результат по тому же входу.
+
+        Best-effort: сбой предвыборки не влияет на обработку — генерация просто
+        выполнит анализ сама.
+        """
+        if not settings.stage1_prefetch:
+            return
+        try:
+            from src.llm import protocol_generator
+
+            protocol_generator.prefetch_analysis(
+                transcription=transcription_result.best_transcript,
+                **stage1_context(request),
+            )
+        except Exception as e:
+            logger.warning(f"Не удалось запустить предвыборку ЭТАПА 1: {e}")
+
     async def _mapping_confirmation_enabled(self, telegram_user_id: int) -> bool:
         """Спрашивать ли имена спикеров у этого пользователя.
 
@@ -518,7 +558,7 @@ class ProcessingService(BaseProcessingService):
                 chat_id=progress_tracker.chat_id,
             )
 
-            session_key = mapping_sessions.save(request.user_id, session)
+            session_key = await mapping_sessions.save(request.user_id, session)
 
             confirmation_message = await show_mapping_confirmation(
                 bot=progress_tracker.bot,
@@ -560,13 +600,14 @@ class ProcessingService(BaseProcessingService):
                         f"Не удалось отправить уведомление об ошибке UI: {notify_error}"
                     )
 
-                mapping_sessions.discard(request.user_id, session_key)
+                await mapping_sessions.discard(request.user_id, session_key)
                 request.speaker_mapping = speaker_mapping
                 return True  # continue processing
             else:
                 # Ссылку на карточку кладём в сессию: ручной ввод имени
                 # перерисовывает её на месте (сообщение с именем — отдельное).
                 session.confirmation_message = confirmation_message
+                await mapping_sessions.persist(request.user_id, session)
                 logger.info(
                     "Обработка приостановлена - ожидаю подтверждения от пользователя"
                 )
@@ -598,6 +639,7 @@ class ProcessingService(BaseProcessingService):
         )
         return True
 
+    @scoped
     async def continue_processing_after_mapping_confirmation(
         self,
         session: MappingSession,
@@ -868,7 +910,7 @@ class ProcessingService(BaseProcessingService):
     ) -> Any:
         """Оптимизированная транскрипция с кэшированием и предобработкой"""
 
-        file_hash = await self.history.calculate_file_hash(file_path)
+        file_hash = await self._file_hash(request, file_path)
         cache_key = f"transcription:{file_hash}:{request.language}"
 
         cached_transcription = await performance_cache.get(cache_key)
@@ -882,7 +924,7 @@ class ProcessingService(BaseProcessingService):
 
             logger.info(f"Запускаем транскрипцию файла: {file_path}")
             transcription_result = await self._run_transcription_async(
-                file_path, request.language
+                file_path, request.language, content_hash=file_hash
             )
             logger.info(
                 f"Транскрипция завершена. Результат получен: "
@@ -934,10 +976,12 @@ class ProcessingService(BaseProcessingService):
 
         return transcription_result
 
-    async def _run_transcription_async(self, file_path: str, language: str):
-        """Асинхронная транскрипция"""
+    async def _run_transcription_async(
+        self, file_path: str, language: str, content_hash: Optional[str] = None
+    ):
+        """Асинхронная транскрипция (через хранилище транскрипций по хешу)"""
         return await self.transcription_service.transcribe_with_diarization(
-            file_path, language
+            file_path, language, content_hash=content_hash
         )
 
     # ------------------------------------------------------------------
@@ -960,11 +1004,23 @@ class ProcessingService(BaseProcessingService):
                     "download",
                 )
 
+        request.file_hash = file_hash_from_sha256(result["sha256"])
         logger.info(
             f"Файл скачан: {temp_file_path} ({result['bytes_downloaded']} байт)"
         )
         return temp_file_path
 
+    async def _file_hash(self, request: ProcessingRequest, file_path: str) -> str:
+        """Хеш содержимого для ключей кеша — один на весь прогон.
+
+        Скачивание кладёт хеш в ``request.file_hash`` по ходу записи файла;
+        диск перечитывается, только если его там нет (например, задача
+        восстановлена из БД после рестарта).
+        """
+        if not request.file_hash:
+            request.file_hash = await self.history.calculate_file_hash(file_path)
+        return request.file_hash
+
     # ------------------------------------------------------------------
     # Performance / monitoring
     # ------------------------------------------------------------------
@@ -977,6 +1033,7 @@ class ProcessingService(BaseProcessingService):
 
         return {
             "cache": cache_stats,
+            "transcription_store": await transcription_store.get_stats(),
             "metrics": metrics_stats,
             "task_pool": task_pool_stats,
             "optimizations": {
@@ -1,7 +1,7 @@
 """Действия с готовым протоколом: PDF и перегенерация из истории.
 
 Обработка записи стоит минуты и деньги; готовый протокол хранится в
-processing_history вместе с транскрипцией. PDF рендерится из сохранённого
+истории вместе с транскрипцией. PDF рендерится из сохранённого
 текста, перегенерация другим шаблоном — один LLM-вызов без повторной
 транскрипции.
 """
@@ -79,7 +79,9 @@ async def regenerate_protocol(
     """
     from src.database import history_repo
 
-    row = await history_repo.get_result_for_user(history_id, telegram_user_id)
+    row = await history_repo.get_result_for_user(
+        history_id, telegram_user_id, with_result=False
+    )
     if not row:
         logger.warning(
             f"Перегенерация: запись {history_id} не найдена или чужая "
@@ -87,8 +89,7 @@ async def regenerate_protocol(
         )
         return False
 
-    transcription_text = (row.get("transcription_text") or "").strip()
-    if not transcription_text:
+    if not row.get("has_transcription"):
         logger.warning(f"Перегенерация: у записи {history_id} нет транскрипции")
         return False
 
@@ -97,6 +98,15 @@ async def regenerate_protocol(
         logger.warning(f"Перегенерация: шаблон {template_id} не найден")
         return False
 
+    # Транскрипция — самый тяжёлый текст записи; читаем её последней, когда
+    # перегенерация точно состоится
+    transcription_text = (
+        await history_repo.get_transcription_text(history_id) or ""
+    ).strip()
+    if not transcription_text:
+        logger.warning(f"Перегенерация: у записи {history_id} нет транскрипции")
+        return False
+
     # Итоги ЭТАПА 1, сохранённые с исходным протоколом. Если оба на месте,
     # генератор пропустит анализ — имена участников совпадут с уже отправленным
     # протоколом. Пусто (старые записи) → полный анализ, как раньше, без ошибок.
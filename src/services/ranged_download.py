@@ -0,0 +1,339 @@
+"""Параллельное докачиваемое скачивание внешних записей по HTTP Range.
+
+Запись с Google Drive, Яндекс.Диска или Synology весит до
+``max_external_file_size`` (2 GB). Одно соединение упирается в скорость
+одного TCP-потока, а обрыв на 90% начинал скачивание заново.
+
+Если сервер отвечает на ``Range: bytes=0-0`` кодом 206 с полным размером в
+``Content-Range``, файл делится на несколько диапазонов. Они качаются
+параллельно в заранее выделенный файл (``os.pwrite`` в пуле потоков, цикл
+событий не блокируется). Рядом лежит JSON с тем, сколько байт каждого
+диапазона уже на диске. Обрыв соединения докачивает диапазон с того же места,
+а повторный запуск после сбоя продолжает по этому файлу, если размер и
+валидатор (ETag/Last-Modified) не изменились.
+
+Без поддержки Range остаётся прежний путь: один поток с хешем в том же проходе.
+В ranged-режиме байты приходят не по порядку, поэтому SHA-256 считается одним
+последовательным чтением готового файла в потоке.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+import aiohttp
+from loguru import logger
+
+from src.exceptions.file import FileError
+from src.performance.async_optimization import write_stream_hashed
+
+# Сетевые сбои, после которых диапазон докачивается с последнего записанного байта
+_RETRYABLE_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError, ConnectionError)
+_HASH_READ_SIZE = 1024 * 1024
+
+
+@dataclass
+class DownloadProgress:
+    """Снимок прогресса скачивания для индикатора."""
+    downloaded: int
+    total: int
+    bytes_per_second: float
+
+    @property
+    def percent(self) -> float:
+        return 100.0 * self.downloaded / self.total if self.total else 0.0
+
+
+ProgressCallback = Callable[[DownloadProgress], Awaitable[None]]
+
+
+@dataclass
+class RangePart:
+    """Диапазон файла ``[start, end]`` (включительно) и число уже записанных байт."""
+    start: int
+    end: int
+    done: int = 0
+
+    @property
+    def length(self) -> int:
+        return self.end - self.start + 1
+
+    @property
+    def complete(self) -> bool:
+        return self.done >= self.length
+
+
+@dataclass
+class RangeProbe:
+    """Результат пробного запроса: поддержка Range, размер и валидатор версии."""
+    accepts_ranges: bool
+    total: int
+    validator: str = ""
+
+
+async def probe_ranges(session, url: str) -> RangeProbe:
+    """Пробный ``Range: bytes=0-0``: 206 с ``Content-Range`` — диапазоны поддерживаются."""
+    async with session.get(url, headers={"Range": "bytes=0-0"}) as response:
+        validator = response.headers.get("etag") or response.headers.get("last-modified") or ""
+        if response.status == 206:
+            total = response.headers.get("content-range", "").split("/")[-1]
+            if total.isdigit():
+                return RangeProbe(True, int(total), validator)
+        content_length = response.headers.get("content-length", "")
+        if response.status == 200 and content_length.isdigit():
+            return RangeProbe(False, int(content_length), validator)
+        return RangeProbe(False, 0, validator)
+
+
+def plan_parts(total: int, parts: int, min_part_bytes: int) -> List[RangePart]:
+    """Поделить ``total`` байт на не более ``parts`` диапазонов не короче ``min_part_bytes``."""
+    count = max(1, min(parts, total // max(1, min_part_bytes)))
+    size = -(-total // count)
+    return [
+        RangePart(start, min(start + size, total) - 1)
+        for start in range(0, total, size)
+    ]
+
+
+def progress_path(partial_path: str) -> str:
+    """Путь JSON-записи прогресса рядом с недокачанным файлом."""
+    return f"{partial_path}.json"
+
+
+def _load_parts(partial_path: str, total: int, validator: str) -> Optional[List[RangePart]]:
+    """Диапазоны прошлой попытки, если она качала тот же файл той же версии."""
+    try:
+        with open(progress_path(partial_path), encoding="utf-8") as file:
+            record = json.load(file)
+        if record.get("total") != total or record.get("validator") != validator:
+            return None
+        if os.path.getsize(partial_path) != total:
+            return None
+        return [RangePart(*part) for part in record["parts"]]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _save_parts(partial_path: str, total: int, validator: str, parts: List[RangePart]) -> None:
+    record = {
+        "total": total,
+        "validator": validator,
+        "parts": [[part.start, part.end, part.done] for part in parts],
+    }
+    tmp_path = f"{progress_path(partial_path)}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(record, file)
+    os.replace(tmp_path, progress_path(partial_path))
+
+
+def _open_preallocated(partial_path: str, total: int) -> int:
+    fd = os.open(partial_path, os.O_RDWR | os.O_CREAT, 0o644)
+    if os.fstat(fd).st_size != total:
+        os.ftruncate(fd, total)
+    return fd
+
+
+def _unlink_quietly(path: str) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def _sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(_HASH_READ_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def discard_partial(partial_path: str) -> None:
+    """Удалить недокачанный файл и запись прогресса."""
+    for path in (partial_path, progress_path(partial_path)):
+        _unlink_quietly(path)
+
+
+class RangedDownloader:
+    """Скачивание одного URL в ``partial_path`` параллельными диапазонами.
+
+    Сессия — та же, что резолвила ссылку (у Synology в её cookie jar лежит
+    токен). ``on_progress`` вызывается не чаще ``progress_interval`` секунд
+    отдельной задачей и не тормозит скачивание.
+    """
+
+    def __init__(
+        self,
+        session,
+        *,
+        parts: int = 4,
+        min_part_bytes: int = 8 * 1024 * 1024,
+        max_retries: int = 5,
+        retry_delay: float = 0.5,
+        chunk_size: int = 256 * 1024,
+        flush_bytes: int = 1024 * 1024,
+        on_progress: Optional[ProgressCallback] = None,
+        progress_interval: float = 3.0,
+    ):
+        self.session = session
+        self.parts = parts
+        self.min_part_bytes = min_part_bytes
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.chunk_size = chunk_size
+        self.flush_bytes = flush_bytes
+        self.on_progress = on_progress
+        self.progress_interval = progress_interval
+        self._downloaded = 0
+        self._total = 0
+        self._started_at = 0.0
+        self._resumed_bytes = 0
+        # Сохранение прогресса, идущее в потоке: отмена задачи его не прерывает
+        self._checkpointing: Optional[asyncio.Future] = None
+
+    async def download(self, url: str, partial_path: str) -> Tuple[int, str]:
+        """Скачать файл; вернуть (число байт, hex SHA-256)."""
+        probe = await probe_ranges(self.session, url)
+        self._total = probe.total
+        self._started_at = time.monotonic()
+        if not probe.accepts_ranges or probe.total <= 0:
+            logger.info(f"Сервер не поддерживает Range, качаем одним потоком: {url[:80]}")
+            return await self._download_single(url, partial_path)
+        return await self._download_ranged(url, partial_path, probe)
+
+    async def _download_single(self, url: str, partial_path: str) -> Tuple[int, str]:
+        async def counted(chunks):
+            async for chunk in chunks:
+                self._downloaded += len(chunk)
+                yield chunk
+
+        async with self.session.get(url) as response:
+            if response.status != 200:
+                raise FileError(f"Ошибка при скачивании файла. Код ответа: {response.status}")
+            return await self._with_reporter(
+                write_stream_hashed(counted(response.content.iter_chunked(self.chunk_size)), partial_path)
+            )
+
+    async def _download_ranged(self, url: str, partial_path: str, probe: RangeProbe) -> Tuple[int, str]:
+        parts = await asyncio.to_thread(_load_parts, partial_path, probe.total, probe.validator)
+        if parts is None:
+            parts = plan_parts(probe.total, self.parts, self.min_part_bytes)
+        else:
+            self._resumed_bytes = sum(part.done for part in parts)
+            logger.info(
+                f"Докачка с {self._resumed_bytes / (1024 * 1024):.1f} из "
+                f"{probe.total / (1024 * 1024):.1f} МБ"
+            )
+        self._downloaded = sum(part.done for part in parts)
+
+        fd = await asyncio.to_thread(_open_preallocated, partial_path, probe.total)
+        try:
+            await asyncio.to_thread(_save_parts, partial_path, probe.total, probe.validator, parts)
+            await self._with_reporter(
+                self._fetch_all(url, fd, [part for part in parts if not part.complete]),
+                checkpoint=lambda: _save_parts(partial_path, probe.total, probe.validator, parts),
+            )
+        finally:
+            await asyncio.to_thread(os.close, fd)
+            # Запись прогресса после сбоя — то, с чего начнётся следующая попытка
+            if not all(part.complete for part in parts):
+                await asyncio.to_thread(_save_parts, partial_path, probe.total, probe.validator, parts)
+
+        sha256 = await asyncio.to_thread(_sha256_file, partial_path)
+        await asyncio.to_thread(_unlink_quietly, progress_path(partial_path))
+        return probe.total, sha256
+
+    async def _fetch_all(self, url: str, fd: int, pending: List[RangePart]) -> None:
+        tasks = [asyncio.create_task(self._fetch_part(url, fd, part)) for part in pending]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+    async def _fetch_part(self, url: str, fd: int, part: RangePart) -> None:
+        attempt = 0
+        while not part.complete:
+            offset = part.start + part.done
+            buffer = bytearray()
+            try:
+                headers = {"Range": f"bytes={offset}-{part.end}"}
+                async with self.session.get(url, headers=headers) as response:
+                    if response.status != 206:
+                        raise FileError(
+                            f"Сервер перестал отдавать диапазоны (код ответа: {response.status})"
+                        )
+                    async for chunk in response.content.iter_chunked(self.chunk_size):
+                        buffer += chunk
+                        if len(buffer) >= self.flush_bytes:
+                            await self._flush(fd, part, buffer)
+                            buffer = bytearray()
+                await self._flush(fd, part, buffer)
+                if not part.complete:
+                    raise aiohttp.ClientPayloadError("соединение закрыто до конца диапазона")
+            except _RETRYABLE_ERRORS as e:
+                # Полученные до обрыва байты валидны — сохраняем их и докачиваем хвост
+                await self._flush(fd, part, buffer)
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise FileError(f"Скачивание прервано после {self.max_retries} повторов: {e}")
+                delay = min(self.retry_delay * 2 ** attempt, 10.0)
+                logger.warning(
+                    f"Обрыв диапазона {part.start}-{part.end} на {part.done}/{part.length} байт, "
+                    f"повтор {attempt}/{self.max_retries} через {delay:.1f} с: {e}"
+                )
+                await asyncio.sleep(delay)
+
+    async def _flush(self, fd: int, part: RangePart, buffer: bytearray) -> None:
+        # Сервер мог прислать больше запрошенного — лишнее чужому диапазону не пишем
+        data = bytes(buffer[: part.length - part.done])
+        if not data:
+            return
+        await asyncio.to_thread(os.pwrite, fd, data, part.start + part.done)
+        part.done += len(data)
+        self._downloaded += len(data)
+
+    async def _with_reporter(self, work: Awaitable, checkpoint: Optional[Callable[[], None]] = None):
+        """Выполнить ``work``, периодически сохраняя прогресс и сообщая его наружу.
+
+        После отмены репортёра дожидаемся начатого сохранения: поток с ним
+        отменой не останавливается, а финальная запись прогресса или удаление
+        файла прогресса не должны с ним разминуться.
+        """
+        reporter = asyncio.create_task(self._report_loop(checkpoint))
+        try:
+            return await work
+        finally:
+            reporter.cancel()
+            await asyncio.gather(reporter, return_exceptions=True)
+            if self._checkpointing is not None:
+                await asyncio.gather(self._checkpointing, return_exceptions=True)
+                self._checkpointing = None
+
+    async def _report_loop(self, checkpoint: Optional[Callable[[], None]]) -> None:
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            if checkpoint is not None:
+                self._checkpointing = asyncio.ensure_future(asyncio.to_thread(checkpoint))
+                try:
+                    await asyncio.shield(self._checkpointing)
+                except OSError as e:
+                    logger.warning(f"Не удалось сохранить прогресс скачивания: {e}")
+            if self.on_progress is not None:
+                try:
+                    await self.on_progress(self.snapshot())
+                except Exception as e:
+                    logger.debug(f"Индикатор скачивания не обновлён: {e}")
+
+    def snapshot(self) -> DownloadProgress:
+        """Текущий прогресс; скорость — по байтам этой попытки."""
+        elapsed = max(time.monotonic() - self._started_at, 1e-6)
+        fresh_bytes = self._downloaded - self._resumed_bytes
+        return DownloadProgress(self._downloaded, self._total, fresh_bytes / elapsed)
+
@@ -0,0 +1,79 @@
+"""Identity map одной обработки: пользователь и шаблоны читаются из БД один раз.
+
+За один прогон ``process_file`` пользователь нужен загрузке данных, решению о
+карточке сопоставления и сохранению истории, шаблон — выбору и генерации.
+Каждое обращение раньше шло отдельным запросом к SQLite и новой сборкой
+pydantic-модели. Область живёт в ``contextvars``: её видят все сервисы,
+вызванные внутри обработки (и задачи, созданные из неё), без протаскивания
+лишнего аргумента через хвост завершения и сессию сопоставления.
+
+Вне области (обычные хендлеры) сервисы читают БД как раньше.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+_current: ContextVar[Optional["RequestScope"]] = ContextVar("request_scope", default=None)
+
+
+class RequestScope:
+    """Кэш пользователей и шаблонов на время одной обработки."""
+
+    def __init__(self):
+        self._users: Dict[int, Any] = {}
+        self._templates: Dict[int, Any] = {}
+
+    async def user(self, telegram_id: int,
+                   load: Callable[[int], Awaitable[Optional[T]]]) -> Optional[T]:
+        """Пользователь по Telegram ID; ``load`` вызывается только при промахе."""
+        if telegram_id not in self._users:
+            self._users[telegram_id] = await load(telegram_id)
+        return self._users[telegram_id]
+
+    async def template(self, template_id: int,
+                       load: Callable[[int], Awaitable[T]]) -> T:
+        """Шаблон по ID; ошибка загрузки не кэшируется."""
+        if template_id not in self._templates:
+            self._templates[template_id] = await load(template_id)
+        return self._templates[template_id]
+
+    def forget_user(self, telegram_id: int) -> None:
+        """Сбросить пользователя после записи в его строку."""
+        self._users.pop(telegram_id, None)
+
+    def forget_templates(self) -> None:
+        """Сбросить шаблоны после изменения таблицы."""
+        self._templates.clear()
+
+
+def current_scope() -> Optional[RequestScope]:
+    """Открытая область текущей обработки или ``None``."""
+    return _current.get()
+
+
+@contextmanager
+def request_scope() -> Iterator[RequestScope]:
+    """Открыть область; вложенный вызов переиспользует внешнюю."""
+    scope = _current.get()
+    if scope is not None:
+        yield scope
+        return
+    scope = RequestScope()
+    token = _current.set(scope)
+    try:
+        yield scope
+    finally:
+        _current.reset(token)
+
+
+def scoped(func):
+    """Выполнить корутину внутри области обработки."""
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        with request_scope():
+            return await func(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,362 @@
+"""
+Общее состояние нескольких процессов бота
+
+Состояние FSM, сессии сопоставления и их расшифровки раньше жили только в
+памяти процесса: второй процесс за тем же токеном их не видел, а рестарт
+терял все карточки, ждущие подтверждения. Здесь — ключ-значение хранилище с
+TTL, которое разделяют процессы:
+
+- ``sqlite`` — файл SQLite в режиме WAL (процессы на одном хосте);
+- ``redis`` — любой Redis-совместимый сервер (процессы на разных хостах);
+- ``memory`` — прежнее поведение: всё в памяти процесса, бэкенда нет.
+
+Интерфейс бэкенда синхронный, как у ``TranscriptionStore``: значения
+небольшие, а вызов может ждать блокировку файла другого процесса или сеть.
+Асинхронные потребители — FSM-хранилище aiogram, хранилище сессий
+сопоставления и кэш шаблонов — ходят в бэкенд через ``asyncio.to_thread``,
+не занимая цикл событий.
+"""
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Protocol
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from loguru import logger
+
+from src.config import settings
+from src.utils.optional_deps import module_available
+
+# Просроченные строки SQLite чистятся раз в столько записей
+_PURGE_EVERY_WRITES = 200
+
+# Сравнить и удалить одним шагом на сервере Redis
+_REDIS_DELETE_IF = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS shared_state (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    expires_at REAL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS idx_shared_state_expires
+    ON shared_state(expires_at);
+"""
+
+
+class StateBackend(Protocol):
+    """Ключ-значение хранилище с TTL, общее для процессов бота."""
+
+    name: str
+
+    def get(self, namespace: str, key: str) -> Optional[bytes]: ...
+
+    def set(self, namespace: str, key: str, value: bytes, ttl: Optional[float] = None) -> None: ...
+
+    def add(self, namespace: str, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        """Записать, только если ключа нет (иначе продлить TTL); True — записано."""
+        ...
+
+    def pop(self, namespace: str, key: str) -> Optional[bytes]:
+        """Атомарно прочитать и удалить: из двух процессов значение получит один."""
+        ...
+
+    def delete(self, namespace: str, key: str) -> None: ...
+
+    def delete_if(self, namespace: str, key: str, value: bytes) -> bool:
+        """Атомарно удалить, только если значение равно ``value``; True — удалено."""
+        ...
+
+
+class SQLiteStateBackend:
+    """Бэкенд на файле SQLite (WAL): процессы одного хоста."""
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._initialized = False
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Короткое соединение на операцию в режиме autocommit (транзакции — явные)."""
+        self._ensure_initialized()
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA synchronous = NORMAL")
+            yield conn
+        finally:
+            conn.close()
+
+    def _ensure_initialized(self) -> None:
+        if self._initialized:
+            return
+        with self._lock:
+            if self._initialized:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            try:
+                conn.execute("PRAGMA journal_mode = WAL")
+                conn.executescript(_SCHEMA)
+                conn.commit()
+            finally:
+                conn.close()
+            self._initialized = True
+
+    @staticmethod
+    def _expires_at(ttl: Optional[float]) -> Optional[float]:
+        return time.time() + ttl if ttl else None
+
+    def _wrote(self, conn: sqlite3.Connection) -> None:
+        self._writes += 1
+        if self._writes % _PURGE_EVERY_WRITES == 0:
+            conn.execute("DELETE FROM shared_state WHERE expires_at < ?", (time.time(),))
+
+    def get(self, namespace: str, key: str) -> Optional[bytes]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value FROM shared_state WHERE namespace = ? AND key = ? "
+                "AND (expires_at IS NULL OR expires_at > ?)",
+                (namespace, key, time.time()),
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, namespace: str, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO shared_state (namespace, key, value, expires_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(namespace, key) DO UPDATE SET "
+                "value = excluded.value, expires_at = excluded.expires_at",
+                (namespace, key, value, self._expires_at(ttl)),
+            )
+            self._wrote(conn)
+
+    def add(self, namespace: str, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        expires_at = self._expires_at(ttl)
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT expires_at FROM shared_state WHERE namespace = ? AND key = ?",
+                    (namespace, key),
+                ).fetchone()
+                if row is not None and (row[0] is None or row[0] > time.time()):
+                    conn.execute(
+                        "UPDATE shared_state SET expires_at = ? WHERE namespace = ? AND key = ?",
+                        (expires_at, namespace, key),
+                    )
+                    added = False
+                else:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO shared_state (namespace, key, value, expires_at) "
+                        "VALUES (?, ?, ?, ?)",
+                        (namespace, key, value, expires_at),
+                    )
+                    added = True
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            self._wrote(conn)
+        return added
+
+    def pop(self, namespace: str, key: str) -> Optional[bytes]:
+        with self._connect() as conn:
+            # BEGIN IMMEDIATE берёт блокировку записи до чтения: второй процесс
+            # дождётся удаления и получит пустоту
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT value, expires_at FROM shared_state WHERE namespace = ? AND key = ?",
+                    (namespace, key),
+                ).fetchone()
+                if row is not None:
+                    conn.execute(
+                        "DELETE FROM shared_state WHERE namespace = ? AND key = ?",
+                        (namespace, key),
+                    )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return None
+        return row[0]
+
+    def delete(self, namespace: str, key: str) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM shared_state WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def delete_if(self, namespace: str, key: str, value: bytes) -> bool:
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "DELETE FROM shared_state WHERE namespace = ? AND key = ? AND value = ?",
+                (namespace, key, value),
+            )
+        return cursor.rowcount > 0
+
+
+class RedisStateBackend:
+    """Бэкенд на Redis-совместимом сервере: процессы на разных хостах."""
+
+    name = "redis"
+
+    def __init__(self, url: str, prefix: str = "soroka"):
+        import redis
+
+        self._redis = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._delete_if = self._redis.register_script(_REDIS_DELETE_IF)
+
+    def _key(self, namespace: str, key: str) -> str:
+        return f"{self.prefix}:{namespace}:{key}"
+
+    @staticmethod
+    def _ex(ttl: Optional[float]) -> Optional[int]:
+        return max(1, int(ttl)) if ttl else None
+
+    def get(self, namespace: str, key: str) -> Optional[bytes]:
+        return self._redis.get(self._key(namespace, key))
+
+    def set(self, namespace: str, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        self._redis.set(self._key(namespace, key), value, ex=self._ex(ttl))
+
+    def add(self, namespace: str, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        name = self._key(namespace, key)
+        if self._redis.set(name, value, ex=self._ex(ttl), nx=True):
+            return True
+        if ttl:
+            self._redis.expire(name, self._ex(ttl))
+        return False
+
+    def pop(self, namespace: str, key: str) -> Optional[bytes]:
+        # MULTI/EXEC вместо GETDEL: работает и на серверах без Redis 6.2
+        pipe = self._redis.pipeline(transaction=True)
+        pipe.get(self._key(namespace, key))
+        pipe.delete(self._key(namespace, key))
+        value, _ = pipe.execute()
+        return value
+
+    def delete(self, namespace: str, key: str) -> None:
+        self._redis.delete(self._key(namespace, key))
+
+    def delete_if(self, namespace: str, key: str, value: bytes) -> bool:
+        return bool(self._delete_if(keys=[self._key(namespace, key)], args=[value]))
+
+
+def _encode_fsm_value(value: Any) -> Dict[str, str]:
+    """JSON для данных FSM: даты из ``model_dump()`` хендлеров — с меткой типа.
+
+    MemoryStorage хранит объекты как есть, и хендлеры кладут туда datetime
+    (``meeting_info.start_time``); метка возвращает их из бэкенда тем же типом.
+    """
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    if isinstance(value, date):
+        return {"__date__": value.isoformat()}
+    raise TypeError(f"Значение типа {type(value).__name__} не сериализуется в данные FSM")
+
+
+def _decode_fsm_value(obj: Dict[str, Any]) -> Any:
+    if len(obj) == 1:
+        if "__datetime__" in obj:
+            return datetime.fromisoformat(obj["__datetime__"])
+        if "__date__" in obj:
+            return date.fromisoformat(obj["__date__"])
+    return obj
+
+
+class SharedFSMStorage(BaseStorage):
+    """FSM-хранилище aiogram поверх общего бэкенда."""
+
+    def __init__(self, backend: StateBackend):
+        self.backend = backend
+        self.key_builder = DefaultKeyBuilder(with_destiny=True)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        name = self.key_builder.build(key, "state")
+        value = state.state if isinstance(state, State) else state
+        if value is None:
+            await asyncio.to_thread(self.backend.delete, "fsm", name)
+        else:
+            await asyncio.to_thread(self.backend.set, "fsm", name, value.encode("utf-8"))
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        value = await asyncio.to_thread(self.backend.get, "fsm", self.key_builder.build(key, "state"))
+        return value.decode("utf-8") if value is not None else None
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        name = self.key_builder.build(key, "data")
+        if not data:
+            await asyncio.to_thread(self.backend.delete, "fsm", name)
+            return
+        payload = json.dumps(
+            data, ensure_ascii=False, default=_encode_fsm_value
+        ).encode("utf-8")
+        await asyncio.to_thread(self.backend.set, "fsm", name, payload)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        value = await asyncio.to_thread(self.backend.get, "fsm", self.key_builder.build(key, "data"))
+        if value is None:
+            return {}
+        return json.loads(value, object_hook=_decode_fsm_value)
+
+    async def close(self) -> None:
+        pass
+
+
+def create_state_backend() -> Optional[StateBackend]:
+    """Бэкенд из настроек; None — состояние остаётся в памяти процесса."""
+    kind = settings.state_backend.lower()
+    if kind == "sqlite":
+        return SQLiteStateBackend(settings.state_sqlite_path)
+    if kind == "redis":
+        if not settings.redis_url:
+            logger.error("STATE_BACKEND=redis, но REDIS_URL не задан — состояние остаётся в памяти")
+            return None
+        if not module_available("redis"):
+            logger.error("STATE_BACKEND=redis, но пакет redis не установлен — состояние остаётся в памяти")
+            return None
+        return RedisStateBackend(settings.redis_url)
+    if kind != "memory":
+        logger.warning(f"Неизвестный STATE_BACKEND={settings.state_backend} — состояние остаётся в памяти")
+    return None
+
+
+def create_fsm_storage(backend: Optional[StateBackend]) -> BaseStorage:
+    if backend is None:
+        return MemoryStorage()
+    return SharedFSMStorage(backend)
+
+
+# Бэкенд процесса (None — режим memory)
+state_backend = create_state_backend()
+
+
+__all__ = [
+    "RedisStateBackend",
+    "SQLiteStateBackend",
+    "SharedFSMStorage",
+    "StateBackend",
+    "create_fsm_storage",
+    "create_state_backend",
+    "state_backend",
+]
@@ -3,13 +3,16 @@ ML-based классификатор шаблонов на основе embedding
 """
 
 import re
-from typing import Dict, List, Optional, Tuple
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 
-import numpy as np
 from loguru import logger
 
 from src.models.template import Template
 
+if TYPE_CHECKING:
+    # numpy приходит вместе с sentence-transformers при загрузке модели
+    import numpy as np
+
 # Ключевые слова категорий (бывший meeting_classifier — внутренний шов подсказки шаблонов)
 _CATEGORY_KEYWORDS = {
     'technical': [
@@ -83,7 +86,7 @@ class SmartTemplateSelector:
     
     def __init__(self):
         self.model = None
-        self.template_embeddings: Dict[int, np.ndarray] = {}
+        self.template_embeddings: Dict[int, "np.ndarray"] = {}
         self._initialized = False
     
     def _score_categories(self, transcription: str) -> Tuple[str, Dict[str, float]]:
@@ -0,0 +1,189 @@
+"""Привязка спикеров pyannote к сегментам транскрипции WhisperX.
+
+Для каждого интервала транскрипции (сегмента или слова) выбирается спикер с
+максимальным пересечением по времени. Вместо перебора всех реплик pyannote для
+каждого сегмента (O(сегменты × реплики)) используется заметающая прямая:
+интервалы и реплики сортируются по началу, активные реплики держатся в куче по
+концу. Каждая реплика один раз входит в кучу и один раз из неё выходит, так
+что работа — O((n + m) log m) плюс число реальных пересечений.
+
+Если выравнивание отдало слова с таймингами, спикер определяется для каждого
+слова, и сегмент, внутри которого сменился говорящий, режется на части по
+границам смены. Слова без таймингов (числа, символы) наследуют спикера соседей.
+"""
+
+import heapq
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+Interval = Tuple[float, float]
+
+
+def _normalize_turns(turns: Sequence[Dict[str, Any]]) -> List[Tuple[float, float, int, str]]:
+    """Реплики как (start, end, порядковый номер, speaker), отсортированные по началу.
+
+    Порядковый номер сохраняет исходный порядок pyannote для разрешения
+    ничьих: при равном пересечении побеждает реплика, пришедшая раньше.
+    """
+    normalized = [
+        (float(turn["start"]), float(turn["end"]), index, turn["speaker"])
+        for index, turn in enumerate(turns)
+        if turn.get("start") is not None and turn.get("end") is not None
+    ]
+    normalized.sort()
+    return normalized
+
+
+def best_overlap_speakers(
+    intervals: Sequence[Interval],
+    turns: Sequence[Dict[str, Any]],
+) -> List[Optional[str]]:
+    """Спикер с максимальным пересечением для каждого интервала (None — пересечений нет).
+
+    Результат выровнен по ``intervals``; входной порядок интервалов не важен.
+    """
+    sorted_turns = _normalize_turns(turns)
+    result: List[Optional[str]] = [None] * len(intervals)
+    order = sorted(range(len(intervals)), key=lambda i: intervals[i][0])
+
+    active: List[Tuple[float, int]] = []  # куча (end, индекс в sorted_turns)
+    next_turn = 0
+    for position in order:
+        start, end = intervals[position]
+        # Реплики, начавшиеся до начала интервала, переходят в активные
+        while next_turn < len(sorted_turns) and sorted_turns[next_turn][0] <= start:
+            heapq.heappush(active, (sorted_turns[next_turn][1], next_turn))
+            next_turn += 1
+        # Закончившиеся до начала интервала больше никого не пересекут
+        while active and active[0][0] <= start:
+            heapq.heappop(active)
+
+        best: Optional[Tuple[float, int]] = None  # (пересечение, -исходный номер)
+        best_speaker: Optional[str] = None
+
+        def consider(turn_index: int) -> None:
+            nonlocal best, best_speaker
+            turn_start, turn_end, original, speaker = sorted_turns[turn_index]
+            if not (start < turn_end and end > turn_start):
+                return
+            # Для интервала нулевой длины внутри реплики пересечение равно 0
+            overlap = max(0.0, min(end, turn_end) - max(start, turn_start))
+            key = (overlap, -original)
+            if best is None or key > best:
+                best, best_speaker = key, speaker
+
+        for _, turn_index in active:
+            consider(turn_index)
+        # Реплики, начавшиеся внутри интервала, смотрим без извлечения:
+        # их обработает следующий интервал с большим началом
+        lookahead = next_turn
+        while lookahead < len(sorted_turns) and sorted_turns[lookahead][0] < end:
+            consider(lookahead)
+            lookahead += 1
+
+        result[position] = best_speaker
+    return result
+
+
+def _word_interval(word: Dict[str, Any]) -> Optional[Interval]:
+    start, end = word.get("start"), word.get("end")
+    if start is None or end is None:
+        return None
+    return float(start), float(end)
+
+
+def _fill_gaps(labels: List[Optional[str]]) -> List[Optional[str]]:
+    """Слова без спикера наследуют предыдущего, а в начале сегмента — следующего."""
+    filled = list(labels)
+    previous: Optional[str] = None
+    for index, label in enumerate(filled):
+        if label is None:
+            filled[index] = previous
+        else:
+            previous = label
+    following: Optional[str] = None
+    for index in range(len(filled) - 1, -1, -1):
+        if filled[index] is None:
+            filled[index] = following
+        else:
+            following = filled[index]
+    return filled
+
+
+def _split_by_words(
+    segment: Dict[str, Any],
+    words: List[Dict[str, Any]],
+    labels: List[str],
+) -> List[Dict[str, Any]]:
+    """Разрезать сегмент на части по сменам спикера между словами."""
+    parts: List[Dict[str, Any]] = []
+    run_start = 0
+    for index in range(1, len(words) + 1):
+        if index < len(words) and labels[index] == labels[run_start]:
+            continue
+        run = words[run_start:index]
+        timed = [interval for interval in map(_word_interval, run) if interval]
+        parts.append({
+            "start": timed[0][0] if timed else segment.get("start"),
+            "end": timed[-1][1] if timed else segment.get("end"),
+            "text": " ".join(str(word.get("word", "")).strip() for word in run).strip(),
+            "speaker": labels[run_start],
+            "words": run,
+        })
+        run_start = index
+    return parts
+
+
+def assign_speakers(
+    segments: Sequence[Dict[str, Any]],
+    turns: Sequence[Dict[str, Any]],
+) -> List[Dict[str, Any]]:
+    """Проставить спикеров сегментам транскрипции по репликам диаризации.
+
+    Возвращает новый список сегментов (входные dict'ы получают поле
+    ``speaker``; разрезанные сегменты заменяются новыми dict'ами). Сегмент без
+    единого пересечения получает новую метку ``SPEAKER_<n>``, как и раньше.
+    """
+    intervals: List[Interval] = []
+    segment_slots: List[int] = []
+    word_slots: List[List[Optional[int]]] = []
+
+    for segment in segments:
+        seg_start = float(segment.get("start") or 0)
+        seg_end = segment.get("end")
+        seg_end = float(seg_end) if seg_end is not None else seg_start
+        segment_slots.append(len(intervals))
+        intervals.append((seg_start, seg_end))
+
+        slots: List[Optional[int]] = []
+        for word in segment.get("words") or []:
+            interval = _word_interval(word)
+            if interval is None:
+                slots.append(None)
+            else:
+                slots.append(len(intervals))
+                intervals.append(interval)
+        word_slots.append(slots)
+
+    speakers_by_interval = best_overlap_speakers(intervals, turns)
+
+    assigned: List[Dict[str, Any]] = []
+    seen_speakers = set()
+    for segment, segment_slot, slots in zip(segments, segment_slots, word_slots):
+        words = segment.get("words") or []
+        labels = _fill_gaps([
+            speakers_by_interval[slot] if slot is not None else None for slot in slots
+        ])
+        if words and all(labels) and len(set(labels)) > 1:
+            parts = _split_by_words(segment, words, labels)
+            assigned.extend(parts)
+            seen_speakers.update(part["speaker"] for part in parts)
+            continue
+
+        # Слова точнее сегмента: паузы внутри сегмента не тянут к чужой реплике
+        speaker = labels[0] if words and all(labels) else speakers_by_interval[segment_slot]
+        if speaker is None:
+            speaker = f"SPEAKER_{len(seen_speakers) + 1}"
+        segment["speaker"] = speaker
+        seen_speakers.add(speaker)
+        assigned.append(segment)
+    return assigned
@@ -8,7 +8,7 @@ from loguru import logger
 
 from src.config import settings
 from src.llm import protocol_generator
-from src.models.diarization import Diarization, Segment
+from src.models.diarization import Diarization
 from src.models.llm_schemas import SPEAKER_MAPPING_SCHEMA
 
 
@@ -127,34 +127,26 @@ class SpeakerMappingService:
         if not diarization:
             return speakers_info
 
-        speakers = diarization.speakers
-        segments = diarization.segments
-
-        for speaker in speakers:
-            # Извлекаем фрагменты речи этого спикера
-            speaker_segments = [
-                seg for seg in segments
-                if seg.speaker == speaker
-            ]
+        # Один проход по колонкам: тексты и время говорения каждого спикера
+        texts: Dict[str, List[str]] = {speaker: [] for speaker in diarization.speakers}
+        speaking_time: Dict[str, float] = dict.fromkeys(texts, 0.0)
+        for speaker, text, start, end in diarization.segments.iter_rows():
+            texts[speaker].append(text)
+            speaking_time[speaker] += (end or 0) - (start or 0)
 
+        for speaker, speaker_texts in texts.items():
             # Извлекаем фрагменты только если требуется
             # При full_text_matching=True полная транскрипция уже содержит всю информацию,
             # поэтому извлечение фрагментов избыточно и только расходует токены LLM
             if extract_samples:
-                text_samples = self._get_distributed_samples(speaker_segments, max_samples=5)
+                text_samples = self._get_distributed_samples(speaker_texts, max_samples=5)
             else:
                 text_samples = []
 
-            # Подсчет времени говорения
-            total_time = sum(
-                (seg.end or 0) - (seg.start or 0)
-                for seg in speaker_segments
-            )
-
             speakers_info.append({
                 'speaker_id': speaker,
-                'segments_count': len(speaker_segments),
-                'speaking_time': total_time,
+                'segments_count': len(speaker_texts),
+                'speaking_time': speaking_time[speaker],
                 'text_samples': text_samples
             })
         
@@ -163,24 +155,24 @@ class SpeakerMappingService:
         
         return speakers_info
     
-    def _get_distributed_samples(self, segments: List[Segment], max_samples: int = 5) -> List[str]:
+    def _get_distributed_samples(self, texts: List[str], max_samples: int = 5) -> List[str]:
         """
         Извлекает фрагменты речи, распределенные по всей транскрипции
 
         Args:
-            segments: Список сегментов спикера
+            texts: Тексты сегментов спикера по порядку
             max_samples: Максимальное количество фрагментов
 
         Returns:
             Список текстовых фрагментов
         """
-        if not segments:
+        if not texts:
             return []
 
-        total = len(segments)
+        total = len(texts)
         if total <= max_samples:
             # Если сегментов мало, берем все
-            return [seg.text.strip() for seg in segments if seg.text]
+            return [text.strip() for text in texts if text]
         
         # Распределяем индексы по всей длине
         indices = []
@@ -210,7 +202,7 @@ class SpeakerMappingService:
         samples = []
         for idx in indices:
             if idx < total:
-                text = segments[idx].text.strip()
+                text = texts[idx].strip()
                 if text:
                     samples.append(text)
 
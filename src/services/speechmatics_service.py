@@ -13,22 +13,19 @@ from src.config import settings
 from src.exceptions.processing import CloudTranscriptionError, SpeechmaticsAPIError
 from src.models.diarization import Diarization, Segment
 from src.models.processing import TranscriptionResult
+from src.utils.optional_deps import module_available
 
-try:
-    import ssl
-
-    import urllib3
-    from httpx import HTTPStatusError
-    from speechmatics.batch_client import BatchClient
-    from speechmatics.models import ConnectionSettings
-    SPEECHMATICS_AVAILABLE = True
-except ImportError:
-    SPEECHMATICS_AVAILABLE = False
+# SDK импортируется при создании клиента (только если задан API ключ)
+SPEECHMATICS_AVAILABLE = module_available("speechmatics")
+if not SPEECHMATICS_AVAILABLE:
     logger.warning("Speechmatics SDK недоступен")
 
 # Отключаем предупреждения SSL если SSL_VERIFY=false
 if not settings.ssl_verify:
     try:
+        import ssl
+
+        import urllib3
         urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
         # Создаем глобальный SSL контекст без верификации
         ssl_context = ssl.create_default_context()
@@ -93,6 +90,7 @@ class SpeechmaticsService:
                     logger.info("Speechmatics клиент инициализирован с включенной SSL верификацией")
                 
                 # Создаем настройки подключения
+                from speechmatics.models import ConnectionSettings
                 self.settings = ConnectionSettings(**connection_kwargs)
                 
             except Exception as e:
@@ -157,6 +155,9 @@ class SpeechmaticsService:
             # Подготавливаем конфигурацию
             config = self._prepare_transcription_config(language, enable_diarization)
             
+            from httpx import HTTPStatusError
+            from speechmatics.batch_client import BatchClient
+
             # Выполняем синхронные вызовы Speechmatics в отдельном потоке, чтобы не блокировать event loop
             def _speechmatics_run_sync():
                 with BatchClient(self.settings) as client:
@@ -0,0 +1,224 @@
+"""Потоковый приём видео по ссылке: звук извлекается, пока файл ещё качается.
+
+Обычный путь — скачать запись целиком, посчитать хеш, затем ffmpeg
+(``TranscriptionService._preprocess_audio``) снимает с неё моно MP3 для
+бэкендов. Для многогигабайтного видео предобработка идёт минутами уже после
+такого же долгого скачивания, а на диске лежит ненужный видеоряд.
+
+Здесь байты ответа идут прямо в stdin ffmpeg, который на лету пишет ту же
+16 kHz моно MP3-дорожку, что и облачная предобработка; SHA-256 исходника
+считается в том же проходе. На диск попадает только маленький
+``*.intake.mp3`` — ``_preprocess_audio`` узнаёт его по суффиксу и второй раз
+не перекодирует.
+
+Не каждый файл можно разобрать из неперематываемого потока: у MP4/MOV индекс
+(``moov``) часто лежит в конце файла. Поэтому начало ответа сначала
+распознаётся (``sniff_streamable_video``): потоково принимаются
+MP4/MOV с ``moov`` перед ``mdat`` (faststart), Matroska/WebM и FLV. Остальное —
+и аудио, которое перекодируется быстро, — качается обычным путём.
+"""
+
+import asyncio
+import hashlib
+import os
+import shutil
+import struct
+import tempfile
+import time
+from typing import AsyncIterator, List, Optional, Tuple
+
+from loguru import logger
+
+from src.exceptions.file import FileError
+from src.services.ranged_download import DownloadProgress, ProgressCallback
+from src.services.transcription_backends import CLOUD_FFMPEG_ARGS
+
+# Суффикс аудио-артефакта потокового приёма; его предобработка не повторяется
+INTAKE_SUFFIX = ".intake.mp3"
+INTAKE_FFMPEG_ARGS: List[str] = list(CLOUD_FFMPEG_ARGS)
+
+# Сколько байт начала ответа нужно, чтобы распознать контейнер
+_SNIFF_BYTES = 64 * 1024
+_STDERR_TAIL = 2000
+
+_FFMPEG = "ffmpeg"
+
+# Расширения видео, для которых вообще имеет смысл пробовать потоковый приём
+STREAMABLE_VIDEO_EXTENSIONS = frozenset({".mp4", ".m4v", ".mov", ".mkv", ".webm", ".flv"})
+
+_MATROSKA_MAGIC = b"\x1a\x45\xdf\xa3"
+_FLV_MAGIC = b"FLV"
+
+
+def is_intake_artifact(file_path: str) -> bool:
+    """Файл — аудио-артефакт потокового приёма (уже в формате облачной предобработки)."""
+    return file_path.endswith(INTAKE_SUFFIX)
+
+
+def may_stream(filename: str) -> bool:
+    """Стоит ли пробовать потоковый приём: только видео, у аудио перекодирование быстрое."""
+    return os.path.splitext(filename or "")[1].lower() in STREAMABLE_VIDEO_EXTENSIONS
+
+
+def _mp4_moov_before_mdat(head: bytes) -> Optional[bool]:
+    """Порядок верхнеуровневых боксов MP4: True — moov раньше mdat, None — не видно."""
+    offset = 0
+    while offset + 8 <= len(head):
+        size, box_type = struct.unpack(">I4s", head[offset:offset + 8])
+        if box_type == b"moov":
+            return True
+        if box_type == b"mdat":
+            return False
+        if size == 1:  # 64-битный размер сразу за заголовком
+            if offset + 16 > len(head):
+                return None
+            size = struct.unpack(">Q", head[offset + 8:offset + 16])[0]
+        if size < 8:
+            return None
+        offset += size
+    return None
+
+
+def sniff_streamable_video(head: bytes) -> bool:
+    """Видео, которое ffmpeg разберёт из потока без перемотки."""
+    if head.startswith(_MATROSKA_MAGIC) or head.startswith(_FLV_MAGIC):
+        return True
+    if head[4:8] == b"ftyp":
+        return bool(_mp4_moov_before_mdat(head))
+    return False
+
+
+async def _read_head(chunks: AsyncIterator[bytes]) -> bytes:
+    head = bytearray()
+    async for chunk in chunks:
+        head += chunk
+        if len(head) >= _SNIFF_BYTES:
+            break
+    return bytes(head)
+
+
+async def transcode_stream(
+    head: bytes,
+    chunks: AsyncIterator[bytes],
+    audio_path: str,
+    *,
+    on_chunk=None,
+) -> Tuple[int, str]:
+    """Прогнать поток через ffmpeg в ``audio_path``; вернуть (байт исходника, SHA-256)."""
+    process = await asyncio.create_subprocess_exec(
+        _FFMPEG, "-hide_banner", "-loglevel", "error",
+        "-i", "pipe:0",
+        *INTAKE_FFMPEG_ARGS,
+        "-y", audio_path,
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    # stderr читается параллельно: заполненный канал остановил бы ffmpeg
+    stderr_task = asyncio.create_task(process.stderr.read())
+    digest = hashlib.sha256()
+    size = 0
+
+    async def feed(chunk: bytes) -> None:
+        nonlocal size
+        digest.update(chunk)
+        size += len(chunk)
+        process.stdin.write(chunk)
+        await process.stdin.drain()
+        if on_chunk is not None:
+            on_chunk(size)
+
+    try:
+        try:
+            if head:
+                await feed(head)
+            async for chunk in chunks:
+                await feed(chunk)
+            process.stdin.close()
+        except (BrokenPipeError, ConnectionResetError):
+            # ffmpeg вышел раньше времени — причина будет в stderr
+            pass
+        returncode = await process.wait()
+        stderr = await stderr_task
+    except BaseException:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+        stderr_task.cancel()
+        raise
+
+    if returncode != 0:
+        tail = stderr.decode("utf-8", errors="ignore")[-_STDERR_TAIL:]
+        raise FileError(f"ffmpeg не смог извлечь звук из потока (код {returncode}): {tail}")
+    return size, digest.hexdigest()
+
+
+async def _report_safely(on_progress: ProgressCallback, progress: DownloadProgress) -> None:
+    try:
+        await on_progress(progress)
+    except Exception as e:
+        logger.debug(f"Индикатор скачивания не обновлён: {e}")
+
+
+async def stream_video_to_audio(
+    session,
+    url: str,
+    temp_dir: str,
+    *,
+    total: int = 0,
+    on_progress: Optional[ProgressCallback] = None,
+    progress_interval: float = 3.0,
+    chunk_size: int = 256 * 1024,
+) -> Optional[Tuple[str, str]]:
+    """Скачать видео потоком прямо в ffmpeg; вернуть (путь к аудио, SHA-256 исходника).
+
+    ``None`` — потоковый приём здесь не подходит (нет ffmpeg, не видео или
+    контейнер не разбирается из потока): вызывающий качает файл обычным путём.
+    """
+    if shutil.which(_FFMPEG) is None:
+        return None
+
+    async with session.get(url) as response:
+        if response.status != 200:
+            raise FileError(f"Ошибка при скачивании файла. Код ответа: {response.status}")
+        chunks = response.content.iter_chunked(chunk_size).__aiter__()
+        head = await _read_head(chunks)
+        if not sniff_streamable_video(head):
+            return None
+
+        fd, audio_path = tempfile.mkstemp(dir=temp_dir, suffix=INTAKE_SUFFIX)
+        os.close(fd)
+        total = total or int(response.headers.get("content-length") or 0)
+        started_at = time.monotonic()
+        last_report = started_at
+        report_task: Optional[asyncio.Task] = None
+
+        def on_chunk(downloaded: int) -> None:
+            nonlocal last_report, report_task
+            now = time.monotonic()
+            if on_progress is None or now - last_report < progress_interval:
+                return
+            if report_task is not None and not report_task.done():
+                return  # индикатор ещё обновляется — поток не ждёт Telegram
+            last_report = now
+            speed = downloaded / max(now - started_at, 1e-6)
+            report_task = asyncio.create_task(
+                _report_safely(on_progress, DownloadProgress(downloaded, total, speed))
+            )
+
+        logger.info(f"Потоковый приём видео: звук извлекается по ходу скачивания ({url[:80]})")
+        try:
+            size, sha256 = await transcode_stream(head, chunks, audio_path, on_chunk=on_chunk)
+        except BaseException:
+            if os.path.exists(audio_path):
+                os.unlink(audio_path)
+            raise
+        finally:
+            if report_task is not None:
+                await asyncio.gather(report_task, return_exceptions=True)
+
+    logger.info(
+        f"Потоковый приём завершён: исходник {size / (1024 * 1024):.1f} МБ, "
+        f"аудио {os.path.getsize(audio_path) / (1024 * 1024):.1f} МБ"
+    )
+    return audio_path, sha256
@@ -30,6 +30,7 @@ from typing import Tuple
 from urllib.parse import quote, urlencode, urlsplit
 
 from src.exceptions.file import FileError
+from src.services.ranged_download import probe_ranges
 
 _SHARE_URL_RE = re.compile(
     r"https?://[^/\s]+/d/s/(?P<link_id>[A-Za-z0-9]+)/(?P<key>[A-Za-z0-9_.\-]+)"
@@ -149,7 +150,7 @@ class SynologyShareResolver:
         return f"{base}/d/s/{link_id}/webapi/entry.cgi/{quote(filename)}?{query}"
 
     async def _fetch_size(self, direct_url: str) -> int:
-        """Размер из content-length; 0, если сервер его не отдал."""
+        """Размер из content-length, иначе из Range-пробы; 0, если не удалось."""
         async with self.session.head(direct_url) as response:
             if response.status != 200:
                 raise FileError(
@@ -157,4 +158,6 @@ class SynologyShareResolver:
                     f"(код ответа: {response.status})"
                 )
             content_length = response.headers.get("content-length")
-            return int(content_length) if content_length else 0
+            if content_length:
+                return int(content_length)
+        return (await probe_ranges(self.session, direct_url)).total
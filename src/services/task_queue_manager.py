@@ -5,7 +5,7 @@
 import asyncio
 import os
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
 from uuid import uuid4
 
 import psutil
@@ -16,6 +16,7 @@ from src.database import queue_repo
 from src.models.processing import ProcessingRequest
 from src.models.task_queue import QueuedTask, TaskPriority, TaskStatus
 from src.services import error_presentation
+from src.services.task_scheduler import TaskScheduler
 
 # Не чаще одного алерта админам об окончании кредитов LLM в этот интервал —
 # при исчерпании баланса падает каждая задача, иначе админов завалит сообщениями.
@@ -33,7 +34,11 @@ class TaskQueueManager:
     """Менеджер глобальной очереди задач с контролем ресурсов"""
     
     def __init__(self):
-        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.max_queue_size)
+        self.queue = TaskScheduler(
+            maxsize=settings.max_queue_size,
+            aging_seconds=settings.queue_aging_seconds,
+            max_active_per_user=settings.queue_max_active_per_user,
+        )
         self.tasks: Dict[str, QueuedTask] = {}  # task_id -> QueuedTask
         self.active_tasks: Dict[str, asyncio.Task] = {}  # task_id -> asyncio.Task
         self.workers: List[asyncio.Task] = []
@@ -41,6 +46,8 @@ class TaskQueueManager:
         self._lock = asyncio.Lock()
         self.bot = None  # Будет инициализирован при старте воркеров
         self._last_credits_alert_at: Optional[datetime] = None
+        # task_id -> слушатель изменения позиций (трекер сообщения об очереди)
+        self._position_listeners: Dict[str, Callable[[], None]] = {}
         
         # Определяем максимальное количество параллельных задач
         if settings.max_concurrent_tasks:
@@ -149,28 +156,38 @@ class TaskQueueManager:
         )
         
         async with self._lock:
+            # Ставим в очередь первой: переполненная очередь (asyncio.QueueFull)
+            # не должна оставить задачу в памяти и БД
+            self.queue.put_nowait(task)
+            
             # Сохраняем в память
             self.tasks[str(task_id)] = task
             
             # Сохраняем в БД
             await self._save_task_to_db(task)
             
-            # Добавляем в очередь
-            await self.queue.put(task)
-            
             logger.info(f"Задача {task_id} добавлена в очередь (приоритет: {priority.name})")
         
+        self._publish_positions()
         return task
     
     async def cancel_task(self, task_id: str) -> bool:
         """Отменить задачу"""
         async with self._lock:
             if task_id not in self.tasks:
+                # Задачу мог поставить другой процесс за тем же токеном: её
+                # воркер увидит отмену в БД и не возьмёт задачу
+                if await self._claim_in_db(task_id, TaskStatus.CANCELLED) is True:
+                    logger.info(f"Задача {task_id} другого процесса отменена в БД")
+                    return True
                 logger.warning(f"Задача {task_id} не найдена")
                 return False
             
             task = self.tasks[task_id]
             
+            # Ожидающую задачу убираем из очереди сразу
+            self.queue.discard(task_id)
+            
             # Если задача уже обрабатывается, отменяем asyncio.Task
             if task_id in self.active_tasks:
                 active_task = self.active_tasks[task_id]
@@ -181,43 +198,48 @@ class TaskQueueManager:
             task.status = TaskStatus.CANCELLED
             await self._update_task_status(task_id, TaskStatus.CANCELLED)
             
-            # Удаляем из памяти
+            # Удаляем из памяти; сообщение об отмене показывает обработчик кнопки
             del self.tasks[task_id]
+            self.unsubscribe_positions(task_id)
             
             logger.info(f"Задача {task_id} отменена")
-            return True
+        
+        self._publish_positions()
+        return True
     
     async def get_task(self, task_id: str) -> Optional[QueuedTask]:
         """Получить задачу по ID"""
         return self.tasks.get(task_id)
     
     async def get_queue_position(self, task_id: str) -> Optional[int]:
-        """Получить позицию задачи в очереди"""
-        async with self._lock:
-            if task_id not in self.tasks:
-                return None
-            
-            task = self.tasks[task_id]
-            
-            if task.status != TaskStatus.QUEUED:
-                return None
-            
-            # Считаем позицию на основе задач с таким же или более высоким приоритетом
-            position = 0
-            for other_task in self.tasks.values():
-                if other_task.status == TaskStatus.QUEUED:
-                    # Проверяем приоритет и время создания
-                    if (other_task.priority.value > task.priority.value or
-                        (other_task.priority == task.priority and 
-                         other_task.created_at < task.created_at)):
-                        position += 1
-            
-            return position
+        """Получить позицию задачи в очереди (None — задача не ожидает)"""
+        # Планировщик считает позицию за O(log n) без await — блокировка не нужна
+        return self.queue.position(task_id)
     
     async def get_queue_size(self) -> int:
         """Получить количество задач в очереди"""
-        async with self._lock:
-            return sum(1 for t in self.tasks.values() if t.status == TaskStatus.QUEUED)
+        return len(self.queue)
+    
+    def subscribe_positions(self, task_id: str, listener: Callable[[], None]) -> None:
+        """Подписаться на изменения позиций в очереди.
+
+        Слушатель вызывается синхронно при постановке, старте, отмене и
+        завершении любой задачи и сам решает, когда перечитать позицию.
+        Пока очередь не меняется, слушатели не вызываются вовсе.
+        """
+        self._position_listeners[task_id] = listener
+    
+    def unsubscribe_positions(self, task_id: str) -> None:
+        """Отписать слушателя позиций задачи (повторный вызов безопасен)"""
+        self._position_listeners.pop(task_id, None)
+    
+    def _publish_positions(self) -> None:
+        """Сообщить подписчикам, что позиции в очереди могли измениться"""
+        for task_id, listener in list(self._position_listeners.items()):
+            try:
+                listener()
+            except Exception as e:
+                logger.error(f"Ошибка слушателя позиции задачи {task_id}: {e}")
     
     async def _worker(self, worker_id: int):
         """Воркер для обработки задач из очереди"""
@@ -228,27 +250,31 @@ class TaskQueueManager:
                 # Получаем задачу из очереди
                 task = await self.queue.get()
                 
-                # Проверяем, не была ли задача отменена
-                if task.status == TaskStatus.CANCELLED:
-                    self.queue.task_done()
-                    continue
-                
                 # Проверяем доступность ресурсов
                 if not await self._check_resources_available():
                     logger.warning(f"Воркер {worker_id}: недостаточно ресурсов, возвращаем задачу в очередь")
-                    await self.queue.put(task)
+                    self.queue.requeue(task)
+                    self._publish_positions()
                     await asyncio.sleep(5)  # Ждем освобождения ресурсов
-                    self.queue.task_done()
                     continue
                 
                 # Обрабатываем задачу
                 logger.info(f"Воркер {worker_id} начал обработку задачи {task.task_id}")
+                self._publish_positions()
                 
-                # Обновляем статус
-                task.status = TaskStatus.PROCESSING
+                # Забираем задачу атомарно: её мог отменить или уже взять
+                # другой процесс, работающий с той же БД
                 task.started_at = datetime.now()
-                await self._update_task_status(str(task.task_id), TaskStatus.PROCESSING, 
-                                             started_at=task.started_at.isoformat())
+                claimed = await self._claim_in_db(str(task.task_id), TaskStatus.PROCESSING,
+                                                  started_at=task.started_at.isoformat())
+                if claimed is False:
+                    logger.info(f"Задача {task.task_id} уже снята с очереди другим процессом")
+                    self.tasks.pop(str(task.task_id), None)
+                    self.unsubscribe_positions(str(task.task_id))
+                    self.queue.task_done(task)
+                    self._publish_positions()
+                    continue
+                task.status = TaskStatus.PROCESSING
                 
                 # Создаем задачу обработки
                 processing_task = asyncio.create_task(
@@ -277,7 +303,8 @@ class TaskQueueManager:
                     if str(task.task_id) in self.tasks:
                         del self.tasks[str(task.task_id)]
                     
-                    self.queue.task_done()
+                    self.queue.task_done(task)
+                    self._publish_positions()
                 
             except asyncio.CancelledError:
                 logger.info(f"Воркер {worker_id} получил сигнал остановки")
@@ -483,6 +510,20 @@ class TaskQueueManager:
         except Exception as e:
             logger.error(f"Ошибка обновления статуса задачи: {e}")
     
+    async def _claim_in_db(self, task_id: str, status: TaskStatus,
+                           started_at: Optional[str] = None) -> Optional[bool]:
+        """Перевести ожидающую задачу в ``status``, если её не забрал другой процесс.
+
+        True — задача наша, False — её уже взяли или отменили, None — в БД её
+        нет или БД недоступна (воркер тогда обрабатывает задачу, как раньше
+        при сбое записи статуса).
+        """
+        try:
+            return await queue_repo.claim_queue_task(task_id, status.value, started_at)
+        except Exception as e:
+            logger.error(f"Ошибка захвата задачи {task_id} в БД: {e}")
+            return None
+    
     async def _restore_queue_from_db(self):
         """Восстановить очередь задач из БД при запуске"""
         try:
@@ -498,7 +539,7 @@ class TaskQueueManager:
                 try:
                     task = QueuedTask.from_db_row(task_data)
                     self.tasks[str(task.task_id)] = task
-                    await self.queue.put(task)
+                    self.queue.put_nowait(task, force=True)
                     logger.info(f"Задача {task.task_id} восстановлена из БД")
                 except Exception as e:
                     logger.error(f"Ошибка восстановления задачи: {e}")
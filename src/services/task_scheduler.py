@@ -0,0 +1,265 @@
+"""Планировщик очереди задач: приоритеты, старение и лимит на пользователя.
+
+``asyncio.Queue`` отдавал задачи строго по порядку поступления, поэтому
+задача администратора ждала за всеми обычными, а позиция, которую
+``get_queue_position`` считала по приоритету, не совпадала с реальным
+порядком. Здесь порядок выдачи и порядок позиций — один и тот же ключ.
+
+Ключ задачи — (приоритет, время создания) со старением: каждые
+``aging_seconds`` ожидания поднимают задачу на один уровень приоритета.
+Это равносильно сортировке по «виртуальному» моменту
+``created_at - priority * aging_seconds``, который не зависит от текущего
+времени, — поэтому ключ считается один раз и кучу не нужно перестраивать.
+
+Справедливость: у пользователя одновременно обрабатывается не больше
+``max_active_per_user`` задач. Ожидающие задачи лежат в куче своего
+пользователя, в общей куче — только головы пользователей, не упёршихся в
+лимит; выдача — O(log n). Позиция считается по уровням приоритета
+Fenwick-деревьями над порядком создания: O(log n) на уровень вместо
+перебора всех задач под блокировкой.
+"""
+
+import asyncio
+import heapq
+import itertools
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from src.models.task_queue import QueuedTask, TaskPriority
+
+
+@dataclass(eq=False)
+class _Entry:
+    """Ожидающая задача и её место в структурах планировщика."""
+    task: QueuedTask
+    priority: int
+    created: float
+    seq: int
+    key: Tuple = ()
+    index: int = -1  # номер в Fenwick-дереве своего уровня
+    queued: bool = True
+
+
+class _Level:
+    """Ожидающие задачи одного приоритета в порядке создания.
+
+    Fenwick-дерево над порядковыми номерами считает живые задачи на
+    префиксе, ``times`` — неубывающие моменты создания для бинарного поиска
+    границы. Новые задачи почти всегда моложе прежних и дописываются в
+    конец; задача из прошлого (возврат в очередь) перестраивает уровень.
+    Ушедшие задачи только обнуляются; когда их становится больше живых,
+    уровень тоже перестраивается.
+    """
+
+    def __init__(self):
+        self.entries: List[Optional[_Entry]] = []
+        self.times: List[float] = []
+        self.tree: List[int] = [0]
+        self.live = 0
+
+    def _prefix(self, count: int) -> int:
+        """Число живых задач среди первых ``count`` номеров."""
+        total = 0
+        while count > 0:
+            total += self.tree[count]
+            count -= count & -count
+        return total
+
+    def add(self, entry: _Entry) -> None:
+        if self.times and entry.created < self.times[-1]:
+            alive = [e for e in self.entries if e is not None] + [entry]
+            self._rebuild(sorted(alive, key=lambda e: (e.created, e.seq)))
+        else:
+            self._append(entry)
+
+    def _append(self, entry: _Entry) -> None:
+        entry.index = len(self.entries)
+        self.entries.append(entry)
+        self.times.append(entry.created)
+        node = len(self.tree)
+        # Узел покрывает (node - lowbit, node]: новая задача плюс уже учтённые до неё
+        self.tree.append(1 + self._prefix(node - 1) - self._prefix(node - (node & -node)))
+        self.live += 1
+
+    def remove(self, entry: _Entry) -> None:
+        node = entry.index + 1
+        while node < len(self.tree):
+            self.tree[node] -= 1
+            node += node & -node
+        self.entries[entry.index] = None
+        self.live -= 1
+        if len(self.entries) > 2 * self.live + 32:
+            self._rebuild([e for e in self.entries if e is not None])
+
+    def _rebuild(self, ordered: List[_Entry]) -> None:
+        self.entries, self.times, self.tree, self.live = [], [], [0], 0
+        for entry in ordered:
+            self._append(entry)
+
+    def rank(self, entry: _Entry) -> int:
+        """Живые задачи уровня, созданные раньше ``entry``."""
+        return self._prefix(entry.index)
+
+    def count_before(self, moment: float, inclusive: bool) -> int:
+        """Живые задачи уровня, созданные раньше ``moment`` (или в тот же момент)."""
+        cut = (bisect_right if inclusive else bisect_left)(self.times, moment)
+        return self._prefix(cut)
+
+
+class TaskScheduler:
+    """Приоритетная очередь задач с интерфейсом, близким к ``asyncio.Queue``.
+
+    ``get`` выдаёт задачу и занимает слот её пользователя, ``task_done``
+    освобождает его. Отменённая задача убирается ``discard`` сразу, а не
+    пропускается воркером при выдаче.
+    """
+
+    def __init__(self, maxsize: int = 0, aging_seconds: float = 0.0,
+                 max_active_per_user: int = 0):
+        self.maxsize = maxsize
+        self.aging_seconds = aging_seconds
+        self.max_active_per_user = max_active_per_user
+        self._entries: Dict[str, _Entry] = {}
+        self._levels: Dict[int, _Level] = {p.value: _Level() for p in TaskPriority}
+        self._waiting: Dict[int, List[Tuple[Tuple, _Entry]]] = {}  # user_id -> куча ожидающих
+        self._active: Dict[int, int] = {}  # user_id -> задач в обработке
+        self._ready: List[Tuple[Tuple, int]] = []  # головы пользователей, не упёршихся в лимит
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def full(self) -> bool:
+        return 0 < self.maxsize <= len(self._entries)
+
+    def _key(self, priority: int, created: float, seq: int) -> Tuple:
+        if self.aging_seconds > 0:
+            return (created - priority * self.aging_seconds, -priority, seq)
+        return (-priority, created, seq)
+
+    def _capped(self, user_id: int) -> bool:
+        return 0 < self.max_active_per_user <= self._active.get(user_id, 0)
+
+    def _head(self, user_id: int) -> Optional[_Entry]:
+        """Ближайшая ожидающая задача пользователя; снятые с очереди выбрасываются."""
+        heap = self._waiting.get(user_id)
+        while heap and not heap[0][1].queued:
+            heapq.heappop(heap)
+        if not heap:
+            self._waiting.pop(user_id, None)
+            return None
+        return heap[0][1]
+
+    def _offer(self, user_id: int) -> None:
+        """Выставить голову пользователя в общую кучу, если лимит позволяет."""
+        head = self._head(user_id)
+        if head is None or self._capped(user_id):
+            return
+        heapq.heappush(self._ready, (head.key, user_id))
+        # Устаревшие записи отбрасываются при выдаче; если их накопилось много — пересобираем
+        if len(self._ready) > 2 * len(self._waiting) + 32:
+            heads = [(user_id, self._head(user_id)) for user_id in list(self._waiting)]
+            self._ready = [
+                (head.key, user_id)
+                for user_id, head in heads
+                if head is not None and not self._capped(user_id)
+            ]
+            heapq.heapify(self._ready)
+
+    def put_nowait(self, task: QueuedTask, force: bool = False) -> None:
+        """Поставить задачу в очередь; ``asyncio.QueueFull`` — очередь заполнена.
+
+        ``force`` — без проверки размера (возврат в очередь, восстановление из БД).
+        """
+        task_id = str(task.task_id)
+        if task_id in self._entries:
+            return
+        if not force and self.full():
+            raise asyncio.QueueFull()
+
+        priority = int(task.priority)
+        entry = _Entry(task, priority, task.created_at.timestamp(), next(self._seq))
+        self._levels.setdefault(priority, _Level()).add(entry)
+        entry.key = self._key(priority, entry.created, entry.seq)
+        self._entries[task_id] = entry
+
+        heap = self._waiting.setdefault(task.user_id, [])
+        heapq.heappush(heap, (entry.key, entry))
+        if heap[0][1] is entry:
+            self._offer(task.user_id)
+        self._wakeup.set()
+
+    def discard(self, task_id: str) -> bool:
+        """Убрать ожидающую задачу из очереди; False — её там нет."""
+        entry = self._entries.get(task_id)
+        if entry is None:
+            return False
+        self._forget(entry)
+        self._offer(entry.task.user_id)
+        return True
+
+    def _forget(self, entry: _Entry) -> None:
+        del self._entries[str(entry.task.task_id)]
+        self._levels[entry.priority].remove(entry)
+        entry.queued = False
+
+    def get_nowait(self) -> Optional[QueuedTask]:
+        """Следующая задача с учётом лимита на пользователя или None."""
+        while self._ready:
+            key, user_id = heapq.heappop(self._ready)
+            head = self._head(user_id)
+            if head is None or head.key != key or self._capped(user_id):
+                continue
+            heapq.heappop(self._waiting[user_id])
+            self._forget(head)
+            self._active[user_id] = self._active.get(user_id, 0) + 1
+            self._offer(user_id)
+            return head.task
+        return None
+
+    async def get(self) -> QueuedTask:
+        """Дождаться следующей задачи."""
+        while True:
+            task = self.get_nowait()
+            if task is not None:
+                return task
+            self._wakeup.clear()
+            await self._wakeup.wait()
+
+    def task_done(self, task: QueuedTask) -> None:
+        """Задача, выданная ``get``, больше не занимает слот пользователя."""
+        count = self._active.get(task.user_id, 0) - 1
+        if count > 0:
+            self._active[task.user_id] = count
+        else:
+            self._active.pop(task.user_id, None)
+        self._offer(task.user_id)
+        self._wakeup.set()
+
+    def requeue(self, task: QueuedTask) -> None:
+        """Вернуть выданную задачу на её прежнее место в очереди."""
+        self.put_nowait(task, force=True)
+        self.task_done(task)
+
+    def position(self, task_id: str) -> Optional[int]:
+        """Сколько ожидающих задач стоит впереди; None — задача не в очереди.
+
+        Порядок — по ключу приоритета и старения; лимит на пользователя
+        может задержать задачу сверх этой позиции.
+        """
+        entry = self._entries.get(task_id)
+        if entry is None:
+            return None
+        ahead = 0
+        for priority, level in self._levels.items():
+            if priority == entry.priority:
+                ahead += level.rank(entry)
+            elif self.aging_seconds > 0:
+                # Ключ другого уровня меньше, если он создан раньше на разницу старения
+                moment = entry.created + (priority - entry.priority) * self.aging_seconds
+                ahead += level.count_before(moment, inclusive=priority > entry.priority)
+            elif priority > entry.priority:
+                ahead += level.live
+        return ahead
@@ -2,7 +2,10 @@
 Сервис для работы с шаблонами
 """
 
+import asyncio
+import uuid
 from typing import Any, Dict, List, Optional
+from weakref import WeakKeyDictionary
 
 from jinja2 import BaseLoader, Environment, TemplateError
 from loguru import logger
@@ -12,39 +15,132 @@ from src.database.template_repo import TemplateRepository
 from src.database.user_repo import UserRepository
 from src.exceptions.template import TemplateNotFoundError, TemplateValidationError
 from src.models.template import Template, TemplateCreate
+from src.models.user import User
+from src.services.request_scope import current_scope
+from src.services.shared_state import StateBackend, state_backend
+
+# Ключ поколения таблицы templates в общем бэкенде состояния
+_SHARED_NAMESPACE = "template_cache"
+_SHARED_KEY = "generation"
+
+
+class _TemplateCache:
+    """Read-through кэш таблицы templates на процесс.
+
+    Таблица маленькая и почти не меняется, а читается на каждой обработке
+    (выбор шаблона, перегенерация, меню). Поколение защищает от гонки: список,
+    прочитанный до инвалидации, не ляжет в кэш после неё.
+
+    С общим бэкендом состояния (несколько процессов) изменение в одном процессе
+    пишет туда новую метку поколения; остальные сверяют её перед ответом из
+    кэша и при расхождении перечитывают таблицу.
+    """
+
+    def __init__(self):
+        self.templates: Optional[List[Template]] = None
+        self.by_id: Dict[int, Template] = {}
+        self.generation = 0
+        # Метка общего поколения, при которой прочитан ``templates``
+        self.shared_mark: Optional[bytes] = None
+
+    def store(self, templates: List[Template], generation: int) -> None:
+        if generation != self.generation:
+            return
+        self.templates = templates
+        self.by_id = {template.id: template for template in templates}
+
+    def invalidate(self) -> None:
+        self.generation += 1
+        self.templates = None
+        self.by_id = {}
+
+
+# Кэш на экземпляр репозитория: у каждой БД (в том числе тестовой) — свой
+_template_caches: "WeakKeyDictionary[TemplateRepository, _TemplateCache]" = WeakKeyDictionary()
 
 
 class TemplateService:
     """Сервис для работы с шаблонами"""
     
     def __init__(self, templates: TemplateRepository = template_repo,
-                 users: UserRepository = user_repo):
+                 users: UserRepository = user_repo,
+                 shared: Optional[StateBackend] = state_backend):
         self._templates = templates
         self._users = users
+        self._shared = shared
         self.jinja_env = Environment(loader=BaseLoader())
+        self._cache = _template_caches.setdefault(templates, _TemplateCache())
+    
+    async def _cached_templates(self) -> List[Template]:
+        """Все шаблоны из кэша процесса (при промахе — один запрос к БД)"""
+        if self._shared is not None:
+            mark = await asyncio.to_thread(self._shared.get, _SHARED_NAMESPACE, _SHARED_KEY)
+            if mark != self._cache.shared_mark:
+                # Таблицу изменил другой процесс (или кэш ещё пуст)
+                self._cache.invalidate()
+                self._cache.shared_mark = mark
+        if self._cache.templates is None:
+            generation = self._cache.generation
+            templates_data = await self._templates.get_templates()
+            templates = [Template(**template) for template in templates_data]
+            self._cache.store(templates, generation)
+            return templates
+        return self._cache.templates
+    
+    async def _invalidate_cache(self) -> None:
+        """Сбросить кэш шаблонов после изменения таблицы (во всех процессах)"""
+        self._cache.invalidate()
+        if self._shared is not None:
+            await asyncio.to_thread(
+                self._shared.set, _SHARED_NAMESPACE, _SHARED_KEY, uuid.uuid4().hex.encode("ascii")
+            )
+        scope = current_scope()
+        if scope is not None:
+            scope.forget_templates()
     
     async def get_all_templates(self) -> List[Template]:
         """Получить все шаблоны"""
         try:
-            templates_data = await self._templates.get_templates()
-            return [Template(**template) for template in templates_data]
+            return list(await self._cached_templates())
         except Exception as e:
             logger.error(f"Ошибка при получении шаблонов: {e}")
             raise
     
     async def get_user_templates(self, telegram_id: int) -> List[Template]:
-        """Получить шаблоны пользователя"""
+        """Получить шаблоны пользователя (свои и системные)"""
         try:
-            templates_data = await self._templates.get_user_templates(telegram_id)
-            return [Template(**template) for template in templates_data]
+            user = await self._get_user(telegram_id)
+            if not user:
+                return []
+            # Кэш уже упорядочен как запрос репозитория: is_default DESC, name
+            return [
+                template for template in await self._cached_templates()
+                if template.created_by == user.id or template.is_default
+            ]
         except Exception as e:
             logger.error(f"Ошибка при получении шаблонов пользователя {telegram_id}: {e}")
             raise
     
+    async def _get_user(self, telegram_id: int) -> Optional[User]:
+        """Пользователь для фильтра шаблонов — через область обработки, если она открыта"""
+        async def load(tid: int) -> Optional[User]:
+            user_data = await self._users.get_user(tid)
+            return User(**user_data) if user_data else None
+
+        scope = current_scope()
+        if scope is not None:
+            return await scope.user(telegram_id, load)
+        return await load(telegram_id)
+    
     async def set_user_default_template(self, telegram_id: int, template_id: int) -> bool:
         """Установить шаблон по умолчанию для пользователя"""
         try:
             result = await self._users.set_default_template(telegram_id, template_id)
+            # Запись могла переписать created_by шаблона и строку пользователя
+            await self._invalidate_cache()
+            scope = current_scope()
+            if scope is not None:
+                scope.forget_user(telegram_id)
             if result:
                 logger.info(f"Установлен шаблон по умолчанию {template_id} для пользователя {telegram_id}")
             return result
@@ -56,6 +152,9 @@ class TemplateService:
         """Сбросить шаблон по умолчанию для пользователя"""
         try:
             result = await self._users.reset_default_template(telegram_id)
+            scope = current_scope()
+            if scope is not None:
+                scope.forget_user(telegram_id)
             if result:
                 logger.info(f"Сброшен шаблон по умолчанию для пользователя {telegram_id}")
             return result
@@ -64,19 +163,29 @@ class TemplateService:
             raise
     
     async def get_template_by_id(self, template_id: int) -> Template:
-        """Получить шаблон по ID"""
+        """Получить шаблон по ID (внутри обработки — тот же объект на весь прогон)"""
         try:
-            template_data = await self._templates.get_template(template_id)
-            if not template_data:
-                raise TemplateNotFoundError(template_id)
-            
-            return Template(**template_data)
+            scope = current_scope()
+            if scope is not None:
+                return await scope.template(template_id, self._load_template)
+            return await self._load_template(template_id)
         except TemplateNotFoundError:
             raise
         except Exception as e:
             logger.error(f"Ошибка при получении шаблона {template_id}: {e}")
             raise
     
+    async def _load_template(self, template_id: int) -> Template:
+        templates = await self._cached_templates()
+        if templates is self._cache.templates:
+            template = self._cache.by_id.get(template_id)
+        else:
+            # Кэш сбросили, пока шли в БД: ищем в только что прочитанном
+            template = next((t for t in templates if t.id == template_id), None)
+        if template is None:
+            raise TemplateNotFoundError(template_id)
+        return template
+    
     async def create_template(self, template_data: TemplateCreate) -> Template:
         """Создать новый шаблон"""
         try:
@@ -94,6 +203,7 @@ class TemplateService:
                 tags=template_data.tags,
                 keywords=template_data.keywords
             )
+            await self._invalidate_cache()
             
             # Возвращаем созданный шаблон
             created_template = await self.get_template_by_id(template_id)
@@ -110,6 +220,7 @@ class TemplateService:
         """Удалить шаблон пользователя (если не базовый)"""
         try:
             result = await self._templates.delete_template(telegram_id, template_id)
+            await self._invalidate_cache()
             if result:
                 logger.info(f"Пользователь {telegram_id} удалил шаблон {template_id}")
             return result
@@ -164,6 +275,7 @@ class TemplateService:
             # Переименование англоязычных шаблонов и удаление системных сирот (идемпотентно)
             from src.services.template_maintenance import apply_template_maintenance
             await apply_template_maintenance(self._templates)
+            await self._invalidate_cache()
             existing_templates = await self.get_all_templates()
             existing_by_name: Dict[str, Template] = {}
             for template in existing_templates:
@@ -266,3 +378,4 @@ class TemplateService:
             tags=template_data.get("tags"),
             keywords=template_data.get("keywords"),
         )
+        await self._invalidate_cache()
@@ -20,21 +20,39 @@ from src.exceptions.processing import (
     TranscriptionError,
 )
 from src.models.processing import TranscriptionResult
+from src.services import audio_chunking
 
-try:
-    from src.services.speechmatics_service import speechmatics_service
-    SPEECHMATICS_AVAILABLE = True
-except ImportError:
-    SPEECHMATICS_AVAILABLE = False
+# Сервисы Speechmatics/Deepgram (и SDK под ними) подключаются при первом
+# обращении к бэкенду, а не при импорте модуля
+speechmatics_service = None
+deepgram_service = None
 
-try:
-    from src.services.deepgram_service import deepgram_service
-    DEEPGRAM_AVAILABLE = True
-except ImportError:
-    DEEPGRAM_AVAILABLE = False
+
+def _speechmatics():
+    global speechmatics_service
+    if speechmatics_service is None:
+        try:
+            from src.services.speechmatics_service import speechmatics_service as service
+        except ImportError as e:
+            logger.warning(f"Speechmatics сервис недоступен: {e}")
+            return None
+        speechmatics_service = service
+    return speechmatics_service
+
+
+def _deepgram():
+    global deepgram_service
+    if deepgram_service is None:
+        try:
+            from src.services.deepgram_service import deepgram_service as service
+        except ImportError as e:
+            logger.warning(f"Deepgram сервис недоступен: {e}")
+            return None
+        deepgram_service = service
+    return deepgram_service
 
 # 16KHz моно MP3 — общая подготовка для облачных API
-_CLOUD_FFMPEG_ARGS = [
+CLOUD_FFMPEG_ARGS = [
     "-ar", "16000",
     "-ac", "1",
     "-map", "0:a",
@@ -73,7 +91,8 @@ class TranscriptionBackend(Protocol):
 class WhisperBackend:
     """Локальный Whisper — базовый бэкенд и цель fallback.
 
-    Модель и её OOM-жизненный цикл принадлежат сервису (общая память процесса).
+    Считает пул процессов моделей (тёплая модель на воркер); без пула — модель
+    сервиса и её OOM-жизненный цикл.
     """
 
     name = "whisper"
@@ -85,7 +104,6 @@ class WhisperBackend:
         return True
 
     async def transcribe(self, file_path: str, language: str) -> TranscriptionResult:
-        self._service._load_whisper_model()
         whisper_result = await self._service._transcribe_with_progress(file_path, language)
         transcription = whisper_result["text"].strip()
         logger.info(f"Локальная транскрибация завершена. Длина текста: {len(transcription)} символов")
@@ -93,7 +111,12 @@ class WhisperBackend:
 
 
 class GroqBackend:
-    """Облачная транскрипция через Groq (режимы cloud и hybrid)."""
+    """Облачная транскрипция через Groq (режимы cloud и hybrid).
+
+    Запись, которая и после сжатия больше лимита API, режется по паузам на
+    перекрывающиеся окна (см. ``audio_chunking``); окна уходят в Groq
+    параллельно, текст склеивается в обычный ``TranscriptionResult``.
+    """
 
     name = "groq"
 
@@ -130,6 +153,67 @@ class GroqBackend:
             logger.error(f"Ошибка при проверке размера файла {file_path}: {e}")
             return False
 
+    def _groq_call_sync(self, path: str):
+        with open(path, "rb") as f:
+            data = f.read()
+        return self._service.groq_client.audio.transcriptions.create(
+            file=(os.path.basename(path), data),
+            model=settings.groq_model,
+            response_format="verbose_json",
+        )
+
+    async def _transcribe_window(
+        self, processed_file: str, window: audio_chunking.AudioWindow, semaphore: asyncio.Semaphore
+    ):
+        """Вырезать окно, отправить в Groq и удалить; вернуть (окно, текст, сегменты)."""
+        async with semaphore:
+            window_file = self._service.temp_dir / f"{Path(processed_file).stem}_w{window.index:03d}.mp3"
+            try:
+                if not await audio_chunking.cut_window(processed_file, window, str(window_file)):
+                    raise CloudTranscriptionError(
+                        f"Не удалось вырезать окно {window.index} для облачной транскрипции",
+                        processed_file,
+                    )
+                if os.path.getsize(window_file) > self.MAX_FILE_SIZE:
+                    raise CloudTranscriptionError(
+                        f"Окно {window.index} больше лимита Groq — уменьшите GROQ_CHUNK_MAX_SECONDS",
+                        processed_file,
+                    )
+                response = await asyncio.to_thread(self._groq_call_sync, str(window_file))
+            finally:
+                if window_file.exists():
+                    window_file.unlink()
+
+        logger.info(f"Окно {window.index} ({window.start:.0f}–{window.end:.0f} с) транскрибировано")
+        return window, response.text, audio_chunking.segments_from_response(response)
+
+    async def _transcribe_chunked(self, processed_file: str) -> str:
+        """Длинная запись: нарезка по паузам, параллельная транскрипция окон, склейка."""
+        duration = await audio_chunking.probe_duration(processed_file)
+        if not duration:
+            raise CloudTranscriptionError(
+                "Не удалось определить длительность записи для нарезки", processed_file
+            )
+
+        silences = await audio_chunking.detect_silences(processed_file)
+        windows = audio_chunking.plan_windows(
+            duration,
+            silences,
+            max_seconds=settings.groq_chunk_max_seconds,
+            overlap_seconds=settings.groq_chunk_overlap_seconds,
+        )
+        logger.info(
+            f"Запись {duration:.0f} с больше лимита Groq — нарезана на {len(windows)} окон "
+            f"(пауз найдено: {len(silences)})"
+        )
+
+        semaphore = asyncio.Semaphore(max(1, settings.groq_chunk_concurrency))
+        results = await asyncio.gather(
+            *(self._transcribe_window(processed_file, window, semaphore) for window in windows)
+        )
+        text, _segments = audio_chunking.stitch_windows(results)
+        return text
+
     async def transcribe(self, file_path: str, language: str) -> TranscriptionResult:
         if not self._service.groq_client:
             raise CloudTranscriptionError("Groq клиент не инициализирован", file_path)
@@ -143,29 +227,22 @@ class GroqBackend:
             processed_file, compression_info = await self._service._preprocess_audio(
                 file_path=file_path,
                 suffix="preprocessed.mp3",
-                ffmpeg_args=_CLOUD_FFMPEG_ARGS,
+                ffmpeg_args=CLOUD_FFMPEG_ARGS,
                 target_description="Groq API",
             )
 
-            if not self._check_file_size(processed_file):
+            if settings.groq_chunked_transcription and os.path.getsize(processed_file) > self.MAX_FILE_SIZE:
+                result_text = await self._transcribe_chunked(processed_file)
+            elif not self._check_file_size(processed_file):
                 raise CloudTranscriptionError(
                     f"Предобработанный файл слишком большой для облачной транскрипции. "
                     f"Максимальный размер: {self.MAX_FILE_SIZE / (1024 * 1024)}MB",
                     processed_file,
                 )
+            else:
+                transcription = await asyncio.to_thread(self._groq_call_sync, processed_file)
+                result_text = transcription.text
 
-            def _groq_call_sync(path: str):
-                with open(path, "rb") as f:
-                    data = f.read()
-                return self._service.groq_client.audio.transcriptions.create(
-                    file=(os.path.basename(path), data),
-                    model=settings.groq_model,
-                    response_format="verbose_json",
-                )
-
-            transcription = await asyncio.to_thread(_groq_call_sync, processed_file)
-
-            result_text = transcription.text
             logger.info(f"Облачная транскрипция завершена. Длина текста: {len(result_text)} символов")
 
             return _text_result(result_text, compression_info)
@@ -273,16 +350,17 @@ class SpeechmaticsBackend:
         self._service = service
 
     def is_available(self) -> bool:
-        return SPEECHMATICS_AVAILABLE and speechmatics_service.is_available()
+        service = _speechmatics()
+        return service is not None and service.is_available()
 
     async def transcribe(self, file_path: str, language: str) -> TranscriptionResult:
         processed_file, compression_info = await self._service._preprocess_audio(
             file_path=file_path,
             suffix="speechmatics.mp3",
-            ffmpeg_args=_CLOUD_FFMPEG_ARGS,
+            ffmpeg_args=CLOUD_FFMPEG_ARGS,
             target_description="Speechmatics API",
         )
-        result = await speechmatics_service.transcribe_file(
+        result = await _speechmatics().transcribe_file(
             file_path=processed_file,
             language=language,
             enable_diarization=settings.enable_diarization,
@@ -301,16 +379,17 @@ class DeepgramBackend:
         self._service = service
 
     def is_available(self) -> bool:
-        return DEEPGRAM_AVAILABLE and deepgram_service.is_available()
+        service = _deepgram()
+        return service is not None and service.is_available()
 
     async def transcribe(self, file_path: str, language: str) -> TranscriptionResult:
         processed_file, compression_info = await self._service._preprocess_audio(
             file_path=file_path,
             suffix="deepgram.mp3",
-            ffmpeg_args=_CLOUD_FFMPEG_ARGS,
+            ffmpeg_args=CLOUD_FFMPEG_ARGS,
             target_description="Deepgram API",
         )
-        result = await deepgram_service.transcribe_file(
+        result = await _deepgram().transcribe_file(
             file_path=processed_file,
             language=language,
             enable_diarization=settings.enable_diarization,
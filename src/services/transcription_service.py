@@ -6,6 +6,7 @@ import asyncio
 import os
 import shutil
 from pathlib import Path
+from typing import Optional, Tuple
 
 import httpx
 from loguru import logger
@@ -15,9 +16,14 @@ from src.exceptions.processing import (
     TranscriptionError,
 )
 from src.models.processing import TranscriptionResult
-from src.performance.oom_protection import get_oom_protection, oom_protected
+from src.performance.oom_protection import get_oom_protection
+from src.performance.transcription_store import transcription_store
 from src.services import error_presentation
+from src.services.model_registry import model_registry
+from src.services.model_workers import ProgressCallback, run_model_job, whisper_transcribe
+from src.services.streaming_intake import INTAKE_FFMPEG_ARGS, is_intake_artifact
 from src.services.transcription_backends import build_backends
+from src.utils.optional_deps import module_available
 
 # Leopard (Picovoice) STT — lazy import for faster startup
 LEOPARD_AVAILABLE = None  # resolved on first use
@@ -26,48 +32,39 @@ LEOPARD_AVAILABLE = None  # resolved on first use
 def _check_leopard_available():
     global LEOPARD_AVAILABLE
     if LEOPARD_AVAILABLE is None:
-        try:
-            import pvleopard  # noqa: F401
-            LEOPARD_AVAILABLE = True
-        except ImportError:
-            LEOPARD_AVAILABLE = False
+        LEOPARD_AVAILABLE = module_available("pvleopard")
+        if not LEOPARD_AVAILABLE:
             logger.warning("pvleopard (Leopard STT) недоступен")
     return LEOPARD_AVAILABLE
 
-try:
-    from groq import Groq
-    GROQ_AVAILABLE = True
-except ImportError:
-    GROQ_AVAILABLE = False
+
+GROQ_AVAILABLE = module_available("groq")
+if not GROQ_AVAILABLE:
     logger.warning("Groq SDK недоступен")
 
-try:
-    from src.services.diarization_service import diarization_service
-    DIARIZATION_AVAILABLE = True
-except ImportError:
-    DIARIZATION_AVAILABLE = False
-    logger.warning("Модуль диаризации недоступен")
+# Диаризация (и torch/whisperx за ней) подключается при первой диаризации
+DIARIZATION_AVAILABLE = None  # resolved on first use
+diarization_service = None
 
-try:
-    from .speechmatics_service import speechmatics_service
-    SPEECHMATICS_AVAILABLE = True
-except ImportError:
-    SPEECHMATICS_AVAILABLE = False
-    logger.warning("Speechmatics сервис недоступен")
 
-try:
-    from .deepgram_service import deepgram_service
-    DEEPGRAM_AVAILABLE = True
-except ImportError:
-    DEEPGRAM_AVAILABLE = False
-    logger.warning("Deepgram сервис недоступен")
+def _get_diarization_service():
+    global DIARIZATION_AVAILABLE, diarization_service
+    if diarization_service is None and DIARIZATION_AVAILABLE is not False:
+        try:
+            from src.services.diarization_service import diarization_service as service
+        except ImportError as e:
+            DIARIZATION_AVAILABLE = False
+            logger.warning(f"Модуль диаризации недоступен: {e}")
+            return None
+        diarization_service = service
+        DIARIZATION_AVAILABLE = True
+    return diarization_service if DIARIZATION_AVAILABLE else None
 
 
 class TranscriptionService:
     """Обновленный сервис транскрипции с защитой от OOM"""
     
     def __init__(self):
-        self.whisper_model = None
         self.groq_client = None
         self.temp_dir = Path(settings.temp_dir)
         self.temp_dir.mkdir(exist_ok=True)
@@ -78,55 +75,23 @@ class TranscriptionService:
         # Инициализация Groq клиента
         if GROQ_AVAILABLE and settings.groq_api_key:
             try:
+                from groq import Groq
                 self.groq_client = Groq(api_key=settings.groq_api_key)
                 logger.info("Groq клиент инициализирован")
             except Exception as e:
                 logger.warning(f"Ошибка при инициализации Groq клиента: {e}")
         
-        # Инициализация Speechmatics сервиса
-        if SPEECHMATICS_AVAILABLE and speechmatics_service.is_available():
-            logger.info("Speechmatics сервис доступен")
-        else:
-            logger.warning("Speechmatics сервис недоступен")
-        
-        # Инициализация Deepgram сервиса
-        if DEEPGRAM_AVAILABLE and deepgram_service.is_available():
-            logger.info("Deepgram сервис доступен")
-        else:
-            logger.warning("Deepgram сервис недоступен")
-        
         # Настраиваем callbacks для очистки памяти
         self.oom_protection.add_cleanup_callback(self._cleanup_models)
 
         # Реестр адаптеров бэкендов транскрипции
         self._backends = build_backends(self)
     
-    @oom_protected(estimated_memory_mb=200)  # Whisper модели занимают ~200MB
-    def _load_whisper_model(self, model_size: str = "base"):
-        """Загрузить модель Whisper с защитой от OOM"""
-        if self.whisper_model is None:
-            logger.info(f"Загрузка модели Whisper: {model_size}")
-            
-            # Проверяем доступную память перед загрузкой
-            memory_status = self.oom_protection.get_memory_status()
-            if memory_status["system"]["percent"] > 80:
-                logger.warning(f"Высокое использование памяти при загрузке модели: {memory_status['system']['percent']:.1f}%")
-            
-            try:
-                import whisper
-                self.whisper_model = whisper.load_model(model_size)
-                logger.info("Модель Whisper загружена")
-            except Exception as e:
-                logger.error(f"Ошибка при загрузке модели Whisper: {e}")
-                raise TranscriptionError(f"Не удалось загрузить модель Whisper: {e}")
-    
     def _cleanup_models(self, cleanup_type: str = "soft"):
-        """Очистка моделей для освобождения памяти"""
-        if cleanup_type == "aggressive" and self.whisper_model is not None:
+        """Очистка моделей для освобождения памяти (закреплённые задачей не трогаются)"""
+        if cleanup_type == "aggressive":
             logger.info("Принудительная очистка модели Whisper")
-            self.whisper_model = None
-            import gc
-            gc.collect()
+            model_registry.evict()
     
     async def download_file(self, file_url: str, file_name: str) -> str:
         """Скачать файл по URL"""
@@ -166,6 +131,11 @@ class TranscriptionService:
             "compression_saved_mb": 0
         }
 
+        # Потоковый приём уже снял с видео ровно эту дорожку — повторно не кодируем
+        if is_intake_artifact(file_path) and list(ffmpeg_args) == INTAKE_FFMPEG_ARGS:
+            logger.info(f"Файл уже подготовлен при приёме, предобработка для {target_description} не нужна")
+            return file_path, compression_info
+
         try:
             if not self._check_ffmpeg():
                 logger.warning(f"ffmpeg не найден, пропускаем предобработку для {target_description}")
@@ -235,8 +205,15 @@ class TranscriptionService:
             logger.warning(f"Не удалось предобработать файл для {target_description}: {e}")
             return file_path, compression_info
 
-    async def transcribe_with_diarization(self, file_path: str, language: str = "ru") -> TranscriptionResult:
-        """Транскрибировать файл с диаризацией и защитой от OOM"""
+    async def transcribe_with_diarization(
+        self, file_path: str, language: str = "ru", content_hash: Optional[str] = None
+    ) -> TranscriptionResult:
+        """Транскрибировать файл с диаризацией и защитой от OOM.
+
+        С ``content_hash`` сначала смотрит в хранилище транскрипций (ключ —
+        хеш, язык, бэкенд режима) и сохраняет туда свежий результат под именем
+        бэкенда, который его на самом деле дал.
+        """
         
         # Проверяем размер файла и доступную память
         try:
@@ -282,12 +259,27 @@ class TranscriptionService:
         
         try:
             backend = self._backends.get(settings.transcription_mode) or self._backends["local"]
-            result = await self._run_with_fallback(backend, file_path, language)
+
+            store_enabled = bool(content_hash and settings.transcription_store_enabled)
+            if store_enabled:
+                stored = await transcription_store.get(content_hash, language, backend.name)
+                if stored is not None:
+                    # Сохранённая до включения диаризации запись её не содержит
+                    had_diarization = stored.diarization is not None
+                    stored = await self._ensure_diarization(stored, file_path, language)
+                    if stored.diarization is not None and not had_diarization:
+                        await transcription_store.put(content_hash, language, backend.name, stored)
+                    return stored
+
+            produced_by, result = await self._run_with_fallback(backend, file_path, language)
             result = await self._ensure_diarization(result, file_path, language)
 
             if result.compression_info is None:
                 result.compression_info = compression_info
 
+            if store_enabled:
+                await transcription_store.put(content_hash, language, produced_by, result)
+
             return result
 
         except Exception as e:
@@ -321,33 +313,39 @@ class TranscriptionService:
 
         return TranscriptionError(text, file_path)
 
-    async def _run_with_fallback(self, backend, file_path: str, language: str) -> TranscriptionResult:
-        """Единая политика: недоступен или типизированная ошибка → локальный Whisper."""
+    async def _run_with_fallback(
+        self, backend, file_path: str, language: str
+    ) -> Tuple[str, TranscriptionResult]:
+        """Единая политика: недоступен или типизированная ошибка → локальный Whisper.
+
+        Возвращает (имя бэкенда, давшего результат, результат).
+        """
         whisper = self._backends["local"]
 
         if backend is not whisper and not backend.is_available():
             logger.warning(f"Бэкенд '{backend.name}' недоступен — используем локальный Whisper")
-            return await whisper.transcribe(file_path, language)
+            return whisper.name, await whisper.transcribe(file_path, language)
 
         try:
-            return await backend.transcribe(file_path, language)
+            return backend.name, await backend.transcribe(file_path, language)
         except TranscriptionError as e:
             if backend is whisper:
                 raise
             logger.warning(f"Ошибка бэкенда '{backend.name}', переключаемся на локальную транскрипцию: {e}")
-            return await whisper.transcribe(file_path, language)
+            return whisper.name, await whisper.transcribe(file_path, language)
 
     async def _ensure_diarization(self, result: TranscriptionResult, file_path: str,
                                   language: str) -> TranscriptionResult:
         """Применить локальную диаризацию ровно один раз, если бэкенд её не дал."""
-        if not (DIARIZATION_AVAILABLE and settings.enable_diarization):
+        if not settings.enable_diarization or result.diarization:
             return result
-        if result.diarization:
+        diarization = _get_diarization_service()
+        if diarization is None:
             return result
 
         try:
             logger.info("Применение локальной диаризации к транскрипции...")
-            diarization_result = await diarization_service.diarize_file(file_path, language)
+            diarization_result = await diarization.diarize_file(file_path, language)
             if diarization_result:
                 result.diarization = diarization_result
                 logger.info(f"Диаризация применена. Найдено говорящих: {len(diarization_result.speakers)}")
@@ -357,39 +355,21 @@ class TranscriptionService:
 
         return result
 
-    async def _transcribe_with_progress(self, file_path: str, language: str):
-        """Транскрипция (не блокирует event loop)"""
-        import threading
-        
-        # Создаем результат для хранения
-        result_container = {"result": None, "error": None}
-        
-        def whisper_worker():
-            """Выполнить транскрипцию в отдельном потоке"""
-            try:
-                result_container["result"] = self.whisper_model.transcribe(
-                    file_path, 
-                    language=language,
-                    word_timestamps=False
-                )
-            except Exception as e:
-                result_container["error"] = e
-        
-        # Запускаем транскрипцию в отдельном потоке
-        thread = threading.Thread(target=whisper_worker)
-        thread.start()
-        
-        # Ожидаем выполнение, не блокируя event loop
-        while thread.is_alive():
-            await asyncio.sleep(0.1)
-        
-        # Ждем завершения в отдельном потоке, чтобы не блокировать event loop
-        await asyncio.to_thread(thread.join)
-        
-        if result_container["error"]:
-            raise result_container["error"]
-            
-        return result_container["result"]
+    async def _transcribe_with_progress(self, file_path: str, language: str,
+                                        progress: Optional[ProgressCallback] = None) -> dict:
+        """Транскрипция локальным Whisper вне event loop.
+
+        Задача уходит в пул процессов моделей, где Whisper остаётся загруженным
+        между задачами; без пула (``model_workers=0``) считается в потоке.
+        """
+        text = await run_model_job(
+            "whisper", file_path, language,
+            progress=progress, in_process=self._transcribe_in_process,
+        )
+        return {"text": text}
+
+    def _transcribe_in_process(self, file_path: str, language: str) -> str:
+        return whisper_transcribe(file_path, language)
     
     def cleanup_file(self, file_path: str):
         """Удалить временный файл"""
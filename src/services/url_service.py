@@ -1,11 +1,14 @@
 """
-Сервис для работы с URL файлами (Google Drive, Яндекс.Диск)
+Сервис для работы с URL файлами (Google Drive, Яндекс.Диск, Synology Drive)
 """
 
+import asyncio
+import hashlib
 import os
 import re
 import tempfile
-from typing import Optional, Tuple
+import weakref
+from typing import NamedTuple, Optional, Tuple
 from urllib.parse import urlparse
 
 import aiohttp
@@ -13,8 +16,33 @@ from loguru import logger
 
 from src.config import settings
 from src.exceptions.file import FileError, FileSizeError, FileTypeError
+from src.services.ranged_download import (
+    ProgressCallback,
+    RangedDownloader,
+    discard_partial,
+    probe_ranges,
+    progress_path,
+)
+from src.services.streaming_intake import may_stream, stream_video_to_audio
 from src.services.synology_link import SynologyShareResolver, is_synology_share_url
 
+# Одна ссылка — одна докачка: повторно присланная во время скачивания ссылка
+# ждёт первую попытку, а не пишет в тот же недокачанный файл
+_partial_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+def _partial_lock(partial_path: str) -> asyncio.Lock:
+    lock = _partial_locks.get(partial_path)
+    if lock is None:
+        lock = _partial_locks[partial_path] = asyncio.Lock()
+    return lock
+
+
+class DownloadedFile(NamedTuple):
+    """Скачанный файл: путь и SHA-256 содержимого (файл ради хеша не перечитывают вызывающие)."""
+    path: str
+    sha256: str
+
 
 class URLService:
     """Сервис для работы с URL файлами"""
@@ -290,19 +318,10 @@ class URLService:
     
     async def _get_file_size_by_range(self, url: str) -> int:
         """Получить размер файла через Range запрос"""
-        headers = {'Range': 'bytes=0-0'}
-        async with self.session.get(url, headers=headers) as response:
-            if response.status == 206:  # Partial Content
-                content_range = response.headers.get('content-range', '')
-                if content_range:
-                    # Формат: "bytes 0-0/total_size"
-                    total_size = content_range.split('/')[-1]
-                    if total_size.isdigit():
-                        return int(total_size)
-            
-            # Если не удалось получить размер, возвращаем 0
+        probe = await probe_ranges(self.session, url)
+        if not probe.total:
             logger.warning(f"Не удалось определить размер файла для {url}")
-            return 0
+        return probe.total
     
     def _extract_filename_from_header(self, content_disposition: str) -> Optional[str]:
         """Извлечь имя файла из заголовка Content-Disposition"""
@@ -344,15 +363,32 @@ class URLService:
                     filename
                 )
     
-    async def download_file(self, url: str, filename: str) -> str:
+    async def download_file(
+        self,
+        url: str,
+        filename: str,
+        on_progress: Optional[ProgressCallback] = None,
+        resume_key: Optional[str] = None,
+        extract_audio: bool = False,
+    ) -> DownloadedFile:
         """
-        Скачать файл и сохранить во временную директорию
-        Возвращает путь к скачанному файлу
+        Скачать файл и сохранить во временную директорию.
+        Возвращает путь к файлу и SHA-256 содержимого.
+
+        Если сервер поддерживает Range, файл качается параллельными
+        диапазонами и после сбоя докачивается: недокачанный файл живёт под
+        именем от ``resume_key`` (по умолчанию — сам URL), поэтому повторно
+        присланная ссылка продолжает с места обрыва. ``on_progress`` получает
+        прогресс и скорость скачивания.
+
+        ``extract_audio=True`` разрешает потоковый приём видео: байты идут
+        сразу в ffmpeg, и возвращается только аудио-артефакт (``*.intake.mp3``)
+        с SHA-256 исходного файла. Если контейнер из потока не разбирается,
+        файл качается как обычно.
         """
         if not self.session:
             raise FileError("Сессия не инициализирована")
         
-        # Создаем временный файл с правильным расширением
         os.makedirs(settings.temp_dir, exist_ok=True)
         
         # Определяем расширение файла
@@ -364,41 +400,71 @@ class URLService:
             else:
                 file_ext = '.mp4'  # По умолчанию для видео
         
-        temp_file = tempfile.NamedTemporaryFile(
-            dir=settings.temp_dir,
-            suffix=file_ext,
-            delete=False
-        )
-        temp_path = temp_file.name
-        temp_file.close()
+        key_digest = hashlib.sha256((resume_key or url).encode("utf-8")).hexdigest()[:24]
+        partial_path = os.path.join(settings.temp_dir, f"download_{key_digest}{file_ext}.partial")
         
-        try:
-            # Получаем прямую ссылку
-            if self._is_google_drive_url(url):
-                file_id = self._extract_google_drive_id(url)
-                download_url = await self._get_google_drive_real_download_url(file_id)
-            elif self._is_yandex_disk_url(url):
-                download_url = await self._get_yandex_disk_direct_url(url)
-            else:
-                download_url = url
-            
-            # Скачиваем файл
-            async with self.session.get(download_url) as response:
-                if response.status == 200:
-                    with open(temp_path, 'wb') as f:
-                        async for chunk in response.content.iter_chunked(8192):
-                            f.write(chunk)
-                    
-                    logger.info(f"Файл успешно скачан: {temp_path}")
-                    return temp_path
+        async with _partial_lock(partial_path):
+            try:
+                # Получаем прямую ссылку
+                if self._is_google_drive_url(url):
+                    file_id = self._extract_google_drive_id(url)
+                    download_url = await self._get_google_drive_real_download_url(file_id)
+                elif self._is_yandex_disk_url(url):
+                    download_url = await self._get_yandex_disk_direct_url(url)
                 else:
-                    raise FileError(f"Ошибка при скачивании файла. Код ответа: {response.status}")
+                    download_url = url
+                
+                if extract_audio and settings.streaming_intake and may_stream(filename):
+                    streamed = await self._stream_audio(download_url, on_progress)
+                    if streamed:
+                        return streamed
+                
+                downloader = RangedDownloader(
+                    self.session,
+                    parts=settings.download_parallel_parts,
+                    min_part_bytes=settings.download_min_part_mb * 1024 * 1024,
+                    max_retries=settings.download_max_retries,
+                    on_progress=on_progress,
+                )
+                _, sha256 = await downloader.download(download_url, partial_path)
+            
+            except Exception as e:
+                # Запись прогресса есть — оставляем файл для докачки (его
+                # подберёт следующая попытка или удалит очистка temp по возрасту)
+                if not os.path.exists(progress_path(partial_path)):
+                    discard_partial(partial_path)
+                if isinstance(e, FileError):
+                    raise
+                raise FileError(f"Ошибка при скачивании файла: {e}")
+            
+            # Готовый файл получает уникальное имя: ключ докачки свободен для
+            # следующей загрузки той же ссылки
+            fd, temp_path = tempfile.mkstemp(dir=settings.temp_dir, suffix=file_ext)
+            os.close(fd)
+            os.replace(partial_path, temp_path)
         
-        except Exception as e:
-            # Удаляем временный файл в случае ошибки
-            if os.path.exists(temp_path):
-                os.unlink(temp_path)
-            raise FileError(f"Ошибка при скачивании файла: {e}")
+        logger.info(f"Файл успешно скачан: {temp_path}")
+        return DownloadedFile(temp_path, sha256)
+    
+    async def _stream_audio(
+        self, download_url: str, on_progress: Optional[ProgressCallback]
+    ) -> Optional[DownloadedFile]:
+        """Потоковый приём видео; None — качаем файл обычным путём.
+
+        Обрыв сети посреди потока тоже ведёт к обычному пути: докачиваемое
+        скачивание по диапазонам переживёт повторный обрыв, поток — нет.
+        """
+        try:
+            streamed = await stream_video_to_audio(
+                self.session, download_url, settings.temp_dir, on_progress=on_progress
+            )
+        except FileError as e:
+            logger.warning(f"Потоковый приём не удался, качаем файл целиком: {e}")
+            return None
+        except (aiohttp.ClientError, asyncio.TimeoutError, ConnectionError) as e:
+            logger.warning(f"Потоковый приём оборвался ({type(e).__name__}: {e}), качаем файл по диапазонам")
+            return None
+        return DownloadedFile(*streamed) if streamed else None
     
     async def process_url(self, url: str) -> Tuple[str, str]:
         """
@@ -416,6 +482,6 @@ class URLService:
         # self.validate_file_by_info(filename, file_size)
         
         # Скачиваем файл
-        temp_path = await self.download_file(url, filename)
+        downloaded = await self.download_file(url, filename)
         
-        return temp_path, filename
+        return downloaded.path, filename
@@ -10,6 +10,7 @@ from src.database import user_repo
 from src.database.user_repo import UserRepository
 from src.exceptions.user import UserCreationError, UserNotFoundError
 from src.models.user import User, UserCreate
+from src.services.request_scope import current_scope
 
 
 class UserService:
@@ -19,7 +20,13 @@ class UserService:
         self._users = users
 
     async def get_user_by_telegram_id(self, telegram_id: int) -> Optional[User]:
-        """Получить пользователя по Telegram ID"""
+        """Получить пользователя по Telegram ID (внутри обработки — один раз)"""
+        scope = current_scope()
+        if scope is not None:
+            return await scope.user(telegram_id, self._load_user)
+        return await self._load_user(telegram_id)
+
+    async def _load_user(self, telegram_id: int) -> Optional[User]:
         try:
             user_data = await self._users.get_user(telegram_id)
             if user_data:
@@ -29,6 +36,13 @@ class UserService:
             logger.error(f"Ошибка при получении пользователя {telegram_id}: {e}")
             raise
 
+    @staticmethod
+    def _forget(telegram_id: int) -> None:
+        """Убрать устаревшую копию пользователя из области обработки"""
+        scope = current_scope()
+        if scope is not None:
+            scope.forget_user(telegram_id)
+
     async def get_user_default_template_id(self, telegram_id: int) -> Optional[int]:
         """Получить ID шаблона по умолчанию пользователя"""
         try:
@@ -53,6 +67,7 @@ class UserService:
                 first_name=user_data.first_name,
                 last_name=user_data.last_name
             )
+            self._forget(user_data.telegram_id)
 
             # Получаем созданного пользователя
             created_user = await self.get_user_by_telegram_id(user_data.telegram_id)
@@ -73,6 +88,7 @@ class UserService:
             if not user:
                 raise UserNotFoundError(telegram_id)
             await self._users.update_protocol_output_preference(telegram_id, mode)
+            self._forget(telegram_id)
             updated_user = await self.get_user_by_telegram_id(telegram_id)
             if not updated_user:
                 raise UserNotFoundError(telegram_id)
@@ -92,6 +108,7 @@ class UserService:
             if not user:
                 raise UserNotFoundError(telegram_id)
             await self._users.update_speaker_mapping_preference(telegram_id, enabled)
+            self._forget(telegram_id)
             updated_user = await self.get_user_by_telegram_id(telegram_id)
             if not updated_user:
                 raise UserNotFoundError(telegram_id)
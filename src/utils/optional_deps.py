@@ -0,0 +1,18 @@
+"""
+Проверка необязательных зависимостей без их импорта
+
+Импорт torch, whisperx или pyannote.audio ради флага «установлено ли» стоит
+секунды старта и сотни мегабайт памяти процесса бота, даже если локальные
+модели никогда не понадобятся. ``importlib.util.find_spec`` только ищет модуль
+на sys.path; настоящий импорт выполняется при первом использовании.
+"""
+
+import importlib.util
+
+
+def module_available(name: str) -> bool:
+    """Установлен ли модуль ``name`` (для ``a.b`` импортируется только пакет ``a``)."""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
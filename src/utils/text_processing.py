@@ -3,7 +3,8 @@
 """
 
 import re
-from typing import Dict, Tuple
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
 
 _SPEAKER_LABEL_RE = re.compile(r"\bSPEAKER[_\s](\d+)\b")
 
@@ -170,45 +171,65 @@ def humanize_speaker_labels_for_reader(protocol_text: str, warnings: list) -> st
 def replace_speakers_in_text(text: str, speaker_mapping: Dict[str, str]) -> str:
     """
     Заменяет все упоминания 'Спикер N' или 'SPEAKER_N' на реальные имена
-    
+
+    Один проход по тексту: все метки сопоставления собраны в одну
+    регулярку (см. ``_speaker_replacer``), имя для найденной метки берётся
+    из таблицы. Подставленное имя повторно не сканируется.
+
     Args:
         text: Исходный текст
         speaker_mapping: Словарь сопоставления {speaker_id: name}
-        
+
     Returns:
         Текст с замененными именами
     """
     if not speaker_mapping:
         return text
-    
-    result = text
-    
-    # Создаем список замен, отсортированный по длине (сначала более длинные)
-    # Это нужно чтобы "SPEAKER_10" заменялся раньше чем "SPEAKER_1"
-    replacements = sorted(
-        speaker_mapping.items(),
-        key=lambda x: len(x[0]),
-        reverse=True
-    )
-    
-    for speaker_id, name in replacements:
-        # Паттерны для поиска различных вариантов написания
-        patterns = [
-            # "SPEAKER_1", "SPEAKER_2" и т.д.
-            (rf'\b{re.escape(speaker_id)}\b', name),
-            
-            # "Спикер 1", "Спикер 2" и т.д. (извлекаем номер)
-            (rf'\bСпикер\s+{_extract_speaker_number(speaker_id)}\b', name),
-            
-            # Варианты с двоеточием "SPEAKER_1:", "Спикер 1:"
-            (rf'\b{re.escape(speaker_id)}:', f'{name}:'),
-            (rf'\bСпикер\s+{_extract_speaker_number(speaker_id)}:', f'{name}:'),
-        ]
-        
-        for pattern, replacement in patterns:
-            result = re.sub(pattern, replacement, result, flags=re.IGNORECASE)
-    
-    return result
+
+    replacer = _speaker_replacer(tuple(speaker_mapping.items()))
+    if replacer is None:
+        return text
+    pattern, by_id, by_number = replacer
+
+    def lookup(match: "re.Match[str]") -> str:
+        speaker_id = match.group("id")
+        if speaker_id is not None:
+            return by_id[speaker_id.lower()]
+        return by_number[match.group("num")]
+
+    return pattern.sub(lookup, text)
+
+
+@lru_cache(maxsize=64)
+def _speaker_replacer(
+    items: Tuple[Tuple[str, str], ...],
+) -> Optional[Tuple["re.Pattern[str]", Dict[str, str], Dict[str, str]]]:
+    """Регулярка и таблицы имён для сопоставления (кешируется по сопоставлению).
+
+    Альтернативы идут от длинных меток к коротким — ``SPEAKER_10`` раньше
+    ``SPEAKER_1``; при совпадении меток без учёта регистра или номеров
+    «Спикер N» побеждает первая в этом порядке.
+    """
+    # Сначала более длинные: "SPEAKER_10" должен заменяться раньше "SPEAKER_1"
+    ordered = sorted((item for item in items if item[0]), key=lambda x: len(x[0]), reverse=True)
+    by_id: Dict[str, str] = {}
+    by_number: Dict[str, str] = {}
+    for speaker_id, name in ordered:
+        by_id.setdefault(speaker_id.lower(), name)
+        number = _extract_speaker_number(speaker_id)
+        if number:
+            by_number.setdefault(number, name)
+    if not by_id:
+        return None
+
+    ids = "|".join(re.escape(speaker_id) for speaker_id, _ in ordered)
+    # "SPEAKER_1" целым словом или перед двоеточием ("SPEAKER_1:")
+    alternatives = [rf"\b(?P<id>{ids})(?:\b|(?=:))"]
+    if by_number:
+        numbers = "|".join(sorted(by_number, key=len, reverse=True))
+        # "Спикер 1", "Спикер 1:"
+        alternatives.append(rf"\bСпикер\s+(?P<num>{numbers})\b")
+    return re.compile("|".join(alternatives), re.IGNORECASE), by_id, by_number
 
 
 def _extract_speaker_number(speaker_id: str) -> str:
@@ -7,6 +7,8 @@
 Фаз 1–3; статусы и состояния называем словами, а не декоративными глифами.
 """
 
+from typing import Optional
+
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 
 from src.ux.html_text import esc
@@ -73,11 +75,20 @@ def admin_help_text() -> str:
 
 
 def performance_report(cache_stats: dict, memory_stats: dict,
-                       task_stats: dict, metrics_stats: dict) -> str:
+                       task_stats: dict, metrics_stats: dict,
+                       model_stats: Optional[dict] = None) -> str:
     """Отчёт производительности (единый источник /performance)."""
     current = memory_stats["current_memory"]
     processing = metrics_stats["processing"]
     optimizing = "Вкл" if memory_stats["is_optimizing"] else "Выкл"
+    models = ""
+    if model_stats:
+        models = (
+            "\n\n<b>Локальные модели</b>\n"
+            f"• Загрузок: {model_stats['model_loads']}\n"
+            f"• Тёплых попаданий: {model_stats['model_hits']}\n"
+            f"• Выгрузок: {model_stats['model_evictions']}"
+        )
     return (
         "<b>Статистика производительности</b>\n\n"
 
@@ -103,6 +114,7 @@ def performance_report(cache_stats: dict, memory_stats: dict,
         f"• Успешность: {processing['success_rate_percent']}%\n"
         f"• Среднее время: {processing['avg_duration_seconds']}с\n"
         f"• Эффективность: {processing['avg_efficiency_ratio']}"
+        f"{models}"
     )
 
 
@@ -116,7 +116,7 @@ class FeedbackCollector:
     async def _save_feedback_to_db(self, feedback: FeedbackEntry):
         """Сохранить обратную связь в БД"""
         try:
-            await feedback_repo.save_feedback(
+            await feedback_repo.queue_feedback(
                 user_id=feedback.user_id,
                 rating=feedback.rating,
                 feedback_type=feedback.feedback_type,
@@ -38,6 +38,14 @@ RECORD_LOST_LINK = (
     "Пришлите ссылку ещё раз."
 )
 
+# Очередь обработки заполнена (asyncio.QueueFull): запись не принята, но
+# проблема временная — пользователь должен повторить позже, а не считать запись
+# сломанной.
+QUEUE_FULL = (
+    "⏳ Очередь обработки сейчас заполнена.\n"
+    "Отправьте запись ещё раз через несколько минут."
+)
+
 
 class MessageBuilder:
     """Строитель красивых сообщений"""
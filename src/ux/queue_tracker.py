@@ -1,5 +1,10 @@
 """
 Трекер позиции задачи в очереди
+
+Трекер не опрашивает очередь: он подписывается на события
+``TaskQueueManager`` и перечитывает позицию не чаще раза в
+``queue_update_interval`` секунд, собирая пачку событий в одну правку
+сообщения. Пока очередь не меняется, трекер ничего не делает.
 """
 
 import asyncio
@@ -9,6 +14,7 @@ from aiogram import Bot
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup, Message
 from loguru import logger
 
+from src.config import settings
 from src.utils.duration import format_duration
 from src.utils.telegram_safe import safe_bot_edit_message, safe_send_message
 
@@ -27,6 +33,8 @@ class QueuePositionTracker:
         self.is_active = True
         self._update_task: Optional[asyncio.Task] = None
         self._last_text = ""
+        self._queue_manager = None
+        self._dirty = False
     
     def create_cancel_button(self) -> InlineKeyboardMarkup:
         """Создать кнопку отмены задачи (без эмодзи: отмена — не ошибка)."""
@@ -160,9 +168,53 @@ class QueuePositionTracker:
         except Exception as e:
             logger.warning(f"Не удалось удалить сообщение очереди: {e}")
     
+    def follow(self, queue_manager) -> None:
+        """Подписаться на изменения позиций в очереди ``queue_manager``"""
+        self._queue_manager = queue_manager
+        queue_manager.subscribe_positions(self.task_id, self._on_queue_changed)
+        # Задача могла сдвинуться или стартовать до подписки
+        self._on_queue_changed()
+    
+    def _on_queue_changed(self) -> None:
+        """Отметить, что позиция устарела, и запланировать правку сообщения"""
+        if not self.is_active:
+            return
+        self._dirty = True
+        if self._update_task is None or self._update_task.done():
+            self._update_task = asyncio.create_task(self._flush_updates())
+    
+    async def _flush_updates(self):
+        """Применить накопленные события одной правкой за окно группировки"""
+        try:
+            while self._dirty and self.is_active:
+                await asyncio.sleep(settings.queue_update_interval)
+                self._dirty = False
+                
+                position = await self._queue_manager.get_queue_position(self.task_id)
+                if position is None:
+                    # Задача стартовала (воркер сам заменит сообщение прогрессом)
+                    # или уже снята с очереди: отмену показывает обработчик кнопки
+                    self._unsubscribe()
+                    self.is_active = False
+                    if await self._queue_manager.get_task(self.task_id) is not None:
+                        await self.delete_message()
+                    return
+                
+                total = await self._queue_manager.get_queue_size()
+                await self.update_position(position, total)
+        except asyncio.CancelledError:
+            logger.debug(f"Обновление позиции задачи {self.task_id} отменено")
+        except Exception as e:
+            logger.error(f"Ошибка обновления позиции задачи {self.task_id}: {e}")
+    
+    def _unsubscribe(self) -> None:
+        if self._queue_manager is not None:
+            self._queue_manager.unsubscribe_positions(self.task_id)
+    
     async def stop(self):
         """Остановить отслеживание"""
         self.is_active = False
+        self._unsubscribe()
         if self._update_task:
             self._update_task.cancel()
             try:
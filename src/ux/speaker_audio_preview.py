@@ -55,7 +55,7 @@ async def _prepare_clip(
     """Выбрать окно и вырезать клип спикера. Возвращает путь к .ogg или None."""
     # Пробрасываем сегменты в чистый выборщик окна как dict-и — его контракт и
     # его тесты (test_audio_fragment_service) остаются на голых сегментах.
-    segments = [s.model_dump() for s in diarization.segments] if diarization else []
+    segments = diarization.segments.to_dicts() if diarization else []
     window = select_fragment_window(
         segments,
         speaker_id,
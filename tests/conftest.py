@@ -27,7 +27,8 @@ async def test_db(tmp_path):
     db_path = str(tmp_path / "test.db")
     db = Database(db_path=db_path)
     await db.init_db()
-    return db
+    yield db
+    await db.close()
 
 
 @pytest.fixture
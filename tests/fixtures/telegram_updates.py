@@ -0,0 +1,31 @@
+"""Записанные обновления Telegram (тела POST-запросов вебхука)."""
+
+RECORDED_UPDATES = [
+    {
+        "update_id": 700000001,
+        "message": {
+            "message_id": 11,
+            "date": 1760600000,
+            "chat": {"id": 1001, "type": "private", "first_name": "Анна"},
+            "from": {"id": 1001, "is_bot": False, "first_name": "Анна", "language_code": "ru"},
+            "text": "/start",
+            "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+        },
+    },
+    {
+        "update_id": 700000002,
+        "callback_query": {
+            "id": "4382bfdwdsb323b2d9",
+            "chat_instance": "-8273421749113274",
+            "from": {"id": 1001, "is_bot": False, "first_name": "Анна", "language_code": "ru"},
+            "message": {
+                "message_id": 12,
+                "date": 1760600005,
+                "chat": {"id": 1001, "type": "private", "first_name": "Анна"},
+                "from": {"id": 42, "is_bot": True, "first_name": "Soroka", "username": "soroka_bot"},
+                "text": "Выберите шаблон",
+            },
+            "data": "template:1",
+        },
+    },
+]
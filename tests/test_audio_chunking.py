@@ -0,0 +1,135 @@
+"""Нарезка длинной записи на окна и склейка транскрипций (Groq > 25 MB).
+
+Планировщик и склейка — чистые функции; ffmpeg/Groq в тесте адаптера
+подменены на границе (audio_chunking.*, groq_client).
+"""
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.services import audio_chunking as ac
+from src.services.audio_chunking import AudioWindow, WindowSegment
+
+
+def test_short_record_is_one_window_without_overlap():
+    windows = ac.plan_windows(300.0, [], max_seconds=600, overlap_seconds=5)
+
+    assert windows == [AudioWindow(0, 0.0, 300.0, 0.0, 300.0)]
+
+
+def test_windows_cut_on_silence_and_respect_limit():
+    # пауза 540–542 с ближе всего к пределу зоны (590 с) — резать там
+    silences = [(100.0, 101.0), (540.0, 542.0), (1000.0, 1003.0)]
+
+    windows = ac.plan_windows(1500.0, silences, max_seconds=600, overlap_seconds=5)
+
+    assert windows[0].keep_end == 541.0
+    assert windows[1].keep_start == 541.0
+    assert windows[1].start == 536.0            # перекрытие назад
+    assert windows[0].end == 546.0              # и вперёд
+    assert windows[-1].keep_end == windows[-1].end == 1500.0
+    assert all(w.duration <= 600 for w in windows)
+    # зоны ответственности покрывают запись без дыр
+    assert [w.keep_start for w in windows[1:]] == [w.keep_end for w in windows[:-1]]
+
+
+def test_hard_cut_when_no_silence_in_range():
+    windows = ac.plan_windows(1000.0, [(10.0, 11.0)], max_seconds=400, overlap_seconds=10)
+
+    assert windows[0].keep_end == 380.0
+    assert all(w.duration <= 400 for w in windows)
+
+
+def test_overlap_larger_than_window_is_rejected():
+    with pytest.raises(ValueError):
+        ac.plan_windows(1000.0, [], max_seconds=10, overlap_seconds=5)
+
+
+def test_stitch_shifts_timestamps_and_keeps_each_segment_once():
+    first = AudioWindow(0, 0.0, 105.0, 0.0, 100.0)
+    second = AudioWindow(1, 95.0, 200.0, 100.0, 200.0)
+    results = [
+        (second, "", [
+            WindowSegment(0.0, 4.0, "конец первой фразы"),   # 95–99: зона первого окна
+            WindowSegment(6.0, 10.0, "вторая часть"),          # 101–105
+        ]),
+        (first, "", [
+            WindowSegment(90.0, 99.0, "конец первой фразы"),
+            WindowSegment(100.5, 104.0, "вторая часть"),       # середина 102 — чужая зона
+        ]),
+    ]
+
+    text, segments = ac.stitch_windows(results)
+
+    assert text == "конец первой фразы вторая часть"
+    assert [(s.start, s.end) for s in segments] == [(90.0, 99.0), (101.0, 105.0)]
+
+
+def test_stitch_removes_repeated_words_without_segments():
+    first = AudioWindow(0, 0.0, 105.0, 0.0, 100.0)
+    second = AudioWindow(1, 95.0, 200.0, 100.0, 200.0)
+
+    text, segments = ac.stitch_windows([
+        (first, "Мы обсудили бюджет. Дальше", None),
+        (second, "бюджет, дальше сроки проекта", None),
+    ])
+
+    assert text == "Мы обсудили бюджет. Дальше сроки проекта"
+    assert segments == []
+
+
+def test_segments_from_sdk_object_and_dict():
+    sdk = SimpleNamespace(segments=[{"start": 1, "end": 2.5, "text": " привет"}])
+    assert ac.segments_from_response(sdk) == [WindowSegment(1.0, 2.5, " привет")]
+
+    assert ac.segments_from_response({"segments": [{"start": None, "end": 1, "text": "x"}]}) is None
+    assert ac.segments_from_response(SimpleNamespace(text="только текст")) is None
+
+
+async def test_groq_backend_chunks_oversized_file(tmp_path, monkeypatch):
+    from src.services import transcription_backends as tb
+    from src.services.transcription_service import TranscriptionService
+
+    processed = tmp_path / "long_preprocessed.mp3"
+    processed.write_bytes(b"x" * 10)
+
+    service = TranscriptionService.__new__(TranscriptionService)
+    service.temp_dir = tmp_path
+    service.groq_client = MagicMock()
+
+    async def fake_preprocess(**kwargs):
+        return str(processed), {"compressed": True}
+
+    service._preprocess_audio = fake_preprocess
+
+    async def fake_duration(path):
+        return 2000.0
+
+    async def fake_silences(path):
+        return []
+
+    async def fake_cut(src, window, out):
+        with open(out, "wb") as f:
+            f.write(str(window.index).encode())
+        return True
+
+    def fake_create(file, model, response_format):
+        index = int(file[1].decode())
+        return SimpleNamespace(text=f"окно {index}", segments=None)
+
+    monkeypatch.setattr(tb.GroqBackend, "MAX_FILE_SIZE", 5)  # запись больше лимита, окна — нет
+    monkeypatch.setattr(tb.settings, "groq_chunked_transcription", True)
+    monkeypatch.setattr(tb.settings, "groq_chunk_max_seconds", 900)
+    monkeypatch.setattr(tb.settings, "groq_chunk_overlap_seconds", 0)
+    monkeypatch.setattr(tb.audio_chunking, "probe_duration", fake_duration)
+    monkeypatch.setattr(tb.audio_chunking, "detect_silences", fake_silences)
+    monkeypatch.setattr(tb.audio_chunking, "cut_window", fake_cut)
+    service.groq_client.audio.transcriptions.create.side_effect = fake_create
+
+    result = await tb.GroqBackend(service).transcribe(str(processed), "ru")
+
+    assert result.transcription == "окно 0 окно 1 окно 2"
+    assert result.diarization is None
+    assert result.compression_info == {"compressed": True}
+    assert list(tmp_path.glob("*_w*.mp3")) == []   # окна за собой убраны
@@ -21,6 +21,13 @@ from src.services.brief_compiler import brief_field_rules, brief_to_schema
 from src.services.protocol_briefs import get_brief_for
 
 
+def _client():
+    """Мок AsyncOpenAI: chat.completions.create — корутина."""
+    client = MagicMock()
+    client.chat.completions.create = AsyncMock()
+    return client
+
+
 def _response(payload: dict):
     resp = MagicMock()
     resp.choices = [MagicMock()]
@@ -75,7 +82,7 @@ def _generation_kwargs(client):
 
 async def test_system_template_sends_brief_schema():
     """Дейли (системный шаблон с брифом) → в LLM уходит его строгая бриф-схема."""
-    client = MagicMock()
+    client = _client()
     client.chat.completions.create.side_effect = [_response(GENERATION_PAYLOAD)]
     gen = _fast_generator(client)
 
@@ -90,7 +97,7 @@ async def test_system_template_sends_brief_schema():
 
 async def test_custom_template_sends_legacy_schema():
     """Кастомный шаблон (брифа нет) → legacy PROTOCOL_DATA_SCHEMA без изменений."""
-    client = MagicMock()
+    client = _client()
     client.chat.completions.create.side_effect = [_response(GENERATION_PAYLOAD)]
     gen = _fast_generator(client)
 
@@ -103,7 +110,7 @@ async def test_custom_template_sends_legacy_schema():
 
 async def test_missing_template_name_sends_legacy_schema():
     """Имя шаблона не передано → legacy-путь (обратная совместимость)."""
-    client = MagicMock()
+    client = _client()
     client.chat.completions.create.side_effect = [_response(GENERATION_PAYLOAD)]
     gen = _fast_generator(client)
 
@@ -115,7 +122,7 @@ async def test_missing_template_name_sends_legacy_schema():
 
 async def test_brief_prompt_carries_section_instructions():
     """Бриф-путь: системный промпт ЭТАПА 2 несёт инструкции секций брифа."""
-    client = MagicMock()
+    client = _client()
     client.chat.completions.create.side_effect = [_response(GENERATION_PAYLOAD)]
     gen = _fast_generator(client)
 
@@ -3,6 +3,7 @@
 """
 
 import asyncio
+import pickle
 import shutil
 import tempfile
 from datetime import datetime, timedelta
@@ -13,6 +14,7 @@ import pytest_asyncio
 from src.performance.cache_system import (
     CacheEntry,
     PerformanceCache,
+    estimate_size,
 )
 
 
@@ -307,6 +309,160 @@ class TestPerformanceCache:
         assert entry2.last_accessed > first_accessed
 
 
+class TestCacheQuotas:
+    """Тесты O(1) LRU и квот по типам кэша"""
+    
+    @pytest.mark.asyncio
+    async def test_get_moves_entry_to_lru_tail(self, temp_cache):
+        """Обращение переносит ключ в конец порядка вытеснения"""
+        for key in ("a", "b", "c"):
+            await temp_cache.set(key, key)
+        
+        await temp_cache.get("a")
+        
+        assert list(temp_cache.memory_cache) == ["b", "c", "a"]
+    
+    @pytest.mark.asyncio
+    async def test_type_quota_does_not_evict_other_types(self, temp_cache):
+        """Переполнение квоты одного типа вытесняет только его записи"""
+        await temp_cache.set("tr", {"data": "t" * 1024}, cache_type="transcription")
+        
+        # llm_response — 15% от 1 MB: десяток записей по 50 KB квоту переполняют
+        for i in range(10):
+            await temp_cache.set(f"llm:{i}", {"data": "x" * (50 * 1024)}, cache_type="llm_response")
+        
+        assert temp_cache.get_stats()["evictions"] > 0
+        assert await temp_cache.get("tr") == {"data": "t" * 1024}
+        assert await temp_cache.get("llm:0") is None
+        assert await temp_cache.get("llm:9") is not None
+        
+        by_type = temp_cache.get_stats()["memory_by_type"]
+        assert by_type["llm_response"]["usage_mb"] <= by_type["llm_response"]["quota_mb"]
+        assert by_type["transcription"]["entries"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_entry_over_type_quota_goes_to_disk(self, temp_cache):
+        """Запись крупнее квоты своего типа сохраняется на диск, а не в память"""
+        value = {"data": "x" * (200 * 1024)}  # больше 15% от 1 MB
+        
+        await temp_cache.set("big:llm", value, cache_type="llm_response")
+        
+        assert "big:llm" not in temp_cache.memory_cache
+        assert (temp_cache.disk_cache_dir / "big:llm.pkl").exists()
+        assert await temp_cache.get("big:llm") == value
+    
+    @pytest.mark.asyncio
+    async def test_overwrite_does_not_leak_memory_usage(self, temp_cache):
+        """Повторная запись того же ключа не удваивает учтённый объём"""
+        await temp_cache.set("key", "x" * 1000)
+        usage = temp_cache.current_memory_usage
+        
+        await temp_cache.set("key", "x" * 1000)
+        
+        assert temp_cache.current_memory_usage == usage
+        assert len(temp_cache.memory_cache) == 1
+    
+    def test_estimate_size_walks_nested_objects(self):
+        """Оценка размера учитывает вложенные контейнеры и атрибуты объектов"""
+        class Holder:
+            def __init__(self, payload):
+                self.payload = payload
+        
+        small = Holder({"segments": ["a"] * 10})
+        large = Holder({"segments": ["a" * 1000 + str(i) for i in range(100)]})
+        
+        assert estimate_size(large) > 100 * 1000
+        assert estimate_size(small) < estimate_size(large)
+
+
+class TestDiskCacheIndex:
+    """Тесты манифеста дискового уровня"""
+    
+    @staticmethod
+    def _large(tag: str):
+        return {"data": tag * (1024 * 1024 + 1000)}
+    
+    @pytest.mark.asyncio
+    async def test_cleanup_expired_does_not_unpickle(self, temp_cache, monkeypatch):
+        """Просроченные записи на диске удаляются по индексу, без чтения файлов"""
+        await temp_cache.set("disk:old", self._large("o"), ttl=timedelta(seconds=0.1))
+        await temp_cache.set("disk:new", self._large("n"), ttl=timedelta(hours=1))
+        await asyncio.sleep(0.3)
+        
+        def _no_unpickle(*args, **kwargs):
+            raise AssertionError("cleanup_expired не должен распаковывать payload")
+        
+        monkeypatch.setattr("src.performance.cache_system.pickle.loads", _no_unpickle)
+        await temp_cache.cleanup_expired()
+        
+        assert not (temp_cache.disk_cache_dir / "disk:old.pkl").exists()
+        assert (temp_cache.disk_cache_dir / "disk:new.pkl").exists()
+        assert temp_cache.get_stats()["disk_entries"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_expired_disk_entry_is_miss_without_read(self, temp_cache):
+        """Просроченная запись на диске — промах, файл удаляется"""
+        await temp_cache.set("disk:ttl", self._large("t"), ttl=timedelta(seconds=0.1))
+        await asyncio.sleep(0.3)
+        
+        assert await temp_cache.get("disk:ttl") is None
+        assert not (temp_cache.disk_cache_dir / "disk:ttl.pkl").exists()
+    
+    @pytest.mark.asyncio
+    async def test_disk_size_limit_evicts_least_recently_used(self):
+        """Сверх лимита диска вытесняются давно не использованные записи"""
+        temp_dir = tempfile.mkdtemp()
+        cache = PerformanceCache(cache_dir=temp_dir, max_memory_mb=1, max_disk_mb=3)
+        try:
+            await cache.set("disk:a", self._large("a"))
+            await cache.set("disk:b", self._large("b"))
+            await asyncio.sleep(0.01)
+            assert await cache.get("disk:a") is not None  # a теперь свежее b
+            await cache.set("disk:c", self._large("c"))
+            
+            assert (cache.disk_cache_dir / "disk:a.pkl").exists()
+            assert not (cache.disk_cache_dir / "disk:b.pkl").exists()
+            assert cache.get_stats()["disk_evictions"] == 1
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+    
+    @pytest.mark.asyncio
+    async def test_clear_by_type_removes_disk_entries(self, temp_cache):
+        """Очистка по типу затрагивает и дисковый уровень"""
+        await temp_cache.set("disk:tr", self._large("t"), cache_type="transcription")
+        await temp_cache.set("disk:llm", self._large("l"), cache_type="llm_response")
+        
+        await temp_cache.clear(cache_type="transcription")
+        
+        assert await temp_cache.get("disk:tr") is None
+        assert await temp_cache.get("disk:llm") is not None
+    
+    @pytest.mark.asyncio
+    async def test_files_written_before_index_are_adopted(self):
+        """Файлы из кэша без индекса учитываются при первом обращении"""
+        temp_dir = tempfile.mkdtemp()
+        try:
+            legacy = PerformanceCache(cache_dir=temp_dir, max_memory_mb=1)
+            entry = CacheEntry(key="legacy", value="v", created_at=datetime.now(), size_bytes=10)
+            (legacy.disk_cache_dir / "legacy.pkl").write_bytes(pickle.dumps(entry))
+            
+            cache = PerformanceCache(cache_dir=temp_dir, max_memory_mb=1)
+            assert cache.get_stats()["disk_entries"] == 1
+            assert await cache.get("legacy") == "v"
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+    
+    @pytest.mark.asyncio
+    async def test_write_leaves_no_temp_files(self, temp_cache):
+        """Запись идёт через временный файл, который заменяет целевой"""
+        await temp_cache.set("disk:atomic", self._large("a"))
+        await temp_cache.set("disk:atomic", self._large("b"))
+        
+        names = [p.name for p in temp_cache.disk_cache_dir.iterdir()]
+        assert names == ["disk:atomic.pkl"]
+        assert await temp_cache.get("disk:atomic") == self._large("b")
+
+
 class TestCacheIntegration:
     """Интеграционные тесты кеша"""
     
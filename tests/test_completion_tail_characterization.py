@@ -324,7 +324,7 @@ async def test_regen_full_result_and_applies_replace_speakers(monkeypatch):
         "id": 7,
         "user_id": 42,
         "file_name": "meeting.mp3",
-        "transcription_text": "полная расшифровка встречи",
+        "has_transcription": True,
         "result_text": "# Старый протокол",
         "speaker_mapping": json.dumps(
             {"SPEAKER_00": "Иван Петров"}, ensure_ascii=False
@@ -334,6 +334,10 @@ async def test_regen_full_result_and_applies_replace_speakers(monkeypatch):
     monkeypatch.setattr(
         db_module.history_repo, "get_result_for_user", AsyncMock(return_value=row)
     )
+    monkeypatch.setattr(
+        db_module.history_repo, "get_transcription_text",
+        AsyncMock(return_value="полная расшифровка встречи"),
+    )
     monkeypatch.setattr(
         db_module.history_repo, "save_processing_result", AsyncMock(return_value=101)
     )
@@ -382,3 +386,26 @@ async def test_regen_full_result_and_applies_replace_speakers(monkeypatch):
     # Страховка замены спикеров применяется к сохранённому сопоставлению
     replace_spy.assert_called_once()
     assert replace_spy.call_args.args[1] == {"SPEAKER_00": "Иван Петров"}
+
+
+def test_stage1_prefetch_uses_generation_context(monkeypatch):
+    """Предвыборка ЭТАПА 1 в конвейере собирает вход так же, как генерация:
+    иначе генерация не найдёт её по промпту и заплатит за второй вызов."""
+    import src.llm as llm
+    import src.services.processing.processing_service as pss
+    from src.services.processing.llm_generation import stage1_context
+
+    calls = []
+    monkeypatch.setattr(
+        llm.protocol_generator, "prefetch_analysis",
+        lambda **kwargs: calls.append(kwargs) or True,
+    )
+    service = pss.ProcessingService.__new__(pss.ProcessingService)
+    request = ProcessingRequest(
+        file_name="a.mp3", llm_provider="openai", user_id=1, meeting_agenda="1. План",
+    )
+    transcription = TranscriptionResult(transcription="текст")
+
+    service._prefetch_stage1(request, transcription)
+
+    assert calls == [{"transcription": "текст", **stage1_context(request)}]
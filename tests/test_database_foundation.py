@@ -43,3 +43,39 @@ async def test_init_db_fresh_schema_is_complete(test_db):
     """После init_db на пустой БД схема актуальна — репозиториям не нужно самолечение."""
     assert "saved_participants" in await _column_names(test_db, "users")
     assert "updated_at" in await _column_names(test_db, "templates")
+
+
+async def test_pool_runs_in_wal_and_reuses_connections(test_db):
+    """Соединения пула долгоживущие, БД в режиме WAL."""
+    async with test_db.connect() as first:
+        cursor = await first.execute("PRAGMA journal_mode")
+        assert (await cursor.fetchone())[0] == "wal"
+    async with test_db.connect() as second:
+        assert second is first
+
+
+async def test_reader_sees_committed_write(test_db):
+    async with test_db.connect() as conn:
+        await conn.execute("INSERT INTO users (telegram_id) VALUES (42)")
+        await conn.commit()
+
+    async with test_db.read() as conn:
+        cursor = await conn.execute("SELECT COUNT(*) FROM users WHERE telegram_id = 42")
+        assert (await cursor.fetchone())[0] == 1
+
+
+async def test_failed_write_block_does_not_leak_transaction(test_db):
+    """Незакоммиченное в упавшем блоке не попадает в следующий блок писателя."""
+    try:
+        async with test_db.connect() as conn:
+            await conn.execute("INSERT INTO users (telegram_id) VALUES (7)")
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+
+    async with test_db.connect() as conn:
+        assert not conn.in_transaction
+        await conn.commit()
+    async with test_db.read() as conn:
+        cursor = await conn.execute("SELECT COUNT(*) FROM users WHERE telegram_id = 7")
+        assert (await cursor.fetchone())[0] == 0
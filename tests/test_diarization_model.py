@@ -128,3 +128,92 @@ def test_start_end_optional_default_to_none():
     assert diar.segments[0].model_dump() == {
         "speaker": "SPEAKER_1", "text": "привет", "start": None, "end": None
     }
+
+
+def _three_segments():
+    return [
+        Segment(speaker="SPEAKER_1", text="привет", start=0.0, end=1.0),
+        Segment(speaker="SPEAKER_2", text="здравствуй", start=1.0, end=2.0),
+        Segment(speaker="SPEAKER_1", text="как дела", start=2.0, end=3.0),
+    ]
+
+
+def test_segments_read_back_as_typed_segments():
+    """Колоночное хранение прозрачно: сегменты читаются как `Segment` в исходном порядке."""
+    diar = Diarization(segments=_three_segments())
+
+    assert len(diar.segments) == 3
+    assert list(diar.segments) == _three_segments()
+    assert diar.segments[-1] == Segment(speaker="SPEAKER_1", text="как дела", start=2.0, end=3.0)
+    assert [s.speaker for s in diar.segments[1:]] == ["SPEAKER_2", "SPEAKER_1"]
+
+
+def test_derived_views_are_computed_once(monkeypatch):
+    """Форматированная транскрипция считается при первом чтении и дальше берётся из кэша."""
+    import src.models.diarization as diarization_module
+
+    calls = []
+    original = diarization_module.format_transcript_with_speaker_sequence
+
+    def counting(segments):
+        calls.append(len(segments))
+        return original(segments)
+
+    monkeypatch.setattr(diarization_module, "format_transcript_with_speaker_sequence", counting)
+    diar = Diarization(segments=_three_segments())
+
+    first = diar.formatted_transcript
+    assert diar.formatted_transcript is first
+    assert diar.speakers_summary == diar.speakers_summary
+    assert calls == [3]
+
+
+def test_cached_views_are_not_shared_mutable_state():
+    """Изменение возвращённых списка/словаря не портит закешированное представление."""
+    diar = Diarization(segments=_three_segments())
+
+    diar.speakers.append("SPEAKER_X")
+    diar.speakers_text["SPEAKER_1"] = "испорчено"
+
+    assert diar.speakers == ["SPEAKER_1", "SPEAKER_2"]
+    assert diar.speakers_text["SPEAKER_1"] == "привет как дела"
+
+
+def test_assigning_segments_invalidates_views():
+    """Замена сегментов сбрасывает производные представления."""
+    diar = Diarization(segments=_three_segments())
+    assert diar.formatted_transcript.startswith("SPEAKER_1")
+
+    diar.segments = [Segment(speaker="SPEAKER_9", text="новое")]
+
+    assert diar.speakers == ["SPEAKER_9"]
+    assert diar.formatted_transcript == "SPEAKER_9: новое"
+
+
+def test_json_round_trip_keeps_segment_dict_shape():
+    """Сериализация даёт прежний список dict'ов сегментов и читается обратно."""
+    diar = Diarization(segments=[Segment(speaker="SPEAKER_1", text="раз")])
+
+    assert diar.model_dump() == {
+        "segments": [{"speaker": "SPEAKER_1", "text": "раз", "start": None, "end": None}]
+    }
+    restored = Diarization.model_validate_json(diar.model_dump_json())
+    assert restored.segments == diar.segments
+
+
+def test_pickle_skips_view_cache_and_upgrades_old_records():
+    """Pickle не тащит кэш представлений; старые записи со списком Segment поднимаются."""
+    import pickle
+
+    diar = Diarization(segments=_three_segments())
+    _ = diar.formatted_transcript
+    restored = pickle.loads(pickle.dumps(diar))
+    assert restored.segments._views == {}
+    assert restored.formatted_transcript == diar.formatted_transcript
+
+    # Форма до колоночного хранения: в __dict__ лежит обычный список Segment
+    legacy = Diarization.__new__(Diarization)
+    state = diar.__getstate__()
+    state["__dict__"] = {"segments": _three_segments()}
+    legacy.__setstate__(state)
+    assert legacy.speakers == ["SPEAKER_1", "SPEAKER_2"]
@@ -0,0 +1,58 @@
+"""Хеш файла считается один раз — по ходу скачивания, а не перечитыванием диска."""
+import hashlib
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+from src.models.processing import ProcessingRequest
+from src.performance.async_optimization import file_hash_from_sha256, write_stream_hashed
+from src.services.processing.processing_history import ProcessingHistoryService
+
+
+async def _chunks(*parts):
+    for part in parts:
+        yield part
+
+
+async def test_stream_write_hashes_in_the_same_pass(tmp_path):
+    target = tmp_path / "rec.mp4"
+
+    size, sha256 = await write_stream_hashed(_chunks(b"abc", b"", b"def"), str(target))
+
+    assert target.read_bytes() == b"abcdef"
+    assert size == 6
+    assert sha256 == hashlib.sha256(b"abcdef").hexdigest()
+
+
+async def test_streamed_hash_matches_disk_fallback(tmp_path):
+    target = tmp_path / "rec.mp4"
+    _, sha256 = await write_stream_hashed(_chunks(b"x" * 5000, b"y" * 7000), str(target))
+
+    from_disk = await ProcessingHistoryService.calculate_file_hash(str(target))
+
+    # ключи кеша совпадают, как бы хеш ни был получен
+    assert file_hash_from_sha256(sha256) == from_disk
+
+
+async def test_file_hash_from_request_skips_disk():
+    import src.services.processing.processing_service as pss
+
+    service = pss.ProcessingService.__new__(pss.ProcessingService)
+    service.history = SimpleNamespace(calculate_file_hash=AsyncMock(return_value="ondisk"))
+    request = ProcessingRequest(
+        file_name="a.mp3", llm_provider="openai", user_id=1, file_hash="streamed"
+    )
+
+    assert await service._file_hash(request, "a.mp3") == "streamed"
+    service.history.calculate_file_hash.assert_not_awaited()
+
+
+async def test_file_hash_fallback_reads_disk_once():
+    import src.services.processing.processing_service as pss
+
+    service = pss.ProcessingService.__new__(pss.ProcessingService)
+    service.history = SimpleNamespace(calculate_file_hash=AsyncMock(return_value="ondisk"))
+    request = ProcessingRequest(file_name="a.mp3", llm_provider="openai", user_id=1)
+
+    assert await service._file_hash(request, "a.mp3") == "ondisk"
+    assert await service._file_hash(request, "a.mp3") == "ondisk"
+    service.history.calculate_file_hash.assert_awaited_once()
@@ -107,3 +107,63 @@ async def test_stats_ignore_other_users_history(history_repo, user_repo, templat
 
     stats = await history_repo.get_user_stats(telegram_id=1001)
     assert stats["total_files"] == 0
+
+
+async def test_texts_live_outside_history_row(history_repo, user_repo, template_repo, test_db):
+    """Транскрипция и протокол — сжатые, в processing_history_texts; в строке их нет."""
+    user_id = await user_repo.create_user(telegram_id=3030)
+    template_id = await template_repo.create_template(name="Т", content="c")
+    transcription = "длинная расшифровка " * 500
+
+    history_id = await history_repo.save_processing_result(
+        user_id=user_id, file_name="m.mp3", template_id=template_id,
+        llm_provider="openai", transcription_text=transcription, result_text="# Протокол",
+    )
+
+    row = await history_repo.get_result_for_user(history_id, telegram_id=3030)
+    assert row["result_text"] == "# Протокол"
+    assert row["has_transcription"] is True
+    assert "transcription_text" not in row
+    assert await history_repo.get_transcription_text(history_id) == transcription
+
+    async with test_db.read() as db:
+        cursor = await db.execute("PRAGMA table_info(processing_history)")
+        columns = {c[1] for c in await cursor.fetchall()}
+        cursor = await db.execute(
+            "SELECT SUM(LENGTH(body)) FROM processing_history_texts WHERE history_id = ?",
+            (history_id,),
+        )
+        stored = (await cursor.fetchone())[0]
+    assert "transcription_text" not in columns
+    assert stored < len(transcription.encode("utf-8")) // 10
+
+
+async def test_row_without_transcription(history_repo, user_repo, template_repo):
+    user_id = await user_repo.create_user(telegram_id=3031)
+    template_id = await template_repo.create_template(name="Т", content="c")
+
+    history_id = await history_repo.save_processing_result(
+        user_id=user_id, file_name="m.mp3", template_id=template_id,
+        llm_provider="openai", transcription_text="", result_text="р",
+    )
+
+    row = await history_repo.get_result_for_user(history_id, telegram_id=3031, with_result=False)
+    assert row["has_transcription"] is False
+    assert "result_text" not in row
+    assert await history_repo.get_transcription_text(history_id) is None
+
+
+async def test_update_result_text_checks_owner(history_repo, user_repo, template_repo):
+    user_id = await user_repo.create_user(telegram_id=3032)
+    await user_repo.create_user(telegram_id=3033)
+    template_id = await template_repo.create_template(name="Т", content="c")
+    history_id = await history_repo.save_processing_result(
+        user_id=user_id, file_name="m.mp3", template_id=template_id,
+        llm_provider="openai", transcription_text="т", result_text="старый",
+    )
+
+    assert await history_repo.update_result_text(history_id, 3033, "чужой") is False
+    assert await history_repo.update_result_text(history_id, 3032, "новый") is True
+
+    row = await history_repo.get_result_for_user(history_id, telegram_id=3032)
+    assert row["result_text"] == "новый"
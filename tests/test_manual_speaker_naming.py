@@ -247,9 +247,9 @@ def test_add_manual_participant_stores_raw_full_name_displays_short():
 
 
 @pytest.fixture(autouse=True)
-def _clean_sessions():
+async def _clean_sessions():
     yield
-    mapping_sessions.discard(42)
+    await mapping_sessions.discard(42)
 
 
 def test_subview_leaves_unnamed_button_first_without_manual_entry():
@@ -479,13 +479,13 @@ async def test_registered_sm_skip_peeks_and_shows_subview(monkeypatch):
     )
     handler = _registered_handler(router, SmSkip)
 
-    mapping_sessions.save(42, _make_session(participants=None, speaker_mapping={}))
+    await mapping_sessions.save(42, _make_session(participants=None, speaker_mapping={}))
     callback = _FakeCallback("sm_skip:42", user_id=42, message=_FakeMessage(42))
 
     await handler(callback, SmSkip(user_id=42), _FakeState())
 
     assert shown and "Участник" in shown[-1].to_plain()
-    assert mapping_sessions.peek(42) is not None  # peek не изъял
+    assert await mapping_sessions.peek(42) is not None  # peek не изъял
     assert continued == []
 
 
@@ -514,13 +514,13 @@ async def test_registered_sm_skip_confirm_takes_and_continues(monkeypatch):
     )
     handler = _registered_handler(router, SmSkipConfirm)
 
-    mapping_sessions.save(42, _make_session(participants=None, speaker_mapping={}))
+    await mapping_sessions.save(42, _make_session(participants=None, speaker_mapping={}))
     callback = _FakeCallback("sm_skipok:42", user_id=42, message=_FakeMessage(42))
 
     await handler(callback, SmSkipConfirm(user_id=42), _FakeState())
 
     assert continued[-1]["confirmed_mapping"] == {}
-    assert mapping_sessions.peek(42) is None  # take изъял
+    assert await mapping_sessions.peek(42) is None  # take изъял
 
 
 @pytest.mark.asyncio
@@ -579,7 +579,7 @@ async def test_skip_or_confirm_shows_subview_and_keeps_session(monkeypatch):
     )
 
     session = _make_session(participants=None, speaker_mapping={})
-    mapping_sessions.save(42, session)
+    await mapping_sessions.save(42, session)
 
     callback = _FakeCallback("sm_skip:42", user_id=42, message=_FakeMessage(42))
 
@@ -588,7 +588,7 @@ async def test_skip_or_confirm_shows_subview_and_keeps_session(monkeypatch):
     content, keyboard = shown[-1]
     assert "Участник" in content.to_plain()
     assert keyboard.inline_keyboard[0][0].callback_data == "sm_skipok:42"
-    assert mapping_sessions.peek(42) is session  # сессия не изъята
+    assert await mapping_sessions.peek(42) is session  # сессия не изъята
     assert continued == []  # продолжения нет
 
 
@@ -619,7 +619,7 @@ async def test_skip_or_confirm_continues_without_friction(monkeypatch):
     session = _make_session(
         participants=None, speaker_mapping={"SPEAKER_1": "Иван"}
     )
-    mapping_sessions.save(42, session)
+    await mapping_sessions.save(42, session)
 
     callback = _FakeCallback("sm_skip:42", user_id=42, message=_FakeMessage(42))
 
@@ -627,7 +627,7 @@ async def test_skip_or_confirm_continues_without_friction(monkeypatch):
 
     assert continued[-1]["confirmed_mapping"] == {}
     assert continued[-1]["session"] is session
-    assert mapping_sessions.peek(42) is None  # take изъял
+    assert await mapping_sessions.peek(42) is None  # take изъял
 
 
 @pytest.mark.asyncio
@@ -682,6 +682,6 @@ async def test_confirmation_pause_defaults_participants_and_stores_card(monkeypa
 
     assert result is None  # обработка приостановлена
     assert captured["participants"] == []
-    session = mapping_sessions.peek(42)
+    session = await mapping_sessions.peek(42)
     assert session is not None
     assert session.confirmation_message is sentinel_card
@@ -59,7 +59,7 @@ def _patch_common(monkeypatch, call_log, saved_sessions, show_kwargs,
     import src.ux.speaker_audio_preview as preview
     import src.ux.speaker_mapping_ui as ui
 
-    def fake_save_state(user_id, session):
+    async def fake_save_state(user_id, session):
         call_log.append("save_state")
         saved_sessions.append(session)
 
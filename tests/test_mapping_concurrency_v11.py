@@ -46,91 +46,91 @@ def _session(task_id=None, mapping=None, user_id=42, file_name="встреча.m
 # ---------------------------------------------------------------------------
 
 
-def test_second_recording_does_not_evict_the_first():
+async def test_second_recording_does_not_evict_the_first():
     """Главная находка: вторая пауза больше не стирает первую расшифровку."""
     store = MappingSessionStore()
     first = _session(task_id="task-1")
-    store.save(42, first)
+    await store.save(42, first)
 
-    store.save(42, _session(task_id="task-2"))
+    await store.save(42, _session(task_id="task-2"))
 
-    assert store.take_regardless(42, "task-1") is first
+    assert await store.take_regardless(42, "task-1") is first
 
 
-def test_save_returns_the_key_of_the_stored_session():
+async def test_save_returns_the_key_of_the_stored_session():
     store = MappingSessionStore()
-    key = store.save(42, _session(task_id="task-1"))
-    assert store.take_regardless(42, key) is not None
+    key = await store.save(42, _session(task_id="task-1"))
+    assert await store.take_regardless(42, key) is not None
 
 
-def test_sessions_without_task_id_still_get_distinct_keys():
+async def test_sessions_without_task_id_still_get_distinct_keys():
     """task_id опционален — две безымянные записи всё равно не сливаются."""
     store = MappingSessionStore()
     first, second = _session(), _session()
 
-    key_first = store.save(42, first)
-    key_second = store.save(42, second)
+    key_first = await store.save(42, first)
+    key_second = await store.save(42, second)
 
     assert key_first != key_second
-    assert store.take_regardless(42, key_first) is first
+    assert await store.take_regardless(42, key_first) is first
 
 
-def test_peek_returns_the_newest_session():
+async def test_peek_returns_the_newest_session():
     """У карточки контракт прежний: одна открытая карточка на пользователя."""
     store = MappingSessionStore()
-    store.save(42, _session(task_id="task-1"))
+    await store.save(42, _session(task_id="task-1"))
     newest = _session(task_id="task-2")
-    store.save(42, newest)
+    await store.save(42, newest)
 
-    assert store.peek(42) is newest
+    assert await store.peek(42) is newest
 
 
-def test_take_regardless_without_key_takes_the_active_session():
+async def test_take_regardless_without_key_takes_the_active_session():
     store = MappingSessionStore()
     newest = _session(task_id="task-2")
-    store.save(42, _session(task_id="task-1"))
-    store.save(42, newest)
+    await store.save(42, _session(task_id="task-1"))
+    await store.save(42, newest)
 
-    assert store.take_regardless(42) is newest
+    assert await store.take_regardless(42) is newest
 
 
-def test_take_regardless_with_key_ignores_the_active_session():
+async def test_take_regardless_with_key_ignores_the_active_session():
     """Таймер первой записи не имеет права забрать вторую."""
     store = MappingSessionStore()
     first = _session(task_id="task-1")
-    store.save(42, first)
+    await store.save(42, first)
     second = _session(task_id="task-2")
-    store.save(42, second)
+    await store.save(42, second)
 
-    assert store.take_regardless(42, "task-1") is first
-    assert store.peek(42) is second, "вторая запись обязана остаться нетронутой"
+    assert await store.take_regardless(42, "task-1") is first
+    assert await store.peek(42) is second, "вторая запись обязана остаться нетронутой"
 
 
-def test_take_regardless_ignores_ttl():
+async def test_take_regardless_ignores_ttl():
     store = MappingSessionStore(ttl_seconds=3600)
-    key = store.save(42, _session(task_id="task-1"))
+    key = await store.save(42, _session(task_id="task-1"))
     store._timestamps[(42, key)] = datetime.now() - timedelta(hours=2)
 
-    assert store.take_regardless(42, key) is not None
+    assert await store.take_regardless(42, key) is not None
 
 
-def test_peek_still_evicts_expired():
+async def test_peek_still_evicts_expired():
     store = MappingSessionStore(ttl_seconds=3600)
-    key = store.save(42, _session(task_id="task-1"))
+    key = await store.save(42, _session(task_id="task-1"))
     store._timestamps[(42, key)] = datetime.now() - timedelta(hours=2)
 
-    assert store.peek(42) is None
+    assert await store.peek(42) is None
 
 
-def test_take_is_atomic():
+async def test_take_is_atomic():
     store = MappingSessionStore()
-    store.save(42, _session(task_id="task-1"))
+    await store.save(42, _session(task_id="task-1"))
 
-    assert store.take(42) is not None
-    assert store.take(42) is None
+    assert await store.take(42) is not None
+    assert await store.take(42) is None
 
 
-def test_discard_targets_one_recording():
+async def test_discard_targets_one_recording():
     """discard выбрасывает названную запись и не трогает соседнюю.
 
     В проде две живые сессии одновременно не встречаются — предыдущую доводит
@@ -140,21 +140,21 @@ def test_discard_targets_one_recording():
     """
     store = MappingSessionStore()
     first = _session(task_id="task-1")
-    store.save(42, first)
-    store.save(42, _session(task_id="task-2"))
+    await store.save(42, first)
+    await store.save(42, _session(task_id="task-2"))
 
-    store.discard(42, "task-2")
+    await store.discard(42, "task-2")
 
-    assert store.take_regardless(42, "task-1") is first
+    assert await store.take_regardless(42, "task-1") is first
 
 
-def test_users_do_not_share_keys():
+async def test_users_do_not_share_keys():
     store = MappingSessionStore()
     mine = _session(task_id="task-1", user_id=42)
-    store.save(42, mine)
-    store.save(99, _session(task_id="task-1", user_id=99))
+    await store.save(42, mine)
+    await store.save(99, _session(task_id="task-1", user_id=99))
 
-    assert store.take_regardless(42, "task-1") is mine
+    assert await store.take_regardless(42, "task-1") is mine
 
 
 # ---------------------------------------------------------------------------
@@ -162,34 +162,34 @@ def test_users_do_not_share_keys():
 # ---------------------------------------------------------------------------
 
 
-def test_closed_session_is_remembered():
+async def test_closed_session_is_remembered():
     """Устаревшая карточка должна знать, что протокол уже доставлен."""
     store = MappingSessionStore()
-    store.save(42, _session(task_id="task-1"))
-    store.take(42)
+    await store.save(42, _session(task_id="task-1"))
+    await store.take(42)
 
-    assert store.was_recently_closed(42) is True
+    assert await store.was_recently_closed(42) is True
 
 
-def test_unknown_user_was_never_closed():
-    assert MappingSessionStore().was_recently_closed(42) is False
+async def test_unknown_user_was_never_closed():
+    assert await MappingSessionStore().was_recently_closed(42) is False
 
 
-def test_auto_delivery_also_counts_as_closed():
+async def test_auto_delivery_also_counts_as_closed():
     store = MappingSessionStore()
-    key = store.save(42, _session(task_id="task-1"))
-    store.take_regardless(42, key)
+    key = await store.save(42, _session(task_id="task-1"))
+    await store.take_regardless(42, key)
 
-    assert store.was_recently_closed(42) is True
+    assert await store.was_recently_closed(42) is True
 
 
-def test_discard_is_not_a_delivery():
+async def test_discard_is_not_a_delivery():
     """UI не показался — протокола не было, врать про доставку нельзя."""
     store = MappingSessionStore()
-    key = store.save(42, _session(task_id="task-1"))
-    store.discard(42, key)
+    key = await store.save(42, _session(task_id="task-1"))
+    await store.discard(42, key)
 
-    assert store.was_recently_closed(42) is False
+    assert await store.was_recently_closed(42) is False
 
 
 def test_stale_card_text_does_not_claim_the_work_is_lost():
@@ -210,9 +210,9 @@ async def test_timer_delivers_only_its_own_recording():
 
     store = MappingSessionStore()
     first = _session(task_id="task-1")
-    store.save(42, first)
+    await store.save(42, first)
     second = _session(task_id="task-2")
-    store.save(42, second)
+    await store.save(42, second)
 
     service = SimpleNamespace(
         continue_processing_after_mapping_confirmation=AsyncMock()
@@ -224,7 +224,7 @@ async def test_timer_delivers_only_its_own_recording():
 
     delivered = service.continue_processing_after_mapping_confirmation.await_args
     assert delivered.kwargs["session"] is first
-    assert store.peek(42) is second, "вторая запись не должна пострадать"
+    assert await store.peek(42) is second, "вторая запись не должна пострадать"
 
 
 @pytest.mark.asyncio
@@ -232,8 +232,8 @@ async def test_timer_is_silent_when_its_recording_is_gone():
     from src.services.mapping_timeout import deliver_on_timeout
 
     store = MappingSessionStore()
-    store.save(42, _session(task_id="task-1"))
-    store.take_regardless(42, "task-1")
+    await store.save(42, _session(task_id="task-1"))
+    await store.take_regardless(42, "task-1")
 
     service = SimpleNamespace(
         continue_processing_after_mapping_confirmation=AsyncMock()
@@ -259,7 +259,7 @@ async def test_previous_recording_is_finished_not_dropped():
 
     store = MappingSessionStore()
     previous = _session(task_id="task-1", mapping={"SPEAKER_1": "Иван"})
-    store.save(42, previous)
+    await store.save(42, previous)
 
     service = SimpleNamespace(
         continue_processing_after_mapping_confirmation=AsyncMock()
@@ -280,7 +280,7 @@ async def test_superseded_recording_is_explained_in_one_line():
     from src.services.mapping_timeout import finish_superseded_session
 
     store = MappingSessionStore()
-    store.save(42, _session(task_id="task-1"))
+    await store.save(42, _session(task_id="task-1"))
     bot = SimpleNamespace(send_message=AsyncMock())
 
     await finish_superseded_session(
@@ -313,7 +313,7 @@ async def test_superseding_survives_a_failing_resume():
     from src.services.mapping_timeout import finish_superseded_session
 
     store = MappingSessionStore()
-    store.save(42, _session(task_id="task-1"))
+    await store.save(42, _session(task_id="task-1"))
 
     service = SimpleNamespace(
         continue_processing_after_mapping_confirmation=AsyncMock(
@@ -370,7 +370,7 @@ async def test_name_capture_stands_down_inside_another_dialog():
     from src.handlers.participants_states import ProtocolHeaderEdit
     from src.services.mapping_session import mapping_sessions
 
-    mapping_sessions.save(77, _session(task_id="task-1", user_id=77))
+    await mapping_sessions.save(77, _session(task_id="task-1", user_id=77))
     try:
         message = SimpleNamespace(
             from_user=SimpleNamespace(id=77), text="27 июля 2026"
@@ -383,7 +383,7 @@ async def test_name_capture_stands_down_inside_another_dialog():
 
         assert await _capturing_speaker_name(message, state) is False
     finally:
-        mapping_sessions.discard(77)
+        await mapping_sessions.discard(77)
 
 
 @pytest.mark.asyncio
@@ -393,14 +393,15 @@ async def test_name_capture_still_works_without_a_dialog():
     )
     from src.services.mapping_session import mapping_sessions
 
-    mapping_sessions.save(78, _session(task_id="task-1", user_id=78))
+    await mapping_sessions.save(78, _session(task_id="task-1", user_id=78))
     try:
         message = SimpleNamespace(from_user=SimpleNamespace(id=78), text="Иван")
         state = SimpleNamespace(get_state=AsyncMock(return_value=None))
 
-        assert await _capturing_speaker_name(message, state) is True
+        captured = await _capturing_speaker_name(message, state)
+        assert captured["mapping_session"].task_id == "task-1"
     finally:
-        mapping_sessions.discard(78)
+        await mapping_sessions.discard(78)
 
 
 @pytest.mark.asyncio
@@ -411,12 +412,29 @@ async def test_name_capture_without_state_argument_still_works():
     )
     from src.services.mapping_session import mapping_sessions
 
-    mapping_sessions.save(79, _session(task_id="task-1", user_id=79))
+    await mapping_sessions.save(79, _session(task_id="task-1", user_id=79))
     try:
         message = SimpleNamespace(from_user=SimpleNamespace(id=79), text="Иван")
-        assert await _capturing_speaker_name(message, None) is True
+        captured = await _capturing_speaker_name(message, None)
+        assert captured["mapping_session"].task_id == "task-1"
     finally:
-        mapping_sessions.discard(79)
+        await mapping_sessions.discard(79)
+
+
+@pytest.mark.asyncio
+async def test_name_capture_skips_the_record_without_an_active_session(monkeypatch):
+    """Фильтр видит каждое сообщение: без активной сессии запись не читается."""
+    from src.handlers.callbacks.speaker_mapping_callbacks import (
+        _capturing_speaker_name,
+    )
+    from src.services.mapping_session import mapping_sessions
+
+    peek = AsyncMock()
+    monkeypatch.setattr(mapping_sessions, "peek", peek)
+    message = SimpleNamespace(from_user=SimpleNamespace(id=80), text="Иван")
+
+    assert await _capturing_speaker_name(message, None) is False
+    peek.assert_not_awaited()
 
 
 def test_router_comment_no_longer_claims_state_isolation():
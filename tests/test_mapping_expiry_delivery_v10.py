@@ -45,35 +45,35 @@ def _session(mapping=None, user_id=42) -> MappingSession:
 # ---------------------------------------------------------------------------
 
 
-def test_take_regardless_returns_expired_session():
+async def test_take_regardless_returns_expired_session():
     """Просроченная сессия всё ещё содержит расшифровку — её нужно доработать."""
     store = MappingSessionStore(ttl_seconds=3600)
-    key = store.save(42, _session())
+    key = await store.save(42, _session())
     store._timestamps[(42, key)] = datetime.now() - timedelta(hours=2)
 
-    assert store.take_regardless(42, key) is not None
+    assert await store.take_regardless(42, key) is not None
 
 
-def test_take_regardless_is_atomic():
+async def test_take_regardless_is_atomic():
     store = MappingSessionStore(ttl_seconds=3600)
-    store.save(42, _session())
+    await store.save(42, _session())
 
-    assert store.take_regardless(42) is not None
-    assert store.take_regardless(42) is None
+    assert await store.take_regardless(42) is not None
+    assert await store.take_regardless(42) is None
 
 
-def test_take_regardless_without_session_is_none():
-    assert MappingSessionStore().take_regardless(42) is None
+async def test_take_regardless_without_session_is_none():
+    assert await MappingSessionStore().take_regardless(42) is None
 
 
-def test_peek_still_evicts_expired_for_the_card():
+async def test_peek_still_evicts_expired_for_the_card():
     """Карточка по-прежнему считает просроченную сессию мёртвой."""
     store = MappingSessionStore(ttl_seconds=3600)
-    key = store.save(42, _session())
+    key = await store.save(42, _session())
     # Ключ хранилища — пара «пользователь + запись» (критика v11).
     store._timestamps[(42, key)] = datetime.now() - timedelta(hours=2)
 
-    assert store.peek(42) is None
+    assert await store.peek(42) is None
 
 
 # ---------------------------------------------------------------------------
@@ -100,7 +100,7 @@ async def test_timeout_delivers_with_partial_mapping():
     from src.services.mapping_timeout import deliver_on_timeout
 
     store = MappingSessionStore()
-    store.save(42, _session(mapping={"SPEAKER_1": "Иван"}))
+    await store.save(42, _session(mapping={"SPEAKER_1": "Иван"}))
     service = _Service()
 
     await deliver_on_timeout(
@@ -119,8 +119,8 @@ async def test_timeout_is_noop_when_user_already_confirmed():
     from src.services.mapping_timeout import deliver_on_timeout
 
     store = MappingSessionStore()
-    store.save(42, _session())
-    store.take(42)  # пользователь подтвердил
+    await store.save(42, _session())
+    await store.take(42)  # пользователь подтвердил
     service = _Service()
 
     await deliver_on_timeout(
@@ -135,7 +135,7 @@ async def test_timeout_delivers_even_when_ttl_already_passed():
     from src.services.mapping_timeout import deliver_on_timeout
 
     store = MappingSessionStore(ttl_seconds=3600)
-    store.save(42, _session())
+    await store.save(42, _session())
     store._timestamps[42] = datetime.now() - timedelta(hours=2)
     service = _Service()
 
@@ -152,7 +152,7 @@ async def test_timeout_warns_the_user_before_delivering():
     from src.services.mapping_timeout import deliver_on_timeout
 
     store = MappingSessionStore()
-    store.save(42, _session())
+    await store.save(42, _session())
     bot = AsyncMock()
 
     await deliver_on_timeout(
@@ -175,7 +175,7 @@ async def test_timeout_survives_resume_failure():
             raise RuntimeError("генерация упала")
 
     store = MappingSessionStore()
-    store.save(42, _session())
+    await store.save(42, _session())
 
     await deliver_on_timeout(
         Failing(), store, user_id=42, bot=AsyncMock(), chat_id=7, delay_seconds=0,
@@ -188,7 +188,7 @@ async def test_timeout_waits_the_requested_delay():
     from src.services.mapping_timeout import deliver_on_timeout
 
     store = MappingSessionStore()
-    store.save(42, _session())
+    await store.save(42, _session())
     service = _Service()
 
     task = asyncio.create_task(deliver_on_timeout(
@@ -43,41 +43,41 @@ def store():
     return MappingSessionStore(ttl_seconds=3600)
 
 
-def test_take_returns_live_objects_and_pops(store):
+async def test_take_returns_live_objects_and_pops(store):
     session = _session()
-    store.save(42, session)
+    await store.save(42, session)
 
-    taken = store.take(42)
+    taken = await store.take(42)
 
     assert taken is session                      # тот же живой объект, без регидрации
     assert taken.request.file_name == "встреча.mp3"
     assert taken.transcription_result.transcription == "текст"
-    assert store.take(42) is None                # двойной тап «Подтвердить» → None
+    assert await store.take(42) is None                # двойной тап «Подтвердить» → None
 
 
-def test_peek_reads_without_removing(store):
-    store.save(42, _session())
+async def test_peek_reads_without_removing(store):
+    await store.save(42, _session())
 
-    assert store.peek(42) is not None
-    assert store.peek(42) is not None            # peek не изымает
-    assert store.take(42) is not None
+    assert await store.peek(42) is not None
+    assert await store.peek(42) is not None            # peek не изымает
+    assert await store.take(42) is not None
 
 
-def test_update_mapping_mutates_session(store):
-    store.save(42, _session())
+async def test_update_mapping_mutates_session(store):
+    await store.save(42, _session())
 
-    ok = store.update_mapping(42, {"SPEAKER_0": "Борис"})
+    ok = await store.update_mapping(42, {"SPEAKER_0": "Борис"})
 
     assert ok is True
-    assert store.peek(42).speaker_mapping == {"SPEAKER_0": "Борис"}
-    assert store.update_mapping(99, {}) is False  # нет сессии — False
+    assert (await store.peek(42)).speaker_mapping == {"SPEAKER_0": "Борис"}
+    assert await store.update_mapping(99, {}) is False  # нет сессии — False
 
 
-def test_expired_session_is_not_returned(store, monkeypatch):
-    key = store.save(42, _session())
+async def test_expired_session_is_not_returned(store, monkeypatch):
+    key = await store.save(42, _session())
 
     # состариваем запись за TTL (ключ — пара «пользователь + запись», v11)
     store._timestamps[(42, key)] -= timedelta(seconds=3601)
 
-    assert store.peek(42) is None
-    assert store.take(42) is None
+    assert await store.peek(42) is None
+    assert await store.take(42) is None
@@ -0,0 +1,104 @@
+"""Реестр тёплых моделей: одна загрузка, закрепление, выгрузка по простою."""
+import threading
+import time
+
+import pytest
+
+from src.services.model_registry import ModelRegistry
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class _SlowLoader:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        return object()
+
+
+def test_model_is_loaded_once_and_shared():
+    registry = ModelRegistry(idle_ttl=0)
+    loader = _SlowLoader(delay=0.05)
+    registry.register("whisper", loader)
+    seen = []
+
+    def job():
+        with registry.use("whisper") as model:
+            seen.append(model)
+
+    threads = [threading.Thread(target=job) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert loader.calls == 1
+    assert len({id(model) for model in seen}) == 1
+    stats = registry.stats()
+    assert (stats["loads"], stats["hits"]) == (1, 3)
+
+
+def test_idle_model_is_evicted_after_ttl_but_pinned_is_kept():
+    clock = _Clock()
+    registry = ModelRegistry(idle_ttl=60, clock=clock)
+    registry.register("whisper", object)
+    registry.register("pyannote", object)
+
+    with registry.use("whisper"):
+        pass
+    with registry.use("pyannote"):
+        clock.now = 100
+        assert registry.evict(idle_only=True) == ["whisper"]
+        assert registry.evict() == []  # закреплённую задача держит даже при нехватке памяти
+
+    assert registry.is_loaded("pyannote")
+    assert registry.evict(idle_only=True) == []  # только что отпущена
+    assert registry.evict() == ["pyannote"]
+    assert registry.stats()["evictions"] == 2
+
+
+def test_preload_warms_in_background():
+    registry = ModelRegistry(idle_ttl=0)
+    loader = _SlowLoader()
+    registry.register("whisper", loader)
+
+    for thread in registry.preload(["whisper", "unknown"]):
+        thread.join()
+    with registry.use("whisper"):
+        pass
+
+    assert loader.calls == 1
+    stats = registry.stats()
+    assert (stats["loads"], stats["hits"]) == (1, 1)
+    assert stats["loaded"] == ["whisper"]
+
+
+def test_failed_load_is_retried_by_next_job():
+    registry = ModelRegistry(idle_ttl=0)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("нет памяти")
+        return "модель"
+
+    registry.register("whisperx", flaky)
+
+    with pytest.raises(RuntimeError):
+        with registry.use("whisperx"):
+            pass
+    with registry.use("whisperx") as model:
+        assert model == "модель"
+
+    assert registry.stats()["pinned"] == []
@@ -0,0 +1,139 @@
+"""Пул процессов локальных моделей: очередь, прогресс, падение воркера."""
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+import src.services.model_workers as mw
+from src.exceptions.processing import TranscriptionError
+from src.services.model_registry import ModelRegistry
+
+pytestmark = pytest.mark.skipif(sys.platform != "linux", reason="fork-воркеры с подменёнными задачами")
+
+
+def _echo(value, progress):
+    progress("working")
+    time.sleep(0.1)
+    return value * 2
+
+
+def _crash(progress):
+    os._exit(3)
+
+
+def _fail(progress):
+    raise ValueError("битый файл")
+
+
+def _typed_fail(progress):
+    raise TranscriptionError("файл не читается", file_path="/tmp/x.wav")
+
+
+def _warm(progress):
+    with mw.model_registry.use("fake") as model:
+        return model
+
+
+@pytest.fixture
+def jobs(monkeypatch):
+    # fork, чтобы воркеры унаследовали подменённые задачи
+    monkeypatch.setattr(mw, "_JOBS", {
+        "echo": _echo, "crash": _crash, "fail": _fail, "typed_fail": _typed_fail, "warm": _warm,
+    })
+
+
+@pytest.fixture
+def pool(jobs):
+    pool = mw.ModelWorkerPool(2, start_method="fork")
+    yield pool
+    pool.close()
+
+
+async def test_jobs_run_in_parallel_with_progress(pool):
+    stages = []
+
+    results = await asyncio.gather(
+        *(pool.submit("echo", i, progress=stages.append) for i in range(4))
+    )
+
+    assert results == [0, 2, 4, 6]
+    assert stages == ["working"] * 4
+    assert pool.stats()["workers"] == 2
+
+
+async def test_event_loop_stays_responsive(pool):
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    task = asyncio.create_task(ticker())
+    await pool.submit("echo", 1)
+    task.cancel()
+
+    assert ticks > 3
+
+
+async def test_worker_crash_fails_only_its_job(pool):
+    with pytest.raises(mw.ModelWorkerCrashed):
+        await pool.submit("crash")
+
+    assert await pool.submit("echo", 21) == 42
+    assert pool.stats()["crashes"] == 1
+
+
+async def test_worker_exception_is_reported(pool):
+    with pytest.raises(mw.ModelWorkerError, match="битый файл"):
+        await pool.submit("fail")
+
+
+async def test_project_error_keeps_its_type_and_text(pool):
+    with pytest.raises(TranscriptionError) as excinfo:
+        await pool.submit("typed_fail")
+
+    assert str(excinfo.value) == "Ошибка транскрипции: файл не читается"
+    assert excinfo.value.details == {"file_path": "/tmp/x.wav"}
+
+
+async def test_repeated_crashes_back_off_and_degrade_the_pool(jobs, monkeypatch):
+    monkeypatch.setattr(mw, "_CRASH_BUDGET", 2)
+    single = mw.ModelWorkerPool(1, start_method="fork")
+    try:
+        with pytest.raises(mw.ModelWorkerCrashed):
+            await single.submit("crash")  # первое падение — замена сразу
+        with pytest.raises(mw.ModelWorkerCrashed):
+            await single.submit("crash")
+        with pytest.raises(mw.ModelWorkerError, match="временно недоступна"):
+            await single.submit("echo", 1)
+        stats = single.stats()
+    finally:
+        single.close()
+
+    assert (stats["crashes"], stats["degraded"], stats["workers"]) == (2, 1, 0)
+    assert [mw._respawn_delay(n) for n in (1, 2, 3, 4)] == [0.0, 1.0, 2.0, 4.0]
+
+
+async def test_disabled_pool_runs_in_thread(monkeypatch):
+    monkeypatch.setattr(mw.settings, "model_workers", 0)
+    monkeypatch.setattr(mw, "_pool", None)
+
+    assert await mw.run_model_job("echo", 3, in_process=lambda value: value + 1) == 4
+
+
+async def test_model_stays_warm_between_jobs(jobs, monkeypatch):
+    registry = ModelRegistry(idle_ttl=0)
+    registry.register("fake", lambda: "модель")
+    monkeypatch.setattr(mw, "model_registry", registry)
+    single = mw.ModelWorkerPool(1, start_method="fork")
+    try:
+        assert [await single.submit("warm") for _ in range(3)] == ["модель"] * 3
+        stats = single.stats()
+    finally:
+        single.close()
+
+    assert (stats["model_loads"], stats["model_hits"]) == (1, 2)
@@ -215,10 +215,10 @@ def _patch_card_render(monkeypatch):
 
 
 @pytest.fixture(autouse=True)
-def _clean_sessions():
+async def _clean_sessions():
     yield
     for user_id in range(40, 60):
-        mapping_sessions.discard(user_id)
+        await mapping_sessions.discard(user_id)
 
 
 # ---------------------------------------------------------------------------
@@ -231,7 +231,7 @@ async def test_three_names_fill_three_unnamed_in_order():
     """«Аня, Тимур, Лена» на три неназванных → три строки по порядку появления."""
     session = _make_session(speaker_mapping={}, user_id=42)
     session.confirmation_message = _FakeMessage(42)
-    mapping_sessions.save(42, session)
+    await mapping_sessions.save(42, session)
     router = _mapping_router()
 
     message = _FakeMessage(42, text="Аня, Тимур, Лена")
@@ -251,7 +251,7 @@ async def test_single_name_goes_to_first_unnamed_and_keeps_full_name():
     """Одно имя без разделителей → первому неназванному; «Анна Петровна» — одно имя."""
     session = _make_session(speaker_mapping={}, user_id=43)
     session.confirmation_message = _FakeMessage(43)
-    mapping_sessions.save(43, session)
+    await mapping_sessions.save(43, session)
     router = _mapping_router()
 
     message = _FakeMessage(43, text="Анна Петровна")
@@ -272,7 +272,7 @@ async def test_named_speakers_not_touched_or_shifted():
         user_id=44,
     )
     session.confirmation_message = _FakeMessage(44)
-    mapping_sessions.save(44, session)
+    await mapping_sessions.save(44, session)
     router = _mapping_router()
 
     message = _FakeMessage(44, text="Аня, Тимур")
@@ -293,7 +293,7 @@ async def test_more_names_than_unnamed_applies_nothing_and_reasks_with_numbers()
         speaker_mapping={}, user_id=45, speakers=("SPEAKER_1", "SPEAKER_2")
     )
     session.confirmation_message = _FakeMessage(45)
-    mapping_sessions.save(45, session)
+    await mapping_sessions.save(45, session)
     router = _mapping_router()
 
     message = _FakeMessage(45, text="Аня, Тимур, Лена, Дима")
@@ -311,7 +311,7 @@ async def test_one_bad_name_blocks_the_whole_message():
     """Всё или ничего: одно имя вне планки 2–50 → не применяется ни одно."""
     session = _make_session(speaker_mapping={}, user_id=46)
     session.confirmation_message = _FakeMessage(46)
-    mapping_sessions.save(46, session)
+    await mapping_sessions.save(46, session)
     router = _mapping_router()
 
     message = _FakeMessage(46, text="Аня, " + "Я" * 51)  # второе имя длиннее 50
@@ -334,7 +334,7 @@ async def test_text_when_all_named_changes_nothing_and_points_to_confirm():
         speakers=("SPEAKER_1", "SPEAKER_2"),
     )
     session.confirmation_message = _FakeMessage(49)
-    mapping_sessions.save(49, session)
+    await mapping_sessions.save(49, session)
     router = _mapping_router()
 
     message = _FakeMessage(49, text="Мария Сидорова")
@@ -360,7 +360,7 @@ async def test_layout_does_not_continue_processing():
     """После раскладки обработка не продолжается сама — только по «Подтвердить»."""
     session = _make_session(speaker_mapping={}, user_id=47)
     session.confirmation_message = _FakeMessage(47)
-    mapping_sessions.save(47, session)
+    await mapping_sessions.save(47, session)
     spy = _ContinueSpy()
     router = _mapping_router(spy)
 
@@ -368,7 +368,7 @@ async def test_layout_does_not_continue_processing():
     await _deliver_message([router], message, _make_fsm(47))
 
     assert spy.called is False  # необратимый шаг — только кнопка
-    assert mapping_sessions.peek(47) is not None  # сессия жива, карточка открыта
+    assert await mapping_sessions.peek(47) is not None  # сессия жива, карточка открыта
 
 
 # ---------------------------------------------------------------------------
@@ -382,7 +382,7 @@ async def test_link_in_main_view_falls_through_card_stays_open():
     карточка остаётся открытой; раскладка не применяется."""
     session = _make_session(speaker_mapping={}, user_id=48)
     session.confirmation_message = _FakeMessage(48)
-    mapping_sessions.save(48, session)
+    await mapping_sessions.save(48, session)
     router = _mapping_router()
 
     routers, caught = _wall_routers(router)
@@ -392,7 +392,7 @@ async def test_link_in_main_view_falls_through_card_stays_open():
     assert caught["winner"] == "general"  # ссылка — в обычный поток
     assert winner is routers[-1]
     assert session.speaker_mapping == {}  # раскладка не тронула сопоставление
-    assert mapping_sessions.peek(48) is not None  # карточка осталась открытой
+    assert await mapping_sessions.peek(48) is not None  # карточка осталась открытой
 
 
 # ---------------------------------------------------------------------------
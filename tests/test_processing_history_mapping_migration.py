@@ -94,3 +94,28 @@ async def test_init_db_mapping_migration_is_idempotent(tmp_path):
     columns = await _columns(db_path)
     assert columns.count("speaker_mapping") == 1
     assert columns.count("meeting_type") == 1
+
+
+@pytest.mark.asyncio
+async def test_init_db_moves_inline_texts_out_of_history(tmp_path):
+    """Тексты старых записей переезжают в processing_history_texts, колонки обнуляются."""
+    from src.database.history_repo import RESULT, unpack_text
+
+    db_path = await _legacy_db(tmp_path)
+
+    db = Database(db_path=db_path)
+    await db.init_db()
+    await db.init_db()
+    await db.close()
+
+    async with aiosqlite.connect(db_path) as conn:
+        cursor = await conn.execute(
+            "SELECT transcription_text, result_text FROM processing_history"
+        )
+        assert await cursor.fetchone() == (None, None)
+        cursor = await conn.execute("SELECT kind, body FROM processing_history_texts")
+        rows = await cursor.fetchall()
+
+    assert [(kind, unpack_text(body)) for kind, body in rows] == [
+        (RESULT, "# старый протокол")
+    ]
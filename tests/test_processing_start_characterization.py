@@ -209,6 +209,24 @@ async def test_quick_process_without_file_does_not_queue(monkeypatch):
     assert "не найден" in warn_text.lower()
 
 
+@pytest.mark.asyncio
+async def test_quick_process_full_queue_asks_to_retry_later(monkeypatch):
+    """Очередь заполнена → не общее «не получилось», а просьба повторить позже."""
+    from src.ux.message_builder import QUEUE_FULL
+
+    state = _fresh_state()
+    await state.update_data(file_id="TG_FILE", file_name="rec.mp3")
+    fake_qm = _patch_processing(monkeypatch)
+    fake_qm.add_task = AsyncMock(side_effect=asyncio.QueueFull())
+    router = pc.setup_processing_callbacks(_FakeUserService(None), MagicMock(), MagicMock())
+    callback = _make_callback()
+
+    await _find_callback(router, "quick_process_file_callback")(callback, state)
+
+    pc.safe_edit_text.assert_awaited_with(callback.message, QUEUE_FULL)
+    assert await state.get_data() == {}
+
+
 # ---------------------------------------------------------------------------
 # Точка 4: «Настроить»
 # ---------------------------------------------------------------------------
@@ -189,7 +189,7 @@ async def test_regenerate_uses_stored_transcription(monkeypatch):
         "id": 7,
         "user_id": 42,
         "file_name": "meeting.mp3",
-        "transcription_text": "полная расшифровка встречи",
+        "has_transcription": True,
         "result_text": "# Старый протокол",
     }
 
@@ -198,6 +198,10 @@ async def test_regenerate_uses_stored_transcription(monkeypatch):
     monkeypatch.setattr(
         db_module.history_repo, "get_result_for_user", AsyncMock(return_value=row)
     )
+    monkeypatch.setattr(
+        db_module.history_repo, "get_transcription_text",
+        AsyncMock(return_value="полная расшифровка встречи"),
+    )
     monkeypatch.setattr(
         db_module.history_repo, "save_processing_result", AsyncMock(return_value=101)
     )
@@ -269,7 +273,7 @@ async def test_regenerate_reuses_stored_mapping_and_type(monkeypatch):
         "id": 7,
         "user_id": 42,
         "file_name": "meeting.mp3",
-        "transcription_text": "полная расшифровка встречи",
+        "has_transcription": True,
         "result_text": "# Старый протокол",
         "speaker_mapping": json.dumps({"SPEAKER_00": "Иван Петров"}, ensure_ascii=False),
         "meeting_type": "daily",
@@ -281,6 +285,10 @@ async def test_regenerate_reuses_stored_mapping_and_type(monkeypatch):
     monkeypatch.setattr(
         db_module.history_repo, "get_result_for_user", AsyncMock(return_value=row)
     )
+    monkeypatch.setattr(
+        db_module.history_repo, "get_transcription_text",
+        AsyncMock(return_value="полная расшифровка встречи"),
+    )
     monkeypatch.setattr(db_module.history_repo, "save_processing_result", save_mock)
 
     class FakeTemplateService:
@@ -344,7 +352,7 @@ async def test_regenerate_heals_history_from_llm_result(monkeypatch):
         "id": 7,
         "user_id": 42,
         "file_name": "meeting.mp3",
-        "transcription_text": "полная расшифровка встречи",
+        "has_transcription": True,
         "result_text": "# Старый протокол",
         "speaker_mapping": None,  # старая запись — итогов анализа нет
         "meeting_type": None,
@@ -356,6 +364,10 @@ async def test_regenerate_heals_history_from_llm_result(monkeypatch):
     monkeypatch.setattr(
         db_module.history_repo, "get_result_for_user", AsyncMock(return_value=row)
     )
+    monkeypatch.setattr(
+        db_module.history_repo, "get_transcription_text",
+        AsyncMock(return_value="полная расшифровка встречи"),
+    )
     monkeypatch.setattr(db_module.history_repo, "save_processing_result", save_mock)
 
     class FakeTemplateService:
@@ -409,7 +421,7 @@ async def test_regenerate_refuses_without_transcription(monkeypatch):
         db_module.history_repo,
         "get_result_for_user",
         AsyncMock(return_value={"id": 7, "user_id": 42, "file_name": "a.mp3",
-                                "transcription_text": "", "result_text": "x"}),
+                                "has_transcription": False}),
     )
 
     ok = await protocol_actions.regenerate_protocol(
@@ -3,8 +3,9 @@
 Эталон поведения — OpenAIProvider (двухэтапная генерация) + EnhancedLLMService
 (надёжность). Мок — на границе OpenAI-клиента (chat.completions.create).
 """
+import asyncio
 import json
-from unittest.mock import MagicMock
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 
@@ -13,6 +14,13 @@ from src.reliability.rate_limiter import RateLimitConfig, RateLimiter
 from src.reliability.retry import RetryConfig, RetryManager
 
 
+def _client():
+    """Мок AsyncOpenAI: chat.completions.create — корутина."""
+    client = MagicMock()
+    client.chat.completions.create = AsyncMock()
+    return client
+
+
 def _response(payload: dict):
     """Ответ OpenAI SDK: choices[0].message.content с JSON-строкой."""
     resp = MagicMock()
@@ -44,7 +52,7 @@ def _fast_generator(client=None, retry_attempts=3, failure_threshold=3):
             "test_api", RateLimitConfig(requests_per_window=1000, window_size=60.0, burst_limit=1000)
         ),
     )
-    gen.default_client = client if client is not None else MagicMock()
+    gen.default_client = client if client is not None else _client()
     return gen
 
 
@@ -55,7 +63,7 @@ def _quiet_cache_metrics(monkeypatch):
 
 
 async def test_generate_runs_two_stages_and_merges_result():
-    client = MagicMock()
+    client = _client()
     client.chat.completions.create.side_effect = [
         _response(ANALYSIS_PAYLOAD),
         _response(GENERATION_PAYLOAD),
@@ -79,7 +87,7 @@ async def test_generate_runs_two_stages_and_merges_result():
 
 async def test_stage1_skipped_when_type_and_mapping_provided():
     """Готовые тип встречи и сопоставление — ЭТАП 1 не выполняется."""
-    client = MagicMock()
+    client = _client()
     client.chat.completions.create.side_effect = [_response(GENERATION_PAYLOAD)]
     gen = _fast_generator(client)
 
@@ -99,7 +107,7 @@ async def test_stage1_skipped_when_type_and_mapping_provided():
 
 async def test_preset_model_used_for_generation_stage():
     """Модель ЭТАПА 2 берётся из пресета; ЭТАП 1 — из analysis_stage_model."""
-    client = MagicMock()
+    client = _client()
     client.chat.completions.create.side_effect = [
         _response(ANALYSIS_PAYLOAD),
         _response(GENERATION_PAYLOAD),
@@ -123,7 +131,7 @@ async def test_preset_model_used_for_generation_stage():
 
 async def test_transient_error_is_retried_then_succeeds():
     """Сетевая ошибка ретраится; второй заход двухэтапного вызова успешен."""
-    client = MagicMock()
+    client = _client()
     client.chat.completions.create.side_effect = [
         ConnectionError("temporary network"),
         _response(ANALYSIS_PAYLOAD),
@@ -142,7 +150,7 @@ async def test_402_is_not_retried_and_propagates():
     from src.exceptions.processing import LLMInsufficientCreditsError
 
     err = Exception("Error code: 402 - This request requires more credits")
-    client = MagicMock()
+    client = _client()
     client.chat.completions.create.side_effect = err
     gen = _fast_generator(client)
 
@@ -156,7 +164,7 @@ async def test_circuit_breaker_opens_and_blocks_calls():
     """После порога отказов CB открывается и блокирует вызовы без похода в API."""
     from src.reliability.circuit_breaker import CircuitBreakerError
 
-    client = MagicMock()
+    client = _client()
     client.chat.completions.create.side_effect = ConnectionError("down")
     gen = _fast_generator(client, retry_attempts=1, failure_threshold=2)
 
@@ -173,7 +181,7 @@ async def test_circuit_breaker_opens_and_blocks_calls():
 
 async def test_structured_call_contract():
     """structured_call: строгая схема, заданная модель, распарсенный dict."""
-    client = MagicMock()
+    client = _client()
     client.chat.completions.create.return_value = _response(
         {"speaker_mappings": {"SPEAKER_0": "Анна"}, "unmapped_speakers": []}
     )
@@ -194,7 +202,7 @@ async def test_reset_closes_open_circuit_breaker():
     """Админский reset закрывает открытый CB; статистика доступна."""
     from src.reliability.circuit_breaker import CircuitBreakerError
 
-    client = MagicMock()
+    client = _client()
     client.chat.completions.create.side_effect = ConnectionError("down")
     gen = _fast_generator(client, retry_attempts=1, failure_threshold=1)
 
@@ -251,3 +259,248 @@ def test_is_available_reflects_configured_client():
 
     gen.default_client = None
     assert gen.is_available() is False
+
+
+async def test_concurrency_per_preset_is_limited(monkeypatch):
+    """Одновременно к одному пресету уходит не больше заданного числа запросов."""
+    import asyncio
+
+    from src.config import settings
+    monkeypatch.setattr(settings, "llm_max_concurrency_per_preset", 2)
+
+    in_flight = 0
+    peak = 0
+
+    async def slow_create(**kwargs):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return _response({"ok": True})
+
+    client = _client()
+    client.chat.completions.create.side_effect = slow_create
+    gen = _fast_generator(client)
+
+    await asyncio.gather(*[
+        gen.structured_call(system_prompt="s", user_prompt="u", schema={"name": "x"})
+        for _ in range(6)
+    ])
+
+    assert client.chat.completions.create.call_count == 6
+    assert peak == 2
+
+
+async def test_preset_client_is_async_and_pooled(monkeypatch):
+    """Клиент пресета — AsyncOpenAI поверх общего пула; close закрывает пулы."""
+    import openai
+
+    from src.config import settings
+    monkeypatch.setattr(settings, "llm_http2", False)
+    monkeypatch.setattr(settings, "llm_pool_max_connections", 7)
+
+    gen = _fast_generator()
+    preset = {"base_url": "https://or.example/v1", "api_key": "k"}
+
+    client = gen._get_client(preset)
+
+    assert isinstance(client, openai.AsyncOpenAI)
+    assert gen._get_client(preset) is client  # один клиент на пресет
+    http_client = gen._http_clients[-1]
+    assert http_client._transport._pool._max_connections == 7
+
+    await gen.close()
+    assert http_client.is_closed
+    assert gen._client_cache == {}
+
+
+async def test_invalidated_client_pool_is_closed_after_inflight_requests(monkeypatch):
+    """Вытесненный клиент пресета не течёт: пул закрывается, когда его запросы завершены."""
+    from src.config import settings
+    monkeypatch.setattr(settings, "llm_http2", False)
+
+    gen = _fast_generator()
+    client = gen._get_client({"base_url": "https://or.example/v1", "api_key": "k"})
+    http_client = gen._http_clients[-1]
+
+    async with gen._lease(client):  # запрос через этот клиент ещё идёт
+        gen.invalidate_cache_for_base_url("https://or.example/v1")
+        await asyncio.sleep(0)
+        assert not http_client.is_closed
+
+    await asyncio.wait_for(asyncio.gather(*gen._closing), timeout=5)
+    assert http_client.is_closed
+    assert http_client not in gen._http_clients
+
+
+async def test_preset_edit_mid_generation_keeps_the_pool_until_it_ends(monkeypatch):
+    """Правка пресета между вызовами map-reduce: генерация доходит до конца на
+    своём клиенте, пул закрывается после неё, семафоры не копятся."""
+    from src.config import settings
+    monkeypatch.setattr(settings, "llm_http2", False)
+    monkeypatch.setattr(settings, "long_transcript_mode", True)
+    monkeypatch.setattr(settings, "long_transcript_threshold_tokens", 200)
+    monkeypatch.setattr(settings, "long_transcript_chunk_tokens", 150)
+
+    analysis_client = _client()
+    analysis_client.chat.completions.create.side_effect = [_response(ANALYSIS_PAYLOAD)]
+    gen = _fast_generator(analysis_client)
+    preset = {"base_url": "https://or.example/v1", "api_key": "k", "model": "m"}
+    client = gen._get_client(preset)
+    http_client = gen._http_clients[-1]
+    pool_open_on_call = []
+
+    async def fake_create(**kwargs):
+        if not pool_open_on_call:
+            gen.invalidate_cache_for_base_url("https://or.example/v1")  # правка пресета
+        await asyncio.sleep(0)
+        pool_open_on_call.append(not http_client.is_closed)
+        if "Объедини частичные протоколы" in kwargs["messages"][1]["content"]:
+            return _response({"protocol_data": {"decisions": "итог"}, "quality_score": 0.9})
+        return _response({"protocol_data": {"decisions": "частично"}, "quality_score": 0.5})
+
+    monkeypatch.setattr(client.chat.completions, "create", fake_create)
+    transcript = "\n\n".join(
+        f"SPEAKER_{i % 2}: " + " ".join(["реплика"] * 30) for i in range(10)
+    )
+
+    result = await gen.generate(preset=preset, transcription=transcript, template_variables={})
+
+    assert result["decisions"] == "итог"
+    assert len(pool_open_on_call) > 2 and all(pool_open_on_call)
+    await asyncio.wait_for(asyncio.gather(*gen._closing), timeout=5)
+    assert http_client.is_closed
+    assert client not in gen._concurrency
+    assert gen._holders == {}
+
+
+async def test_long_transcript_uses_map_reduce(monkeypatch):
+    """Длинная транскрипция: анализ по началу, map по фрагментам, reduce по той же схеме."""
+    from src.config import settings
+    monkeypatch.setattr(settings, "long_transcript_mode", True)
+    monkeypatch.setattr(settings, "long_transcript_threshold_tokens", 200)
+    monkeypatch.setattr(settings, "long_transcript_chunk_tokens", 150)
+
+    calls = []
+
+    async def fake_create(**kwargs):
+        user_prompt = kwargs["messages"][1]["content"]
+        calls.append(user_prompt)
+        if "Объедини частичные протоколы" in user_prompt:
+            return _response({"protocol_data": {"decisions": "итог"}, "quality_score": 0.9})
+        if "Это фрагмент" in user_prompt:
+            return _response({"protocol_data": {"decisions": "частично"}, "quality_score": 0.5})
+        return _response(ANALYSIS_PAYLOAD)
+
+    client = _client()
+    client.chat.completions.create.side_effect = fake_create
+    gen = _fast_generator(client)
+    transcript = "\n\n".join(
+        f"SPEAKER_{i % 2}: " + " ".join(["реплика"] * 30) for i in range(10)
+    )
+
+    result = await gen.generate(preset=None, transcription=transcript, template_variables={})
+
+    map_calls = [c for c in calls if "Это фрагмент" in c]
+    reduce_calls = [c for c in calls if "Объедини частичные протоколы" in c]
+    assert len(map_calls) > 1
+    assert len(reduce_calls) >= 1
+    assert all(transcript not in c for c in calls)  # целиком транскрипция не уходит
+    assert result["decisions"] == "итог"
+    assert result["_meeting_type"] == "status"
+    assert result["_quality_score"] == 0.9
+
+    schemas = {
+        str(call.kwargs["response_format"])
+        for call in client.chat.completions.create.call_args_list[1:]
+    }
+    assert len(schemas) == 1  # map и reduce — одна и та же схема генерации
+
+
+async def test_short_transcript_stays_single_call(monkeypatch):
+    """Ниже порога — обычная двухэтапная генерация без фрагментов."""
+    from src.config import settings
+    monkeypatch.setattr(settings, "long_transcript_threshold_tokens", 10_000)
+
+    client = _client()
+    client.chat.completions.create.side_effect = [
+        _response(ANALYSIS_PAYLOAD),
+        _response(GENERATION_PAYLOAD),
+    ]
+    gen = _fast_generator(client)
+
+    await gen.generate(preset=None, transcription="SPEAKER_0: коротко", template_variables={})
+
+    assert client.chat.completions.create.call_count == 2
+    generation_prompt = client.chat.completions.create.call_args_list[1].kwargs["messages"][1]["content"]
+    assert "Это фрагмент" not in generation_prompt
+
+
+async def test_prefetched_analysis_is_reused_by_generate():
+    """ЭТАП 1, запущенный заранее, забирается генерацией вместо второго вызова."""
+    import asyncio
+
+    client = _client()
+    client.chat.completions.create.side_effect = [
+        _response(ANALYSIS_PAYLOAD),
+        _response(GENERATION_PAYLOAD),
+    ]
+    gen = _fast_generator(client)
+    context = {"participants": None, "meeting_topic": "Бюджет", "meeting_agenda": "1. План"}
+
+    assert gen.prefetch_analysis(transcription="SPEAKER_0: привет", **context) is True
+    assert gen.prefetch_analysis(transcription="SPEAKER_0: привет", **context) is True  # без дубля
+    await asyncio.sleep(0)
+
+    result = await gen.generate(
+        preset=None, transcription="SPEAKER_0: привет", template_variables={}, **context
+    )
+
+    assert client.chat.completions.create.call_count == 2  # анализ один раз
+    assert result["_meeting_type"] == "status"
+    assert gen._prefetched_analysis == {}
+
+
+async def test_prefetch_with_other_context_is_not_used():
+    """Изменился вход анализа — предвыборка не подходит, анализ выполняется заново."""
+    import asyncio
+
+    client = _client()
+    client.chat.completions.create.side_effect = [
+        _response({**ANALYSIS_PAYLOAD, "meeting_type": "technical"}),
+        _response(ANALYSIS_PAYLOAD),
+        _response(GENERATION_PAYLOAD),
+    ]
+    gen = _fast_generator(client)
+
+    gen.prefetch_analysis(transcription="т", meeting_agenda="Старая повестка")
+    await asyncio.sleep(0.01)
+
+    result = await gen.generate(
+        preset=None, transcription="т", template_variables={}, meeting_agenda="Новая повестка"
+    )
+
+    assert client.chat.completions.create.call_count == 3
+    assert result["_meeting_type"] == "status"
+
+
+async def test_failed_prefetch_falls_back_to_live_analysis():
+    """Сбой фоновой предвыборки не ломает генерацию: анализ выполняется сам."""
+    import asyncio
+
+    client = _client()
+    client.chat.completions.create.side_effect = [
+        ValueError("bad schema"),  # не ретраится: предвыборка падает
+        _response(ANALYSIS_PAYLOAD),
+        _response(GENERATION_PAYLOAD),
+    ]
+    gen = _fast_generator(client, retry_attempts=1)
+
+    gen.prefetch_analysis(transcription="т")
+    await asyncio.sleep(0.01)
+
+    result = await gen.generate(preset=None, transcription="т", template_variables={})
+
+    assert result["_meeting_type"] == "status"
+    assert client.chat.completions.create.call_count == 3
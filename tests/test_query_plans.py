@@ -0,0 +1,46 @@
+"""Индексы горячих выборок и проверка планов запросов репозиториев."""
+import aiosqlite
+
+from src.database.database import _SCHEMA_MIGRATIONS, Database
+from src.database.query_plans import RepositoryQuery, collect_queries, explain_queries
+
+
+async def test_repository_queries_do_not_scan_hot_tables(test_db):
+    queries = collect_queries()
+    await explain_queries(test_db, queries)
+
+    locations = {query.location for query in queries}
+    assert "QueueRepository.get_pending_queue_tasks" in locations
+    assert "HistoryRepository.get_user_stats" in locations
+    assert [(q.location, q.plan, q.error) for q in queries if q.failed] == []
+
+
+async def test_scan_of_hot_table_is_reported(test_db):
+    query = RepositoryQuery(
+        location="Probe.by_file_name",
+        sql="SELECT * FROM queue_tasks qt WHERE qt.file_name = ?",
+    )
+    await explain_queries(test_db, [query])
+
+    assert query.hot_scans == ["queue_tasks"]
+    assert query.failed
+
+
+async def test_schema_migrations_run_once(tmp_path):
+    db_path = str(tmp_path / "versions.db")
+    db = Database(db_path=db_path)
+    await db.init_db()
+    await db.init_db()
+    await db.close()
+
+    async with aiosqlite.connect(db_path) as conn:
+        cursor = await conn.execute("PRAGMA user_version")
+        version = (await cursor.fetchone())[0]
+        cursor = await conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx_%'"
+        )
+        indexes = {row[0] for row in await cursor.fetchall()}
+
+    assert version == _SCHEMA_MIGRATIONS[-1][0]
+    assert {"idx_queue_tasks_status_priority", "idx_processing_history_user_created",
+            "idx_processing_metrics_created"} <= indexes
@@ -0,0 +1,118 @@
+"""Позиция в очереди обновляется по событиям менеджера, а не опросом."""
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+
+import src.ux.queue_tracker as qt_mod
+from src.services.task_queue_manager import TaskQueueManager
+from src.ux.queue_tracker import QueuePositionTracker
+
+
+class _FakeQueueManager:
+    def __init__(self, position=3, total=5):
+        self.position = position
+        self.total = total
+        self.listeners = {}
+        self.tasks = {"t1": object()}
+        self.position_reads = 0
+
+    def subscribe_positions(self, task_id, listener):
+        self.listeners[task_id] = listener
+
+    def unsubscribe_positions(self, task_id):
+        self.listeners.pop(task_id, None)
+
+    def publish(self):
+        for listener in list(self.listeners.values()):
+            listener()
+
+    async def get_queue_position(self, task_id):
+        self.position_reads += 1
+        return self.position
+
+    async def get_queue_size(self):
+        return self.total
+
+    async def get_task(self, task_id):
+        return self.tasks.get(task_id)
+
+
+def _tracker(monkeypatch):
+    monkeypatch.setattr(qt_mod.settings, "queue_update_interval", 0.01)
+    tracker = QueuePositionTracker(SimpleNamespace(), chat_id=1, task_id="t1")
+    tracker.update_position = AsyncMock()
+    tracker.delete_message = AsyncMock()
+    return tracker
+
+
+@pytest.mark.asyncio
+async def test_burst_of_events_becomes_one_edit(monkeypatch):
+    tracker = _tracker(monkeypatch)
+    manager = _FakeQueueManager()
+
+    tracker.follow(manager)
+    for _ in range(10):
+        manager.publish()
+    await asyncio.sleep(0.05)
+
+    assert manager.position_reads == 1
+    tracker.update_position.assert_awaited_once_with(3, 5)
+
+
+@pytest.mark.asyncio
+async def test_idle_queue_is_not_polled(monkeypatch):
+    tracker = _tracker(monkeypatch)
+    manager = _FakeQueueManager()
+
+    tracker.follow(manager)
+    await asyncio.sleep(0.05)
+    reads = manager.position_reads
+    await asyncio.sleep(0.05)
+
+    assert manager.position_reads == reads
+
+
+@pytest.mark.asyncio
+async def test_started_task_deletes_message_and_unsubscribes(monkeypatch):
+    tracker = _tracker(monkeypatch)
+    manager = _FakeQueueManager(position=None)
+
+    tracker.follow(manager)
+    await asyncio.sleep(0.05)
+
+    tracker.delete_message.assert_awaited_once()
+    assert manager.listeners == {}
+    assert tracker.is_active is False
+
+
+@pytest.mark.asyncio
+async def test_cancelled_task_keeps_cancel_message(monkeypatch):
+    """Отменённой задачи нет в менеджере — сообщение «отменена» не удаляем."""
+    tracker = _tracker(monkeypatch)
+    manager = _FakeQueueManager(position=None)
+    manager.tasks = {}
+
+    tracker.follow(manager)
+    await asyncio.sleep(0.05)
+
+    tracker.delete_message.assert_not_awaited()
+
+
+def test_manager_publishes_and_survives_failing_listener():
+    manager = TaskQueueManager.__new__(TaskQueueManager)
+    manager._position_listeners = {}
+    calls = []
+
+    def broken():
+        raise RuntimeError("boom")
+
+    manager.subscribe_positions("a", broken)
+    manager.subscribe_positions("b", lambda: calls.append("b"))
+    manager._publish_positions()
+    manager.unsubscribe_positions("b")
+    manager.unsubscribe_positions("b")
+    manager._publish_positions()
+
+    assert calls == ["b"]
@@ -63,6 +63,7 @@ async def test_status_update_with_and_without_started_at(queue_repo, test_db):
 
     assert await queue_repo.update_queue_task_status(
         "t-2", "processing", started_at="2026-07-07 10:01:00") is True
+    await test_db.journal.flush()  # processing идёт через write-behind журнал
     async with test_db.connect() as conn:
         row = await (await conn.execute(
             "SELECT status, started_at, error_message FROM queue_tasks WHERE task_id = 't-2'"
@@ -71,6 +72,7 @@ async def test_status_update_with_and_without_started_at(queue_repo, test_db):
 
     # без started_at — прежний started_at сохраняется, статус и ошибка обновляются
     assert await queue_repo.update_queue_task_status("t-2", "failed", error_message="LLM 402") is True
+    await test_db.journal.flush()
     async with test_db.connect() as conn:
         row = await (await conn.execute(
             "SELECT status, started_at, error_message FROM queue_tasks WHERE task_id = 't-2'"
@@ -80,10 +82,22 @@ async def test_status_update_with_and_without_started_at(queue_repo, test_db):
     assert row["error_message"] == "LLM 402"
 
 
+async def test_claim_lets_exactly_one_process_take_a_queued_task(queue_repo):
+    await queue_repo.save_queue_task(_task("t-claim"))
+
+    assert await queue_repo.claim_queue_task(
+        "t-claim", "processing", started_at="2026-07-07 10:02:00") is True
+    assert await queue_repo.claim_queue_task("t-claim", "processing") is False  # второй процесс
+    assert await queue_repo.claim_queue_task("t-claim", "cancelled") is False   # отменять поздно
+    assert await queue_repo.claim_queue_task("t-missing", "cancelled") is None
+    assert await queue_repo.get_pending_queue_tasks() == []
+
+
 async def test_message_id_update(queue_repo, test_db):
     await queue_repo.save_queue_task(_task("t-3"))
 
     assert await queue_repo.update_queue_task_message_id("t-3", 424242) is True
+    await test_db.journal.flush()
 
     async with test_db.connect() as conn:
         row = await (await conn.execute(
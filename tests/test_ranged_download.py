@@ -0,0 +1,227 @@
+"""Параллельное докачиваемое скачивание по HTTP Range.
+
+Сеть — настоящий локальный aiohttp-сервер: он умеет отдавать диапазоны,
+обрывать ответ посередине и игнорировать Range, как простые хранилища.
+"""
+import hashlib
+import json
+import os
+
+import aiohttp
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from src.exceptions.file import FileError
+from src.services.ranged_download import (
+    RangedDownloader,
+    RangePart,
+    plan_parts,
+    progress_path,
+)
+
+PAYLOAD = bytes(range(256)) * 4096  # 1 MiB
+
+
+class FileServer:
+    """Отдаёт PAYLOAD; ``drop_after`` обрывает первые ответы на диапазон после N байт."""
+
+    def __init__(self, *, ranges=True, drop_after=None, drops=1):
+        self.ranges = ranges
+        self.drop_after = drop_after
+        self.drops_left = drops
+        self.range_requests = []
+
+    async def handle(self, request):
+        header = request.headers.get("Range")
+        if not self.ranges or not header:
+            return web.Response(body=PAYLOAD, headers={"ETag": '"v1"'})
+        start, end = (int(x) for x in header.split("=")[1].split("-"))
+        self.range_requests.append((start, end))
+        body = PAYLOAD[start:end + 1]
+        response = web.StreamResponse(status=206, headers={
+            "Content-Range": f"bytes {start}-{end}/{len(PAYLOAD)}",
+            "Content-Length": str(len(body)),
+            "ETag": '"v1"',
+        })
+        await response.prepare(request)
+        if self.drop_after is not None and self.drops_left > 0 and len(body) > self.drop_after:
+            self.drops_left -= 1
+            await response.write(body[:self.drop_after])
+            request.transport.close()
+            return response
+        await response.write(body)
+        await response.write_eof()
+        return response
+
+
+@pytest.fixture
+async def serve():
+    servers = []
+
+    async def start(file_server):
+        app = web.Application()
+        app.router.add_get("/file", file_server.handle)
+        server = TestServer(app)
+        await server.start_server()
+        servers.append(server)
+        return str(server.make_url("/file"))
+
+    yield start
+    for server in servers:
+        await server.close()
+
+
+def _downloader(session, **kwargs):
+    kwargs.setdefault("parts", 4)
+    kwargs.setdefault("min_part_bytes", 64 * 1024)
+    kwargs.setdefault("chunk_size", 16 * 1024)
+    kwargs.setdefault("flush_bytes", 32 * 1024)
+    kwargs.setdefault("retry_delay", 0)
+    return RangedDownloader(session, **kwargs)
+
+
+def test_plan_parts_covers_file_without_gaps():
+    parts = plan_parts(1000, 3, 100)
+
+    assert [(p.start, p.end) for p in parts] == [(0, 333), (334, 667), (668, 999)]
+    assert plan_parts(150, 8, 100) == [RangePart(0, 149)]
+
+
+async def test_parallel_ranges_assemble_exact_file(serve, tmp_path):
+    server = FileServer()
+    url = await serve(server)
+    target = tmp_path / "rec.mp4.partial"
+
+    async with aiohttp.ClientSession() as session:
+        size, sha256 = await _downloader(session).download(url, str(target))
+
+    assert target.read_bytes() == PAYLOAD
+    assert (size, sha256) == (len(PAYLOAD), hashlib.sha256(PAYLOAD).hexdigest())
+    # пробный bytes=0-0 и четыре рабочих диапазона; запись прогресса убрана
+    assert len(server.range_requests) == 5
+    assert not os.path.exists(progress_path(str(target)))
+
+
+async def test_dropped_range_resumes_from_written_offset(serve, tmp_path):
+    server = FileServer(drop_after=100 * 1024)
+    url = await serve(server)
+    target = tmp_path / "rec.mp4.partial"
+
+    async with aiohttp.ClientSession() as session:
+        _, sha256 = await _downloader(session).download(url, str(target))
+
+    assert sha256 == hashlib.sha256(PAYLOAD).hexdigest()
+    # повтор просит хвост диапазона с записанного места, а не весь диапазон
+    retried = [start for start, _ in server.range_requests[1:] if start % (256 * 1024)]
+    assert len(retried) == 1
+    assert 0 < retried[0] % (256 * 1024) <= 100 * 1024
+
+
+async def test_next_attempt_continues_from_progress_record(serve, tmp_path):
+    server = FileServer()
+    url = await serve(server)
+    target = tmp_path / "rec.mp4.partial"
+    half = len(PAYLOAD) // 2
+    # след прошлой попытки: первая половина на диске, вторая не тронута
+    target.write_bytes(PAYLOAD[:half] + b"\0" * half)
+    progress_path_ = progress_path(str(target))
+    with open(progress_path_, "w") as file:
+        json.dump({"total": len(PAYLOAD), "validator": '"v1"',
+                   "parts": [[0, half - 1, half], [half, len(PAYLOAD) - 1, 0]]}, file)
+
+    async with aiohttp.ClientSession() as session:
+        _, sha256 = await _downloader(session).download(url, str(target))
+
+    assert sha256 == hashlib.sha256(PAYLOAD).hexdigest()
+    assert server.range_requests[1:] == [(half, len(PAYLOAD) - 1)]
+
+
+async def test_changed_file_version_restarts_from_zero(serve, tmp_path):
+    server = FileServer()
+    url = await serve(server)
+    target = tmp_path / "rec.mp4.partial"
+    target.write_bytes(b"x" * len(PAYLOAD))
+    with open(progress_path(str(target)), "w") as file:
+        json.dump({"total": len(PAYLOAD), "validator": '"v0"',
+                   "parts": [[0, len(PAYLOAD) - 1, len(PAYLOAD) - 1]]}, file)
+
+    async with aiohttp.ClientSession() as session:
+        await _downloader(session).download(url, str(target))
+
+    assert target.read_bytes() == PAYLOAD
+
+
+async def test_exhausted_retries_keep_progress_for_resume(serve, tmp_path):
+    server = FileServer(drop_after=10 * 1024, drops=100)
+    url = await serve(server)
+    target = tmp_path / "rec.mp4.partial"
+
+    async with aiohttp.ClientSession() as session:
+        with pytest.raises(FileError):
+            await _downloader(session, max_retries=1).download(url, str(target))
+
+    with open(progress_path(str(target))) as file:
+        record = json.load(file)
+    assert sum(done for _, _, done in record["parts"]) > 0
+
+
+async def test_server_without_ranges_streams_once_and_reports_progress(serve, tmp_path):
+    url = await serve(FileServer(ranges=False))
+    target = tmp_path / "rec.mp4.partial"
+    reports = []
+
+    async def on_progress(progress):
+        reports.append(progress)
+
+    async with aiohttp.ClientSession() as session:
+        downloader = _downloader(session, on_progress=on_progress, progress_interval=0)
+        size, sha256 = await downloader.download(url, str(target))
+
+    assert target.read_bytes() == PAYLOAD
+    assert sha256 == hashlib.sha256(PAYLOAD).hexdigest()
+    assert downloader.snapshot().downloaded == size
+    assert reports and reports[-1].total == len(PAYLOAD)
+
+
+async def test_finish_waits_for_checkpoint_already_in_thread():
+    """Сохранение прогресса, начатое до конца скачивания, завершается раньше, чем
+    финальная запись или удаление файла прогресса: иначе оно их перетирает."""
+    import asyncio
+    import threading
+
+    started, release = threading.Event(), threading.Event()
+    finished = []
+
+    def checkpoint():
+        started.set()
+        release.wait(5)
+        finished.append(True)
+
+    async def work():
+        await asyncio.to_thread(started.wait, 5)
+        threading.Timer(0.1, release.set).start()
+        return "done"
+
+    downloader = _downloader(None, progress_interval=0)
+
+    assert await downloader._with_reporter(work(), checkpoint=checkpoint) == "done"
+    assert finished == [True]
+
+
+async def test_url_service_moves_finished_download_to_unique_path(serve, tmp_path, monkeypatch):
+    from src.services import url_service as url_module
+
+    monkeypatch.setattr(url_module.settings, "temp_dir", str(tmp_path))
+    monkeypatch.setattr(url_module.settings, "download_min_part_mb", 0)
+    url = await serve(FileServer())
+
+    async with url_module.URLService() as service:
+        first = await service.download_file(url, "rec.mp4", resume_key="https://share/x")
+        second = await service.download_file(url, "rec.mp4", resume_key="https://share/x")
+
+    assert first.path != second.path
+    assert open(first.path, "rb").read() == PAYLOAD
+    assert first.sha256 == hashlib.sha256(PAYLOAD).hexdigest()
+    # ключ докачки освобождён: недокачанных файлов и записей прогресса не осталось
+    assert not list(tmp_path.glob("*.partial*"))
@@ -29,6 +29,7 @@ sys.path.insert(0, os.path.join(_root, "src"))
 
 import src.handlers.message_handlers as mh  # noqa: E402
 from src.exceptions.file import FileSizeError, FileTypeError  # noqa: E402
+from src.services.url_service import DownloadedFile  # noqa: E402
 
 # --- Реальный формат ответа FileService.get_supported_formats() ---
 _SUPPORTED_FORMATS = {
@@ -255,9 +256,9 @@ class _FakeURLService:
         if self._validate_exc:
             raise self._validate_exc
 
-    async def download_file(self, url, filename):
+    async def download_file(self, url, filename, **_options):
         self.calls.append(("download_file", url, filename))
-        return self._download_path
+        return DownloadedFile(self._download_path, "0" * 64)
 
     def _call_names(self):
         return [c[0] for c in self.calls]
@@ -108,11 +108,15 @@ async def test_regenerate_end_to_end_without_stubbing_llm_service(monkeypatch):
         db_module.history_repo, "get_result_for_user",
         AsyncMock(return_value={
             "id": 7, "user_id": 42, "file_name": "meeting.mp3",
-            "transcription_text": "полная расшифровка встречи",
+            "has_transcription": True,
             "result_text": "# Старый протокол",
             "speaker_mapping": None, "meeting_type": None,
         }),
     )
+    monkeypatch.setattr(
+        db_module.history_repo, "get_transcription_text",
+        AsyncMock(return_value="полная расшифровка встречи"),
+    )
     monkeypatch.setattr(
         db_module.history_repo, "save_processing_result", AsyncMock(return_value=101)
     )
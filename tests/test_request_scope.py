@@ -0,0 +1,116 @@
+"""Identity map обработки и кэш шаблонов процесса."""
+import pytest
+
+from src.models.template import TemplateCreate
+from src.services.request_scope import current_scope, request_scope
+from src.services.template_service import TemplateService
+from src.services.user_service import UserService
+
+
+class _CountingUsers:
+    """Обёртка над UserRepository, считающая чтения."""
+
+    def __init__(self, repo):
+        self._repo = repo
+        self.reads = 0
+
+    async def get_user(self, telegram_id):
+        self.reads += 1
+        return await self._repo.get_user(telegram_id)
+
+    def __getattr__(self, name):
+        return getattr(self._repo, name)
+
+
+class _CountingTemplates:
+    def __init__(self, repo):
+        self._repo = repo
+        self.reads = 0
+
+    async def get_templates(self):
+        self.reads += 1
+        return await self._repo.get_templates()
+
+    def __getattr__(self, name):
+        return getattr(self._repo, name)
+
+
+@pytest.mark.asyncio
+async def test_user_is_read_once_per_scope(user_repo):
+    await user_repo.create_user(telegram_id=10)
+    users = _CountingUsers(user_repo)
+    service = UserService(users=users)
+
+    with request_scope():
+        first = await service.get_user_by_telegram_id(10)
+        second = await service.get_user_by_telegram_id(10)
+    await service.get_user_by_telegram_id(10)
+
+    assert first is second
+    assert users.reads == 2
+    assert current_scope() is None
+
+
+@pytest.mark.asyncio
+async def test_user_update_is_visible_inside_scope(user_repo):
+    await user_repo.create_user(telegram_id=11)
+    service = UserService(users=user_repo)
+
+    with request_scope():
+        await service.get_user_by_telegram_id(11)
+        updated = await service.update_user_protocol_output_preference(11, "pdf")
+
+    assert updated.protocol_output_mode == "pdf"
+
+
+@pytest.mark.asyncio
+async def test_template_cache_is_read_through_and_invalidated(template_repo, user_repo):
+    templates = _CountingTemplates(template_repo)
+    service = TemplateService(templates=templates, users=user_repo)
+    await template_repo.create_template(name="Системный", content="## Протокол {x}", is_default=True)
+
+    assert [t.name for t in await service.get_all_templates()] == ["Системный"]
+    await service.get_all_templates()
+    assert templates.reads == 1
+
+    created = await service.create_template(TemplateCreate(name="Новый", content="## Протокол {y}"))
+    assert (await service.get_template_by_id(created.id)).name == "Новый"
+    assert {t.name for t in await service.get_all_templates()} == {"Системный", "Новый"}
+    assert templates.reads == 2
+
+
+@pytest.mark.asyncio
+async def test_user_templates_come_from_cache(template_repo, user_repo):
+    owner_row = await user_repo.create_user(telegram_id=20)
+    await user_repo.create_user(telegram_id=21)
+    await template_repo.create_template(name="Общий", content="## Протокол {x}", is_default=True)
+    await template_repo.create_template(name="Свой", content="## Протокол {y}", created_by=owner_row)
+    service = TemplateService(templates=template_repo, users=user_repo)
+
+    assert [t.name for t in await service.get_user_templates(20)] == ["Общий", "Свой"]
+    assert [t.name for t in await service.get_user_templates(21)] == ["Общий"]
+    assert await service.get_user_templates(99) == []
+
+
+@pytest.mark.asyncio
+async def test_template_change_in_another_process_drops_the_cache(template_repo, user_repo, tmp_path):
+    """Два процесса над одной БД и общим бэкендом: правка в одном видна другому."""
+    from src.services.shared_state import SQLiteStateBackend
+
+    path = str(tmp_path / "state.sqlite")
+    editor_templates = _CountingTemplates(template_repo)
+    reader_templates = _CountingTemplates(template_repo)
+    editor = TemplateService(templates=editor_templates, users=user_repo,
+                             shared=SQLiteStateBackend(path))
+    reader = TemplateService(templates=reader_templates, users=user_repo,
+                             shared=SQLiteStateBackend(path))
+    await template_repo.create_template(name="Системный", content="## Протокол {x}", is_default=True)
+
+    assert [t.name for t in await reader.get_all_templates()] == ["Системный"]
+    await reader.get_all_templates()
+    assert reader_templates.reads == 1
+
+    await editor.create_template(TemplateCreate(name="Новый", content="## Протокол {y}"))
+
+    assert {t.name for t in await reader.get_all_templates()} == {"Системный", "Новый"}
+    assert reader_templates.reads == 2
@@ -0,0 +1,190 @@
+"""Общее состояние процессов: FSM и карточки сопоставления в SQLite.
+
+«Процессы» здесь — независимые экземпляры бэкенда и хранилищ над одним файлом:
+общего у них только то, что лежит в SQLite.
+"""
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import pytest
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.fsm.storage.base import StorageKey
+
+from src.models.diarization import Diarization, Segment
+from src.models.processing import ProcessingRequest, TranscriptionResult
+from src.performance.metrics import ProcessingMetrics
+from src.services.mapping_session import MappingSession, SharedMappingSessionStore
+from src.services.shared_state import SharedFSMStorage, SQLiteStateBackend
+
+
+class _Form(StatesGroup):
+    waiting = State()
+
+
+@pytest.fixture
+def backends(tmp_path):
+    path = str(tmp_path / "state.sqlite")
+    return SQLiteStateBackend(path), SQLiteStateBackend(path)
+
+
+def _session(task_id="task-1"):
+    return MappingSession(
+        request=ProcessingRequest(
+            user_id=42, file_name="встреча.mp3", template_id=2, llm_provider="openai",
+        ),
+        transcription_result=TranscriptionResult(
+            transcription="текст",
+            diarization=Diarization(segments=[Segment(speaker="SPEAKER_0", text="текст")]),
+        ),
+        speaker_mapping={"SPEAKER_0": "Анна"},
+        meeting_type="status",
+        temp_file_path="/tmp/f.mp3",
+        cache_key="processing_result:abc",
+        task_id=task_id,
+        metrics=ProcessingMetrics(file_name="встреча.mp3", user_id=42, start_time=datetime.now()),
+        speakers_with_audio={"SPEAKER_0"},
+    )
+
+
+def test_pop_hands_value_to_one_process_only(backends):
+    first, second = backends
+    first.set("ns", "k", b"v")
+
+    assert second.get("ns", "k") == b"v"
+    assert second.pop("ns", "k") == b"v"
+    assert first.pop("ns", "k") is None
+
+
+def test_add_keeps_existing_value_and_expired_keys_vanish(backends, monkeypatch):
+    backend, _ = backends
+    assert backend.add("ns", "hash", b"one", ttl=60) is True
+    assert backend.add("ns", "hash", b"two", ttl=60) is False
+    assert backend.get("ns", "hash") == b"one"
+
+    backend.set("ns", "short", b"v", ttl=10)
+    now = time.time()
+    monkeypatch.setattr("src.services.shared_state.time.time", lambda: now + 11)
+    assert backend.get("ns", "short") is None
+    assert backend.pop("ns", "short") is None
+
+
+def test_delete_if_removes_only_the_expected_value(backends):
+    backend, other = backends
+    backend.set("ns", "active", b"task-2")
+
+    assert other.delete_if("ns", "active", b"task-1") is False
+    assert backend.get("ns", "active") == b"task-2"
+    assert other.delete_if("ns", "active", b"task-2") is True
+    assert backend.get("ns", "active") is None
+
+
+async def test_fsm_state_is_visible_to_another_process(backends):
+    first, second = (SharedFSMStorage(b) for b in backends)
+    key = StorageKey(bot_id=42, chat_id=1001, user_id=1001)
+
+    await first.set_state(key, _Form.waiting)
+    await first.update_data(key, {"participants_list": [{"name": "Анна"}]})
+
+    assert await second.get_state(key) == _Form.waiting.state
+    assert await second.get_data(key) == {"participants_list": [{"name": "Анна"}]}
+    await second.set_state(key, None)
+    await second.set_data(key, {})
+    assert (await first.get_state(key), await first.get_data(key)) == (None, {})
+
+
+async def test_fsm_data_keeps_meeting_info_datetimes(backends):
+    """Приглашение на встречу: хендлер участников кладёт ``model_dump()`` с datetime."""
+    from src.models.meeting_info import MeetingInfo, MeetingParticipant
+
+    first, second = (SharedFSMStorage(b) for b in backends)
+    key = StorageKey(bot_id=42, chat_id=1001, user_id=1001)
+    meeting_info = MeetingInfo(
+        topic="Бюджет",
+        start_time=datetime(2026, 7, 27, 10, 30),
+        participants=[MeetingParticipant(name="Анна Петрова", is_organizer=True)],
+    )
+
+    await first.update_data(key, {"meeting_info": meeting_info.model_dump()})
+
+    data = await second.get_data(key)
+    assert data["meeting_info"] == meeting_info.model_dump()
+    assert MeetingInfo(**data["meeting_info"]) == meeting_info
+
+
+async def test_mapping_paused_in_one_process_is_confirmed_in_another(backends):
+    paused_by, confirmed_by = (SharedMappingSessionStore(b) for b in backends)
+    await paused_by.save(42, _session())
+
+    session = await confirmed_by.peek(42)
+    session.speaker_mapping = {"SPEAKER_0": "Борис"}
+    session.editing_speaker = "SPEAKER_0"
+    await confirmed_by.persist(42, session)
+
+    seen = await paused_by.peek(42)
+    assert seen.speaker_mapping == {"SPEAKER_0": "Борис"}
+    assert seen.editing_speaker == "SPEAKER_0"
+    assert seen.speakers_with_audio == {"SPEAKER_0"}
+    assert seen.transcription_result.diarization.speakers == ["SPEAKER_0"]
+
+    taken = await confirmed_by.take(42)
+    assert taken.request.file_name == "встреча.mp3"
+    assert await paused_by.take(42) is None              # двойной тап из другого процесса
+    assert await paused_by.take_regardless(42, "task-1") is None  # таймер тоже опоздал
+    assert await paused_by.was_recently_closed(42)
+
+
+async def test_transcript_is_stored_once_by_content_hash(backends):
+    backend, _ = backends
+    store = SharedMappingSessionStore(backend)
+    await store.save(42, _session("task-1"))
+    await store.save(43, _session("task-2"))
+
+    with sqlite3.connect(backend.path) as conn:
+        rows = conn.execute(
+            "SELECT namespace, COUNT(*) FROM shared_state GROUP BY namespace"
+        ).fetchall()
+    counts = dict(rows)
+    assert counts["transcript"] == 1
+    assert counts["mapping"] == 2
+
+
+async def test_backend_io_runs_off_the_event_loop(backends, monkeypatch):
+    """SQLite ждёт блокировку другого процесса — цикл событий ждать не должен."""
+    backend, _ = backends
+    store = SharedMappingSessionStore(backend)
+    loop_thread = threading.get_ident()
+    io_threads = set()
+    original_get = backend.get
+
+    def recording_get(namespace, key):
+        io_threads.add(threading.get_ident())
+        return original_get(namespace, key)
+
+    monkeypatch.setattr(backend, "get", recording_get)
+    await store.save(42, _session())
+
+    assert await store.has_active(42)
+    assert await store.peek(42) is not None
+    assert io_threads and loop_thread not in io_threads
+
+
+async def test_take_keeps_the_pointer_of_a_session_saved_concurrently(backends, monkeypatch):
+    """Второй процесс сохраняет новую запись, пока первый снимает указатель старой."""
+    first_backend, second_backend = backends
+    first, second = (SharedMappingSessionStore(b) for b in backends)
+    await first.save(42, _session("task-1"))
+
+    def save_newer_first(original):
+        def run(namespace, key, *args):
+            if namespace == "mapping_active":
+                second._save(42, _session("task-2"))
+            return original(namespace, key, *args)
+        return run
+
+    monkeypatch.setattr(first_backend, "delete", save_newer_first(first_backend.delete))
+    monkeypatch.setattr(first_backend, "delete_if", save_newer_first(first_backend.delete_if))
+
+    assert (await first.take(42)).task_id == "task-1"
+    assert (await second.peek(42)).task_id == "task-2"
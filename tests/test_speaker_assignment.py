@@ -0,0 +1,113 @@
+"""Привязка спикеров pyannote к сегментам WhisperX заметающей прямой.
+
+Результат по сегментам сверяется с прежним квадратичным перебором; отдельно —
+разрез сегмента по словам при смене спикера.
+"""
+import random
+
+from src.services.speaker_assignment import assign_speakers, best_overlap_speakers
+
+
+def _brute_force(intervals, turns):
+    """Прежний алгоритм: перебор всех реплик, максимум пересечения, первая при ничьей."""
+    result = []
+    for start, end in intervals:
+        overlapping = []
+        for turn in turns:
+            if start < turn["end"] and end > turn["start"]:
+                overlap = min(end, turn["end"]) - max(start, turn["start"])
+                overlapping.append((turn["speaker"], overlap))
+        overlapping.sort(key=lambda item: item[1], reverse=True)
+        result.append(overlapping[0][0] if overlapping else None)
+    return result
+
+
+def _turn(start, end, speaker):
+    return {"start": start, "end": end, "speaker": speaker}
+
+
+def test_matches_brute_force_on_random_overlapping_turns():
+    rng = random.Random(7)
+    turns = []
+    cursor = 0.0
+    for _ in range(300):
+        start = cursor + rng.uniform(-2.0, 3.0)  # бывают наложения реплик
+        turns.append(_turn(max(0.0, start), max(0.0, start) + rng.uniform(0.2, 8.0),
+                           f"SPEAKER_{rng.randint(0, 4):02d}"))
+        cursor = max(0.0, start) + rng.uniform(0.5, 4.0)
+    turns.sort(key=lambda turn: turn["start"])
+    intervals = []
+    for _ in range(500):
+        start = rng.uniform(0.0, cursor)
+        intervals.append((start, start + rng.choice([0.0, rng.uniform(0.1, 12.0)])))
+
+    assert best_overlap_speakers(intervals, turns) == _brute_force(intervals, turns)
+
+
+def test_segment_takes_speaker_with_largest_overlap():
+    turns = [_turn(0.0, 4.0, "A"), _turn(4.0, 10.0, "B")]
+    segments = [{"start": 3.0, "end": 9.0, "text": "привет всем"}]
+
+    assigned = assign_speakers(segments, turns)
+
+    assert [segment["speaker"] for segment in assigned] == ["B"]
+
+
+def test_segment_without_overlap_gets_new_label():
+    turns = [_turn(0.0, 1.0, "A")]
+    segments = [
+        {"start": 0.0, "end": 1.0, "text": "раз"},
+        {"start": 5.0, "end": 6.0, "text": "два"},
+    ]
+
+    assigned = assign_speakers(segments, turns)
+
+    assert [segment["speaker"] for segment in assigned] == ["A", "SPEAKER_2"]
+
+
+def test_speaker_change_inside_segment_splits_by_words():
+    turns = [_turn(0.0, 2.0, "A"), _turn(2.0, 5.0, "B")]
+    words = [
+        {"word": "Да,", "start": 0.1, "end": 0.5},
+        {"word": "согласен.", "start": 0.6, "end": 1.5},
+        {"word": "А", "start": 2.2, "end": 2.4},
+        {"word": "сроки?", "start": 2.5, "end": 3.0},
+    ]
+    segments = [{"start": 0.1, "end": 3.0, "text": "Да, согласен. А сроки?", "words": words}]
+
+    assigned = assign_speakers(segments, turns)
+
+    assert [(s["speaker"], s["text"], s["start"], s["end"]) for s in assigned] == [
+        ("A", "Да, согласен.", 0.1, 1.5),
+        ("B", "А сроки?", 2.2, 3.0),
+    ]
+
+
+def test_untimed_words_inherit_neighbour_speaker():
+    turns = [_turn(0.0, 2.0, "A"), _turn(2.0, 5.0, "B")]
+    words = [
+        {"word": "В"},  # без таймингов в начале — берёт следующего
+        {"word": "пятницу", "start": 0.2, "end": 0.8},
+        {"word": "15", },  # числа выравнивание не таймирует
+        {"word": "Хорошо", "start": 2.5, "end": 3.0},
+    ]
+    segments = [{"start": 0.0, "end": 3.0, "text": "В пятницу 15 Хорошо", "words": words}]
+
+    assigned = assign_speakers(segments, turns)
+
+    assert [(s["speaker"], s["text"]) for s in assigned] == [
+        ("A", "В пятницу 15"),
+        ("B", "Хорошо"),
+    ]
+
+
+def test_single_speaker_segment_keeps_original_dict():
+    turns = [_turn(0.0, 5.0, "A")]
+    segment = {"start": 0.0, "end": 2.0, "text": "всё ок",
+               "words": [{"word": "всё", "start": 0.0, "end": 0.5},
+                         {"word": "ок", "start": 0.6, "end": 1.0}]}
+
+    assigned = assign_speakers([segment], turns)
+
+    assert assigned == [segment]
+    assert segment["speaker"] == "A"
@@ -178,10 +178,10 @@ def _patch_card_render(monkeypatch):
 
 
 @pytest.fixture(autouse=True)
-def _clean_sessions():
+async def _clean_sessions():
     yield
     for user_id in range(40, 60):
-        mapping_sessions.discard(user_id)
+        await mapping_sessions.discard(user_id)
 
 
 # ---------------------------------------------------------------------------
@@ -193,7 +193,7 @@ def _clean_sessions():
 async def test_tap_then_text_names_the_tapped_speaker(_patch_card_render):
     session = _make_session(participants=None, speaker_mapping={}, user_id=42)
     session.confirmation_message = _FakeMessage(42)
-    mapping_sessions.save(42, session)
+    await mapping_sessions.save(42, session)
     router = _mapping_router()
 
     await _open_subview(router, 42, "SPEAKER_2")
@@ -216,7 +216,7 @@ async def test_trailing_comma_not_part_of_subview_name(_patch_card_render):
     запятой: применяется разобранное имя, а не сырой текст сообщения."""
     session = _make_session(participants=None, speaker_mapping={}, user_id=42)
     session.confirmation_message = _FakeMessage(42)
-    mapping_sessions.save(42, session)
+    await mapping_sessions.save(42, session)
     router = _mapping_router()
 
     await _open_subview(router, 42, "SPEAKER_1")
@@ -344,7 +344,7 @@ async def test_link_in_subview_falls_through_to_general_flow():
     имя не применяется, под-вид остаётся открытым (editing_speaker цел)."""
     session = _make_session(participants=None, speaker_mapping={}, user_id=50)
     session.confirmation_message = _FakeMessage(50)
-    mapping_sessions.save(50, session)
+    await mapping_sessions.save(50, session)
     router = _mapping_router()
     await _open_subview(router, 50, "SPEAKER_1")
 
@@ -364,7 +364,7 @@ async def test_non_text_in_subview_falls_through():
     отказ «отправьте текстом» исчез (ADR-0006)."""
     session = _make_session(participants=None, speaker_mapping={}, user_id=51)
     session.confirmation_message = _FakeMessage(51)
-    mapping_sessions.save(51, session)
+    await mapping_sessions.save(51, session)
     router = _mapping_router()
     await _open_subview(router, 51, "SPEAKER_1")
 
@@ -384,10 +384,10 @@ async def test_expired_session_falls_through_no_gone_text():
     (осознанное изменение #99: под-вида нет без живой сессии)."""
     session = _make_session(participants=None, speaker_mapping={}, user_id=52)
     session.confirmation_message = _FakeMessage(52)
-    mapping_sessions.save(52, session)
+    await mapping_sessions.save(52, session)
     router = _mapping_router()
     await _open_subview(router, 52, "SPEAKER_1")
-    mapping_sessions.discard(52)  # имитируем истечение TTL
+    await mapping_sessions.discard(52)  # имитируем истечение TTL
 
     routers, caught = _wall_routers(router)
     message = _FakeMessage(52, text="Мария Сидорова")
@@ -414,7 +414,7 @@ async def test_main_view_text_is_laid_out_over_unnamed(_patch_card_render):
     """
     session = _make_session(participants=None, speaker_mapping={}, user_id=53)
     session.confirmation_message = _FakeMessage(53)
-    mapping_sessions.save(53, session)  # сессия жива, под-вид не открыт (главный вид)
+    await mapping_sessions.save(53, session)  # сессия жива, под-вид не открыт (главный вид)
     router = _mapping_router()
 
     message = _FakeMessage(53, text="Мария Сидорова")
@@ -435,7 +435,7 @@ async def test_main_view_namesakes_land_on_separate_speakers(_patch_card_render)
     """
     session = _make_session(participants=None, speaker_mapping={}, user_id=57)
     session.confirmation_message = _FakeMessage(57)
-    mapping_sessions.save(57, session)
+    await mapping_sessions.save(57, session)
     router = _mapping_router()
 
     await _deliver_message(
@@ -454,7 +454,7 @@ async def test_main_view_namesakes_in_one_message(_patch_card_render):
     """Тот же дедуп бьёт и по раскладке одним сообщением через запятую (#100)."""
     session = _make_session(participants=None, speaker_mapping={}, user_id=58)
     session.confirmation_message = _FakeMessage(58)
-    mapping_sessions.save(58, session)
+    await mapping_sessions.save(58, session)
     router = _mapping_router()
 
     message = _FakeMessage(58, text="Алексей Шабловский, Алексей Тимченко")
@@ -475,7 +475,7 @@ async def test_multiple_names_refused_with_hint():
     не применяется, под-вид остаётся открытым."""
     session = _make_session(participants=None, speaker_mapping={}, user_id=54)
     session.confirmation_message = _FakeMessage(54)
-    mapping_sessions.save(54, session)
+    await mapping_sessions.save(54, session)
     router = _mapping_router()
     await _open_subview(router, 54, "SPEAKER_1")
 
@@ -496,7 +496,7 @@ async def test_name_over_limit_refused_without_partial_apply():
     """Имя длиннее 50 символов → отказ, ничего не применяем (всё или ничего)."""
     session = _make_session(participants=None, speaker_mapping={}, user_id=55)
     session.confirmation_message = _FakeMessage(55)
-    mapping_sessions.save(55, session)
+    await mapping_sessions.save(55, session)
     router = _mapping_router()
     await _open_subview(router, 55, "SPEAKER_1")
 
@@ -515,7 +515,7 @@ async def test_slash_name_refused_in_subview():
     ничего не применяем."""
     session = _make_session(participants=None, speaker_mapping={}, user_id=56)
     session.confirmation_message = _FakeMessage(56)
-    mapping_sessions.save(56, session)
+    await mapping_sessions.save(56, session)
     router = _mapping_router()
     await _open_subview(router, 56, "SPEAKER_1")
 
@@ -543,7 +543,7 @@ async def test_back_button_returns_to_main_view_layout(_patch_card_render):
     """
     session = _make_session(participants=None, speaker_mapping={}, user_id=57)
     session.confirmation_message = _FakeMessage(57)
-    mapping_sessions.save(57, session)
+    await mapping_sessions.save(57, session)
     router = _mapping_router()
     await _open_subview(router, 57, "SPEAKER_2")
 
@@ -567,7 +567,7 @@ async def test_selecting_participant_clears_editing_speaker():
         participants=[{"name": "Иван Петров"}], speaker_mapping={}, user_id=58
     )
     session.confirmation_message = _FakeMessage(58)
-    mapping_sessions.save(58, session)
+    await mapping_sessions.save(58, session)
     router = _mapping_router()
     await _open_subview(router, 58, "SPEAKER_1")
 
@@ -47,9 +47,9 @@ class _FakeCallback:
 
 
 @pytest.fixture(autouse=True)
-def _clean_sessions():
+async def _clean_sessions():
     yield
-    mapping_sessions.discard(USER)
+    await mapping_sessions.discard(USER)
 
 
 def _cbdata():
@@ -86,7 +86,7 @@ async def test_frame_reports_expired_when_session_gone(monkeypatch):
         return True
 
     monkeypatch.setattr(cb, "safe_edit_text", fake_edit)
-    mapping_sessions.discard(USER)
+    await mapping_sessions.discard(USER)
 
     called = []
 
@@ -106,7 +106,7 @@ async def test_frame_peek_passes_session_to_body():
     import src.handlers.callbacks.speaker_mapping_callbacks as cb
 
     sentinel = SimpleNamespace(name="session")
-    mapping_sessions.save(USER, sentinel)
+    await mapping_sessions.save(USER, sentinel)
 
     seen = {}
 
@@ -119,7 +119,7 @@ async def test_frame_peek_passes_session_to_body():
 
     assert seen["user_id"] == USER
     assert seen["session"] is sentinel
-    assert mapping_sessions.peek(USER) is sentinel  # peek не изымает
+    assert await mapping_sessions.peek(USER) is sentinel  # peek не изымает
 
 
 @pytest.mark.asyncio
@@ -128,7 +128,7 @@ async def test_frame_take_removes_session():
     import src.handlers.callbacks.speaker_mapping_callbacks as cb
 
     sentinel = SimpleNamespace(name="session")
-    mapping_sessions.save(USER, sentinel)
+    await mapping_sessions.save(USER, sentinel)
 
     seen = {}
 
@@ -139,7 +139,7 @@ async def test_frame_take_removes_session():
     await handler(_FakeCallback(from_user_id=USER), _cbdata(), _FakeState())
 
     assert seen["session"] is sentinel
-    assert mapping_sessions.peek(USER) is None  # take изъял
+    assert await mapping_sessions.peek(USER) is None  # take изъял
 
 
 @pytest.mark.asyncio
@@ -147,7 +147,7 @@ async def test_frame_answer_error_on_body_exception():
     """Исключение сути при on_error='answer' → лог + короткий тост «не получилось»."""
     import src.handlers.callbacks.speaker_mapping_callbacks as cb
 
-    mapping_sessions.save(USER, SimpleNamespace())
+    await mapping_sessions.save(USER, SimpleNamespace())
 
     @cb.card_handler(session="peek")
     async def handler(callback, callback_data, state, user_id, session):
@@ -171,7 +171,7 @@ async def test_frame_edit_error_on_body_exception(monkeypatch):
         return True
 
     monkeypatch.setattr(cb, "safe_edit_text", fake_edit)
-    mapping_sessions.save(USER, SimpleNamespace())
+    await mapping_sessions.save(USER, SimpleNamespace())
 
     @cb.card_handler(session="take", on_error="edit")
     async def handler(callback, callback_data, state, user_id, session):
@@ -50,3 +50,23 @@ async def test_mapping_llm_error_is_typed(monkeypatch):
     service = sms.SpeakerMappingService()
     with pytest.raises(SpeakerMappingLLMError):
         await service._call_llm_for_mapping("промпт", "openai")
+
+
+def test_speakers_info_is_grouped_in_one_pass():
+    """Сведения о спикерах — один проход по колонкам, без Segment на каждого спикера."""
+    import src.services.speaker_mapping_service as sms
+    from src.models.diarization import Diarization, Segment
+
+    diarization = Diarization(segments=[
+        Segment(speaker=f"SPEAKER_{i % 3}", text=f" реплика {i} ", start=i, end=i + 1 + i % 3)
+        for i in range(30)
+    ] + [Segment(speaker="SPEAKER_9", text="без таймингов")])
+
+    info = sms.SpeakerMappingService()._extract_speakers_info(diarization)
+
+    assert [s["speaker_id"] for s in info] == ["SPEAKER_2", "SPEAKER_1", "SPEAKER_0", "SPEAKER_9"]
+    assert [(s["segments_count"], s["speaking_time"]) for s in info] == [
+        (10, 30), (10, 20), (10, 10), (1, 0)
+    ]
+    assert info[2]["text_samples"] == ["реплика 0", "реплика 9", "реплика 15", "реплика 18", "реплика 27"]
+    assert info[3]["text_samples"] == ["без таймингов"]
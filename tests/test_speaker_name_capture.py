@@ -176,10 +176,10 @@ def _patch_card_render(monkeypatch):
 
 
 @pytest.fixture(autouse=True)
-def _clean_sessions():
+async def _clean_sessions():
     yield
     for user_id in range(40, 60):
-        mapping_sessions.discard(user_id)
+        await mapping_sessions.discard(user_id)
 
 
 # ---------------------------------------------------------------------------
@@ -191,7 +191,7 @@ def _clean_sessions():
 async def test_valid_name_applies_to_speaker(_patch_card_render):
     session = _make_session(participants=None, speaker_mapping={}, user_id=42)
     session.confirmation_message = _FakeMessage(42)
-    mapping_sessions.save(42, session)
+    await mapping_sessions.save(42, session)
     router = _mapping_router()
     await _open_subview(router, 42, "SPEAKER_1")
 
@@ -217,7 +217,7 @@ async def test_non_text_message_falls_through_no_soft_refusal():
         participants=[{"name": "Иван Петров"}], speaker_mapping={}, user_id=46
     )
     session.confirmation_message = _FakeMessage(46)
-    mapping_sessions.save(46, session)
+    await mapping_sessions.save(46, session)
     router = _mapping_router()
     await _open_subview(router, 46, "SPEAKER_1")
 
@@ -243,10 +243,10 @@ async def test_expired_session_falls_through_no_gone_text():
     проваливается мимо в общий обработчик. Прежнего ответа «истекло» тут нет."""
     session = _make_session(participants=None, speaker_mapping={}, user_id=48)
     session.confirmation_message = _FakeMessage(48)
-    mapping_sessions.save(48, session)
+    await mapping_sessions.save(48, session)
     router = _mapping_router()
     await _open_subview(router, 48, "SPEAKER_1")
-    mapping_sessions.discard(48)  # имитируем истечение TTL сессии
+    await mapping_sessions.discard(48)  # имитируем истечение TTL сессии
 
     message = _FakeMessage(48, text="Мария Сидорова")
     winner = await _deliver_message([router], message, _make_fsm(48))
@@ -274,7 +274,7 @@ async def test_cancel_returns_to_main_view_which_captures_text():
         participants=[{"name": "Иван Петров"}], speaker_mapping={}, user_id=47
     )
     session.confirmation_message = _FakeMessage(47)
-    mapping_sessions.save(47, session)
+    await mapping_sessions.save(47, session)
     router = _mapping_router()
     await _open_subview(router, 47, "SPEAKER_2")
 
@@ -331,7 +331,7 @@ def _wall_routers(mapping_router):
 async def test_command_and_menu_bypass_name_capture_in_subview():
     session = _make_session(participants=None, speaker_mapping={}, user_id=49)
     session.confirmation_message = _FakeMessage(49)
-    mapping_sessions.save(49, session)
+    await mapping_sessions.save(49, session)
     mapping_router = _mapping_router()
     await _open_subview(mapping_router, 49, "SPEAKER_1")
     routers, caught = _wall_routers(mapping_router)
@@ -0,0 +1,70 @@
+"""Замена меток спикеров одним проходом: совпадение с прежней заменой в четыре прохода."""
+import re
+
+import pytest
+
+from src.utils.text_processing import (
+    _extract_speaker_number,
+    _speaker_replacer,
+    replace_speakers_in_text,
+)
+
+
+def _four_pass_reference(text, speaker_mapping):
+    """Прежняя реализация: четыре re.sub на каждого спикера."""
+    for speaker_id, name in sorted(speaker_mapping.items(), key=lambda x: len(x[0]), reverse=True):
+        number = _extract_speaker_number(speaker_id)
+        for pattern, replacement in (
+            (rf"\b{re.escape(speaker_id)}\b", name),
+            (rf"\bСпикер\s+{number}\b", name),
+            (rf"\b{re.escape(speaker_id)}:", f"{name}:"),
+            (rf"\bСпикер\s+{number}:", f"{name}:"),
+        ):
+            text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
+    return text
+
+
+MAPPING = {f"SPEAKER_{i}": f"Участник {chr(ord('А') + i)}" for i in range(1, 12)}
+
+TEXTS = [
+    "SPEAKER_1: Добрый день\nSPEAKER_10: Привет\nSPEAKER_11: Начнём",
+    "Участники: Спикер 1; Спикер 2; Спикер 10\nРешения: Спикер 1 утвердил план",
+    "Ответственный: спикер 3, срок — пятница. speaker_2 согласен.",
+    "Спикер 1: да\nСпикер  11: нет\nSPEAKER_12 и Спикер 12 не сопоставлены",
+    "SPEAKER_100 и SPEAKER_1X — не метки, SPEAKER_1: метка",
+    "",
+]
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_single_pass_matches_four_pass_reference(text):
+    assert replace_speakers_in_text(text, MAPPING) == _four_pass_reference(text, MAPPING)
+
+
+def test_longer_label_wins():
+    result = replace_speakers_in_text("Спикер 10 и Спикер 1", {"SPEAKER_1": "Иван", "SPEAKER_10": "Пётр"})
+
+    assert result == "Пётр и Иван"
+
+
+def test_substituted_name_is_not_replaced_again():
+    # Четыре прохода превращали "Спикер 2" в "Спикер 1", а затем в "Анна"
+    result = replace_speakers_in_text("Спикер 2", {"SPEAKER_2": "Спикер 1", "SPEAKER_1": "Анна"})
+
+    assert result == "Спикер 1"
+
+
+def test_pattern_is_compiled_once_per_mapping():
+    _speaker_replacer.cache_clear()
+    mapping = {"SPEAKER_1": "Иван", "SPEAKER_2": "Мария"}
+
+    for _ in range(3):
+        replace_speakers_in_text("SPEAKER_1 и Спикер 2", mapping)
+
+    info = _speaker_replacer.cache_info()
+    assert (info.misses, info.hits) == (1, 2)
+
+
+def test_empty_mapping_leaves_text_unchanged():
+    assert replace_speakers_in_text("SPEAKER_1: текст", {}) == "SPEAKER_1: текст"
+    assert replace_speakers_in_text("SPEAKER_1: текст", {"": "Никто"}) == "SPEAKER_1: текст"
@@ -0,0 +1,60 @@
+"""Бюджет холодного старта: импорт бота без тяжёлых ML-пакетов и в пределах бюджета.
+
+Отсутствие тяжёлых пакетов проверяется всегда. Время импорта зависит от машины,
+поэтому бюджет — бенчмарк по запросу:
+
+    STARTUP_BENCHMARK=1 pytest -m startup_benchmark tests/test_startup_budget.py
+"""
+import os
+
+import pytest
+
+from src.performance.startup_profile import (
+    STARTUP_BUDGET_MS,
+    format_tree,
+    heavy_imports,
+    measure_imports,
+    parse_importtime,
+    total_ms,
+)
+
+_SAMPLE = """\
+import time: self [us] | cumulative | imported package
+import time:       200 |        200 |     _json
+import time:       300 |        500 |   json.decoder
+import time:       100 |        100 |   json.encoder
+import time:       400 |       1000 | json
+import time:      5000 |       5000 | torch
+"""
+
+
+def test_importtime_output_becomes_tree():
+    roots = parse_importtime(_SAMPLE)
+
+    assert [r.name for r in roots] == ["json", "torch"]
+    json_record = roots[0]
+    assert [c.name for c in json_record.children] == ["json.decoder", "json.encoder"]
+    assert json_record.children[0].children[0].name == "_json"
+    assert total_ms(roots) == 6.0
+    assert heavy_imports(roots) == ["torch"]
+    # ветки дешевле порога скрыты вместе с детьми
+    assert [line.split()[-1] for line in format_tree(roots, min_ms=0.4)] == [
+        "torch", "json", "json.decoder",
+    ]
+
+
+def test_cold_start_skips_heavy_packages():
+    roots = measure_imports("src.bot")
+
+    assert heavy_imports(roots) == [], "\n".join(format_tree(roots, min_ms=50)[:30])
+
+
+@pytest.mark.startup_benchmark
+@pytest.mark.skipif(
+    not os.environ.get("STARTUP_BENCHMARK"),
+    reason="бенчмарк старта: STARTUP_BENCHMARK=1 pytest -m startup_benchmark",
+)
+def test_cold_start_within_budget():
+    roots = measure_imports("src.bot")
+
+    assert total_ms(roots) < STARTUP_BUDGET_MS, "\n".join(format_tree(roots, min_ms=50)[:30])
@@ -0,0 +1,180 @@
+"""Потоковый приём видео: байты идут в ffmpeg по ходу скачивания.
+
+ffmpeg подменён скриптом с тем же контрактом (stdin → последний аргумент,
+ошибка — ненулевой код и stderr): важен конвейер, а не кодек.
+"""
+import hashlib
+import struct
+import sys
+
+import aiohttp
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from src.exceptions.file import FileError
+from src.services import streaming_intake as si
+
+
+def _box(kind: bytes, payload: bytes = b"") -> bytes:
+    return struct.pack(">I4s", 8 + len(payload), kind) + payload
+
+
+FASTSTART_MP4 = _box(b"ftyp", b"isom\0\0\0\0") + _box(b"moov", b"\0" * 64) + _box(b"mdat", b"\1" * 300_000)
+TAIL_INDEX_MP4 = _box(b"ftyp", b"isom\0\0\0\0") + _box(b"mdat", b"\1" * 300_000) + _box(b"moov", b"\0" * 64)
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path, monkeypatch):
+    """Исполняемый «ffmpeg»: копирует stdin в выходной файл или падает по env."""
+    script = tmp_path / "ffmpeg"
+    script.write_text(
+        f"#!{sys.executable}\n"
+        "import os, sys\n"
+        "if os.environ.get('FAKE_FFMPEG_FAIL'):\n"
+        "    sys.stdin.buffer.read(10)\n"
+        "    sys.stderr.write('pipe:0: Invalid data found')\n"
+        "    sys.exit(1)\n"
+        "data = sys.stdin.buffer.read()\n"
+        "open(sys.argv[-1], 'wb').write(b'AUDIO' + data[:16])\n"
+    )
+    script.chmod(0o755)
+    monkeypatch.setattr(si, "_FFMPEG", str(script))
+    return script
+
+
+async def _chunks(data, size=50_000):
+    for offset in range(0, len(data), size):
+        yield data[offset:offset + size]
+
+
+def test_sniff_accepts_faststart_mp4_and_matroska_only():
+    assert si.sniff_streamable_video(FASTSTART_MP4[:65536])
+    assert not si.sniff_streamable_video(TAIL_INDEX_MP4[:65536])
+    assert si.sniff_streamable_video(b"\x1a\x45\xdf\xa3" + b"\0" * 100)
+    assert not si.sniff_streamable_video(b"ID3\x04" + b"\0" * 100)
+
+
+def test_only_video_extensions_try_streaming():
+    assert si.may_stream("meeting.MP4")
+    assert si.may_stream("call.webm")
+    assert not si.may_stream("meeting.mp3")
+    assert not si.may_stream("")
+
+
+async def test_transcode_hashes_source_in_the_same_pass(fake_ffmpeg, tmp_path):
+    audio = tmp_path / "x.intake.mp3"
+
+    size, sha256 = await si.transcode_stream(
+        FASTSTART_MP4[:1000], _chunks(FASTSTART_MP4[1000:]), str(audio)
+    )
+
+    assert size == len(FASTSTART_MP4)
+    assert sha256 == hashlib.sha256(FASTSTART_MP4).hexdigest()
+    assert audio.read_bytes() == b"AUDIO" + FASTSTART_MP4[:16]
+
+
+async def test_ffmpeg_failure_surfaces_stderr(fake_ffmpeg, tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_FFMPEG_FAIL", "1")
+
+    with pytest.raises(FileError, match="Invalid data"):
+        await si.transcode_stream(b"", _chunks(b"x" * 2_000_000), str(tmp_path / "x.intake.mp3"))
+
+
+async def _serve(payload):
+    async def handle(request):
+        return web.Response(body=payload)
+
+    app = web.Application()
+    app.router.add_get("/video", handle)
+    server = TestServer(app)
+    await server.start_server()
+    return server
+
+
+async def test_streamable_video_leaves_only_audio_on_disk(fake_ffmpeg, tmp_path):
+    server = await _serve(FASTSTART_MP4)
+    reports = []
+
+    async def on_progress(progress):
+        reports.append(progress)
+
+    try:
+        async with aiohttp.ClientSession() as session:
+            audio_path, sha256 = await si.stream_video_to_audio(
+                session, str(server.make_url("/video")), str(tmp_path),
+                on_progress=on_progress, progress_interval=0,
+            )
+    finally:
+        await server.close()
+
+    assert audio_path.endswith(si.INTAKE_SUFFIX)
+    assert sha256 == hashlib.sha256(FASTSTART_MP4).hexdigest()
+    assert [p.name for p in tmp_path.iterdir() if p.name != "ffmpeg"] == [audio_path.rsplit("/", 1)[-1]]
+    assert reports
+
+
+async def test_tail_index_video_falls_back_to_regular_download(fake_ffmpeg, tmp_path):
+    server = await _serve(TAIL_INDEX_MP4)
+    try:
+        async with aiohttp.ClientSession() as session:
+            result = await si.stream_video_to_audio(
+                session, str(server.make_url("/video")), str(tmp_path)
+            )
+    finally:
+        await server.close()
+
+    assert result is None
+    assert not list(tmp_path.glob("*" + si.INTAKE_SUFFIX))
+
+
+async def test_stream_dropped_mid_body_falls_back_to_ranged_download(fake_ffmpeg, tmp_path, monkeypatch):
+    from src.services import url_service as url_module
+
+    async def handle(request):
+        header = request.headers.get("Range")
+        if header:
+            start, end = (int(x) for x in header.split("=")[1].split("-"))
+            return web.Response(status=206, body=FASTSTART_MP4[start:end + 1], headers={
+                "Content-Range": f"bytes {start}-{end}/{len(FASTSTART_MP4)}",
+            })
+        # Потоковый запрос без Range: соединение рвётся посреди тела
+        response = web.StreamResponse(headers={"Content-Length": str(len(FASTSTART_MP4))})
+        await response.prepare(request)
+        await response.write(FASTSTART_MP4[:100_000])
+        request.transport.close()
+        return response
+
+    app = web.Application()
+    app.router.add_get("/video", handle)
+    server = TestServer(app)
+    await server.start_server()
+    monkeypatch.setattr(url_module.settings, "temp_dir", str(tmp_path))
+    monkeypatch.setattr(url_module.settings, "streaming_intake", True)
+    monkeypatch.setattr(url_module.settings, "download_min_part_mb", 0)
+    try:
+        async with url_module.URLService() as service:
+            downloaded = await service.download_file(
+                str(server.make_url("/video")), "meeting.mp4", extract_audio=True
+            )
+    finally:
+        await server.close()
+
+    assert not downloaded.path.endswith(si.INTAKE_SUFFIX)
+    assert open(downloaded.path, "rb").read() == FASTSTART_MP4
+    assert downloaded.sha256 == hashlib.sha256(FASTSTART_MP4).hexdigest()
+    assert not list(tmp_path.glob("*" + si.INTAKE_SUFFIX))
+
+
+async def test_preprocess_skips_intake_artifact():
+    from src.services.transcription_service import TranscriptionService
+
+    service = TranscriptionService.__new__(TranscriptionService)
+    service._check_ffmpeg = lambda: pytest.fail("ffmpeg не должен запускаться")
+
+    path, info = await service._preprocess_audio(
+        "temp/abc.intake.mp3", "deepgram.mp3", si.INTAKE_FFMPEG_ARGS, "Deepgram API"
+    )
+
+    assert path == "temp/abc.intake.mp3"
+    assert info["compressed"] is False
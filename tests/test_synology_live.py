@@ -42,7 +42,7 @@ async def test_recipe_downloads_real_file_from_nas():
         assert filename, "имя файла должно определяться до скачивания"
         assert file_size > 0, "размер должен определяться до скачивания"
 
-        temp_path = await service.download_file(direct_url, filename)
+        temp_path, _sha256 = await service.download_file(direct_url, filename)
 
     try:
         actual_size = os.path.getsize(temp_path)
@@ -0,0 +1,158 @@
+"""Планировщик очереди: приоритет, старение, лимит на пользователя и позиции."""
+import asyncio
+import random
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+
+from src.models.task_queue import QueuedTask, TaskPriority
+from src.services.task_scheduler import TaskScheduler
+
+T0 = datetime(2026, 1, 1, 12, 0, 0)
+
+
+def _task(user_id=1, priority=TaskPriority.NORMAL, seconds=0.0):
+    return QueuedTask(
+        task_id=uuid4(), user_id=user_id, chat_id=user_id,
+        request=SimpleNamespace(), priority=priority,
+        created_at=T0 + timedelta(seconds=seconds),
+    )
+
+
+def _drain(scheduler):
+    order = []
+    while (task := scheduler.get_nowait()) is not None:
+        order.append(task)
+        scheduler.task_done(task)
+    return order
+
+
+def test_higher_priority_overtakes_earlier_tasks():
+    scheduler = TaskScheduler()
+    normal = [_task(user_id=i, seconds=i) for i in range(3)]
+    admin = _task(user_id=9, priority=TaskPriority.ADMIN, seconds=10)
+    for task in normal + [admin]:
+        scheduler.put_nowait(task)
+
+    assert scheduler.position(str(admin.task_id)) == 0
+    assert _drain(scheduler) == [admin] + normal
+
+
+def test_aging_lets_long_waiting_low_task_ahead():
+    scheduler = TaskScheduler(aging_seconds=60)
+    low = _task(user_id=1, priority=TaskPriority.LOW, seconds=0)
+    # NORMAL, созданная через 90 с, «моложе» LOW на полтора уровня старения
+    normal = _task(user_id=2, priority=TaskPriority.NORMAL, seconds=90)
+    high = _task(user_id=3, priority=TaskPriority.HIGH, seconds=90)
+    for task in (high, normal, low):
+        scheduler.put_nowait(task)
+
+    assert [scheduler.position(str(t.task_id)) for t in (high, low, normal)] == [0, 1, 2]
+    assert _drain(scheduler) == [high, low, normal]
+
+
+def test_user_cap_lets_other_users_through():
+    scheduler = TaskScheduler(max_active_per_user=1)
+    burst = [_task(user_id=1, seconds=i) for i in range(5)]
+    other = _task(user_id=2, seconds=10)
+    for task in burst + [other]:
+        scheduler.put_nowait(task)
+
+    first = scheduler.get_nowait()
+    second = scheduler.get_nowait()
+    assert (first, second) == (burst[0], other)
+    # у первого пользователя слот занят, у второго очередь пуста
+    assert scheduler.get_nowait() is None
+
+    scheduler.task_done(first)
+    assert scheduler.get_nowait() is burst[1]
+
+
+def test_full_queue_raises_and_requeue_bypasses_limit():
+    scheduler = TaskScheduler(maxsize=1)
+    first, second = _task(seconds=0), _task(seconds=1)
+    scheduler.put_nowait(first)
+    with pytest.raises(asyncio.QueueFull):
+        scheduler.put_nowait(second)
+
+    taken = scheduler.get_nowait()
+    scheduler.put_nowait(second)
+    scheduler.requeue(taken)
+
+    # возвращённая задача встаёт на прежнее место — впереди более поздней
+    assert scheduler.position(str(taken.task_id)) == 0
+    assert len(scheduler) == 2
+
+
+async def test_get_waits_for_put():
+    scheduler = TaskScheduler()
+    task = _task()
+    waiter = asyncio.create_task(scheduler.get())
+    await asyncio.sleep(0)
+    assert not waiter.done()
+
+    scheduler.put_nowait(task)
+
+    assert await asyncio.wait_for(waiter, 1) is task
+
+
+@pytest.mark.parametrize("aging", [0, 45])
+def test_positions_match_sorted_order_under_random_churn(aging):
+    rng = random.Random(aging)
+    scheduler = TaskScheduler(aging_seconds=aging)
+    queued = {}
+
+    def expected():
+        ranked = sorted(queued.values(), key=lambda e: e[0])
+        return {task_id: i for i, (_, task_id) in enumerate(ranked)}
+
+    for step in range(600):
+        action = rng.random()
+        if action < 0.55 or not queued:
+            # изредка задача «из прошлого», как при возврате в очередь
+            seconds = step - rng.choice([0, 0, 0, 40])
+            task = _task(user_id=rng.randrange(5), priority=rng.choice(list(TaskPriority)), seconds=seconds)
+            scheduler.put_nowait(task)
+            key = scheduler._entries[str(task.task_id)].key
+            queued[str(task.task_id)] = (key, str(task.task_id))
+        elif action < 0.8:
+            task_id = rng.choice(list(queued))
+            assert scheduler.discard(task_id)
+            del queued[task_id]
+        else:
+            task = scheduler.get_nowait()
+            scheduler.task_done(task)
+            # без лимита на пользователя выдаётся строго первая по ключу
+            assert expected()[str(task.task_id)] == 0
+            del queued[str(task.task_id)]
+
+        if step % 20 == 0:
+            ranks = expected()
+            assert {task_id: scheduler.position(task_id) for task_id in queued} == ranks
+    assert len(scheduler) == len(queued)
+
+
+async def test_manager_reports_priority_position(monkeypatch):
+    from src.services import task_queue_manager as tqm
+
+    async def noop(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(tqm.queue_repo, "save_queue_task", noop)
+    monkeypatch.setattr(tqm.queue_repo, "update_queue_task_status", noop)
+    manager = tqm.TaskQueueManager()
+    request = SimpleNamespace(user_id=1, file_id=None, file_path="a.mp3", file_name="a.mp3",
+                              template_id=1, llm_provider="openai", language="ru",
+                              is_external_file=False, participants_list=None, meeting_topic=None,
+                              meeting_date=None, meeting_time=None, speaker_mapping=None)
+
+    normal = await manager.add_task(request, chat_id=1)
+    admin = await manager.add_task(request, chat_id=1, priority=TaskPriority.ADMIN)
+
+    assert await manager.get_queue_position(str(admin.task_id)) == 0
+    assert await manager.get_queue_position(str(normal.task_id)) == 1
+    assert await manager.cancel_task(str(admin.task_id))
+    assert await manager.get_queue_position(str(normal.task_id)) == 0
+    assert await manager.get_queue_size() == 1
@@ -53,7 +53,7 @@ async def test_regen_picker_is_two_column_grid_with_cancel(monkeypatch):
     import src.database as db_module
     monkeypatch.setattr(
         db_module.history_repo, "get_result_for_user",
-        AsyncMock(return_value={"transcription_text": "расшифровка"}),
+        AsyncMock(return_value={"has_transcription": True}),
     )
     monkeypatch.setattr(pac, "_safe_callback_answer", AsyncMock())
 
@@ -0,0 +1,63 @@
+"""Нарезка длинной транскрипции на фрагменты для map-reduce генерации."""
+
+from src.llm.transcript_chunking import (
+    chunk_transcript,
+    estimate_tokens,
+    split_into_turns,
+)
+
+
+def _turn(speaker: str, words: int, word: str = "слово") -> str:
+    return f"{speaker}: " + " ".join([word] * words)
+
+
+def test_split_into_turns_uses_blank_lines():
+    text = "SPEAKER_1: привет\n\nSPEAKER_2: здравствуй\n\n\n\nSPEAKER_1: начнём"
+
+    assert split_into_turns(text) == [
+        "SPEAKER_1: привет",
+        "SPEAKER_2: здравствуй",
+        "SPEAKER_1: начнём",
+    ]
+
+
+def test_chunks_break_on_turn_boundaries_within_budget():
+    turns = [_turn(f"SPEAKER_{i % 3}", 40) for i in range(30)]
+    text = "\n\n".join(turns)
+
+    chunks = chunk_transcript(text, max_tokens=600)
+
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 600 for chunk in chunks)
+    # Склейка фрагментов восстанавливает исходные реплики без потерь и разрывов
+    assert [t for chunk in chunks for t in split_into_turns(chunk)] == turns
+
+
+def test_oversized_turn_is_split_and_keeps_speaker_label():
+    sentences = " ".join(f"Предложение номер {i} про бюджет." for i in range(200))
+    text = f"SPEAKER_1: короткая реплика\n\nSPEAKER_2: {sentences}"
+
+    chunks = chunk_transcript(text, max_tokens=300)
+
+    assert all(estimate_tokens(chunk) <= 300 for chunk in chunks)
+    pieces = [t for chunk in chunks for t in split_into_turns(chunk)]
+    assert pieces[0] == "SPEAKER_1: короткая реплика"
+    assert len(pieces) > 2
+    assert all(piece.startswith("SPEAKER_2: ") for piece in pieces[1:])
+    restored = " ".join(piece[len("SPEAKER_2: "):] for piece in pieces[1:])
+    assert restored == sentences
+
+
+def test_sentence_longer_than_budget_falls_back_to_words():
+    text = "SPEAKER_1: " + " ".join(["слово"] * 500)
+
+    chunks = chunk_transcript(text, max_tokens=100)
+
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 100 for chunk in chunks)
+
+
+def test_short_transcript_is_single_chunk():
+    text = "SPEAKER_1: привет\n\nSPEAKER_2: пока"
+
+    assert chunk_transcript(text, max_tokens=1000) == [text]
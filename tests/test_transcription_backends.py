@@ -17,7 +17,6 @@ def service():
     from src.services.transcription_service import TranscriptionService
 
     svc = TranscriptionService.__new__(TranscriptionService)
-    svc.whisper_model = None
     svc.groq_client = None
     return svc
 
@@ -35,7 +34,6 @@ def test_registry_covers_all_six_modes(service):
 async def test_whisper_backend_transcribes_and_strips(service):
     from src.services import transcription_backends as tb
 
-    service._load_whisper_model = MagicMock()
     service._transcribe_with_progress = AsyncMock(return_value={"text": "  привет мир  "})
 
     result = await tb.WhisperBackend(service).transcribe("f.mp3", "ru")
@@ -54,7 +54,6 @@ def service():
     from src.services.transcription_service import TranscriptionService
 
     svc = TranscriptionService.__new__(TranscriptionService)
-    svc.whisper_model = None
     svc.groq_client = None
     svc.oom_protection = MagicMock()
     svc.oom_protection.can_process_file.return_value = (True, "ok")
@@ -10,6 +10,7 @@ import weakref
 import pytest
 
 from src.performance.oom_protection import get_oom_protection
+from src.services.model_registry import ModelRegistry
 from src.services.transcription_service import TranscriptionService
 
 
@@ -34,20 +35,28 @@ def test_service_is_collected_after_use():
     assert ref() is None, "TranscriptionService пережил задачу — утечка вернулась"
 
 
-def test_whisper_model_is_released_with_service():
-    """Модель — самый тяжёлый груз сервиса; она обязана уходить вместе с ним."""
+def test_whisper_model_is_not_held_by_service(monkeypatch):
+    """Модель — самый тяжёлый груз; её держит реестр процесса, а не сервис задачи."""
+    import src.services.transcription_service as ts_module
 
     class FakeWhisperModel:
         pass
 
+    registry = ModelRegistry(idle_ttl=0)
+    registry.register("whisper", FakeWhisperModel)
+    monkeypatch.setattr(ts_module, "model_registry", registry)
+
     service = TranscriptionService()
-    service.whisper_model = FakeWhisperModel()
-    model_ref = weakref.ref(service.whisper_model)
+    ref = weakref.ref(service)
+    with registry.use("whisper"):
+        pass
+    TranscriptionService()
 
     del service
     gc.collect()
 
-    assert model_ref() is None, "Модель Whisper осталась в памяти после сервиса"
+    assert ref() is None
+    assert registry.stats()["loads"] == 1  # одна модель на процесс, не на задачу
 
 
 def test_singleton_registry_does_not_grow_across_tasks():
@@ -62,11 +71,18 @@ def test_singleton_registry_does_not_grow_across_tasks():
     assert len(protection.cleanup_callbacks) == baseline
 
 
-def test_live_service_still_receives_aggressive_cleanup():
+def test_live_service_still_receives_aggressive_cleanup(monkeypatch):
     """Слабая ссылка не должна отключить саму защиту у живого сервиса."""
+    import src.services.transcription_service as ts_module
+
+    registry = ModelRegistry(idle_ttl=0)
+    registry.register("whisper", object)
+    monkeypatch.setattr(ts_module, "model_registry", registry)
     service = TranscriptionService()
-    service.whisper_model = object()
+    with registry.use("whisper"):
+        pass
 
-    get_oom_protection()._aggressive_cleanup()
+    get_oom_protection()._aggressive_cleanup()  # сервис жив: колбэк держится слабой ссылкой
 
-    assert service.whisper_model is None
+    assert not registry.is_loaded("whisper")
+    del service
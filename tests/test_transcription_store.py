@@ -0,0 +1,126 @@
+"""Хранилище транскрипций по хешу содержимого: переживает рестарт, делится между процессами."""
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.models.diarization import Diarization, Segment
+from src.models.processing import TranscriptionResult
+from src.performance.transcription_store import TranscriptionStore
+
+
+def _result(text="текст встречи"):
+    return TranscriptionResult(
+        transcription=text,
+        diarization=Diarization(segments=[Segment(speaker="SPEAKER_1", text=text, start=0.0, end=1.5)]),
+        compression_info={"compressed": True},
+    )
+
+
+async def test_roundtrip_survives_new_instance(tmp_path):
+    store = TranscriptionStore(root_dir=str(tmp_path / "store"))
+    assert await store.put("abcdef0123456789", "ru", "deepgram", _result())
+
+    # «рестарт»: новый экземпляр читает тот же каталог
+    restarted = TranscriptionStore(root_dir=str(tmp_path / "store"))
+    loaded = await restarted.get("abcdef0123456789", "ru", "deepgram")
+
+    assert loaded == _result()
+    assert restarted.stats["hits"] == 1
+
+
+async def test_key_includes_language_and_backend(tmp_path):
+    store = TranscriptionStore(root_dir=str(tmp_path))
+    await store.put("abcdef0123456789", "ru", "deepgram", _result())
+
+    assert await store.get("abcdef0123456789", "en", "deepgram") is None
+    assert await store.get("abcdef0123456789", "ru", "whisper") is None
+    assert store.stats["misses"] == 2
+
+
+async def test_missing_blob_is_a_miss_and_drops_index_row(tmp_path):
+    store = TranscriptionStore(root_dir=str(tmp_path))
+    await store.put("abcdef0123456789", "ru", "groq", _result())
+    for blob in (tmp_path / "blobs").rglob("*.zlib"):
+        blob.unlink()
+
+    assert await store.get("abcdef0123456789", "ru", "groq") is None
+    assert (await store.get_stats())["entries"] == 0
+
+
+async def test_size_limit_evicts_least_recently_used(tmp_path):
+    store = TranscriptionStore(root_dir=str(tmp_path), max_size_mb=1)
+    store.max_size_bytes = 1  # любая вторая запись переполняет хранилище
+
+    await store.put("1111111111111111", "ru", "groq", _result("первая"))
+    await store.put("2222222222222222", "ru", "groq", _result("вторая"))
+
+    assert await store.get("1111111111111111", "ru", "groq") is None
+    assert store.stats["evictions"] >= 1
+
+
+@pytest.fixture
+def service():
+    from src.services.transcription_service import TranscriptionService
+
+    svc = TranscriptionService.__new__(TranscriptionService)
+    svc.oom_protection = MagicMock()
+    svc.oom_protection.can_process_file.return_value = (True, "ok")
+    svc._check_ffmpeg = lambda: True
+    return svc
+
+
+class _Backend:
+    def __init__(self, name, result=None, available=True):
+        self.name = name
+        self._result = result
+        self._available = available
+        self.calls = 0
+
+    def is_available(self):
+        return self._available
+
+    async def transcribe(self, file_path, language):
+        self.calls += 1
+        return self._result
+
+
+async def test_service_skips_backend_on_stored_hit(service, tmp_path, monkeypatch):
+    import src.services.transcription_service as ts_module
+
+    store = TranscriptionStore(root_dir=str(tmp_path / "store"))
+    monkeypatch.setattr(ts_module, "transcription_store", store)
+    monkeypatch.setattr(ts_module.settings, "transcription_mode", "deepgram")
+    monkeypatch.setattr(ts_module.settings, "enable_diarization", False)
+    audio = tmp_path / "a.mp3"
+    audio.write_bytes(b"audio")
+
+    deepgram = _Backend("deepgram", result=_result("из deepgram"))
+    service._backends = {"deepgram": deepgram, "local": _Backend("whisper")}
+
+    first = await service.transcribe_with_diarization(str(audio), "ru", content_hash="feedfacefeedface")
+    second = await service.transcribe_with_diarization(str(audio), "ru", content_hash="feedfacefeedface")
+
+    assert first.transcription == second.transcription == "из deepgram"
+    assert deepgram.calls == 1
+
+
+async def test_fallback_result_is_stored_under_actual_backend(service, tmp_path, monkeypatch):
+    import src.services.transcription_service as ts_module
+
+    store = TranscriptionStore(root_dir=str(tmp_path / "store"))
+    monkeypatch.setattr(ts_module, "transcription_store", store)
+    monkeypatch.setattr(ts_module.settings, "transcription_mode", "deepgram")
+    monkeypatch.setattr(ts_module.settings, "enable_diarization", False)
+    audio = tmp_path / "a.mp3"
+    audio.write_bytes(b"audio")
+
+    service._backends = {
+        "deepgram": _Backend("deepgram", available=False),
+        "local": _Backend("whisper", result=_result("из whisper")),
+    }
+
+    await service.transcribe_with_diarization(str(audio), "ru", content_hash="feedfacefeedface")
+
+    # откат на whisper не выдаёт себя за deepgram
+    assert await store.get("feedfacefeedface", "ru", "deepgram") is None
+    assert (await store.get("feedfacefeedface", "ru", "whisper")).transcription == "из whisper"
@@ -24,6 +24,7 @@ import src.handlers.callbacks.processing_callbacks as pc  # noqa: E402
 import src.handlers.message_handlers as mh  # noqa: E402
 import src.services.task_queue_manager as tqm_mod  # noqa: E402
 import src.ux.queue_tracker as qt_mod  # noqa: E402
+from src.services.url_service import DownloadedFile  # noqa: E402
 from src.ux.quick_actions import QuickActionsUI  # noqa: E402
 
 _DRIVE_URL = "https://drive.google.com/file/d/abc123/view"
@@ -104,8 +105,8 @@ class _FakeURLService:
     def validate_file_by_info(self, filename, size):
         return None
 
-    async def download_file(self, url, filename):
-        return self._download_path
+    async def download_file(self, url, filename, **_options):
+        return DownloadedFile(self._download_path, "0" * 64)
 
 
 def _make_message():
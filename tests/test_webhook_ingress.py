@@ -0,0 +1,189 @@
+"""Режим вебхука: секрет, ограниченная очередь и мониторинг на одном сервере.
+
+Сервер — настоящее приложение aiohttp из ``build_webhook_app``; тела запросов —
+записанные обновления Telegram, к Bot API никто не обращается.
+"""
+import asyncio
+
+import pytest
+from aiogram import Bot, Dispatcher
+from aiohttp.test_utils import TestClient, TestServer
+from fixtures.telegram_updates import RECORDED_UPDATES
+
+from src.api.webhook import WEBHOOK_HANDLER, build_webhook_app, derive_webhook_secret, webhook_path
+
+SECRET = "s3cr3t-token"
+HEADERS = {"X-Telegram-Bot-Api-Secret-Token": SECRET}
+
+
+class _Monitoring:
+    def get_health_status(self):
+        return {"overall_status": "healthy"}
+
+
+class _Recorder:
+    """Диспетчер, который только запоминает обновления (и может задерживать их)."""
+
+    def __init__(self):
+        self.dp = Dispatcher()
+        self.seen = []
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+        self.release.set()
+        self.dp.message()(self._record)
+        self.dp.callback_query()(self._record)
+
+    async def _record(self, event):
+        self.started.set()
+        await self.release.wait()
+        self.seen.append(type(event).__name__)
+
+
+@pytest.fixture
+async def webhook():
+    clients = []
+
+    async def make(recorder, **kwargs):
+        app = build_webhook_app(
+            recorder.dp, Bot("42:TEST"), SECRET, monitoring=_Monitoring(), path="/telegram", **kwargs
+        )
+        client = TestClient(TestServer(app))
+        await client.start_server()
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        await client.close()
+
+
+async def _drain(client):
+    await asyncio.wait_for(client.app[WEBHOOK_HANDLER].queue.join(), timeout=5)
+
+
+async def test_wrong_secret_is_rejected(webhook):
+    recorder = _Recorder()
+    client = await webhook(recorder)
+
+    missing = await client.post("/telegram", json=RECORDED_UPDATES[0])
+    wrong = await client.post("/telegram", json=RECORDED_UPDATES[0],
+                              headers={"X-Telegram-Bot-Api-Secret-Token": "nope"})
+    await _drain(client)
+
+    assert (missing.status, wrong.status) == (401, 401)
+    assert recorder.seen == []
+    assert client.app[WEBHOOK_HANDLER].stats()["unauthorized"] == 2
+
+
+async def test_recorded_updates_are_dispatched(webhook):
+    recorder = _Recorder()
+    client = await webhook(recorder)
+
+    for update in RECORDED_UPDATES:
+        response = await client.post("/telegram", json=update, headers=HEADERS)
+        assert response.status == 200
+    bad = await client.post("/telegram", json={"message": {}}, headers=HEADERS)
+    await _drain(client)
+
+    assert bad.status == 400
+    assert sorted(recorder.seen) == ["CallbackQuery", "Message"]
+    assert client.app[WEBHOOK_HANDLER].stats()["accepted"] == 2
+
+
+async def test_full_queue_answers_503(webhook):
+    recorder = _Recorder()
+    recorder.release.clear()
+    client = await webhook(recorder, queue_size=1, workers=1, enqueue_timeout=0.05)
+
+    first = await client.post("/telegram", json=RECORDED_UPDATES[0], headers=HEADERS)
+    await asyncio.wait_for(recorder.started.wait(), timeout=5)  # обработчик занят
+    queued = await client.post("/telegram", json=RECORDED_UPDATES[1], headers=HEADERS)
+    overflow = await client.post("/telegram", json=RECORDED_UPDATES[0], headers=HEADERS)
+
+    assert (first.status, queued.status, overflow.status) == (200, 200, 503)
+    assert overflow.headers["Retry-After"] == "1"
+
+    recorder.release.set()
+    await _drain(client)
+    assert len(recorder.seen) == 2
+    stats = client.app[WEBHOOK_HANDLER].stats()
+    assert (stats["accepted"], stats["rejected"]) == (2, 1)
+
+
+async def test_monitoring_is_served_on_webhook_port(webhook):
+    client = await webhook(_Recorder(), monitoring_token="mon-token")
+
+    health = await client.get("/health")
+    webhook_stats = await client.get(
+        "/monitoring/webhook", headers={"Authorization": "Bearer mon-token"}
+    )
+
+    assert health.status == 200
+    assert (await health.json())["overall_status"] == "healthy"
+    assert (await webhook_stats.json())["capacity"] == 100
+
+
+def test_route_path_comes_from_public_url():
+    assert webhook_path("https://bot.example.com/telegram/hook") == "/telegram/hook"
+    assert webhook_path("https://bot.example.com") == "/webhook"
+
+
+async def test_monitoring_token_guards_stats_but_not_health(webhook):
+    client = await webhook(_Recorder(), monitoring_token="mon-token")
+
+    health = await client.get("/health")
+    anonymous = await client.get("/monitoring/webhook")
+    wrong = await client.get("/monitoring/webhook", headers={"Authorization": "Bearer nope"})
+    allowed = await client.get("/monitoring/webhook", headers={"Authorization": "Bearer mon-token"})
+
+    assert (health.status, anonymous.status, wrong.status, allowed.status) == (200, 401, 401, 200)
+
+
+async def test_monitoring_without_token_is_not_published(webhook):
+    """За TLS-прокси на localhost каждый запрос — с 127.0.0.1: адрес ничего не доказывает."""
+    client = await webhook(_Recorder())
+
+    health = await client.get("/health")
+    statuses = [
+        (await client.get(path)).status
+        for path in ("/monitoring/webhook", "/monitoring/stats", "/monitoring/performance")
+    ]
+
+    assert health.status == 200
+    assert statuses == [404, 404, 404]
+
+
+def test_derived_secret_is_shared_by_processes_of_one_token():
+    secret = derive_webhook_secret("42:TEST")
+
+    assert secret == derive_webhook_secret("42:TEST")
+    assert secret != derive_webhook_secret("43:OTHER")
+    assert "42:TEST" not in secret and len(secret) == 64
+
+
+async def test_sigterm_returns_from_run_webhook(monkeypatch):
+    """docker stop → SIGTERM: run_webhook возвращается, и бот проходит обычную остановку."""
+    import signal
+    from unittest.mock import AsyncMock
+
+    from src.api.webhook import run_webhook
+    from src.config import settings
+
+    monkeypatch.setattr(settings, "webhook_url", "https://bot.example.com/telegram")
+    monkeypatch.setattr(settings, "webhook_host", "127.0.0.1")
+    monkeypatch.setattr(settings, "webhook_port", 0)
+    monkeypatch.setattr(settings, "monitoring_token", "mon-token")
+    loop = asyncio.get_running_loop()
+    handlers = {}
+    monkeypatch.setattr(loop, "add_signal_handler", lambda sig, cb: handlers.__setitem__(sig, cb))
+    monkeypatch.setattr(loop, "remove_signal_handler", lambda sig: handlers.pop(sig))
+    bot = Bot("42:TEST")
+    bot.set_webhook = AsyncMock()
+
+    task = asyncio.create_task(run_webhook(_Recorder().dp, bot, _Monitoring()))
+    while not bot.set_webhook.await_count:
+        await asyncio.sleep(0.01)
+    handlers[signal.SIGTERM]()
+
+    await asyncio.wait_for(task, timeout=5)
+    assert handlers == {}
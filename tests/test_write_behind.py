@@ -0,0 +1,85 @@
+"""Журнал отложенной записи: пачки, замена по ключу, надёжный путь статусов."""
+import pytest
+
+from src.database.queue_repo import QueueRepository
+
+
+def _task(task_id):
+    return {
+        "task_id": task_id, "user_id": 1, "chat_id": 1, "file_name": "a.mp3",
+        "template_id": 1, "llm_provider": "openai", "status": "queued",
+        "created_at": "2026-07-07 10:00:00",
+    }
+
+
+async def _row(db, task_id):
+    async with db.read() as conn:
+        cursor = await conn.execute(
+            "SELECT status, message_id FROM queue_tasks WHERE task_id = ?", (task_id,)
+        )
+        return await cursor.fetchone()
+
+
+@pytest.mark.asyncio
+async def test_same_row_is_coalesced_and_written_once(test_db):
+    repo = QueueRepository(test_db)
+    await repo.save_queue_task(_task("t"))
+
+    await repo.update_queue_task_message_id("t", 1)
+    await repo.update_queue_task_message_id("t", 2)
+    await repo.update_queue_task_status("t", "processing", started_at="2026-07-07 10:01:00")
+    await repo.update_queue_task_status("t", "completed")
+    assert len(test_db.journal) == 3
+
+    assert (await _row(test_db, "t"))["status"] == "queued"  # ещё в журнале
+    assert await test_db.journal.flush() == 3
+    row = await _row(test_db, "t")
+    assert (row["status"], row["message_id"]) == ("completed", 2)
+
+
+@pytest.mark.asyncio
+async def test_last_write_wins_across_statement_variants(test_db):
+    repo = QueueRepository(test_db)
+    await repo.save_queue_task(_task("t"))
+
+    await repo.update_queue_task_status("t", "processing", started_at="2026-07-07 10:01:00")
+    await repo.update_queue_task_status("t", "failed", error_message="boom")
+    await repo.update_queue_task_status("t", "processing", started_at="2026-07-07 10:02:00")
+    await test_db.journal.flush()
+
+    assert (await _row(test_db, "t"))["status"] == "processing"
+
+
+@pytest.mark.asyncio
+async def test_cancel_is_durable_and_not_overtaken(test_db):
+    repo = QueueRepository(test_db)
+    await repo.save_queue_task(_task("t"))
+
+    await repo.update_queue_task_status("t", "processing", started_at="2026-07-07 10:01:00")
+    await repo.update_queue_task_status("t", "cancelled")
+
+    assert len(test_db.journal) == 0
+    assert (await _row(test_db, "t"))["status"] == "cancelled"
+
+
+@pytest.mark.asyncio
+async def test_full_buffer_flushes_before_accepting(test_db):
+    test_db.journal.max_pending = 2
+    repo = QueueRepository(test_db)
+    for task_id in ("a", "b", "c"):
+        await repo.save_queue_task(_task(task_id))
+        await repo.update_queue_task_message_id(task_id, 7)
+
+    assert len(test_db.journal) == 1
+    assert (await _row(test_db, "a"))["message_id"] == 7
+
+
+@pytest.mark.asyncio
+async def test_close_flushes_pending_writes(test_db):
+    repo = QueueRepository(test_db)
+    await repo.save_queue_task(_task("t"))
+    await repo.update_queue_task_message_id("t", 5)
+
+    await test_db.close()
+
+    assert (await _row(test_db, "t"))["message_id"] == 5